@@ -0,0 +1,5 @@
+"""Performance benchmarks of the application.
+
+Benchmarks are plain scripts to be executed as modules, for instance
+`python -m benchmarks.notification_indexes`.
+"""
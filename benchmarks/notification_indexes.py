@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Benchmark the notification lookups as the notification history grows.
+
+Every friend has a single pending notification event while the history of
+already notified events grows, the cost of the lookups done on every run should
+stay flat with the indexes and grow linearly without them.
+"""
+import os
+import statistics
+import tempfile
+import time
+
+from datetime import date
+from datetime import timedelta
+
+import click
+
+from sqlalchemy import insert
+from sqlalchemy import text
+
+from friends_keeper.database import configure_database
+from friends_keeper.database import dispose_database
+from friends_keeper.database.friends import Friend
+from friends_keeper.database.migrations import upgrade_database
+from friends_keeper.database.notifications import NotificationEvent
+from friends_keeper.utils.orm.friends import get_next_friend_notification
+from friends_keeper.utils.orm.notifications import get_today_notifications_with_friends
+
+
+__CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"])
+CHUNK_SIZE = 10000
+
+
+def populate(engine, friends: int, history: int) -> None:
+    """Populate the database with friends, their pending events and the history.
+
+    Args:
+        engine (Engine): Engine bound to the database.
+        friends (int): Number of friends.
+        history (int): Number of already notified events.
+    """
+    today = date.today()
+
+    with engine.begin() as connection:
+
+        for start in range(1, friends + 1, CHUNK_SIZE):
+            indexes = range(start, min(start + CHUNK_SIZE, friends + 1))
+            connection.execute(
+                insert(Friend),
+                [{"id": index, "nickname": f"nickname_{index}", "min_days": 9, "max_days": 14} for index in indexes],
+            )
+            connection.execute(
+                insert(NotificationEvent),
+                [
+                    {"friend_id": index, "date": today + timedelta(days=index % 30), "already_notified": False}
+                    for index in indexes
+                ],
+            )
+
+        for start in range(0, history, CHUNK_SIZE):
+            connection.execute(
+                insert(NotificationEvent),
+                [
+                    {
+                        "friend_id": index % friends + 1,
+                        "date": today - timedelta(days=index % 3650 + 1),
+                        "already_notified": True,
+                    }
+                    for index in range(start, min(start + CHUNK_SIZE, history))
+                ],
+            )
+
+
+def drop_indexes(engine) -> None:
+    """Drop all the notification events indexes.
+
+    Args:
+        engine (Engine): Engine bound to the database.
+    """
+    with engine.begin() as connection:
+
+        for index in NotificationEvent.__table__.indexes:
+            connection.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+
+
+def measure(function, repeat: int) -> float:
+    """Get the median time in milliseconds it takes to call the given function.
+
+    Args:
+        function (callable): Function to measure.
+        repeat (int): Number of calls.
+
+    Returns:
+        float: Median time in milliseconds.
+    """
+    timings = list()
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(timings)
+
+
+def run_benchmark(friends: int, history: int, indexed: bool, repeat: int) -> dict:
+    """Run the benchmark with the given history size.
+
+    Args:
+        friends (int): Number of friends.
+        history (int): Number of already notified events.
+        indexed (bool): Whether the indexes are kept or dropped.
+        repeat (int): Number of calls measured per lookup.
+
+    Returns:
+        dict: Median time of every lookup in milliseconds.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        engine = configure_database({"database": {"url": f"sqlite:///{os.path.join(directory, 'benchmark.db')}"}})
+        upgrade_database(engine)
+        populate(engine, friends=friends, history=history)
+
+        if not indexed:
+            drop_indexes(engine)
+
+        result = {
+            "today": measure(get_today_notifications_with_friends, repeat),
+            "friend": measure(lambda: get_next_friend_notification(friends // 2), repeat),
+        }
+        dispose_database()
+
+    return result
+
+
+@click.command(context_settings=__CONTEXT_SETTINGS, help="Benchmark notification lookups against history size")
+@click.option("--friends", default=1000, show_default=True, help="Number of friends.")
+@click.option(
+    "--history",
+    "histories",
+    multiple=True,
+    type=int,
+    default=(10000, 100000, 1000000),
+    show_default=True,
+    help="Number of already notified events, can be given several times.",
+)
+@click.option("--repeat", default=5, show_default=True, help="Calls measured per lookup.")
+def main(friends: int, histories: tuple, repeat: int):
+    """Print the lookups cost for every history size with and without indexes."""
+    click.echo(f"{'history':>10} {'today (idx)':>12} {'today (scan)':>13} {'friend (idx)':>13} {'friend (scan)':>14}")
+
+    for history in histories:
+        indexed = run_benchmark(friends=friends, history=history, indexed=True, repeat=repeat)
+        scanned = run_benchmark(friends=friends, history=history, indexed=False, repeat=repeat)
+        click.echo(
+            f"{history:>10} {indexed['today']:>10.2f}ms {scanned['today']:>11.2f}ms "
+            f"{indexed['friend']:>11.2f}ms {scanned['friend']:>12.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""Benchmark the run pipeline, the ORM helpers and the notifiers.
+
+Every database size is seeded once with friends, their pending notification
+events and a deep history of already notified ones, see
+`benchmarks.notification_indexes.populate`. Then are measured:
+  - `get_today_notifications`, `get_all_friends` and `create_friend`.
+  - Every notifier sending `--messages` messages to a local stand-in of its
+    service, see `benchmarks.stand_ins`.
+  - `main_core` notifying with all of them, every call on a fresh copy of the
+    seeded database so all of them have the same reminders due.
+
+Results can be written as JSON with `--output` and compared with a previous
+one with `--baseline`, the exit code is 1 when any benchmark got slower than
+`--threshold` times its baseline, so regressions show up between commits.
+"""
+import itertools
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from datetime import datetime
+from typing import Callable
+from typing import List
+from typing import Union
+from unittest import mock
+
+import click
+import yaml
+
+from benchmarks.notification_indexes import populate
+from benchmarks.stand_ins import gotify_server
+from benchmarks.stand_ins import serve
+from benchmarks.stand_ins import smtp_server
+from sqlalchemy import text
+
+from friends_keeper.core import main_core
+from friends_keeper.core import prepare_database
+from friends_keeper.database import configure_database
+from friends_keeper.database import dispose_database
+from friends_keeper.database.migrations import upgrade_database
+from friends_keeper.notifiers import NotifierFactory
+from friends_keeper.utils.orm.friends import create_friend
+from friends_keeper.utils.orm.friends import get_all_friends
+from friends_keeper.utils.orm.notifications import get_today_notifications
+
+
+__CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"])
+
+
+def measure(function: Callable, repeat: int, setup: Union[Callable, None] = None) -> dict:
+    """Get the time in milliseconds it takes to call the given function.
+
+    Args:
+        function (Callable): Function to measure.
+        repeat (int): Number of calls.
+        setup (Union[Callable, None], optional): Function called before every call, not measured.
+        Defaults to None.
+
+    Returns:
+        dict: Median, minimum and maximum time in milliseconds.
+    """
+    timings = list()
+
+    for _ in range(repeat):
+
+        if setup is not None:
+            setup()
+
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {"median_ms": statistics.median(timings), "min_ms": min(timings), "max_ms": max(timings)}
+
+
+def get_configuration(directory: str, gotify_port: int, smtp_port: int) -> dict:
+    """Get the configuration notifying with every notifier to the local stand-ins.
+
+    Args:
+        directory (str): Directory of the database and the notifications file.
+        gotify_port (int): Port of the Gotify stand-in.
+        smtp_port (int): Port of the SMTP stand-in.
+
+    Returns:
+        dict: Configuration.
+    """
+    return {
+        "logging": {"path": os.path.join(directory, "friends_keeper.log"), "debug_level": "ERROR"},
+        "database": {"url": f"sqlite:///{os.path.join(directory, 'friends_keeper.db')}"},
+        "notifications": {"type": ["file", "gotify", "email"], "title": "Benchmark"},
+        "notifiers": {
+            "file": {"path": os.path.join(directory, "notifications.txt")},
+            "gotify": {"url": f"http://127.0.0.1:{gotify_port}", "app_token": "benchmark"},
+            "email": {
+                "host": "127.0.0.1",
+                "port": smtp_port,
+                "password": "",
+                "from_address": "friends_keeper@localhost",
+                "to_address": ["benchmark@localhost"],
+            },
+        },
+    }
+
+
+def seed_database(path: str, friends: int, history: int) -> None:
+    """Create the seeded database all benchmarks of a size start from.
+
+    Args:
+        path (str): Database file path.
+        friends (int): Number of friends.
+        history (int): Number of already notified events.
+    """
+    engine = configure_database({"database": {"url": f"sqlite:///{path}"}})
+    upgrade_database(engine)
+    populate(engine, friends=friends, history=history)
+
+    # Leave everything on the database file so it can be copied.
+    with engine.connect() as connection:
+        connection.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+
+    dispose_database()
+
+
+def restore_database(seed_path: str, path: str) -> None:
+    """Replace the database with a copy of the seeded one.
+
+    Args:
+        seed_path (str): Seeded database file path.
+        path (str): Database file path.
+    """
+    dispose_database()
+
+    for suffix in ("-wal", "-shm"):
+
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    shutil.copyfile(seed_path, path)
+
+
+def send_messages(notifier, messages: int) -> None:
+    """Send the given number of messages with the notifier and flush it.
+
+    Args:
+        notifier (BaseNotifier): Notifier to send with.
+        messages (int): Number of messages.
+    """
+    for index in range(messages):
+        notifier.send_message(f"Remember to CALL nickname_{index}", idempotency_key=f"benchmark-{index}")
+
+    notifier.flush()
+
+
+def run_benchmarks(friends: int, history: int, repeat: int, messages: int) -> List[dict]:
+    """Run all benchmarks against a database of the given size.
+
+    Args:
+        friends (int): Number of friends.
+        history (int): Number of already notified events.
+        repeat (int): Number of calls measured per benchmark.
+        messages (int): Messages sent per notifier call.
+
+    Returns:
+        List[dict]: Result of every benchmark.
+    """
+    results = dict()
+
+    with tempfile.TemporaryDirectory() as directory:
+        seed_path = os.path.join(directory, "seed.db")
+        seed_database(seed_path, friends=friends, history=history)
+
+        with serve(gotify_server()) as gotify_port, serve(smtp_server()) as smtp_port:
+            configuration = get_configuration(directory, gotify_port=gotify_port, smtp_port=smtp_port)
+            config_file_path = os.path.join(directory, "config.yaml")
+            database_path = os.path.join(directory, "friends_keeper.db")
+
+            with open(config_file_path, "w") as config_file:
+                yaml.safe_dump(configuration, config_file)
+
+            # Runs neither log every query nor write the application log file.
+            with mock.patch("friends_keeper.utils.CONFIGURATION_FILE_PATH", config_file_path), mock.patch(
+                "friends_keeper.core.configure_logging"
+            ):
+                restore_database(seed_path, database_path)
+                prepare_database(configuration=configuration)
+                nicknames = (f"benchmark_{index}" for index in itertools.count())
+
+                results["get_today_notifications"] = measure(get_today_notifications, repeat)
+                results["get_all_friends"] = measure(get_all_friends, repeat)
+                results["create_friend"] = measure(
+                    lambda: create_friend(nickname=next(nicknames), min_days=9, max_days=14), repeat
+                )
+
+                for notifier in NotifierFactory.get_notifiers(configuration=configuration):
+                    results[f"notifier_{notifier.notifier_type}"] = measure(
+                        lambda: send_messages(notifier, messages), repeat
+                    )
+                    notifier.close()
+
+                results["main_core"] = measure(
+                    lambda: main_core(debug_level=logging.ERROR),
+                    repeat,
+                    setup=lambda: restore_database(seed_path, database_path),
+                )
+                dispose_database()
+
+    return [{"friends": friends, "history": history, "benchmark": name, **result} for name, result in results.items()]
+
+
+def get_commit() -> Union[str, None]:
+    """Get the commit benchmarked.
+
+    Returns:
+        Union[str, None]: Commit hash or None when it is not a git checkout.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, check=True, text=True
+        ).stdout.strip()  # nosec B603 B607
+
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[dict], baseline: dict, threshold: float) -> List[str]:
+    """Compare the results with the baseline ones.
+
+    Args:
+        results (List[dict]): Results of the benchmarks.
+        baseline (dict): Report of a previous execution.
+        threshold (float): Times slower than the baseline a benchmark must be to be a regression.
+
+    Returns:
+        List[str]: Description of every regression.
+    """
+    baseline_results = {
+        (result["friends"], result["history"], result["benchmark"]): result for result in baseline["results"]
+    }
+    regressions = list()
+
+    for result in results:
+        previous = baseline_results.get((result["friends"], result["history"], result["benchmark"]))
+
+        if previous is None:
+            continue
+
+        ratio = result["median_ms"] / previous["median_ms"]
+        result["baseline_ratio"] = ratio
+
+        if ratio > threshold:
+            regressions.append(
+                f"{result['benchmark']} ({result['friends']} friends) took {result['median_ms']:.2f}ms, "
+                f"{ratio:.2f} times the baseline {previous['median_ms']:.2f}ms"
+            )
+
+    return regressions
+
+
+@click.command(context_settings=__CONTEXT_SETTINGS, help="Benchmark the run pipeline, ORM helpers and notifiers")
+@click.option(
+    "--friends",
+    "friends_sizes",
+    multiple=True,
+    type=int,
+    default=(1000, 100000, 1000000),
+    show_default=True,
+    help="Number of friends, can be given several times.",
+)
+@click.option("--history-per-friend", default=10, show_default=True, help="Already notified events per friend.")
+@click.option("--repeat", default=5, show_default=True, help="Calls measured per benchmark.")
+@click.option("--messages", default=100, show_default=True, help="Messages sent per notifier call.")
+@click.option("--output", type=click.Path(dir_okay=False), help="File to write the results to as JSON.")
+@click.option("--baseline", type=click.File(), help="JSON results of a previous execution to compare with.")
+@click.option("--threshold", default=1.2, show_default=True, help="Times slower than the baseline to fail.")
+def main(
+    friends_sizes: tuple,
+    history_per_friend: int,
+    repeat: int,
+    messages: int,
+    output: Union[str, None],
+    baseline,
+    threshold: float,
+):
+    """Print the benchmarks results and optionally write them as JSON."""
+    logging.basicConfig(level=logging.ERROR, handlers=[logging.NullHandler()])
+    results = list()
+    click.echo(f"{'friends':>10} {'benchmark':<25} {'median':>12} {'min':>12} {'max':>12}")
+
+    for friends in friends_sizes:
+
+        for result in run_benchmarks(
+            friends=friends, history=friends * history_per_friend, repeat=repeat, messages=messages
+        ):
+            results.append(result)
+            click.echo(
+                f"{friends:>10} {result['benchmark']:<25} {result['median_ms']:>10.2f}ms "
+                f"{result['min_ms']:>10.2f}ms {result['max_ms']:>10.2f}ms"
+            )
+
+    regressions = compare(results, json.load(baseline), threshold) if baseline is not None else list()
+
+    if output is not None:
+        report = {
+            "commit": get_commit(),
+            "created_at": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "messages": messages,
+            "results": results,
+        }
+
+        with open(output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+    for regression in regressions:
+        click.echo(f"Regression: {regression}", err=True)
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
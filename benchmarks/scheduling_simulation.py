@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Simulate the reminders per day every scheduling strategy ends up with.
+
+Friends get random `[min_days, max_days)` windows, as the `add` command allows,
+and their first reminder is scheduled on the first day. Every simulated day the
+due reminders are rescheduled with the strategy, the same way a run does, and
+the number of reminders of every day after the warm up is reported as the
+peak-to-mean daily load: 1.0 means every day gets the same number of reminders.
+
+The simulation runs in memory, the balanced strategy gets the pending events
+from the simulated calendar instead of loading them from the database.
+"""
+import random
+import statistics
+
+from collections import Counter
+from collections import defaultdict
+from datetime import date
+from datetime import timedelta
+
+import click
+
+from friends_keeper.scheduling import SCHEDULING_STRATEGIES
+
+
+__CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"])
+
+
+def get_windows(friends: int, seed: int) -> list:
+    """Get the days window of every friend.
+
+    Args:
+        friends (int): Number of friends.
+        seed (int): Random seed.
+
+    Returns:
+        list: Minimum and maximum days of every friend.
+    """
+    rng = random.Random(seed)
+    return [(rng.randint(1, 15), rng.randint(16, 30)) for _ in range(friends)]
+
+
+def simulate(strategy_name: str, windows: list, days: int, seed: int) -> list:
+    """Simulate the given days and get the number of reminders of every one of them.
+
+    Args:
+        strategy_name (str): Scheduling strategy name.
+        windows (list): Minimum and maximum days of every friend.
+        days (int): Number of days simulated.
+        seed (int): Random seed.
+
+    Returns:
+        list: Number of reminders of every day.
+    """
+    pending = defaultdict(list)
+    pending_windows = defaultdict(Counter)
+
+    def load_pending(start: date, end: date) -> list:
+        return [
+            (event_date, min_days, max_days, count)
+            for event_date, windows_count in pending_windows.items()
+            if start <= event_date < end
+            for (min_days, max_days), count in windows_count.items()
+        ]
+
+    def schedule(friends: list, today: date) -> None:
+        next_dates = strategy.next_dates([windows[friend] for friend in friends], today=today)
+
+        for friend, next_date in zip(friends, next_dates):
+            pending[next_date].append(friend)
+            pending_windows[next_date][windows[friend]] += 1
+
+    options = {"load_pending": load_pending} if strategy_name == "balanced" else dict()
+    strategy = SCHEDULING_STRATEGIES[strategy_name](rng=random.Random(seed), **options)
+    start = date.today()
+    schedule(list(range(len(windows))), today=start)
+    loads = list()
+
+    for offset in range(days):
+        today = start + timedelta(days=offset)
+        due = pending.pop(today, list())
+        pending_windows.pop(today, None)
+        loads.append(len(due))
+        schedule(due, today=today)
+
+    return loads
+
+
+@click.command(context_settings=__CONTEXT_SETTINGS, help="Simulate the daily reminders load of every strategy")
+@click.option("--friends", default=10000, show_default=True, help="Number of friends.")
+@click.option("--days", default=365, show_default=True, help="Number of days simulated.")
+@click.option("--warmup", default=30, show_default=True, help="First days left out of the report.")
+@click.option("--seed", default=0, show_default=True, help="Random seed.")
+def main(friends: int, days: int, warmup: int, seed: int):
+    """Print the daily load statistics of every scheduling strategy."""
+    windows = get_windows(friends=friends, seed=seed)
+    click.echo(f"{'strategy':>10} {'mean':>9} {'stdev':>8} {'min':>6} {'peak':>6} {'peak/mean':>10}")
+
+    for strategy_name in SCHEDULING_STRATEGIES:
+        loads = simulate(strategy_name=strategy_name, windows=windows, days=days, seed=seed)[warmup:]
+        mean = statistics.mean(loads)
+        click.echo(
+            f"{strategy_name:>10} {mean:>9.1f} {statistics.pstdev(loads):>8.1f} {min(loads):>6} "
+            f"{max(loads):>6} {max(loads) / mean:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Local stand-ins of the services notifiers deliver to.
+
+They answer right away and keep nothing, so benchmarks measure the cost of the
+notifiers themselves instead of the network or a real server.
+"""
+import json
+import socketserver
+import threading
+
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Iterator
+
+
+class GotifyHandler(BaseHTTPRequestHandler):
+    """Gotify API stand-in answering every message as created."""
+
+    protocol_version = "HTTP/1.1"
+    # Answer right away instead of waiting for the client to acknowledge the headers.
+    disable_nagle_algorithm = True
+
+    def do_POST(self) -> None:
+        """Read the message and answer it was created."""
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps({"id": 1}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        """Do not log requests."""
+        pass
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """SMTP server stand-in accepting every email without authentication."""
+
+    disable_nagle_algorithm = True
+
+    def handle(self) -> None:
+        """Answer the SMTP commands of a connection until it quits."""
+        self.reply("220 localhost ESMTP stand-in")
+
+        for line in self.rfile:
+            command = line.decode().strip().upper()
+
+            if command.startswith("EHLO"):
+                self.reply("250-localhost", "250 8BITMIME")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+
+                for data_line in self.rfile:
+
+                    if data_line == b".\r\n":
+                        break
+
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+    def reply(self, *lines: str) -> None:
+        """Send the given reply lines.
+
+        Args:
+            lines (str): Reply lines, with their status code.
+        """
+        self.wfile.write("".join(f"{line}\r\n" for line in lines).encode())
+
+
+class ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """TCP server handling every connection on its own daemon thread."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+@contextmanager
+def serve(server: socketserver.BaseServer) -> Iterator[int]:
+    """Run the given server on a background thread within the context.
+
+    Args:
+        server (socketserver.BaseServer): Server bound to a local port.
+
+    Yields:
+        Iterator[int]: Port the server listens on.
+    """
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        yield server.server_address[1]
+
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def gotify_server() -> ThreadingHTTPServer:
+    """Get a Gotify stand-in bound to a free local port.
+
+    Returns:
+        ThreadingHTTPServer: Server to run with `serve`.
+    """
+    return ThreadingHTTPServer(("127.0.0.1", 0), GotifyHandler)
+
+
+def smtp_server() -> ThreadingTCPServer:
+    """Get an SMTP stand-in bound to a free local port.
+
+    Returns:
+        ThreadingTCPServer: Server to run with `serve`.
+    """
+    return ThreadingTCPServer(("127.0.0.1", 0), SMTPHandler)
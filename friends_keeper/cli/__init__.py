@@ -2,39 +2,78 @@
 
 All different command options groups are added together in this module to centralice the
 addition of different command groups.
+
+Command groups are loaded lazily so `--help` and simple commands do not pay for
+importing the dependencies of every other command.
 """
 
 import click
 
-from friends_keeper.cli.add import add_cli
 from friends_keeper.cli.cli_options import CLIOptions
-from friends_keeper.cli.delete import delete_cli
-from friends_keeper.cli.run import run_cli
-from friends_keeper.cli.show import show_cli
-from friends_keeper.cli.update import update_cli
+from friends_keeper.cli.lazy_group import LazyGroup
+from friends_keeper.constants import DEFAULT_SLOW_QUERY_THRESHOLD
+from friends_keeper.extensions import configure_logging
 from friends_keeper.extensions import logger
 
 
 __CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"])
+__LAZY_COMMANDS = {
+    "add": ("friends_keeper.cli.add", "add_cli", "Add friend or notification to the database"),
+    "delete": ("friends_keeper.cli.delete", "delete_cli", "Delete friend or notification from database."),
+    "dev": ("friends_keeper.cli.dev", "dev_cli", "Development and load testing tools"),
+    "import": ("friends_keeper.cli.importer", "import_cli", "Import friends from a CSV or JSON lines file"),
+    "reschedule": (
+        "friends_keeper.cli.reschedule",
+        "reschedule_cli",
+        "Reschedule the notification events of every active friend",
+    ),
+    "run": ("friends_keeper.cli.run", "run_cli", "Run main core"),
+    "serve": ("friends_keeper.cli.serve", "serve_cli", "Run main core as a long running scheduler"),
+    "show": ("friends_keeper.cli.show", "show_cli", "Show information about stored data"),
+    "update": ("friends_keeper.cli.update", "update_cli", "Update friend or notification on the database"),
+}
 
 
-@click.group(context_settings=__CONTEXT_SETTINGS, no_args_is_help=True)
+@click.group(cls=LazyGroup, lazy_commands=__LAZY_COMMANDS, context_settings=__CONTEXT_SETTINGS, no_args_is_help=True)
 @click.option("-v", "--verbose", default=2, count=True)
+@click.option(
+    "--profile-queries",
+    is_flag=True,
+    default=False,
+    help="Count and time every database statement, printing a summary when the command finishes.",
+)
+@click.option(
+    "--slow-query-threshold",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_SLOW_QUERY_THRESHOLD,
+    show_default=True,
+    help="Seconds from which profiled statements are logged along with their query plan.",
+)
 @click.pass_context
-def main_cli(ctx: click.Context, verbose: bool):
+def main_cli(ctx: click.Context, verbose: bool, profile_queries: bool, slow_query_threshold: float):
     """Main entrypoint for the friends keeper application.
 
     Args:
         ctx (click.Context): context to be passed onto other command groups.
         verbose (bool): Level of logging.
+        profile_queries (bool): Whether to profile the database statements.
+        slow_query_threshold (float): Seconds from which profiled statements are logged.
     """
-    click.echo(f"\nUsing debug level {verbose * 10}")
+    configure_logging()
+    click.echo(f"\nUsing debug level {verbose * 10}", err=True)
     logger.setLevel(verbose)
     ctx.obj = CLIOptions(debug_level=verbose * 10)
 
+    if profile_queries:
+        # Imported here as it needs SQLAlchemy, which commands not using the database do not load.
+        from friends_keeper.database.profiler import disable_query_profiler
+        from friends_keeper.database.profiler import enable_query_profiler
+
+        query_profiler = enable_query_profiler(slow_query_threshold=slow_query_threshold)
+
+        def report_queries() -> None:
+            """Print the profiled statements summary and disable the profiler."""
+            disable_query_profiler()
+            click.echo(f"\nQuery profile:\n{query_profiler.format_summary()}", err=True)
 
-main_cli.add_command(add_cli)
-main_cli.add_command(show_cli)
-main_cli.add_command(delete_cli)
-main_cli.add_command(run_cli)
-main_cli.add_command(update_cli)
+        ctx.call_on_close(report_queries)
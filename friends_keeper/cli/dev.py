@@ -0,0 +1,112 @@
+"""Development command line module."""
+from typing import Tuple
+
+import click
+
+from friends_keeper.constants import DEFAULT_SEED_CHUNK_SIZE
+from friends_keeper.constants import DEFAULT_SEED_HISTORY_YEARS
+from friends_keeper.constants import DEFAULT_SEED_INACTIVE_RATIO
+from friends_keeper.constants import DEFAULT_SEED_MAX_DAYS
+from friends_keeper.constants import DEFAULT_SEED_MIN_DAYS
+from friends_keeper.utils.seed import parse_days_range
+from friends_keeper.utils.seed import seed_friends
+
+
+@click.group(name="dev", invoke_without_command=True, help="Development and load testing tools", no_args_is_help=True)
+def dev_cli() -> None:
+    """Main development command line option group."""
+    pass
+
+
+def days_range_callback(ctx: click.Context, param: click.Parameter, value: str) -> Tuple[int, int]:
+    """Parse a range of days option.
+
+    Args:
+        ctx (click.Context): Command context.
+        param (click.Parameter): Option being parsed.
+        value (str): Range of days given as `LOW:HIGH`.
+
+    Raises:
+        click.BadParameter: Raised when the range is not valid.
+
+    Returns:
+        Tuple[int, int]: Lowest and highest days.
+    """
+    try:
+        return parse_days_range(value)
+    except ValueError as exec_error:
+        raise click.BadParameter(str(exec_error))
+
+
+@dev_cli.command(name="seed", help="Fill the database with synthetic friends and notification history")
+@click.option("--friends", type=click.IntRange(min=1), required=True, help="Number of friends.")
+@click.option(
+    "--min-days",
+    default="{}:{}".format(*DEFAULT_SEED_MIN_DAYS),
+    show_default=True,
+    callback=days_range_callback,
+    help="Range `min_days` are drawn from.",
+)
+@click.option(
+    "--max-days",
+    default="{}:{}".format(*DEFAULT_SEED_MAX_DAYS),
+    show_default=True,
+    callback=days_range_callback,
+    help="Range `max_days` are drawn from.",
+)
+@click.option(
+    "--inactive-ratio",
+    type=click.FloatRange(min=0, max=1),
+    default=DEFAULT_SEED_INACTIVE_RATIO,
+    show_default=True,
+    help="Share of inactive friends.",
+)
+@click.option(
+    "--history-years",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_SEED_HISTORY_YEARS,
+    show_default=True,
+    help="Years of already notified events.",
+)
+@click.option("--seed", type=int, default=None, help="Random seed, the same seed gives the same database.")
+@click.option(
+    "--chunk-size",
+    type=click.IntRange(min=1),
+    default=DEFAULT_SEED_CHUNK_SIZE,
+    show_default=True,
+    help="Friends inserted per transaction.",
+)
+def seed_cli(
+    friends: int,
+    min_days: Tuple[int, int],
+    max_days: Tuple[int, int],
+    inactive_ratio: float,
+    history_years: float,
+    seed: int,
+    chunk_size: int,
+) -> None:
+    """Generate friends along with their pending and already notified events.
+
+    Args:
+        friends (int): Number of friends.
+        min_days (Tuple[int, int]): Range `min_days` are drawn from.
+        max_days (Tuple[int, int]): Range `max_days` are drawn from.
+        inactive_ratio (float): Share of inactive friends.
+        history_years (float): Years of already notified events.
+        seed (int): Random seed.
+        chunk_size (int): Friends inserted per transaction.
+    """
+    result = seed_friends(
+        friends=friends,
+        min_days=min_days,
+        max_days=max_days,
+        inactive_ratio=inactive_ratio,
+        history_years=history_years,
+        seed=seed,
+        chunk_size=chunk_size,
+    )
+    rows_per_second = (result.friends + result.pending + result.history) / result.elapsed if result.elapsed else 0
+    click.echo(
+        f"{result.friends} friends seeded, {result.inactive} inactive, with {result.pending} pending and "
+        f"{result.history} already notified events in {result.elapsed:.2f} seconds ({rows_per_second:.0f} rows/s)."
+    )
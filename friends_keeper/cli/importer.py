@@ -0,0 +1,59 @@
+"""Import command line module."""
+import click
+
+from friends_keeper.constants import DEFAULT_IMPORT_CHUNK_SIZE
+from friends_keeper.constants import IMPORT_FORMATS
+from friends_keeper.exceptions import ConfigurationError
+from friends_keeper.scheduling import get_scheduling_strategy
+from friends_keeper.utils import load_configuration_file
+from friends_keeper.utils.importer import get_file_format
+from friends_keeper.utils.importer import import_friends
+
+
+@click.command(name="import", help="Import friends from a CSV or JSON lines file")
+@click.argument("file_path", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--format",
+    "file_format",
+    type=click.Choice(IMPORT_FORMATS),
+    default=None,
+    help="File format, taken from the file extension by default.",
+)
+@click.option(
+    "--chunk-size",
+    type=click.IntRange(min=1),
+    default=DEFAULT_IMPORT_CHUNK_SIZE,
+    show_default=True,
+    help="Friends inserted per transaction.",
+)
+def import_cli(file_path: str, file_format: str, chunk_size: int) -> None:
+    """Import friends along with their first notification event.
+
+    Args:
+        file_path (str): CSV or JSON lines file path.
+        file_format (str): File format.
+        chunk_size (int): Friends inserted per transaction.
+    """
+    if file_format is None:
+
+        try:
+            file_format = get_file_format(file_path)
+        except ValueError as exec_error:
+            raise click.BadParameter(str(exec_error), param_hint="'--format'")
+
+    try:
+        configuration = load_configuration_file()
+    except (OSError, ConfigurationError):
+        configuration = None
+
+    result = import_friends(
+        file_path=file_path,
+        file_format=file_format,
+        chunk_size=chunk_size,
+        strategy=get_scheduling_strategy(configuration=configuration),
+    )
+    rows_per_second = result.read / result.elapsed if result.elapsed else 0
+    click.echo(
+        f"{result.imported} friends imported, {result.skipped} skipped and {result.invalid} invalid "
+        f"out of {result.read} rows in {result.elapsed:.2f} seconds ({rows_per_second:.0f} rows/s)."
+    )
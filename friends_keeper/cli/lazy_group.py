@@ -0,0 +1,85 @@
+"""Click group loading its subcommands lazily.
+
+Subcommands pull heavy dependencies such as SQLAlchemy or the notifiers
+clients, so they are only imported when they are actually invoked.
+"""
+import importlib
+
+from typing import Dict
+from typing import List
+from typing import Tuple
+from typing import Union
+
+import click
+
+
+class LazyGroup(click.Group):
+    """Click group whose subcommands are imported on first use.
+
+    Args:
+        click.Group (click.Group): Click group base object.
+    """
+
+    def __init__(self, *args, lazy_commands: Dict[str, Tuple[str, str, str]] = None, **kwargs):
+        """Initialization of the lazy group.
+
+        Args:
+            lazy_commands (Dict[str, Tuple[str, str, str]], optional): Subcommands keyed on their name
+            with the module path, the attribute name within the module and their short help. Defaults to None.
+        """
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands or dict()
+
+    def list_commands(self, ctx: click.Context) -> List[str]:
+        """List the names of all subcommands, loaded or not.
+
+        Args:
+            ctx (click.Context): Click context.
+
+        Returns:
+            List[str]: Sorted subcommand names.
+        """
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> Union[click.Command, None]:
+        """Get a subcommand importing its module if it was not loaded yet.
+
+        Args:
+            ctx (click.Context): Click context.
+            cmd_name (str): Subcommand name.
+
+        Returns:
+            Union[click.Command, None]: Subcommand or None if there is no such subcommand.
+        """
+        if cmd_name not in self.commands and cmd_name in self.lazy_commands:
+            module_path, attribute_name, _ = self.lazy_commands[cmd_name]
+            command = getattr(importlib.import_module(module_path), attribute_name)
+            self.add_command(command, name=cmd_name)
+
+        return super().get_command(ctx, cmd_name)
+
+    def format_commands(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
+        """Write the subcommands help without importing the ones not loaded yet.
+
+        Args:
+            ctx (click.Context): Click context.
+            formatter (click.HelpFormatter): Help formatter.
+        """
+        rows = list()
+
+        for cmd_name in self.list_commands(ctx):
+
+            if cmd_name in self.commands:
+                command = self.commands[cmd_name]
+
+                if command.hidden:
+                    continue
+
+                rows.append((cmd_name, command.get_short_help_str(formatter.width)))
+
+            else:
+                rows.append((cmd_name, self.lazy_commands[cmd_name][2]))
+
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
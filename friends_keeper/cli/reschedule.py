@@ -0,0 +1,25 @@
+"""Reschedule command line module."""
+import random
+import time
+
+import click
+
+from friends_keeper.scheduling import RandomScheduling
+from friends_keeper.utils.orm.friends import reschedule_active_friends
+
+
+@click.command(name="reschedule", help="Reschedule the notification events of every active friend")
+@click.option("--seed", type=int, default=None, help="Random seed, the same seed gives the same dates.")
+@click.confirmation_option(prompt="Are you sure you want to reschedule the notification events of every active friend?")
+def reschedule_cli(seed: int) -> None:
+    """Give every active friend a new pending notification event within its days window.
+
+    Args:
+        seed (int): Random seed.
+    """
+    start_time = time.perf_counter()
+    updated, created = reschedule_active_friends(strategy=RandomScheduling(rng=random.Random(seed)))
+    click.echo(
+        f"{updated} notification events rescheduled and {created} created "
+        f"in {time.perf_counter() - start_time:.2f} seconds."
+    )
@@ -1,16 +1,41 @@
 """Run command line module."""
+import json
+
 import click
 
+from friends_keeper.constants import DEFAULT_CATCH_UP_CHUNK_SIZE
 from friends_keeper.core import main_core
+from friends_keeper.instrumentation import format_summary
 
 
 @click.group(name="run", invoke_without_command=True, help="Run main core")
+@click.option(
+    "--catch-up",
+    is_flag=True,
+    help="Notify overdue notification events after missed runs, once per friend and in chunks.",
+)
+@click.option(
+    "--chunk-size",
+    type=click.IntRange(min=1),
+    default=DEFAULT_CATCH_UP_CHUNK_SIZE,
+    show_default=True,
+    help="Friends notified at once when catching up.",
+)
+@click.option(
+    "--timings",
+    type=click.Choice(["text", "json"]),
+    default=None,
+    help="Print where the run spent its time, as text or JSON.",
+)
 @click.pass_context
-def run_cli(ctx: click.Context) -> None:
+def run_cli(ctx: click.Context, catch_up: bool, chunk_size: int, timings: str) -> None:
     """Main run command line option group.
 
     Args:
         ctx (click.Context): Click context passed.
+        catch_up (bool): Notify overdue notification events coalesced per friend and in chunks.
+        chunk_size (int): Friends notified at once when catching up.
+        timings (str): Format to print the run summary in, None to not print it.
     """
     # click.echo(dir(ctx.obj))
     # if ctx.invoked_subcommand == "friend":
@@ -19,4 +44,7 @@ def run_cli(ctx: click.Context) -> None:
     #     ctx.obj = NotificationOptions()
     debug_level = ctx.obj.debug_level
 
-    main_core(debug_level=debug_level)
+    summary = main_core(debug_level=debug_level, catch_up=catch_up, chunk_size=chunk_size, timings=bool(timings))
+
+    if summary is not None and timings is not None:
+        click.echo(json.dumps(summary, indent=2) if timings == "json" else format_summary(summary))
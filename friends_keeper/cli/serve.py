@@ -0,0 +1,32 @@
+"""Serve command line module."""
+import click
+
+from friends_keeper.constants import DEFAULT_DAEMON_POLL_INTERVAL
+from friends_keeper.constants import DEFAULT_DAEMON_RETRY_INTERVAL
+from friends_keeper.daemon import FriendsKeeperDaemon
+
+
+@click.command(name="serve", help="Run main core as a long running scheduler")
+@click.option(
+    "--poll-interval",
+    type=click.FloatRange(min=0, min_open=True),
+    default=DEFAULT_DAEMON_POLL_INTERVAL,
+    show_default=True,
+    help="Seconds between configuration file and next notification checks.",
+)
+@click.option(
+    "--retry-interval",
+    type=click.FloatRange(min=0, min_open=True),
+    default=DEFAULT_DAEMON_RETRY_INTERVAL,
+    show_default=True,
+    help="Seconds before retrying notifications which could not be notified.",
+)
+def serve_cli(poll_interval: float, retry_interval: float) -> None:
+    """Main serve command.
+
+    Args:
+        poll_interval (float): Seconds between configuration file and next notification checks.
+        retry_interval (float): Seconds before retrying notifications which could not be notified.
+    """
+    daemon = FriendsKeeperDaemon(poll_interval=poll_interval, retry_interval=retry_interval)
+    daemon.serve()
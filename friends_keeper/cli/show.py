@@ -3,20 +3,25 @@ import json
 import sys
 import traceback
 
+from typing import Callable
+from typing import Iterator
+from typing import Tuple
 from typing import Union
 
 import click
 
-from prettytable import PrettyTable
-
-from friends_keeper.constants import DATE_FORMAT
+from friends_keeper.constants import DEFAULT_PAGE_SIZE
+from friends_keeper.constants import OUTPUT_FORMATS
+from friends_keeper.database.friends import Friend
+from friends_keeper.database.notifications import NotificationEvent
 from friends_keeper.exceptions import ConfigurationError
 from friends_keeper.extensions import logger
 from friends_keeper.utils import load_configuration_file
-from friends_keeper.utils.orm.friends import get_all_friend_notifications
-from friends_keeper.utils.orm.friends import get_all_friends
-from friends_keeper.utils.orm.friends import get_friend
-from friends_keeper.utils.orm.notifications import get_coming_notifications
+from friends_keeper.utils.cli import RowsWriter
+from friends_keeper.utils.cli import TableRowsWriter
+from friends_keeper.utils.cli import get_rows_writer
+from friends_keeper.utils.orm.friends import get_friends_page
+from friends_keeper.utils.orm.notifications import get_notifications_page
 
 
 @click.group(name="show", invoke_without_command=True, help="Show information about stored data", no_args_is_help=True)
@@ -25,13 +30,137 @@ def show_cli() -> None:
     pass
 
 
+FRIENDS_FIELDS = [
+    ("id", "Friend ID"),
+    ("nickname", "Nickname"),
+    ("min_days", "Min. days"),
+    ("max_days", "Max. days"),
+    ("active", "Active"),
+]
+NOTIFICATIONS_FIELDS = [("id", "Notification ID"), ("nickname", "Nickname"), ("date", "Date")]
+
+
+def pagination_options(function: Callable) -> Callable:
+    """Add the pagination and output format options to a command.
+
+    Args:
+        function (Callable): Command function.
+
+    Returns:
+        Callable: Command function with the options added.
+    """
+    options = [
+        click.option(
+            "--limit", type=click.IntRange(min=1), default=None, help="Maximum number of rows to show, all by default."
+        ),
+        click.option("--after", type=click.INT, default=None, help="Show rows after the one with this ID."),
+        click.option(
+            "--format",
+            "output_format",
+            type=click.Choice(OUTPUT_FORMATS),
+            default=OUTPUT_FORMATS[0],
+            show_default=True,
+            help="Output format.",
+        ),
+    ]
+
+    for option in reversed(options):
+        function = option(function)
+
+    return function
+
+
+def iter_pages(get_page: Callable, after: Union[int, None], limit: Union[int, None]) -> Iterator[list]:
+    """Iterate over the pages of rows, one query per page, up to the given limit.
+
+    Args:
+        get_page (Callable): Function getting a page given the `after` cursor and the `limit`.
+        after (Union[int, None]): ID of the row to start after.
+        limit (Union[int, None]): Maximum number of rows, None for all of them.
+
+    Yields:
+        Iterator[list]: Pages of rows.
+    """
+    remaining = limit
+
+    while remaining is None or remaining > 0:
+        page_size = DEFAULT_PAGE_SIZE if remaining is None else min(DEFAULT_PAGE_SIZE, remaining)
+        page = get_page(after=after, limit=page_size)
+
+        if page:
+            yield page
+
+        if len(page) < page_size:
+            return
+
+        if remaining is not None:
+            remaining -= len(page)
+
+        after = get_row_id(page[-1])
+
+
+def get_row_id(row: Union[Friend, Tuple[NotificationEvent, Friend]]) -> int:
+    """Get the ID used as pagination cursor of a row.
+
+    Args:
+        row (Union[Friend, Tuple[NotificationEvent, Friend]]): Friend or notification event along with its friend.
+
+    Returns:
+        int: Row ID.
+    """
+    return row[0].id if isinstance(row, tuple) else row.id
+
+
+def write_pages(
+    pages: Iterator[list],
+    writer: RowsWriter,
+    to_dict: Callable,
+    title: str,
+    empty_message: str,
+    limit: Union[int, None],
+) -> None:
+    """Echo the pages of rows as soon as they are read.
+
+    Args:
+        pages (Iterator[list]): Pages of rows.
+        writer (RowsWriter): Writer for the output format.
+        to_dict (Callable): Function turning a row into a dictionary keyed on the field keys.
+        title (str): Title echoed before the table.
+        empty_message (str): Message echoed on the table format when there are no rows.
+        limit (Union[int, None]): Maximum number of rows, used to tell how to get the next ones.
+    """
+    is_table = isinstance(writer, TableRowsWriter)
+    last_id = None
+
+    for page in pages:
+
+        if is_table and not writer.rows_written:
+            click.echo(title)
+
+        writer.write([to_dict(row) for row in page])
+        last_id = get_row_id(page[-1])
+
+    writer.close()
+
+    if is_table:
+
+        if not writer.rows_written:
+            click.echo(empty_message)
+        elif writer.rows_written == limit:
+            click.echo(f"\nMore rows may follow, use '--after {last_id}' to show them.")
+
+
 @show_cli.command(name="friends", help="Show friends information")
 @click.option("--show-inactive", type=click.BOOL, default=False, show_default=True, help="Show inactive users.")
-def friends(show_inactive: bool) -> None:
+@pagination_options
+def friends(show_inactive: bool, limit: Union[int, None], after: Union[int, None], output_format: str) -> None:
     """Show all friends on database.
 
     Args:
         show_inactive (bool): Whether show or not inactive friends.
+        limit (Union[int, None]): Maximum number of friends to show.
+        after (Union[int, None]): Show friends after the one with this ID.
+        output_format (str): Output format.
     """
     # Get configuration
     try:
@@ -46,30 +175,36 @@ def friends(show_inactive: bool) -> None:
 
     else:
 
-        friends = get_all_friends(show_inactive=show_inactive)
-
-        if len(friends) > 0:
-            click.echo("\nFriends in database")
-            table_printer = PrettyTable()
-            table_printer.field_names = ["Friend ID", "Nickname", "Min. days", "Max. days", "Active"]
-
-            for friend in friends:
-                table_printer.add_row([friend.id, friend.nickname, friend.min_days, friend.max_days, friend.active])
-
-            click.echo(table_printer.get_string())
-        else:
-            click.echo("No friends found.")
+        pages = iter_pages(
+            lambda after, limit: get_friends_page(after=after, limit=limit, show_inactive=show_inactive),
+            after=after,
+            limit=limit,
+        )
+        write_pages(
+            pages=pages,
+            writer=get_rows_writer(output_format, FRIENDS_FIELDS),
+            to_dict=lambda friend: friend.to_dict(),
+            title="\nFriends in database",
+            empty_message="No friends found.",
+            limit=limit,
+        )
 
 
 @show_cli.command(name="notifications", help="Show coming notifications")
 @click.option(
     "-f", "--friend-id", type=click.INT, default=None, help="Retrieve friend specific notifications.", show_default=True
 )
-def notifications(friend_id: Union[str, None]) -> None:
+@pagination_options
+def notifications(
+    friend_id: Union[str, None], limit: Union[int, None], after: Union[int, None], output_format: str
+) -> None:
     """Show all notification events comming for a given friend.
 
     Args:
         friend_id (Union[str, None]): Friend's ID.
+        limit (Union[int, None]): Maximum number of notification events to show.
+        after (Union[int, None]): Show notification events after the one with this ID.
+        output_format (str): Output format.
     """
     # Get configuration
     try:
@@ -84,25 +219,19 @@ def notifications(friend_id: Union[str, None]) -> None:
 
     else:
 
-        if friend_id is not None:
-            notifications = get_all_friend_notifications(friend_id=friend_id)
-        else:
-            notifications = get_coming_notifications()
-
-        if len(notifications) > 0:
-            click.echo("\nComing notifications events:")
-
-            table_printer = PrettyTable()
-            table_printer.field_names = ["Notification ID", "Nickname", "Date"]
-
-            for notification in notifications:
-                friend = get_friend(friend_id=notification.friend_id)
-                table_printer.add_row([notification.id, friend.nickname, notification.date.strftime(DATE_FORMAT)])
-
-            click.echo(table_printer.get_string())
-
-        else:
-            click.echo("No notifications found.")
+        pages = iter_pages(
+            lambda after, limit: get_notifications_page(after=after, limit=limit, friend_id=friend_id),
+            after=after,
+            limit=limit,
+        )
+        write_pages(
+            pages=pages,
+            writer=get_rows_writer(output_format, NOTIFICATIONS_FIELDS),
+            to_dict=lambda row: {"id": row[0].id, "nickname": row[1].nickname, "date": row[0].date},
+            title="\nComing notifications events:",
+            empty_message="No notifications found.",
+            limit=limit,
+        )
 
 
 @show_cli.command(name="configuration", help="Show friends_keeper configuration")
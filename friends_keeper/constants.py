@@ -10,7 +10,9 @@ from collections import namedtuple
 
 __repo_root = os.path.dirname(os.path.dirname(__file__))
 REPO_ROOT_DIR = __repo_root
-CONFIGURATION_FILE_PATH = "./config.yaml"
+CONFIGURATION_FILE_PATH = os.environ.get("FRIENDS_KEEPER_CONFIGURATION", "./config.yaml")
+# Optional file where the validated configuration is cached between executions.
+CONFIGURATION_CACHE_FILE_PATH = os.environ.get("FRIENDS_KEEPER_CONFIGURATION_CACHE", "")
 LOGGING_PATH = os.path.abspath(__repo_root)
 
 DATE_FORMAT = "%d/%m/%y"
@@ -18,6 +20,80 @@ DATE_FORMAT = "%d/%m/%y"
 __notifiers = {"file": "file", "gotify": "gotify", "email": "email"}
 NOTIFIER_TYPES = namedtuple("directions", __notifiers.keys())(**__notifiers)
 NOTIFICATIONS_FILE_PATH = os.path.join(REPO_ROOT_DIR, "notifications.txt")
+# Bytes and seconds the file notifier buffers messages for, and rotated files it keeps.
+DEFAULT_FILE_FLUSH_SIZE = 65536
+DEFAULT_FILE_FLUSH_INTERVAL = 5
+DEFAULT_FILE_BACKUP_COUNT = 5
+# Seconds each notifier gets to deliver a message, SMTP connections time out after them
+# and retries do not start past them.
+DEFAULT_NOTIFIER_TIMEOUT = 30
+# Characters per notification message, longer ones are split into several messages.
+DEFAULT_MAX_MESSAGE_LENGTH = 1000
+# Friends with overdue notification events notified and rescheduled at once when catching up.
+DEFAULT_CATCH_UP_CHUNK_SIZE = 100
+# Outbox messages delivered at once, attempts before giving up on one and seconds between attempts,
+# doubled after every failed attempt up to the maximum.
+__outbox_statuses = {"pending": "pending", "sent": "sent", "failed": "failed"}
+OUTBOX_STATUSES = namedtuple("statuses", __outbox_statuses.keys())(**__outbox_statuses)
+DEFAULT_OUTBOX_BATCH_SIZE = 100
+DEFAULT_OUTBOX_MAX_ATTEMPTS = 10
+DEFAULT_OUTBOX_RETRY_BACKOFF = 60
+DEFAULT_OUTBOX_MAX_RETRY_BACKOFF = 21600
+# Attempts of every notifier delivery and seconds between them, doubled after every failed attempt up to the
+# maximum and jittered. Consecutive failed deliveries opening the notifier circuit, seconds it stays open and
+# seconds its state is kept in memory before loading it again.
+DEFAULT_NOTIFIER_RETRY_ATTEMPTS = 3
+DEFAULT_NOTIFIER_RETRY_BACKOFF = 0.5
+DEFAULT_NOTIFIER_MAX_RETRY_BACKOFF = 5
+DEFAULT_CIRCUIT_BREAKER_FAILURE_THRESHOLD = 5
+DEFAULT_CIRCUIT_BREAKER_RESET_TIMEOUT = 300
+DEFAULT_CIRCUIT_BREAKER_CACHE_TTL = 5
+# Gotify HTTP connection pool settings, timeouts in seconds.
+DEFAULT_GOTIFY_POOL_SIZE = 4
+DEFAULT_GOTIFY_CONNECT_TIMEOUT = 5
+DEFAULT_GOTIFY_READ_TIMEOUT = 10
+DEFAULT_SMTP_HOST = "localhost"
+# Seconds between the daemon checks while sleeping and before retrying failed notifications.
+DEFAULT_DAEMON_POLL_INTERVAL = 60
+DEFAULT_DAEMON_RETRY_INTERVAL = 300
+# Runs hold this lock while notifying, seconds until an unreleased lock expires.
+RUN_LOCK_NAME = "run"
+DEFAULT_RUN_LOCK_TTL = 900
+# Seconds until notification events claimed by a run which never finished can be claimed again.
+DEFAULT_CLAIM_TTL = 3600
+# Prometheus metrics settings, histogram buckets are upper bounds in seconds.
+DEFAULT_METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+DEFAULT_METRICS_HOST = "127.0.0.1"
+# Seconds from which the query profiler logs statements along with their query plan.
+DEFAULT_SLOW_QUERY_THRESHOLD = 0.1
+# Rows per query when listing friends and notifications.
+DEFAULT_PAGE_SIZE = 100
+OUTPUT_FORMATS = ("table", "jsonl", "csv")
+# Friends import settings, days between reminders are used when rows do not have them.
+DEFAULT_IMPORT_CHUNK_SIZE = 1000
+IMPORT_FORMATS = ("csv", "jsonl")
+DEFAULT_MIN_DAYS = 7
+DEFAULT_MAX_DAYS = 20
+# Synthetic databases settings, see `friends_keeper dev seed`.
+DEFAULT_SEED_CHUNK_SIZE = 10000
+DEFAULT_SEED_MIN_DAYS = (1, 15)
+DEFAULT_SEED_MAX_DAYS = (16, 30)
+DEFAULT_SEED_INACTIVE_RATIO = 0.1
+DEFAULT_SEED_HISTORY_YEARS = 1.0
+
+SCHEDULING_STRATEGY_NAMES = ("random", "balanced")
+DEFAULT_SCHEDULING_STRATEGY = "random"
+# Relative SQLite paths are resolved against the configuration file directory.
+DEFAULT_DATABASE_URL = "sqlite:///friends_keeper.db"
+# Pragmas applied to every new SQLite connection, `cache_size` in KiB when negative and `mmap_size` in bytes.
+DEFAULT_SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,
+    "mmap_size": 67108864,
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,
+}
 
 ACTIONS = ["message", "call", "text"]
 REMINDING_NOTES = [
@@ -53,6 +129,37 @@ DEFAULT_CONFIGURATION = {
     },
 }
 
+# Delivery settings shared by every notifier.
+NOTIFIER_DELIVERY_SCHEMA = {
+    "retry": {
+        "type": "object",
+        "properties": {
+            "attempts": {"type": "integer", "minimum": 1},
+            "backoff": {"type": "number", "minimum": 0},
+            "max_backoff": {"type": "number", "minimum": 0},
+        },
+        "additionalProperties": False,
+    },
+    "circuit_breaker": {
+        "type": "object",
+        "properties": {
+            "failure_threshold": {"type": "integer", "minimum": 1},
+            "reset_timeout": {"type": "number", "exclusiveMinimum": 0},
+            "cache_ttl": {"type": "number", "minimum": 0},
+        },
+        "additionalProperties": False,
+    },
+    "rate_limit": {
+        "type": "object",
+        "properties": {
+            "rate": {"type": "number", "exclusiveMinimum": 0},
+            "burst": {"type": "integer", "minimum": 1},
+        },
+        "required": ["rate"],
+        "additionalProperties": False,
+    },
+    "max_items_per_message": {"type": "integer", "minimum": 1},
+}
 
 YAML_SCHEMA = {
     "type": "object",
@@ -66,6 +173,25 @@ YAML_SCHEMA = {
             },
             "required": ["path", "debug_level"],
         },
+        "database": {
+            "type": "object",
+            "properties": {
+                "url": {"type": "string"},
+                "echo": {"type": "boolean"},
+                "pragmas": {
+                    "type": "object",
+                    "properties": {
+                        "journal_mode": {"enum": ["DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"]},
+                        "synchronous": {"enum": ["OFF", "NORMAL", "FULL", "EXTRA"]},
+                        "cache_size": {"type": "integer"},
+                        "mmap_size": {"type": "integer", "minimum": 0},
+                        "temp_store": {"enum": ["DEFAULT", "FILE", "MEMORY"]},
+                        "busy_timeout": {"type": "integer", "minimum": 0},
+                    },
+                    "additionalProperties": False,
+                },
+            },
+        },
         "notifications": {
             "type": "object",
             "properties": {
@@ -75,9 +201,39 @@ YAML_SCHEMA = {
                 },
                 "title": {"type": "string"},
                 "message": {"type": "string"},
+                "scheduling": {"enum": list(SCHEDULING_STRATEGY_NAMES)},
+                "max_message_length": {"type": "integer", "minimum": 1},
             },
             "required": ["type"],
         },
+        "outbox": {
+            "type": "object",
+            "properties": {
+                "batch_size": {"type": "integer", "minimum": 1},
+                "max_attempts": {"type": "integer", "minimum": 1},
+                "retry_backoff": {"type": "number", "exclusiveMinimum": 0},
+                "max_retry_backoff": {"type": "number", "exclusiveMinimum": 0},
+            },
+            "additionalProperties": False,
+        },
+        "instrumentation": {
+            "type": "object",
+            "properties": {
+                "enabled": {"type": "boolean"},
+                "path": {"type": "string"},
+            },
+            "additionalProperties": False,
+        },
+        "metrics": {
+            "type": "object",
+            "properties": {
+                "textfile": {"type": "string"},
+                "host": {"type": "string"},
+                "port": {"type": "integer", "minimum": 0, "maximum": 65535},
+                "buckets": {"type": "array", "items": {"type": "number", "exclusiveMinimum": 0}, "minItems": 1},
+            },
+            "additionalProperties": False,
+        },
         "notifiers": {
             "type": "object",
             "properties": {
@@ -85,6 +241,20 @@ YAML_SCHEMA = {
                     "type": "object",
                     "properties": {
                         "path": {"type": "string"},
+                        "timeout": {"type": "number", "exclusiveMinimum": 0},
+                        "flush_size": {"type": "integer", "minimum": 0},
+                        "flush_interval": {"type": "number", "minimum": 0},
+                        "rotation": {
+                            "type": "object",
+                            "properties": {
+                                "max_bytes": {"type": "integer", "minimum": 1},
+                                "interval": {"type": "number", "exclusiveMinimum": 0},
+                                "backup_count": {"type": "integer", "minimum": 1},
+                                "compress": {"type": "boolean"},
+                            },
+                            "additionalProperties": False,
+                        },
+                        **NOTIFIER_DELIVERY_SCHEMA,
                     },
                     "required": ["path"],
                 },
@@ -95,19 +265,30 @@ YAML_SCHEMA = {
                         "app_token": {"type": "string"},
                         "client_token": {"type": "string"},
                         "create_app": {"type": "boolean"},
+                        "timeout": {"type": "number", "exclusiveMinimum": 0},
+                        "pool_size": {"type": "integer", "minimum": 1},
+                        "connect_timeout": {"type": "number", "exclusiveMinimum": 0},
+                        "read_timeout": {"type": "number", "exclusiveMinimum": 0},
+                        **NOTIFIER_DELIVERY_SCHEMA,
                     },
                     "required": ["url", "app_token"],
                 },
                 "email": {
                     "type": "object",
                     "properties": {
+                        "host": {"type": "string"},
                         "port": {"type": "integer"},
+                        "username": {"type": "string"},
                         "password": {"type": "string"},
+                        "use_ssl": {"type": "boolean"},
+                        "use_tls": {"type": "boolean"},
                         "from_address": {"type": "string"},
                         "to_address": {
                             "type": "array",
                             "items": {"type": "string"},
                         },
+                        "timeout": {"type": "number", "exclusiveMinimum": 0},
+                        **NOTIFIER_DELIVERY_SCHEMA,
                     },
                     "required": ["password", "from_address", "to_address"],
                 },
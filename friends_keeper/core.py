@@ -6,41 +6,104 @@ action on and notify the user about those friends to contact.
 
 After notification, the event should be marked as `already_notified=True`
  and generate the next notification event on the database.
+
+All due notification events are processed in batch: they are loaded together
+with their friends in one query and rescheduled within a single transaction.
+The per event processing is only used as a fallback when the batch fails.
+
+Notifiers render their messages from the notification events along with their
+friends, so friends are read once per run no matter how many notifiers are
+enabled. Messages are written to the outbox in the same transaction that
+reschedules the events and delivered afterwards, see `friends_keeper.outbox`.
+
+The next notification event dates are picked by the scheduling strategy set on
+the configuration, see `friends_keeper.scheduling`.
+
+After missed runs the catch up mode goes through the overdue notification
+events in chunks, coalescing the ones of every friend.
+
+Runs hold the run lock while notifying, so a run starting before the previous
+one finished skips instead of sending the same notifications again. Events are
+claimed as well before being notified, so even runs holding the lock after it
+expired never notify events claimed by another one.
 """
 import logging
-import random
 import sys
+import time
 import traceback
+import uuid
 
+from datetime import datetime
+from typing import List
+from typing import Tuple
 from typing import Union
 
+from friends_keeper.constants import DEFAULT_CATCH_UP_CHUNK_SIZE
+from friends_keeper.constants import RUN_LOCK_NAME
+from friends_keeper.database import configure_database
+from friends_keeper.database.friends import Friend
+from friends_keeper.database.notifications import NotificationEvent
 from friends_keeper.exceptions import ConfigurationError
+from friends_keeper.exceptions import DatabaseError
+from friends_keeper.extensions import configure_logging
+from friends_keeper.instrumentation import count
+from friends_keeper.instrumentation import gauge
+from friends_keeper.instrumentation import instrument_run
+from friends_keeper.instrumentation import span
 from friends_keeper.notifiers import NotifierFactory
-from friends_keeper.utils import generate_next_reminder_date
+from friends_keeper.notifiers.base import BaseNotifier
+from friends_keeper.notifiers.dispatcher import close_notifier
+from friends_keeper.outbox import drain_outbox
+from friends_keeper.outbox import render_outbox_messages
+from friends_keeper.scheduling import RandomScheduling
+from friends_keeper.scheduling import SchedulingStrategy
+from friends_keeper.scheduling import get_scheduling_strategy
 from friends_keeper.utils import load_configuration_file
-from friends_keeper.utils.orm.friends import get_friend
-from friends_keeper.utils.orm.notifications import create_notification
+from friends_keeper.utils.orm.friends import get_friends_by_ids
+from friends_keeper.utils.orm.locks import hold_lock
+from friends_keeper.utils.orm.notifications import claim_notifications
+from friends_keeper.utils.orm.notifications import get_due_notifications_by_friend
+from friends_keeper.utils.orm.notifications import get_next_notification_date
 from friends_keeper.utils.orm.notifications import get_today_notifications
-from friends_keeper.utils.orm.notifications import mark_notification_as_done
+from friends_keeper.utils.orm.notifications import get_today_notifications_with_friends
+from friends_keeper.utils.orm.notifications import release_notifications
+from friends_keeper.utils.orm.notifications import reschedule_notifications
+from friends_keeper.utils.orm.outbox import get_next_outbox_attempt
 
 
 logger = logging.getLogger(__name__)
 
 
-def main_core(debug_level: Union[int, None] = None):
+def main_core(
+    debug_level: Union[int, None] = None,
+    catch_up: bool = False,
+    chunk_size: int = DEFAULT_CATCH_UP_CHUNK_SIZE,
+    timings: bool = False,
+) -> Union[dict, None]:
     """Main core logic definition.
 
     Steps:
       - Get notifications.
       - Get notifications' friends
       - Build mesage.
-      - Notify user.
       - Mark notification event as `already_done=True`.
       - Create new notification event.
+      - Notify user.
 
     Args:
         debug_level (Union[int, None], optional): Error level to be used while executing. Defaults to None.
+        catch_up (bool, optional): Notify the overdue notification events coalesced per friend and
+        in chunks, see `catch_up_notifications`. Defaults to False.
+        chunk_size (int, optional): Friends notified at once when catching up. Defaults to DEFAULT_CATCH_UP_CHUNK_SIZE.
+        timings (bool, optional): Instrument the run even if the configuration does not enable it,
+        see `friends_keeper.instrumentation`. Defaults to False.
+
+    Returns:
+        Union[dict, None]: Summary of the run when it was instrumented.
     """
+    start_time = time.perf_counter()
+    configure_logging()
+
     # without setting the level everywhere
     if debug_level is not None:
         logger.setLevel(debug_level)
@@ -57,39 +120,382 @@ def main_core(debug_level: Union[int, None] = None):
 
     else:
 
-        # Get today notifications
-        notifications = get_today_notifications()
+        with instrument_run(configuration=configuration, enabled=timings, start_time=start_time) as instrumentation:
+            instrumentation.record("load_configuration", time.perf_counter() - start_time)
+
+            with span("prepare_database"):
+                prepare_database(configuration=configuration)
+
+            with hold_lock(RUN_LOCK_NAME) as acquired:
+
+                if acquired:
+                    run_notifications(configuration=configuration, catch_up=catch_up, chunk_size=chunk_size)
+                else:
+                    logger.warning("Another run is still in progress, skipping this one.")
+
+        return instrumentation.summary() if instrumentation.enabled else None
+
+
+def run_notifications(
+    configuration: dict, catch_up: bool = False, chunk_size: int = DEFAULT_CATCH_UP_CHUNK_SIZE
+) -> None:
+    """Notify and reschedule the due notification events, meant to be called holding the run lock.
+
+    Args:
+        configuration (dict): YAML configuration loaded as dict.
+        catch_up (bool, optional): Notify the overdue notification events coalesced per friend and
+        in chunks, see `catch_up_notifications`. Defaults to False.
+        chunk_size (int, optional): Friends notified at once when catching up. Defaults to DEFAULT_CATCH_UP_CHUNK_SIZE.
+    """
+    if catch_up:
+        # Events are loaded chunk by chunk while catching up, only check whether any is due.
+        next_date = get_next_notification_date()
+        notifications = next_date is not None and next_date <= datetime.today().date()
+
+    else:
+        # Get today notifications along with their friends
+        notifications = get_due_notifications()
         logger.debug(f"Found notifications: {notifications}")
 
-        # If there are notifications, do notify
-        if notifications:
+    # Messages of previous runs waiting for another attempt are delivered as well.
+    next_attempt = get_next_outbox_attempt()
+
+    if not notifications and (next_attempt is None or next_attempt > datetime.now()):
+        logger.info("We didn't find any notifications for today")
+        return
+
+    # Get notifier and notify
+    try:
+        with span("create_notifiers"):
+            notifiers = NotifierFactory.get_notifiers(configuration=configuration)
+            strategy = get_scheduling_strategy(configuration=configuration)
+
+    except (NotImplementedError, ConfigurationError):
+        exec_info = sys.exc_info()
+        logger.error("Error occurred trying to send the notification")
+        traceback.print_exception(*exec_info)
+
+        if not catch_up:
+            release_notifications([notification.id for notification, _ in notifications])
+
+    else:
+
+        try:
+            if catch_up:
+                catch_up_notifications(notifiers=notifiers, strategy=strategy, chunk_size=chunk_size)
+            elif notifications:
+                enqueue_notifications(notifiers=notifiers, notifications=notifications, strategy=strategy)
+
+            drain_outbox(notifiers=notifiers, configuration=configuration)
+
+        finally:
+
+            for notifier in notifiers:
+                close_notifier(notifier)
+
+
+def enqueue_notifications(
+    notifiers: List[BaseNotifier],
+    notifications: List[Tuple[NotificationEvent, Friend]],
+    strategy: Union[SchedulingStrategy, None] = None,
+) -> None:
+    """Render the messages of the given notifications into the outbox while rescheduling them.
+
+    When the notifications could not be rescheduled their claims are released, so
+    the next run picks them up instead of waiting for the claims to expire.
+
+    Args:
+        notifiers (List[BaseNotifier]): Notifiers to render the messages of.
+        notifications (List[Tuple[NotificationEvent, Friend]]): Notification events along
+        with their friends.
+        strategy (Union[SchedulingStrategy, None], optional): Strategy picking the next
+        notification event dates. Defaults to None, which picks them at random.
+
+    Raises:
+        DatabaseError: Raised if the notification events could not be rescheduled.
+    """
+    try:
+        with span("render_messages"):
+            outbox_messages = render_outbox_messages(notifiers=notifiers, notifications=notifications)
+
+        with span("reschedule"):
+            process_notifications(
+                notifications, strategy=strategy, outbox_messages=outbox_messages, notifiers=notifiers
+            )
+
+    except DatabaseError:
+        logger.error("Error occurred rescheduling the notifications, releasing them.")
+        release_notifications([notification.id for notification, _ in notifications])
+        raise
+
+
+def catch_up_notifications(
+    notifiers: List[BaseNotifier],
+    strategy: Union[SchedulingStrategy, None] = None,
+    chunk_size: int = DEFAULT_CATCH_UP_CHUNK_SIZE,
+) -> int:
+    """Render into the outbox and reschedule the overdue notification events in fixed size chunks.
+
+    After missed runs a friend may have several overdue events, they are all
+    coalesced into a single notification and the friend gets a single next event.
+    Friends are gone through in chunks, every chunk rendered and rescheduled on
+    its own, so memory use and message sizes do not depend on the backlog size.
+    Messages are delivered afterwards by draining the outbox.
+
+    Args:
+        notifiers (List[BaseNotifier]): Notifiers to render the messages of.
+        strategy (Union[SchedulingStrategy, None], optional): Strategy picking the next
+        notification event dates. Defaults to None, which picks them at random.
+        chunk_size (int, optional): Friends notified at once. Defaults to DEFAULT_CATCH_UP_CHUNK_SIZE.
+
+    Raises:
+        DatabaseError: Raised if a chunk could not be loaded or rescheduled.
+
+    Returns:
+        int: Number of friends caught up.
+    """
+    strategy = strategy or RandomScheduling()
+    claim_token = uuid.uuid4().hex
+    notified = 0
+    due = 0
+    after = None
+
+    while True:
+        with span("due_notifications"):
+            friends_with_events = get_due_notifications_by_friend(after=after, limit=chunk_size)
+
+        if not friends_with_events:
+            break
+
+        after = friends_with_events[-1][0].id
+        friends_with_events = claim_friends_events(claim_token=claim_token, friends_with_events=friends_with_events)
+
+        if not friends_with_events:
+            continue
+
+        notifications = [(events[0], friend) for friend, events in friends_with_events]
+        notification_ids = [event.id for _, events in friends_with_events for event in events]
+        count("rows_read", len(notification_ids))
+        due += len(notification_ids)
+
+        try:
+            with span("render_messages"):
+                outbox_messages = render_outbox_messages(notifiers=notifiers, notifications=notifications)
+
+            with span("reschedule"):
+                next_dates = strategy.next_dates(
+                    [(friend.min_days, friend.max_days) for friend, _ in friends_with_events]
+                )
+                reschedule_notifications(
+                    notification_ids=notification_ids,
+                    next_notifications=[
+                        {"friend_id": friend.id, "date": next_date}
+                        for (friend, _), next_date in zip(friends_with_events, next_dates)
+                    ],
+                    outbox_messages=outbox_messages,
+                )
+
+        except DatabaseError:
+            logger.error("Error occurred catching up the notifications, releasing them.")
+            release_notifications(notification_ids)
+            raise
+
+        count("rows_written", len(notification_ids) + len(friends_with_events) + len(outbox_messages))
+        notified += len(friends_with_events)
+        logger.info(f"Caught up {len(notification_ids)} notification events of {len(friends_with_events)} friends.")
+
+    gauge("due_notifications", due)
+    return notified
+
+
+def claim_friends_events(
+    claim_token: str, friends_with_events: List[Tuple[Friend, List[NotificationEvent]]]
+) -> List[Tuple[Friend, List[NotificationEvent]]]:
+    """Claim the given friends' notification events, leaving out the ones claimed by another run.
+
+    Args:
+        claim_token (str): Token identifying the run.
+        friends_with_events (List[Tuple[Friend, List[NotificationEvent]]]): Friends along with
+        their due notification events.
+
+    Raises:
+        DatabaseError: Raised if the notification events could not be claimed.
+
+    Returns:
+        List[Tuple[Friend, List[NotificationEvent]]]: Friends along with their claimed notification
+        events, friends without any left out.
+    """
+    notification_ids = [event.id for _, events in friends_with_events for event in events]
+    claimed_ids = set(claim_notifications(claim_token=claim_token, notification_ids=notification_ids))
+    claimed = [
+        (friend, [event for event in events if event.id in claimed_ids]) for friend, events in friends_with_events
+    ]
+    return [(friend, events) for friend, events in claimed if events]
+
+
+def prepare_database(configuration: dict) -> None:
+    """Configure the application database, which brings its schema up to date.
+
+    Args:
+        configuration (dict): YAML configuration loaded as dict.
+
+    Raises:
+        DatabaseError: Raised when the database could not be set up.
+    """
+    try:
+        configure_database(configuration=configuration)
+
+    except DatabaseError:
+        exec_info = sys.exc_info()
+        logger.error("Error occurred setting up the database.")
+        traceback.print_exception(*exec_info)
+        raise
+
+
+def get_due_notifications() -> List[Tuple[NotificationEvent, Friend]]:
+    """Claim today notification events and get them along with their friends.
+
+    Events claimed by another run are left out. Events and friends are loaded with
+    one joined query, if that fails they are loaded separately with one query for
+    the events and another for the friends.
+
+    Raises:
+        DatabaseError: Raised if the notification events could not be claimed or loaded.
+
+    Returns:
+        List[Tuple[NotificationEvent, Friend]]: Notification events along with the
+        friend they belong to.
+    """
+    claim_token = uuid.uuid4().hex
+
+    with span("due_notifications"):
+        claimed_ids = claim_notifications(claim_token=claim_token)
+
+        try:
+            notifications_with_friends = get_today_notifications_with_friends(claim_token=claim_token)
+
+        except DatabaseError:
+            logger.error("Error occurred loading notifications along with friends, loading them separately.")
 
-            # Get notifier and notify
             try:
-                notifiers = NotifierFactory.get_notifiers(configuration=configuration)
-
-            except (NotImplementedError, ConfigurationError):
-                exec_info = sys.exc_info()
-                logger.error("Error occurred trying to send the notification")
-                traceback.print_exception(*exec_info)
-
-            else:
-
-                for notifier in notifiers:
-                    notifier.notify(notifications)
-
-                for notification in notifications:
-                    # Mark notifications as done
-                    logger.debug(f"Marking notification '{notification.id}' as done.")
-                    friend = get_friend(friend_id=notification.friend_id)
-                    mark_notification_as_done(notification.id)
-                    # Create new notification event
-                    random_day = random.choice(range(friend.min_days, friend.max_days))
-                    notification_date = generate_next_reminder_date(days=random_day)
-                    new_notification = create_notification(friend_id=friend.id, date=notification_date)
-                    logger.debug(
-                        f"New notification event '{new_notification.id}' created at '{new_notification.date}'."
-                    )
-
-        else:
-            logger.info("We didn't find any notifications for today")
+                notifications = get_today_notifications(claim_token=claim_token)
+                friends = {
+                    friend.id: friend for friend in get_friends_by_ids([event.friend_id for event in notifications])
+                }
+
+            except DatabaseError:
+                release_notifications(claimed_ids)
+                raise
+
+            notifications_with_friends = [
+                (notification, friends[notification.friend_id])
+                for notification in notifications
+                if notification.friend_id in friends
+            ]
+
+    count("rows_read", len(notifications_with_friends))
+    gauge("due_notifications", len(notifications_with_friends))
+    return notifications_with_friends
+
+
+def process_notifications(
+    notifications_with_friends: List[Tuple[NotificationEvent, Friend]],
+    strategy: Union[SchedulingStrategy, None] = None,
+    outbox_messages: Union[List[dict], None] = None,
+    notifiers: Union[List[BaseNotifier], None] = None,
+) -> None:
+    """Mark notified events as done and create the next ones.
+
+    Events are processed in batch, if the batch transaction fails they are processed one by one.
+
+    Args:
+        notifications_with_friends (List[Tuple[NotificationEvent, Friend]]): Notification
+        events along with the friend they belong to.
+        strategy (Union[SchedulingStrategy, None], optional): Strategy picking the next
+        notification event dates. Defaults to None, which picks them at random.
+        outbox_messages (Union[List[dict], None], optional): Messages rendered from the
+        events to write to the outbox. Defaults to None.
+        notifiers (Union[List[BaseNotifier], None], optional): Notifiers which rendered the
+        messages, rendering them again event by event when processed one by one. Defaults to None.
+    """
+    strategy = strategy or RandomScheduling()
+
+    try:
+        process_notifications_in_batch(notifications_with_friends, strategy=strategy, outbox_messages=outbox_messages)
+
+    except DatabaseError:
+        logger.error("Error occurred processing notifications in batch, processing them one by one.")
+        process_notifications_one_by_one(notifications_with_friends, strategy=strategy, notifiers=notifiers)
+
+
+def process_notifications_in_batch(
+    notifications_with_friends: List[Tuple[NotificationEvent, Friend]],
+    strategy: Union[SchedulingStrategy, None] = None,
+    outbox_messages: Union[List[dict], None] = None,
+) -> None:
+    """Mark notification events as done and create the next ones in a single transaction.
+
+    Args:
+        notifications_with_friends (List[Tuple[NotificationEvent, Friend]]): Notification
+        events along with the friend they belong to.
+        strategy (Union[SchedulingStrategy, None], optional): Strategy picking the next
+        notification event dates. Defaults to None, which picks them at random.
+        outbox_messages (Union[List[dict], None], optional): Messages rendered from the
+        events to write to the outbox within the same transaction. Defaults to None.
+
+    Raises:
+        DatabaseError: Raised if the transaction could not be committed.
+    """
+    strategy = strategy or RandomScheduling()
+    notification_ids = [notification.id for notification, _ in notifications_with_friends]
+    next_dates = strategy.next_dates([(friend.min_days, friend.max_days) for _, friend in notifications_with_friends])
+    next_notifications = [
+        {"friend_id": friend.id, "date": next_date}
+        for (_, friend), next_date in zip(notifications_with_friends, next_dates)
+    ]
+
+    logger.debug(f"Marking notifications '{notification_ids}' as done.")
+    reschedule_notifications(
+        notification_ids=notification_ids, next_notifications=next_notifications, outbox_messages=outbox_messages
+    )
+    count("rows_written", len(notification_ids) + len(next_notifications) + len(outbox_messages or []))
+    logger.debug(f"Created {len(next_notifications)} new notification events.")
+
+
+def process_notifications_one_by_one(
+    notifications_with_friends: List[Tuple[NotificationEvent, Friend]],
+    strategy: Union[SchedulingStrategy, None] = None,
+    notifiers: Union[List[BaseNotifier], None] = None,
+) -> None:
+    """Mark notification events as done and create the next ones one at a time.
+
+    Each event opens its own session, so this is only meant as a fallback for
+    `process_notifications_in_batch`. The messages of every event are rendered on
+    their own and written to the outbox in the same transaction that reschedules
+    it, so events left behind by an error have no messages in the outbox and are
+    not sent twice when the next run picks them up.
+
+    Args:
+        notifications_with_friends (List[Tuple[NotificationEvent, Friend]]): Notification
+        events along with the friend they belong to.
+        strategy (Union[SchedulingStrategy, None], optional): Strategy picking the next
+        notification event dates. Defaults to None, which picks them at random.
+        notifiers (Union[List[BaseNotifier], None], optional): Notifiers to render the
+        messages of every event. Defaults to None, which writes no messages.
+
+    Raises:
+        DatabaseError: Raised if an event could not be rescheduled, the events before it are kept.
+    """
+    strategy = strategy or RandomScheduling()
+
+    for notification, friend in notifications_with_friends:
+        outbox_messages = render_outbox_messages(notifiers=notifiers or [], notifications=[(notification, friend)])
+        notification_date = strategy.next_date(friend.min_days, friend.max_days)
+        logger.debug(f"Marking notification '{notification.id}' as done.")
+        reschedule_notifications(
+            notification_ids=[notification.id],
+            next_notifications=[{"friend_id": friend.id, "date": notification_date}],
+            outbox_messages=outbox_messages,
+        )
+        count("rows_written", 2 + len(outbox_messages))
+        logger.debug(f"New notification event created at '{notification_date}'.")
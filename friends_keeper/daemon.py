@@ -0,0 +1,319 @@
+"""Long running scheduler.
+
+Instead of starting a new process every hour just to find out that nothing is
+due, the daemon keeps the configuration, the database engine and the notifiers
+loaded and sleeps until the earliest pending notification event date, or the
+earliest outbox message attempt when messages wait for another attempt before it.
+
+It wakes up before that when:
+  - It receives `SIGHUP`, reloading the configuration.
+  - The configuration file changes, reloading it.
+  - An earlier notification event shows up on the database, which is checked
+    every poll interval with an index lookup.
+
+`SIGTERM` and `SIGINT` stop it gracefully.
+
+When `metrics.port` is set the metrics of all its runs are served on `/metrics`,
+see `friends_keeper.metrics`. The metrics settings are read on start.
+
+Due events are notified holding the run lock, the same one `friends_keeper run`
+takes, so the daemon and a cronjob left behind can not notify them twice.
+"""
+import logging
+import os
+import signal
+import threading
+
+from datetime import datetime
+from datetime import time
+from datetime import timedelta
+from typing import Union
+
+from friends_keeper.constants import DEFAULT_DAEMON_POLL_INTERVAL
+from friends_keeper.constants import DEFAULT_DAEMON_RETRY_INTERVAL
+from friends_keeper.constants import DEFAULT_METRICS_HOST
+from friends_keeper.constants import RUN_LOCK_NAME
+from friends_keeper.core import enqueue_notifications
+from friends_keeper.core import get_due_notifications
+from friends_keeper.core import prepare_database
+from friends_keeper.exceptions import ConfigurationError
+from friends_keeper.exceptions import DatabaseError
+from friends_keeper.instrumentation import instrument_run
+from friends_keeper.metrics import get_metrics_registry
+from friends_keeper.metrics import start_metrics_server
+from friends_keeper.notifiers import NotifierFactory
+from friends_keeper.notifiers.dispatcher import close_notifier
+from friends_keeper.outbox import drain_outbox
+from friends_keeper.scheduling import get_scheduling_strategy
+from friends_keeper.utils import get_configuration_file_path
+from friends_keeper.utils import load_configuration_file
+from friends_keeper.utils.orm.locks import hold_lock
+from friends_keeper.utils.orm.notifications import get_next_notification_date
+from friends_keeper.utils.orm.outbox import get_next_outbox_attempt
+
+
+logger = logging.getLogger(__name__)
+
+
+class FriendsKeeperDaemon:
+    """Scheduler notifying the notification events as soon as they are due."""
+
+    def __init__(
+        self,
+        poll_interval: float = DEFAULT_DAEMON_POLL_INTERVAL,
+        retry_interval: float = DEFAULT_DAEMON_RETRY_INTERVAL,
+    ):
+        """Initialization of the daemon.
+
+        Args:
+            poll_interval (float, optional): Seconds between configuration file and next
+            notification date checks while sleeping. Defaults to DEFAULT_DAEMON_POLL_INTERVAL.
+            retry_interval (float, optional): Seconds to wait before notifying again events
+            which could not be notified. Defaults to DEFAULT_DAEMON_RETRY_INTERVAL.
+        """
+        self.poll_interval = poll_interval
+        self.retry_interval = retry_interval
+        self.configuration = None
+        self.notifiers = list()
+        self.strategy = None
+        self.next_date = None
+        self.next_attempt = None
+        self.running = False
+        self.metrics_registry = None
+        self.metrics_server = None
+        self._configuration_mtime = None
+        self._reload_requested = False
+        self._wake_event = threading.Event()
+
+    def serve(self) -> None:
+        """Notify due notification events until the daemon is stopped.
+
+        Raises:
+            ConfigurationError: Raised when the configuration can not be loaded on start.
+            OSError: Raised when the metrics server could not be started.
+        """
+        self.install_signal_handlers()
+        self.reload()
+        self.start_metrics()
+        self.running = True
+        logger.info("Friends keeper daemon started.")
+
+        try:
+            while self.running:
+                self.run_pending()
+                self.sleep(self.get_wake_time())
+
+        finally:
+            self.close()
+            logger.info("Friends keeper daemon stopped.")
+
+    def run_pending(self) -> int:
+        """Notify and reschedule the notification events already due and drain the outbox.
+
+        When outbox messages are waiting for another attempt the daemon wakes up
+        again at the earliest of them, unless a notification event is due before.
+
+        Runs are instrumented when the configuration enables it, see `friends_keeper.instrumentation`.
+
+        Returns:
+            int: Number of notification events due.
+        """
+        try:
+            with instrument_run(configuration=self.configuration, registry=self.metrics_registry), hold_lock(
+                RUN_LOCK_NAME
+            ) as acquired:
+
+                if not acquired:
+                    logger.info("Another run is still in progress, retrying later.")
+                    self.next_date = datetime.today().date()
+                    self.next_attempt = None
+                    return 0
+
+                notifications = get_due_notifications()
+
+                if notifications:
+                    enqueue_notifications(
+                        notifiers=self.notifiers, notifications=notifications, strategy=self.strategy
+                    )
+
+                else:
+                    logger.debug("We didn't find any notifications for today")
+
+                drain_outbox(notifiers=self.notifiers, configuration=self.configuration)
+
+            self.next_date = get_next_notification_date()
+            self.next_attempt = get_next_outbox_attempt()
+
+        except DatabaseError:
+            logger.error("Error occurred processing the due notifications, retrying later.")
+            notifications = list()
+            self.next_date = datetime.today().date()
+            self.next_attempt = None
+
+        return len(notifications)
+
+    def get_wake_time(self) -> Union[datetime, None]:
+        """Get when the daemon has to look for due notification events again.
+
+        Pending outbox messages bring it forward to their earliest next attempt.
+
+        Returns:
+            Union[datetime, None]: Wake up time or None if there are no pending events nor messages.
+        """
+        now = datetime.now()
+        wake_times = list()
+
+        if self.next_date is not None:
+            # Events still due could not be notified, do not retry right away.
+            wake_times.append(
+                now + timedelta(seconds=self.retry_interval)
+                if self.next_date <= now.date()
+                else datetime.combine(self.next_date, time.min)
+            )
+
+        if self.next_attempt is not None:
+            # Messages already due were left behind by the last drain, do not retry right away either.
+            wake_times.append(
+                now + timedelta(seconds=self.retry_interval) if self.next_attempt <= now else self.next_attempt
+            )
+
+        return min(wake_times, default=None)
+
+    def sleep(self, wake_time: Union[datetime, None]) -> None:
+        """Sleep until the given time or until something requires waking up before.
+
+        Args:
+            wake_time (Union[datetime, None]): Time to wake up at, None to sleep until woken up.
+        """
+        logger.debug(f"Sleeping until '{wake_time}'.")
+
+        while self.running:
+            timeout = self.poll_interval
+
+            if wake_time is not None:
+                remaining = (wake_time - datetime.now()).total_seconds()
+
+                if remaining <= 0:
+                    return
+
+                timeout = min(timeout, remaining)
+
+            if self._wake_event.wait(timeout):
+                self._wake_event.clear()
+
+                if self._reload_requested:
+                    self._reload_requested = False
+                    self.reload()
+
+                return
+
+            if self.configuration_changed():
+                logger.info("Configuration file changed.")
+                self.reload()
+                return
+
+            if self.earlier_notification_scheduled():
+                return
+
+    def configuration_changed(self) -> bool:
+        """Check whether the configuration file changed since it was loaded.
+
+        Returns:
+            bool: Whether the configuration file changed.
+        """
+        try:
+            return os.stat(get_configuration_file_path()).st_mtime_ns != self._configuration_mtime
+        except OSError:
+            return False
+
+    def earlier_notification_scheduled(self) -> bool:
+        """Check whether a notification event earlier than the one waited for was created.
+
+        Returns:
+            bool: Whether there is an earlier notification event.
+        """
+        try:
+            next_date = get_next_notification_date()
+        except DatabaseError:
+            return False
+
+        return next_date is not None and (self.next_date is None or next_date < self.next_date)
+
+    def reload(self) -> None:
+        """Load the configuration, set up the database and create the notifiers again.
+
+        On start errors are raised, afterwards the previous configuration is kept.
+
+        Raises:
+            ConfigurationError: Raised when the configuration can not be loaded on start.
+        """
+        try:
+            self._configuration_mtime = os.stat(get_configuration_file_path()).st_mtime_ns
+            configuration = load_configuration_file()
+            prepare_database(configuration=configuration)
+            notifiers = NotifierFactory.get_notifiers(configuration=configuration)
+            strategy = get_scheduling_strategy(configuration=configuration)
+
+        except (OSError, NotImplementedError, ConfigurationError) as exec_error:
+
+            if self.configuration is None:
+                raise ConfigurationError(f"Error occurred loading the configuration: {exec_error!r}")
+
+            logger.error(f"Error occurred reloading the configuration, keeping the previous one: {exec_error!r}")
+
+        else:
+            self.close_notifiers()
+            self.configuration = configuration
+            self.notifiers = notifiers
+            self.strategy = strategy
+            logger.info(f"Configuration loaded, using notifiers: '{notifiers}' and scheduling strategy '{strategy}'.")
+
+    def start_metrics(self) -> None:
+        """Keep the metrics of all runs when exported and serve them when `metrics.port` is set.
+
+        Raises:
+            OSError: Raised when the metrics server could not be started.
+        """
+        metrics_configuration = self.configuration.get("metrics", dict())
+        self.metrics_registry = get_metrics_registry(configuration=self.configuration)
+
+        if "port" in metrics_configuration:
+            self.metrics_server = start_metrics_server(
+                registry=self.metrics_registry,
+                port=metrics_configuration["port"],
+                host=metrics_configuration.get("host", DEFAULT_METRICS_HOST),
+            )
+
+    def stop(self) -> None:
+        """Stop the daemon, waking it up if it is sleeping."""
+        self.running = False
+        self._wake_event.set()
+
+    def request_reload(self) -> None:
+        """Reload the configuration and look for due notification events right away."""
+        self._reload_requested = True
+        self._wake_event.set()
+
+    def install_signal_handlers(self) -> None:
+        """Reload on `SIGHUP` and stop on `SIGTERM` and `SIGINT`."""
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, lambda signum, frame: self.request_reload())
+
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+        signal.signal(signal.SIGINT, lambda signum, frame: self.stop())
+
+    def close_notifiers(self) -> None:
+        """Close the notifiers in use."""
+        for notifier in self.notifiers:
+            close_notifier(notifier)
+
+        self.notifiers = list()
+
+    def close(self) -> None:
+        """Release all resources held by the daemon."""
+        self.close_notifiers()
+
+        if self.metrics_server is not None:
+            self.metrics_server.shutdown()
+            self.metrics_server.server_close()
+            self.metrics_server = None
@@ -1,29 +1,269 @@
 """Database declaration objects.
 
+The whole application shares a single engine, built from the `database` section
+of the configuration file, and `Session` is bound to it. The database schema is
+brought up to date once, when the engine is created. SQLite connections get
+the tuning pragmas applied as soon as they are opened. Every statement executed
+is counted on the `db_queries` instrumentation counter, and profiled when the
+query profiler is enabled, see `friends_keeper.database.profiler`.
+
 Raises:
     DatabaseError: If not able to connect the database.
 """
+import logging
+import os
+
+from typing import Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from sqlalchemy.engine import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import ArgumentError
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm.session import sessionmaker
+from sqlalchemy.pool import QueuePool
 
+from friends_keeper.constants import DEFAULT_DATABASE_URL
+from friends_keeper.constants import DEFAULT_SQLITE_PRAGMAS
+from friends_keeper.database.profiler import get_query_profiler
+from friends_keeper.exceptions import ConfigurationError
 from friends_keeper.exceptions import DatabaseError
+from friends_keeper.instrumentation import count
 
 
-# TODO: Decide whether this should be here on in 'extensions' module
+logger = logging.getLogger(__name__)
 
 # declarative base class
 base_database = declarative_base()
 
+# Engine in use along with the settings it was created with.
+__database = {"engine": None, "settings": None}
+
+
+class ConfiguredSessionMaker(sessionmaker):
+    """Session factory which binds itself to the application engine on first use.
 
-try:
-    # engine = create_engine("sqlite:///./friends_keeper.db", echo=True)
-    engine = create_engine("sqlite:///./friends_keeper.db")
+    Args:
+        sessionmaker (sqlalchemy.orm.session.sessionmaker): SQLAlchemy session factory.
+    """
+
+    def __call__(self, **local_kw):
+        """Create a new session, configuring the database if it was not done yet.
+
+        Returns:
+            sqlalchemy.orm.Session: New session.
+        """
+        if self.kw.get("bind") is None:
+            get_engine()
+
+        return super().__call__(**local_kw)
 
-except TypeError:
-    raise DatabaseError("Seems like database provided does not work :(\nPlease check you configuration.")
 
 # Create a 'reusable' session object
-Session = sessionmaker(expire_on_commit=False)
-# Session.configure(bind=create_engine("sqlite:///./friends_keeper.db", echo=True))
-Session.configure(bind=create_engine("sqlite:///./friends_keeper.db"))
+Session = ConfiguredSessionMaker(expire_on_commit=False)
+
+
+def configure_database(configuration: Union[dict, None] = None, config_file_path: Union[str, None] = None) -> Engine:
+    """Create the application engine from the configuration, upgrade its schema and bind `Session` to it.
+
+    The engine is only created again when the database settings change, the
+    schema is upgraded every time it is, so databases created by older versions
+    get the tables, columns and indexes added since before any command uses them.
+
+    Args:
+        configuration (Union[dict, None], optional): YAML configuration loaded as dict. Defaults to None.
+        config_file_path (Union[str, None], optional): Configuration file path, relative SQLite
+        paths are resolved against its directory. Defaults to None, which uses `CONFIGURATION_FILE_PATH`.
+
+    Raises:
+        DatabaseError: Raised when the engine could not be created or the database upgraded.
+
+    Returns:
+        Engine: Application engine.
+    """
+    # Imported here as the migrations import the models, which import this module.
+    from friends_keeper.database.migrations import upgrade_database
+    from friends_keeper.utils import get_configuration_file_path
+
+    database_configuration = (configuration or dict()).get("database", dict())
+    base_dir = os.path.dirname(config_file_path or get_configuration_file_path())
+
+    try:
+        url = get_database_url(database_configuration.get("url", DEFAULT_DATABASE_URL), base_dir=base_dir)
+
+    except ArgumentError:
+        raise DatabaseError("Seems like database provided does not work :(\nPlease check you configuration.")
+
+    pragmas = {**DEFAULT_SQLITE_PRAGMAS, **database_configuration.get("pragmas", dict())}
+    echo = database_configuration.get("echo", False)
+    settings = (url, tuple(sorted(pragmas.items())), echo)
+
+    if __database["engine"] is not None and __database["settings"] == settings:
+        return __database["engine"]
+
+    engine = create_database_engine(url=url, pragmas=pragmas, echo=echo)
+
+    try:
+        upgrade_database(engine)
+
+    except DatabaseError:
+        engine.dispose()
+        raise
+
+    dispose_database()
+    __database.update(engine=engine, settings=settings)
+    Session.configure(bind=engine)
+    logger.debug(f"Using database '{engine.url!r}'.")
+    return engine
+
+
+def create_database_engine(url: str, pragmas: dict, echo: bool = False) -> Engine:
+    """Create an engine with the SQLite pragmas, the statements counter and the query profiler, if enabled.
+
+    Args:
+        url (str): Database URL.
+        pragmas (dict): SQLite pragmas applied to every new connection.
+        echo (bool, optional): Whether to log every statement. Defaults to False.
+
+    Raises:
+        DatabaseError: Raised when the engine could not be created.
+
+    Returns:
+        Engine: Database engine.
+    """
+    engine_options = dict(echo=echo)
+    database_url = make_url(url)
+
+    if database_url.get_backend_name() == "sqlite" and database_url.database not in (None, "", ":memory:"):
+        # Keep SQLite file connections pooled, as SQLAlchemy 2.0 does, so long running
+        # processes reuse warm connections and pragmas are only applied once per connection.
+        engine_options.update(poolclass=QueuePool, connect_args={"check_same_thread": False})
+
+    try:
+        engine = create_engine(url, **engine_options)
+
+    except (TypeError, ArgumentError):
+        raise DatabaseError("Seems like database provided does not work :(\nPlease check you configuration.")
+
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", SQLitePragmas(pragmas))
+
+    event.listen(engine, "before_cursor_execute", count_query)
+    query_profiler = get_query_profiler()
+
+    if query_profiler is not None:
+        query_profiler.attach(engine)
+
+    return engine
+
+
+def get_engine() -> Engine:
+    """Get the application engine, configuring it from the configuration file if needed.
+
+    Database commands do not need a valid notifiers configuration, so when the
+    configuration file can not be loaded the default database settings are used.
+
+    Returns:
+        Engine: Application engine.
+    """
+    if __database["engine"] is None:
+        from friends_keeper.utils import load_configuration_file
+
+        try:
+            configuration = load_configuration_file()
+
+        except (OSError, ConfigurationError):
+            logger.warning("Configuration file could not be loaded, using the default database settings.")
+            configuration = None
+
+        configure_database(configuration=configuration)
+
+    return __database["engine"]
+
+
+def get_configured_engine() -> Union[Engine, None]:
+    """Get the application engine if it was already configured, without configuring it.
+
+    Returns:
+        Union[Engine, None]: Application engine or None if it was not configured yet.
+    """
+    return __database["engine"]
+
+
+def dispose_database() -> None:
+    """Close all connections of the application engine and unbind `Session` from it."""
+    if __database["engine"] is not None:
+        __database["engine"].dispose()
+
+    __database.update(engine=None, settings=None)
+    Session.configure(bind=None)
+
+
+def count_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    """Count a statement about to be executed on the `db_queries` instrumentation counter.
+
+    Args:
+        conn (sqlalchemy.engine.Connection): Connection executing the statement.
+        cursor (sqlite3.Cursor): Raw cursor.
+        statement (str): SQL statement.
+        parameters (Union[tuple, list]): Statement parameters.
+        context (sqlalchemy.engine.default.DefaultExecutionContext): Execution context.
+        executemany (bool): Whether the statement runs for many parameter sets.
+    """
+    count("db_queries")
+
+
+def get_database_url(url: str, base_dir: str) -> str:
+    """Get the database URL with relative SQLite paths made absolute.
+
+    Args:
+        url (str): Database URL.
+        base_dir (str): Directory relative SQLite paths are resolved against.
+
+    Returns:
+        str: Database URL.
+    """
+    database_url = make_url(url)
+    database = database_url.database
+
+    if (
+        database_url.get_backend_name() == "sqlite"
+        and database
+        and database != ":memory:"
+        and not database.startswith("file:")
+        and not os.path.isabs(database)
+    ):
+        database_url = database_url.set(database=os.path.join(base_dir, database))
+
+    return str(database_url)
+
+
+class SQLitePragmas:
+    """SQLite connection listener setting the given pragmas on every new connection.
+
+    Pragma names and values are restricted by the configuration schema.
+    """
+
+    def __init__(self, pragmas: dict):
+        """Initialization of the pragmas listener.
+
+        Args:
+            pragmas (dict): Pragma values keyed on their name.
+        """
+        self.pragmas = pragmas
+
+    def __call__(self, dbapi_connection, connection_record) -> None:
+        """Set the pragmas on the new connection.
+
+        Args:
+            dbapi_connection (sqlite3.Connection): Raw SQLite connection.
+            connection_record (sqlalchemy.pool._ConnectionRecord): Pool record of the connection.
+        """
+        cursor = dbapi_connection.cursor()
+
+        try:
+            for name, value in self.pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
@@ -0,0 +1,62 @@
+"""Circuit breaker database schema definition."""
+
+from datetime import datetime
+
+from sqlalchemy import Column
+from sqlalchemy import DateTime
+from sqlalchemy import Integer
+from sqlalchemy import String
+
+from friends_keeper.database import base_database
+
+
+class CircuitBreaker(base_database):
+    """Circuit breakers table schema definition.
+
+    Every row keeps the consecutive delivery failures of one notifier and, once
+    they reach the threshold, until when the circuit stays open, so runs after
+    the one that opened it fail fast as well.
+
+    Args:
+        base_database (sqlalchemy.orm.declarative_base): Declarative base from sqlalchemy.
+    """
+
+    __tablename__ = "circuit_breakers"
+
+    notifier_type = Column(String, primary_key=True)
+    failures = Column(Integer, nullable=False, default=0)
+    opened_until = Column(DateTime, nullable=True)
+    last_error = Column(String, nullable=True)
+    updated_at = Column(DateTime, nullable=False, default=datetime.now)
+
+    def is_open(self, now: datetime) -> bool:
+        """Whether the circuit is open at the given time.
+
+        Args:
+            now (datetime): Time to check.
+
+        Returns:
+            bool: True while deliveries must fail fast.
+        """
+        return self.opened_until is not None and self.opened_until > now
+
+    def to_dict(self) -> dict:
+        """Dictionary representation of the table.
+
+        Returns:
+            dict: Table representation.
+        """
+        return {
+            "notifier_type": self.notifier_type,
+            "failures": self.failures,
+            "opened_until": self.opened_until.isoformat() if self.opened_until else None,
+            "last_error": self.last_error,
+        }
+
+    def __repr__(self) -> str:
+        """Representation of the table in string format.
+
+        Returns:
+            str: String representation of the table.
+        """
+        return f"CircuitBreaker: {str(self.to_dict())}"
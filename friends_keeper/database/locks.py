@@ -0,0 +1,40 @@
+"""Lock database schema definition."""
+
+from sqlalchemy import Column
+from sqlalchemy import DateTime
+from sqlalchemy import String
+
+from friends_keeper.database import base_database
+
+
+class Lock(base_database):
+    """Locks table schema definition.
+
+    Every row is a named lease held by an owner until it expires, so a process
+    which died without releasing it does not keep the others out forever.
+
+    Args:
+        base_database (sqlalchemy.orm.declarative_base): Declarative base from sqlalchemy.
+    """
+
+    __tablename__ = "locks"
+
+    name = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+    def to_dict(self) -> dict:
+        """Dictionary representation of the table.
+
+        Returns:
+            dict: Table representation.
+        """
+        return {"name": self.name, "owner": self.owner, "expires_at": self.expires_at.isoformat()}
+
+    def __repr__(self) -> str:
+        """Representation of the table in string format.
+
+        Returns:
+            str: String representation of the table.
+        """
+        return f"Lock: {str(self.to_dict())}"
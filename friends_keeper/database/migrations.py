@@ -0,0 +1,90 @@
+"""Database schema migrations.
+
+`create_all` only creates the tables that do not exist yet, so databases created
+by older versions never get the columns and indexes added to existing tables
+later on. This module brings any existing database up to date with the models,
+new columns must be nullable or have a server default for that to work.
+"""
+import logging
+
+from sqlalchemy import inspect
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.schema import CreateColumn
+
+from friends_keeper.database import base_database
+from friends_keeper.database.circuit_breakers import CircuitBreaker  # noqa: F401
+from friends_keeper.database.friends import Friend  # noqa: F401
+from friends_keeper.database.locks import Lock  # noqa: F401
+from friends_keeper.database.notifications import NotificationEvent  # noqa: F401
+from friends_keeper.database.outbox import OutboxMessage  # noqa: F401
+from friends_keeper.exceptions import DatabaseError
+
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade_database(engine: Engine) -> bool:
+    """Create missing tables, columns and indexes on the given database.
+
+    Args:
+        engine (Engine): Engine bound to the database to upgrade.
+
+    Raises:
+        DatabaseError: Raised when the database could not be upgraded.
+
+    Returns:
+        bool: Whether any column or index was created.
+    """
+    created = False
+
+    try:
+        base_database.metadata.create_all(engine)
+        inspector = inspect(engine)
+
+        for table in base_database.metadata.sorted_tables:
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+
+            for column in table.columns:
+
+                if column.name not in existing_columns:
+                    logger.info(f"Adding missing column '{column.name}' to table '{table.name}'.")
+                    add_column(engine, table, column)
+                    created = True
+
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+
+            for index in table.indexes:
+
+                if index.name not in existing_indexes:
+                    logger.info(f"Creating missing index '{index.name}' on table '{table.name}'.")
+                    index.create(bind=engine)
+                    created = True
+
+    except SQLAlchemyError as exec_error:
+        msg = f"An error occurred upgrading the database: {exec_error!r}"
+        logger.error(msg)
+        raise DatabaseError(msg)
+
+    else:
+        logger.debug("Database schema is up to date.")
+        return created
+
+
+def add_column(engine: Engine, table, column) -> None:
+    """Add the given model column to its existing table.
+
+    Args:
+        engine (Engine): Engine bound to the database to upgrade.
+        table (sqlalchemy.Table): Table the column is added to.
+        column (sqlalchemy.Column): Column to add.
+
+    Raises:
+        SQLAlchemyError: Raised when the column could not be added.
+    """
+    table_name = engine.dialect.identifier_preparer.format_table(table)
+    column_definition = CreateColumn(column).compile(dialect=engine.dialect)
+
+    with engine.begin() as connection:
+        connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_definition}"))
@@ -5,8 +5,12 @@ import json
 from sqlalchemy import Boolean
 from sqlalchemy import Column
 from sqlalchemy import Date
+from sqlalchemy import DateTime
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
 from sqlalchemy import Integer
+from sqlalchemy import String
+from sqlalchemy import false
 
 from friends_keeper.constants import DATE_FORMAT
 from friends_keeper.database import base_database
@@ -15,6 +19,14 @@ from friends_keeper.database import base_database
 class NotificationEvent(base_database):
     """Notification events table schema definition.
 
+    The table keeps the whole notification history so the lookups done on every
+    run are backed by indexes: pending events by date, with a partial index on
+    SQLite which only holds pending events, and events by friend.
+
+    Runs claim the events they are about to notify by setting `claim_token`, so
+    concurrent runs never notify the same events, claims expire after
+    `DEFAULT_CLAIM_TTL` in case the run claiming them never finished.
+
     Args:
         base_database (sqlalchemy.orm.declarative_base): Declarative base from sqlalchemy.
     """
@@ -25,6 +37,14 @@ class NotificationEvent(base_database):
     friend_id = Column(ForeignKey(("friends.id")))
     date = Column(Date)
     already_notified = Column(Boolean, default=False)
+    claim_token = Column(String, nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_notifications_already_notified_date", "already_notified", "date"),
+        Index("ix_notifications_pending_date", "date", sqlite_where=already_notified == false()),
+        Index("ix_notifications_friend_id_already_notified", "friend_id", "already_notified"),
+    )
 
     def to_json(self) -> str:
         """JSON representation of the table.
@@ -0,0 +1,71 @@
+"""Outbox message database schema definition."""
+
+from datetime import datetime
+
+from sqlalchemy import Column
+from sqlalchemy import DateTime
+from sqlalchemy import Index
+from sqlalchemy import Integer
+from sqlalchemy import String
+
+from friends_keeper.constants import OUTBOX_STATUSES
+from friends_keeper.database import base_database
+
+
+class OutboxMessage(base_database):
+    """Outbox messages table schema definition.
+
+    Every row is a rendered message waiting to be delivered by one notifier. Rows
+    are written in the same transaction that reschedules the notification events
+    they were rendered from and delivered afterwards, so a crash never loses nor
+    sends again a message. Pending rows are looked up by their status and next
+    attempt time through an index.
+
+    Runs claim the messages they are about to deliver by setting `claim_token`, so
+    concurrent runs never deliver the same messages, claims expire after
+    `DEFAULT_CLAIM_TTL` in case the run claiming them never finished.
+
+    Args:
+        base_database (sqlalchemy.orm.declarative_base): Declarative base from sqlalchemy.
+    """
+
+    __tablename__ = "outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    notifier_type = Column(String, nullable=False)
+    idempotency_key = Column(String, nullable=False)
+    message = Column(String, nullable=False)
+    status = Column(String, nullable=False, default=OUTBOX_STATUSES.pending)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.now)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    sent_at = Column(DateTime, nullable=True)
+    claim_token = Column(String, nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    def to_dict(self) -> dict:
+        """Dictionary representation of the table.
+
+        Returns:
+            dict: Table representation.
+        """
+        return {
+            "id": self.id,
+            "notifier_type": self.notifier_type,
+            "idempotency_key": self.idempotency_key,
+            "status": self.status,
+            "attempts": self.attempts,
+        }
+
+    def __repr__(self) -> str:
+        """Representation of the table in string format.
+
+        Returns:
+            str: String representation of the table.
+        """
+        return f"OutboxMessage: {str(self.to_dict())}"
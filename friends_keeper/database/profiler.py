@@ -0,0 +1,279 @@
+"""Database query profiler.
+
+The profiler listens to the cursor execution events of the engine, so it sees
+every statement the ORM helpers run, and for every one of them records:
+  - How many times it was executed, statements only differing on the number
+    of `IN` parameters counted together, which makes N+1 patterns obvious.
+  - The total and the longest wall time it took.
+
+Statements slower than `slow_query_threshold` seconds are logged along with
+their `EXPLAIN QUERY PLAN` on SQLite.
+
+It is opt-in, `friends_keeper --profile-queries` enables it for the command and
+prints the summary once it finishes. It is attached to the engine already
+configured when enabled and to the engines created while it is enabled, see
+`friends_keeper.database.configure_database`.
+"""
+import logging
+import re
+import threading
+import time
+
+from typing import List
+from typing import Tuple
+from typing import Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from friends_keeper.constants import DEFAULT_SLOW_QUERY_THRESHOLD
+
+
+logger = logging.getLogger(__name__)
+
+# Connection info key holding the start times of the statements being executed.
+_START_TIMES_KEY = "friends_keeper_query_start_times"
+_EXPLAINABLE_STATEMENTS = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+_PARAMETERS_LIST = re.compile(r"\(\?(?:, \?)+\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryProfiler:
+    """Statements counter and timer, safe to share across threads."""
+
+    def __init__(self, slow_query_threshold: float = DEFAULT_SLOW_QUERY_THRESHOLD):
+        """Initialization of the query profiler.
+
+        Args:
+            slow_query_threshold (float, optional): Seconds from which statements are logged along
+            with their query plan. Defaults to DEFAULT_SLOW_QUERY_THRESHOLD.
+        """
+        self.slow_query_threshold = slow_query_threshold
+        # Count, total and maximum seconds keyed on the normalized statement.
+        self.statements = dict()
+        self.slow_queries = 0
+        self.engines = list()
+        self._lock = threading.Lock()
+
+    def attach(self, engine: Engine) -> None:
+        """Profile the statements executed on the given engine.
+
+        Args:
+            engine (Engine): Engine to profile.
+        """
+        if event.contains(engine, "before_cursor_execute", self.before_cursor_execute):
+            return
+
+        event.listen(engine, "before_cursor_execute", self.before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self.after_cursor_execute)
+        event.listen(engine, "handle_error", self.handle_error)
+        self.engines.append(engine)
+
+    def detach(self, engine: Engine) -> None:
+        """Stop profiling the statements executed on the given engine.
+
+        Args:
+            engine (Engine): Engine profiled.
+        """
+        if not event.contains(engine, "before_cursor_execute", self.before_cursor_execute):
+            return
+
+        event.remove(engine, "before_cursor_execute", self.before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", self.after_cursor_execute)
+        event.remove(engine, "handle_error", self.handle_error)
+        self.engines.remove(engine)
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        """Start timing a statement.
+
+        Args:
+            conn (sqlalchemy.engine.Connection): Connection executing the statement.
+            cursor (sqlite3.Cursor): Raw cursor.
+            statement (str): SQL statement.
+            parameters (Union[tuple, list]): Statement parameters.
+            context (sqlalchemy.engine.default.DefaultExecutionContext): Execution context.
+            executemany (bool): Whether the statement runs for many parameter sets.
+        """
+        conn.info.setdefault(_START_TIMES_KEY, list()).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        """Record the time a statement took, logging it with its query plan when slow.
+
+        Args:
+            conn (sqlalchemy.engine.Connection): Connection which executed the statement.
+            cursor (sqlite3.Cursor): Raw cursor.
+            statement (str): SQL statement.
+            parameters (Union[tuple, list]): Statement parameters.
+            context (sqlalchemy.engine.default.DefaultExecutionContext): Execution context.
+            executemany (bool): Whether the statement ran for many parameter sets.
+        """
+        seconds = time.perf_counter() - conn.info[_START_TIMES_KEY].pop()
+        self.record(statement, seconds)
+
+        if seconds >= self.slow_query_threshold:
+            with self._lock:
+                self.slow_queries += 1
+
+            query_plan = get_query_plan(conn, statement, parameters[0] if executemany else parameters)
+            logger.warning(
+                f"Slow query took {seconds * 1000:.1f}ms: {normalize_statement(statement)}"
+                + (f"\nQuery plan:\n{query_plan}" if query_plan else "")
+            )
+
+    def handle_error(self, exception_context) -> None:
+        """Discard the start time of a statement which failed.
+
+        Args:
+            exception_context (sqlalchemy.engine.ExceptionContext): Context of the error.
+        """
+        connection = exception_context.connection
+
+        if connection is not None and connection.info.get(_START_TIMES_KEY):
+            connection.info[_START_TIMES_KEY].pop()
+
+    def record(self, statement: str, seconds: float) -> None:
+        """Record the time a statement took.
+
+        Args:
+            statement (str): SQL statement.
+            seconds (float): Seconds it took.
+        """
+        key = normalize_statement(statement)
+
+        with self._lock:
+            stats = self.statements.setdefault(key, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    def get_top_statements(self, limit: int = 10) -> List[Tuple[str, int, float, float]]:
+        """Get the statements which took the longest in total.
+
+        Args:
+            limit (int, optional): Maximum number of statements. Defaults to 10.
+
+        Returns:
+            List[Tuple[str, int, float, float]]: Statement, executions, total and maximum seconds.
+        """
+        with self._lock:
+            statements = [(statement, *stats) for statement, stats in self.statements.items()]
+
+        return sorted(statements, key=lambda stats: stats[2], reverse=True)[:limit]
+
+    def format_summary(self, limit: int = 10) -> str:
+        """Format the profiled statements summary.
+
+        Args:
+            limit (int, optional): Maximum number of statements listed. Defaults to 10.
+
+        Returns:
+            str: Totals followed by the statements which took the longest in total.
+        """
+        with self._lock:
+            executions = sum(stats[0] for stats in self.statements.values())
+            total = sum(stats[1] for stats in self.statements.values())
+            lines = [
+                f"{executions} statements ({len(self.statements)} distinct) took {total * 1000:.1f}ms, "
+                f"{self.slow_queries} over {self.slow_query_threshold * 1000:.0f}ms."
+            ]
+
+        for statement, count, statement_total, maximum in self.get_top_statements(limit=limit):
+            lines.append(
+                f"{count:>7} x {statement_total * 1000:>9.1f}ms (max {maximum * 1000:.1f}ms) {statement[:200]}"
+            )
+
+        return "\n".join(lines)
+
+
+__profiler = {"profiler": None}
+
+
+def enable_query_profiler(slow_query_threshold: float = DEFAULT_SLOW_QUERY_THRESHOLD) -> QueryProfiler:
+    """Enable the query profiler for the engine already configured and the ones created from now on.
+
+    Any profiler enabled before is disabled first.
+
+    Args:
+        slow_query_threshold (float, optional): Seconds from which statements are logged along
+        with their query plan. Defaults to DEFAULT_SLOW_QUERY_THRESHOLD.
+
+    Returns:
+        QueryProfiler: Profiler enabled.
+    """
+    # Imported here as `friends_keeper.database` imports this module.
+    from friends_keeper.database import get_configured_engine
+
+    disable_query_profiler()
+    query_profiler = QueryProfiler(slow_query_threshold=slow_query_threshold)
+    engine = get_configured_engine()
+
+    if engine is not None:
+        query_profiler.attach(engine)
+
+    __profiler["profiler"] = query_profiler
+    return query_profiler
+
+
+def disable_query_profiler() -> None:
+    """Disable the query profiler, detaching it from the engines it profiles."""
+    query_profiler = __profiler["profiler"]
+
+    if query_profiler is not None:
+        for engine in list(query_profiler.engines):
+            query_profiler.detach(engine)
+
+    __profiler["profiler"] = None
+
+
+def get_query_profiler() -> Union[QueryProfiler, None]:
+    """Get the query profiler enabled.
+
+    Returns:
+        Union[QueryProfiler, None]: Profiler or None if it is not enabled.
+    """
+    return __profiler["profiler"]
+
+
+def normalize_statement(statement: str) -> str:
+    """Normalize a statement so executions of the same query are counted together.
+
+    Whitespace is collapsed and parameter lists, which change with the number of
+    values of `IN` clauses, are shortened.
+
+    Args:
+        statement (str): SQL statement.
+
+    Returns:
+        str: Normalized statement.
+    """
+    return _PARAMETERS_LIST.sub("(?, ...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+def get_query_plan(conn, statement: str, parameters: Union[tuple, dict, None]) -> Union[str, None]:
+    """Get the SQLite query plan of a statement, one step per line.
+
+    Args:
+        conn (sqlalchemy.engine.Connection): Connection which executed the statement.
+        statement (str): SQL statement.
+        parameters (Union[tuple, dict, None]): Parameters the statement was executed with.
+
+    Returns:
+        Union[str, None]: Query plan or None when it is not SQLite, not a query or could not be explained.
+    """
+    if conn.dialect.name != "sqlite" or not statement.lstrip().upper().startswith(_EXPLAINABLE_STATEMENTS):
+        return None
+
+    cursor = conn.connection.cursor()
+
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+        rows = cursor.fetchall()
+
+    except conn.dialect.dbapi.Error as exec_error:
+        logger.debug(f"Query plan could not be explained: {exec_error!r}")
+        return None
+
+    finally:
+        cursor.close()
+
+    return "\n".join(f"  {row[-1]}" for row in rows)
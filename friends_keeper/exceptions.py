@@ -49,3 +49,41 @@ class WrongNotifierError(NotifierError):
     """
 
     pass
+
+
+class DeliveryDeferredError(NotifierError):
+    """Raised when a notifier puts off a delivery without attempting it.
+
+    Args:
+        NotifierError (friends_keeper.exceptions.NotifierError): General Friends keeper notifier exception.
+    """
+
+    def __init__(self, message: str, retry_at=None):
+        """Initialization of the exception.
+
+        Args:
+            message (str): Error message.
+            retry_at (datetime, optional): When the notifier lets deliveries through again. Defaults to None.
+        """
+        super().__init__(message)
+        self.retry_at = retry_at
+
+
+class CircuitOpenError(DeliveryDeferredError):
+    """Raised when a notifier fails fast because its circuit is open.
+
+    Args:
+        DeliveryDeferredError (friends_keeper.exceptions.DeliveryDeferredError): Deferred delivery exception.
+    """
+
+    pass
+
+
+class RateLimitedError(DeliveryDeferredError):
+    """Raised when a notifier went over its rate limit.
+
+    Args:
+        DeliveryDeferredError (friends_keeper.exceptions.DeliveryDeferredError): Deferred delivery exception.
+    """
+
+    pass
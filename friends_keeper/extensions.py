@@ -9,13 +9,20 @@ import os
 from friends_keeper.constants import LOGGING_PATH
 
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s [%(name)s] - [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(os.path.join(LOGGING_PATH, "friends_keeper.log")),
-        logging.StreamHandler(),
-    ],
-)
-
 logger = logging.getLogger(__name__)
+
+
+def configure_logging() -> None:
+    """Configure the application logging handlers.
+
+    It is not done at import time so importing the application does not open
+    the log file, only the first call has any effect.
+    """
+    logging.basicConfig(
+        level=logging.DEBUG,
+        format="%(asctime)s [%(name)s] - [%(levelname)s] %(message)s",
+        handlers=[
+            logging.FileHandler(os.path.join(LOGGING_PATH, "friends_keeper.log")),
+            logging.StreamHandler(),
+        ],
+    )
@@ -0,0 +1,364 @@
+"""Run instrumentation module.
+
+Stages of a run are timed with spans and what they did is tallied with counters,
+so a slow run tells where it spent its time:
+  - Spans: every stage records how many times it ran, the total and the longest
+    time it took. Stages are `load_configuration`, `prepare_database`,
+    `create_notifiers`, `due_notifications`, `render_messages`, `reschedule`,
+    `due_outbox_messages`, `deliver` and `complete_outbox_messages`, along with
+    every notifier delivery on `notifier.<type>`.
+  - Counters: `rows_read`, `rows_written`, `db_queries` and, per notifier type,
+    `messages_sent.<type>`, `messages_failed.<type>`, `messages_deferred.<type>`
+    and `retries.<type>`.
+  - Gauges: `due_notifications`.
+
+Every run gets a summary, logged and written as JSON to the `instrumentation.path`
+configured, overwritten on every run so it can be scraped. Observers get every
+span, counter and gauge as they happen, which is how Prometheus metrics are
+exported, see `friends_keeper.metrics`.
+
+Instrumentation is disabled unless `instrumentation.enabled` is set, metrics
+are exported or the run asks for it. The active instrumentation is then a
+`NullInstrumentation` whose spans and counters do nothing, so hooks on the hot
+path only cost a function call.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from contextlib import contextmanager
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Callable
+from typing import ContextManager
+from typing import Iterator
+from typing import List
+from typing import Union
+
+from friends_keeper.metrics import MetricsRegistry
+from friends_keeper.metrics import get_metrics_registry
+
+
+logger = logging.getLogger(__name__)
+
+
+class Instrumentation:
+    """Spans and counters of a run, safe to share across threads."""
+
+    enabled = True
+
+    def __init__(
+        self,
+        clock: Callable[[], float] = time.perf_counter,
+        start_time: Union[float, None] = None,
+        observers: Union[List[MetricsRegistry], None] = None,
+    ):
+        """Initialization of the instrumentation.
+
+        Args:
+            clock (Callable[[], float], optional): Clock in seconds. Defaults to time.perf_counter.
+            start_time (Union[float, None], optional): Time on the clock the run started.
+            Defaults to None, which is now.
+            observers (Union[List[MetricsRegistry], None], optional): Objects with `record`, `count`
+            and `gauge` methods getting every span, counter and gauge. Defaults to None.
+        """
+        self.clock = clock
+        self.observers = observers or list()
+        self.started_at = datetime.now()
+        self.start_time = clock() if start_time is None else start_time
+        self.finish_time = None
+        # Count, total and maximum seconds keyed on the span name.
+        self.spans = dict()
+        self.counters = dict()
+        self.gauges = dict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Time the code within the context.
+
+        Args:
+            name (str): Span name.
+
+        Yields:
+            Iterator[None]: Nothing, the time is recorded on exit.
+        """
+        start_time = self.clock()
+
+        try:
+            yield
+
+        finally:
+            self.record(name, self.clock() - start_time)
+
+    def record(self, name: str, seconds: float) -> None:
+        """Record the time a span took.
+
+        Args:
+            name (str): Span name.
+            seconds (float): Seconds it took.
+        """
+        with self._lock:
+            stats = self.spans.setdefault(name, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+        for observer in self.observers:
+            observer.record(name, seconds)
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Add the given value to a counter.
+
+        Args:
+            name (str): Counter name.
+            value (int, optional): Value to add. Defaults to 1.
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+        for observer in self.observers:
+            observer.count(name, value)
+
+    def gauge(self, name: str, value: float) -> None:
+        """Set a gauge.
+
+        Args:
+            name (str): Gauge name.
+            value (float): Value.
+        """
+        with self._lock:
+            self.gauges[name] = value
+
+        for observer in self.observers:
+            observer.gauge(name, value)
+
+    def stop(self) -> None:
+        """Stop the run clock, the summary duration does not grow afterwards."""
+        self.finish_time = self.clock()
+
+    def summary(self) -> dict:
+        """Get the summary of the run.
+
+        Returns:
+            dict: Start time, duration in seconds, spans with their count, total and
+            maximum seconds, counters and gauges.
+        """
+        finish_time = self.clock() if self.finish_time is None else self.finish_time
+
+        with self._lock:
+            return {
+                "started_at": self.started_at.isoformat(),
+                "duration": finish_time - self.start_time,
+                "spans": {
+                    name: {"count": count, "total": total, "max": maximum}
+                    for name, (count, total, maximum) in self.spans.items()
+                },
+                "counters": dict(sorted(self.counters.items())),
+                "gauges": dict(sorted(self.gauges.items())),
+            }
+
+
+class NullInstrumentation(Instrumentation):
+    """Disabled instrumentation, spans and counters do nothing."""
+
+    enabled = False
+
+    def span(self, name: str) -> ContextManager[None]:
+        """Get a context which does nothing.
+
+        Args:
+            name (str): Span name.
+
+        Returns:
+            ContextManager[None]: Shared context doing nothing.
+        """
+        return _NULL_SPAN
+
+    def record(self, name: str, seconds: float) -> None:
+        """Do nothing.
+
+        Args:
+            name (str): Span name.
+            seconds (float): Seconds it took.
+        """
+        pass
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Do nothing.
+
+        Args:
+            name (str): Counter name.
+            value (int, optional): Value to add. Defaults to 1.
+        """
+        pass
+
+    def gauge(self, name: str, value: float) -> None:
+        """Do nothing.
+
+        Args:
+            name (str): Gauge name.
+            value (float): Value.
+        """
+        pass
+
+
+_NULL_SPAN = nullcontext()
+_NULL_INSTRUMENTATION = NullInstrumentation()
+_instrumentation = _NULL_INSTRUMENTATION
+
+
+def get_instrumentation() -> Instrumentation:
+    """Get the active instrumentation.
+
+    Returns:
+        Instrumentation: Instrumentation of the current run or a `NullInstrumentation`.
+    """
+    return _instrumentation
+
+
+def set_instrumentation(instrumentation: Union[Instrumentation, None]) -> Instrumentation:
+    """Set the active instrumentation.
+
+    Args:
+        instrumentation (Union[Instrumentation, None]): Instrumentation to use, None disables it.
+
+    Returns:
+        Instrumentation: Instrumentation active until now.
+    """
+    global _instrumentation
+    previous = _instrumentation
+    _instrumentation = instrumentation or _NULL_INSTRUMENTATION
+    return previous
+
+
+def span(name: str) -> ContextManager[None]:
+    """Time the code within the context on the active instrumentation.
+
+    Args:
+        name (str): Span name.
+
+    Returns:
+        ContextManager[None]: Context timing its code.
+    """
+    return _instrumentation.span(name)
+
+
+def count(name: str, value: int = 1) -> None:
+    """Add the given value to a counter of the active instrumentation.
+
+    Args:
+        name (str): Counter name.
+        value (int, optional): Value to add. Defaults to 1.
+    """
+    _instrumentation.count(name, value)
+
+
+def gauge(name: str, value: float) -> None:
+    """Set a gauge of the active instrumentation.
+
+    Args:
+        name (str): Gauge name.
+        value (float): Value.
+    """
+    _instrumentation.gauge(name, value)
+
+
+@contextmanager
+def instrument_run(
+    configuration: Union[dict, None] = None,
+    enabled: bool = False,
+    start_time: Union[float, None] = None,
+    registry: Union[MetricsRegistry, None] = None,
+) -> Iterator[Instrumentation]:
+    """Instrument the run within the context and report its summary on exit.
+
+    Runs are instrumented as well when metrics are exported, the run feeds the
+    given registry, or a new one when none is given, and the metrics are written
+    to `metrics.textfile` when it is set.
+
+    Args:
+        configuration (Union[dict, None], optional): YAML configuration loaded as dict, the
+        `instrumentation` section enables it and sets the summary path. Defaults to None.
+        enabled (bool, optional): Instrument the run even if the configuration does not enable it.
+        Defaults to False.
+        start_time (Union[float, None], optional): `time.perf_counter` time the run started.
+        Defaults to None, which is now.
+        registry (Union[MetricsRegistry, None], optional): Registry kept across runs.
+        Defaults to None, which creates one when the configuration exports metrics.
+
+    Yields:
+        Iterator[Instrumentation]: Instrumentation of the run, a `NullInstrumentation` when disabled.
+    """
+    instrumentation_configuration = (configuration or dict()).get("instrumentation", dict())
+    registry = registry or get_metrics_registry(configuration=configuration)
+
+    if not (enabled or registry is not None or instrumentation_configuration.get("enabled", False)):
+        yield _NULL_INSTRUMENTATION
+        return
+
+    instrumentation = Instrumentation(start_time=start_time, observers=[registry] if registry is not None else None)
+    previous = set_instrumentation(instrumentation)
+
+    try:
+        yield instrumentation
+
+    finally:
+        set_instrumentation(previous)
+        instrumentation.stop()
+        summary = instrumentation.summary()
+        report_summary(summary, path=instrumentation_configuration.get("path"))
+
+        if registry is not None:
+            registry.observe_run(summary)
+            textfile = (configuration or dict()).get("metrics", dict()).get("textfile")
+
+            if textfile is not None:
+                registry.write_textfile(textfile)
+
+
+def report_summary(summary: dict, path: Union[str, None] = None) -> None:
+    """Log the run summary and write it as JSON to the given path.
+
+    The file is replaced at once, so it is never read half written.
+
+    Args:
+        summary (dict): Run summary.
+        path (Union[str, None], optional): JSON file path. Defaults to None, which only logs it.
+    """
+    logger.info(format_summary(summary))
+
+    if path is None:
+        return
+
+    temporary_path = f"{path}.tmp"
+
+    try:
+        with open(temporary_path, "w") as summary_file:
+            json.dump(summary, summary_file, indent=2)
+        os.replace(temporary_path, path)
+
+    except OSError:
+        logger.error(f"Error occurred writing the run summary to '{path}'.")
+
+
+def format_summary(summary: dict) -> str:
+    """Format the run summary as text, one span, counter or gauge per line.
+
+    Args:
+        summary (dict): Run summary.
+
+    Returns:
+        str: Run summary.
+    """
+    lines = [f"Run finished in {summary['duration']:.3f} seconds."]
+
+    for name, stats in summary["spans"].items():
+        lines.append(f"  {name:<30} {stats['count']:>6} x {stats['total']:>9.3f}s (max {stats['max']:.3f}s)")
+
+    for name, value in {**summary["counters"], **summary["gauges"]}.items():
+        lines.append(f"  {name:<30} {value:>6}")
+
+    return "\n".join(lines)
@@ -0,0 +1,327 @@
+"""Prometheus metrics module.
+
+Metrics are fed by the run instrumentation, see `friends_keeper.instrumentation`,
+and rendered in the Prometheus text exposition format:
+  - `friends_keeper_run_duration_seconds`: histogram of the runs duration.
+  - `friends_keeper_stage_duration_seconds{stage}`: histogram of every run stage.
+  - `friends_keeper_notifier_duration_seconds{notifier}`: histogram of every
+    notifier delivery, retries included.
+  - `friends_keeper_messages_sent_total{notifier}`, `..._messages_failed_total`,
+    `..._messages_deferred_total` and `..._retries_total`: notifier deliveries.
+  - `friends_keeper_rows_read_total`, `friends_keeper_rows_written_total` and
+    `friends_keeper_db_queries_total`: database work.
+  - `friends_keeper_due_notifications`: notification events due on the last run.
+  - `friends_keeper_runs_total` and `friends_keeper_last_run_timestamp_seconds`.
+
+One-shot runs write them to the `metrics.textfile` path, meant for the node
+exporter textfile collector, so counters start over on every run, which
+Prometheus takes as counter resets. The scheduler keeps them along its whole
+lifetime and serves them on `/metrics` at `metrics.host` and `metrics.port`.
+"""
+import logging
+import os
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Iterable
+from typing import List
+from typing import Tuple
+from typing import Union
+
+from friends_keeper.constants import DEFAULT_METRICS_BUCKETS
+from friends_keeper.constants import DEFAULT_METRICS_HOST
+
+
+logger = logging.getLogger(__name__)
+
+METRICS_PREFIX = "friends_keeper"
+METRICS_DESCRIPTIONS = {
+    "friends_keeper_run_duration_seconds": "Time runs took.",
+    "friends_keeper_stage_duration_seconds": "Time every run stage took.",
+    "friends_keeper_notifier_duration_seconds": "Time notifier deliveries took, retries included.",
+    "friends_keeper_messages_sent_total": "Messages delivered.",
+    "friends_keeper_messages_failed_total": "Messages which could not be delivered.",
+    "friends_keeper_messages_deferred_total": "Messages deferred by an open circuit or the rate limit.",
+    "friends_keeper_retries_total": "Delivery attempts made again after a failure.",
+    "friends_keeper_rows_read_total": "Notification events and outbox messages read.",
+    "friends_keeper_rows_written_total": "Notification events and outbox messages written.",
+    "friends_keeper_db_queries_total": "Statements executed on the database.",
+    "friends_keeper_due_notifications": "Notification events due on the last run.",
+    "friends_keeper_runs_total": "Runs finished.",
+    "friends_keeper_last_run_timestamp_seconds": "Time the last run finished.",
+}
+# Spans whose name starts with the prefix are notifier deliveries.
+NOTIFIER_SPAN_PREFIX = "notifier."
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class MetricsRegistry:
+    """Histograms, counters and gauges fed by the instrumentation, safe to share across threads."""
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_METRICS_BUCKETS):
+        """Initialization of the metrics registry.
+
+        Args:
+            buckets (Iterable[float], optional): Upper bounds in seconds of the histograms buckets.
+            Defaults to DEFAULT_METRICS_BUCKETS.
+        """
+        self.buckets = tuple(sorted(buckets))
+        # Bucket counts, sum and count keyed on the metric name and its labels.
+        self.histograms = dict()
+        self.counters = dict()
+        self.gauges = dict()
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float) -> None:
+        """Observe the time a span took on its histogram.
+
+        Args:
+            name (str): Span name.
+            seconds (float): Seconds it took.
+        """
+        if name.startswith(NOTIFIER_SPAN_PREFIX):
+            notifier_type = name.partition(".")[2]
+            key = (f"{METRICS_PREFIX}_notifier_duration_seconds", (("notifier", notifier_type),))
+        else:
+            key = (f"{METRICS_PREFIX}_stage_duration_seconds", (("stage", name),))
+
+        self.observe(key, seconds)
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Add the given value to the counter of an instrumentation counter.
+
+        Counters named `<name>.<notifier type>` get the notifier type as label.
+
+        Args:
+            name (str): Counter name.
+            value (int, optional): Value to add. Defaults to 1.
+        """
+        name, _, notifier_type = name.partition(".")
+        key = (f"{METRICS_PREFIX}_{name}_total", (("notifier", notifier_type),) if notifier_type else ())
+
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge(self, name: str, value: float) -> None:
+        """Set the gauge of an instrumentation gauge.
+
+        Args:
+            name (str): Gauge name.
+            value (float): Value.
+        """
+        with self._lock:
+            self.gauges[(f"{METRICS_PREFIX}_{name}", ())] = value
+
+    def observe(self, key: Tuple[str, Labels], value: float) -> None:
+        """Observe a value on a histogram.
+
+        Args:
+            key (Tuple[str, Labels]): Metric name and labels.
+            value (float): Value observed.
+        """
+        with self._lock:
+            histogram = self.histograms.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+
+            for index, upper_bound in enumerate(self.buckets):
+
+                if value <= upper_bound:
+                    histogram[0][index] += 1
+
+            histogram[1] += value
+            histogram[2] += 1
+
+    def observe_run(self, summary: dict) -> None:
+        """Observe a finished run.
+
+        Args:
+            summary (dict): Run summary, see `friends_keeper.instrumentation.Instrumentation.summary`.
+        """
+        self.observe((f"{METRICS_PREFIX}_run_duration_seconds", ()), summary["duration"])
+
+        with self._lock:
+            key = (f"{METRICS_PREFIX}_runs_total", ())
+            self.counters[key] = self.counters.get(key, 0) + 1
+            self.gauges[(f"{METRICS_PREFIX}_last_run_timestamp_seconds", ())] = time.time()
+
+    def render(self) -> str:
+        """Render the metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Metrics, every one with its help and type.
+        """
+        lines = list()
+
+        with self._lock:
+            for metric_type, metrics in (("counter", self.counters), ("gauge", self.gauges)):
+
+                for name, samples in group_by_name(metrics):
+                    lines.extend(get_metadata_lines(name, metric_type))
+                    lines.extend(f"{name}{format_labels(labels)} {format_value(value)}" for labels, value in samples)
+
+            for name, samples in group_by_name(self.histograms):
+                lines.extend(get_metadata_lines(name, "histogram"))
+
+                for labels, (bucket_counts, total, count) in samples:
+                    lines.extend(
+                        f"{name}_bucket{format_labels(labels + (('le', format_value(upper_bound)),))} {bucket_count}"
+                        for upper_bound, bucket_count in zip(self.buckets, bucket_counts)
+                    )
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {count}")
+                    lines.append(f"{name}_sum{format_labels(labels)} {format_value(total)}")
+                    lines.append(f"{name}_count{format_labels(labels)} {count}")
+
+        return "".join(f"{line}\n" for line in lines)
+
+    def write_textfile(self, path: str) -> None:
+        """Write the metrics to the given file for the textfile collector.
+
+        The file is replaced at once, so it is never collected half written.
+
+        Args:
+            path (str): Metrics file path, its name must end with `.prom` to be collected.
+        """
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+
+        try:
+            with open(temporary_path, "w") as metrics_file:
+                metrics_file.write(self.render())
+            os.replace(temporary_path, path)
+
+        except OSError:
+            logger.error(f"Error occurred writing the metrics to '{path}'.")
+
+        else:
+            logger.debug(f"Metrics written to '{path}'.")
+
+
+def get_metrics_registry(configuration: Union[dict, None] = None) -> Union[MetricsRegistry, None]:
+    """Get a metrics registry when the configuration exports metrics.
+
+    Args:
+        configuration (Union[dict, None], optional): YAML configuration loaded as dict. Defaults to None.
+
+    Returns:
+        Union[MetricsRegistry, None]: Registry or None if `metrics` has neither `textfile` nor `port`.
+    """
+    metrics_configuration = (configuration or dict()).get("metrics", dict())
+
+    if "textfile" not in metrics_configuration and "port" not in metrics_configuration:
+        return None
+
+    return MetricsRegistry(buckets=metrics_configuration.get("buckets", DEFAULT_METRICS_BUCKETS))
+
+
+def start_metrics_server(registry: MetricsRegistry, port: int, host: str = DEFAULT_METRICS_HOST) -> ThreadingHTTPServer:
+    """Serve the metrics of the registry on `/metrics` from a daemon thread.
+
+    Args:
+        registry (MetricsRegistry): Registry to serve.
+        port (int): Port to listen on, 0 picks a free one.
+        host (str, optional): Address to listen on. Defaults to DEFAULT_METRICS_HOST.
+
+    Raises:
+        OSError: Raised when the address could not be bound.
+
+    Returns:
+        ThreadingHTTPServer: Server, to be shut down and closed when done.
+    """
+    handler = type("BoundMetricsHandler", (MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Serving metrics on 'http://{host}:{server.server_address[1]}/metrics'.")
+    return server
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """HTTP handler serving the metrics of `registry` on `/metrics`."""
+
+    registry = None
+
+    def do_GET(self) -> None:
+        """Answer with the metrics, or not found for any other path."""
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        """Log requests on debug instead of writing them to stderr.
+
+        Args:
+            format (str): Message format.
+            args: Message arguments.
+        """
+        logger.debug(format % args)
+
+
+def group_by_name(metrics: dict) -> List[Tuple[str, List[tuple]]]:
+    """Group the samples of a metrics dictionary by metric name.
+
+    Args:
+        metrics (dict): Values keyed on the metric name and labels.
+
+    Returns:
+        List[Tuple[str, List[tuple]]]: Metric names, sorted, along with their labels and values.
+    """
+    grouped = dict()
+
+    for (name, labels), value in sorted(metrics.items()):
+        grouped.setdefault(name, list()).append((labels, value))
+
+    return list(grouped.items())
+
+
+def get_metadata_lines(name: str, metric_type: str) -> List[str]:
+    """Get the help and type lines of a metric.
+
+    Args:
+        name (str): Metric name.
+        metric_type (str): Metric type.
+
+    Returns:
+        List[str]: Help and type lines.
+    """
+    return [f"# HELP {name} {METRICS_DESCRIPTIONS.get(name, name)}", f"# TYPE {name} {metric_type}"]
+
+
+def format_labels(labels: Labels) -> str:
+    """Format metric labels, escaping their values.
+
+    Args:
+        labels (Labels): Label names and values.
+
+    Returns:
+        str: Labels within braces or an empty string without labels.
+    """
+    if not labels:
+        return ""
+
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def format_value(value: float) -> str:
+    """Format a sample value.
+
+    Args:
+        value (float): Value.
+
+    Returns:
+        str: Integers without decimals and floats with their shortest representation.
+    """
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+
+    return repr(float(value))
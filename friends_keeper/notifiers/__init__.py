@@ -1,13 +1,16 @@
-"""Notifiers modules with notifier factory."""
+"""Notifiers modules with notifier factory.
+
+Notifier classes are imported only when they are configured, so the HTTP
+stack of gotify is not loaded by runs that do not use it. Every notifier is
+wrapped with retries and a circuit breaker, see `friends_keeper.notifiers.resilient`.
+"""
 from abc import ABC
 from typing import List
 
 from friends_keeper.constants import NOTIFIER_TYPES
 from friends_keeper.extensions import logger
 from friends_keeper.notifiers.base import BaseNotifier
-from friends_keeper.notifiers.email import EmailNotifier
-from friends_keeper.notifiers.file import FileNotifier
-from friends_keeper.notifiers.gotify import GotifyNotifier
+from friends_keeper.notifiers.resilient import ResilientNotifier
 
 
 class NotifierFactory(ABC):
@@ -27,7 +30,7 @@ class NotifierFactory(ABC):
             NotImplementedError: Raised when notifier is not implemented.
 
         Returns:
-            List[BaseNotifier]: List with loaded notifiers.
+            List[BaseNotifier]: List with loaded notifiers, wrapped with retries and a circuit breaker.
         """
         notifiers = list()
         notifier_types = configuration["notifications"]["type"]
@@ -41,17 +44,23 @@ class NotifierFactory(ABC):
             else:
 
                 if notifier_type == NOTIFIER_TYPES.file:
+                    from friends_keeper.notifiers.file import FileNotifier
+
                     logger.debug(f"Adding '{NOTIFIER_TYPES.file}' notifier.")
                     notifiers.append(FileNotifier(configuration=configuration))
 
                 elif notifier_type == NOTIFIER_TYPES.gotify:
+                    from friends_keeper.notifiers.gotify import GotifyNotifier
+
                     logger.debug(f"Adding '{NOTIFIER_TYPES.gotify}' notifier.")
                     notifiers.append(GotifyNotifier(configuration=configuration))
 
                 elif notifier_type == NOTIFIER_TYPES.email:
+                    from friends_keeper.notifiers.email import EmailNotifier
+
                     logger.debug(f"Adding '{NOTIFIER_TYPES.email}' notifier.")
                     notifiers.append(EmailNotifier(configuration=configuration))
 
         else:
             logger.debug(f"Using these notifiers: '{notifiers}'.")
-            return notifiers
+            return [ResilientNotifier(notifier=notifier) for notifier in notifiers]
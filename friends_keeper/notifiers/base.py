@@ -5,15 +5,22 @@ import random
 from abc import ABC
 from abc import abstractmethod
 from typing import List
+from typing import Tuple
+from typing import Union
 
 from friends_keeper.constants import ACTIONS
+from friends_keeper.constants import DEFAULT_MAX_MESSAGE_LENGTH
+from friends_keeper.constants import DEFAULT_NOTIFIER_TIMEOUT
 from friends_keeper.constants import REMINDING_NOTES
+from friends_keeper.database.friends import Friend
 from friends_keeper.database.notifications import NotificationEvent
-from friends_keeper.utils.orm.friends import get_friend
 
 
 logger = logging.getLogger(__name__)
 
+# Notification event along with the friend it belongs to.
+NotificationWithFriend = Tuple[NotificationEvent, Friend]
+
 
 class BaseNotifier(ABC):
     """Base notifier to be inherited by other implementations.
@@ -22,6 +29,9 @@ class BaseNotifier(ABC):
         ABC (abc.ABC): Abstract class.
     """
 
+    # Key of the notifier under the `notifiers` section of the configuration.
+    notifier_type = ""
+
     def __init__(self, configuration: dict):
         """Initialization of the object.
 
@@ -33,29 +43,66 @@ class BaseNotifier(ABC):
         else:
             self.title = "Friends keeper notification"
 
+        notifier_configuration = configuration.get("notifiers", {}).get(self.notifier_type, {})
+        self.timeout = notifier_configuration.get("timeout", DEFAULT_NOTIFIER_TIMEOUT)
+        self.max_message_length = configuration["notifications"].get("max_message_length", DEFAULT_MAX_MESSAGE_LENGTH)
+        # Friends per message, not limited when unset.
+        self.max_items_per_message = notifier_configuration.get("max_items_per_message")
         self.configuration = configuration
 
     @abstractmethod
-    def notify(self, message: str) -> None:
-        """Abstract method definition so all object get the same method.
+    def send_message(self, message: str, idempotency_key: Union[str, None] = None) -> None:
+        """Send a single message already rendered, as delivered from the outbox.
 
         Args:
             message (str): Message to be sent.
+            idempotency_key (Union[str, None], optional): Key identifying the message, the same
+            on every delivery attempt, given to the receiving end when it can tell repeated
+            messages apart with it. Defaults to None.
+        """
+        pass
+
+    def flush(self) -> None:
+        """Write any message the notifier buffered.
+
+        Called after every batch of deliveries, notifiers buffering messages
+        should override it, by default messages are not buffered. Messages that
+        could not be written must be dropped, so they are not written twice when
+        attempted again.
+        """
+        pass
+
+    def buffered_messages(self) -> int:
+        """Get the number of messages sent but not written yet, waiting for a flush.
+
+        Returns:
+            int: Messages buffered, always 0 unless the notifier buffers messages.
+        """
+        return 0
+
+    def close(self) -> None:
+        """Release any resource held by the notifier.
+
+        Notifiers holding connections or file handles across sends should
+        override it, by default there is nothing to release.
         """
         pass
 
-    def build_notification_message(self, notifications: List[NotificationEvent]) -> str:
+    def build_notification_message(self, notifications: List[NotificationWithFriend]) -> str:
         """Build notification message using information from notification event passed.
 
+        Friends come along with their notification event so no query is done
+        no matter how many notifiers build their message.
+
         Args:
-            notifications (List[NotificationEvent]): List with notification event
-            objects.
+            notifications (List[NotificationWithFriend]): List with notification event
+            and friend pairs.
 
         Returns:
             str: Message to be sent.
         """
         # Join all friend together
-        friends = ", ".join([get_friend(notification.friend_id).nickname for notification in notifications])
+        friends = ", ".join([friend.nickname for _, friend in notifications])
         action = random.choice(ACTIONS).upper()
 
         logger.debug(f"Found friends: {friends}")
@@ -72,3 +119,45 @@ class BaseNotifier(ABC):
             logger.debug(f"Built message: '{notification_message}'")
 
         return notification_message
+
+    def build_notification_messages(self, notifications: List[NotificationWithFriend]) -> List[str]:
+        """Build as many notification messages as needed to keep each one within the maximum length.
+
+        Friends are split into consecutive groups whose nicknames fit on the
+        longest message template, and of up to `max_items_per_message` friends
+        when the notifier sets it, a friend whose nickname does not fit on its own
+        still gets its own message.
+
+        Args:
+            notifications (List[NotificationWithFriend]): List with notification event
+            and friend pairs.
+
+        Returns:
+            List[str]: Messages to be sent.
+        """
+        templates = REMINDING_NOTES
+
+        if "message" in self.configuration["notifications"]:
+            templates = [self.configuration["notifications"]["message"]]
+
+        overhead = max(
+            len(template.format(action=action.upper(), friend_name="")) for template in templates for action in ACTIONS
+        )
+        groups = list()
+        group_length = 0
+
+        for notification, friend in notifications:
+            nickname_length = len(friend.nickname)
+
+            if (
+                groups
+                and group_length + len(", ") + nickname_length + overhead <= self.max_message_length
+                and (self.max_items_per_message is None or len(groups[-1]) < self.max_items_per_message)
+            ):
+                groups[-1].append((notification, friend))
+                group_length += len(", ") + nickname_length
+            else:
+                groups.append([(notification, friend)])
+                group_length = nickname_length
+
+        return [self.build_notification_message(notifications=group) for group in groups]
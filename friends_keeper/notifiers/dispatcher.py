@@ -0,0 +1,271 @@
+"""Notifiers dispatcher module.
+
+Outbox messages are delivered by all notifiers concurrently, each one on its own
+thread, with its own timeout and delivering its own messages, so the time it
+takes to deliver is the one of the slowest notifier and a hung notifier does not
+block the others.
+
+A notifier which does not deliver a message within its timeout is left behind:
+its messages not delivered so far are taken as failed and its thread stops once
+the message it is sending returns. Until then the notifier is not used for other
+deliveries, and closing it with `close_notifier` is deferred until it finishes.
+"""
+import logging
+import threading
+import time
+
+from collections import namedtuple
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import List
+
+from friends_keeper.database.outbox import OutboxMessage
+from friends_keeper.exceptions import NotifierError
+from friends_keeper.notifiers.base import BaseNotifier
+
+
+logger = logging.getLogger(__name__)
+
+# IDs of the outbox messages delivered and, when delivery stopped on an error, IDs of the messages that failed.
+DeliveryResult = namedtuple("DeliveryResult", ["notifier", "sent_ids", "failed_ids", "error", "elapsed"])
+
+# Deliveries which went over their notifier timeout and are still running, keyed on the notifier.
+_overdue_deliveries = dict()
+_overdue_lock = threading.Lock()
+
+
+class Delivery:
+    """Delivery of the outbox messages of a single notifier, on its own thread."""
+
+    def __init__(self, notifier: BaseNotifier, messages: List[OutboxMessage]):
+        """Initialization of the delivery.
+
+        Args:
+            notifier (BaseNotifier): Notifier to deliver with.
+            messages (List[OutboxMessage]): Outbox messages of the notifier.
+        """
+        self.notifier = notifier
+        self.messages = messages
+        self.future = Future()
+        # IDs of the messages written, buffered messages only once a flush writes them.
+        self.sent_ids = list()
+        # Messages handed to the notifier so far, to tell a slow delivery from a hung one.
+        self.processed = 0
+        self.cancelled = False
+        self.finished = False
+        self.close_requested = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self.run, name=f"delivery-{notifier.notifier_type}", daemon=True)
+
+    def start(self) -> None:
+        """Start delivering on the delivery thread."""
+        self._thread.start()
+
+    def run(self) -> None:
+        """Deliver the messages in order until one fails or the delivery is cancelled.
+
+        Messages buffered by the notifier only count as delivered once the flush
+        writing them succeeds, the notifier is flushed at the end so the ones still
+        buffered are written. Buffered messages dropped by a failed flush are taken
+        as failed along with the message being sent.
+        """
+        start_time = time.monotonic()
+        failed_ids = list()
+        # IDs of the messages sent but still buffered, oldest first.
+        buffered_ids = list()
+        error = None
+
+        for message in self.messages:
+
+            if self.cancelled:
+                break
+
+            try:
+                self.notifier.send_message(message.message, idempotency_key=message.idempotency_key)
+
+            except BaseException as exec_error:
+                error = exec_error
+                failed_ids.extend(_settle_buffered(self.notifier, buffered_ids))
+                failed_ids.append(message.id)
+                break
+
+            buffered_ids.append(message.id)
+
+            with self._lock:
+                self.processed += 1
+                self.sent_ids.extend(_settle_buffered(self.notifier, buffered_ids))
+
+        flushed = False
+
+        try:
+            self.notifier.flush()
+
+        except BaseException as exec_error:
+            error = error or exec_error
+            failed_ids.extend(_settle_buffered(self.notifier, buffered_ids))
+
+        else:
+            flushed = True
+
+        with self._lock:
+
+            if flushed:
+                self.sent_ids.extend(_settle_buffered(self.notifier, buffered_ids))
+
+            sent_ids = list(self.sent_ids)
+            self.finished = True
+
+        self.future.set_result((time.monotonic() - start_time, sent_ids, failed_ids, error))
+
+        with _overdue_lock:
+            _overdue_deliveries.pop(self.notifier, None)
+            close_requested = self.close_requested
+
+        if close_requested:
+            logger.info(f"Closing notifier '{self.notifier}' now that its overdue delivery finished.")
+            self.notifier.close()
+
+    def wait(self, start_time: float) -> DeliveryResult:
+        """Wait for the delivery while it keeps delivering messages within the notifier timeout.
+
+        The timeout applies to each message, so rate limited notifiers can take
+        longer as long as they keep delivering. When it runs out the delivery is
+        cancelled, the messages delivered so far are kept and the rest are failed.
+
+        Args:
+            start_time (float): Monotonic time the delivery started.
+
+        Returns:
+            DeliveryResult: Result of the delivery.
+        """
+        deadline = start_time + self.notifier.timeout
+        processed = self.processed
+
+        while True:
+
+            try:
+                elapsed, sent_ids, failed_ids, error = self.future.result(
+                    timeout=max(deadline - time.monotonic(), 0)
+                )
+
+            except FutureTimeoutError:
+
+                with self._lock:
+
+                    if self.finished or self.processed != processed:
+                        processed = self.processed
+                        deadline = time.monotonic() + self.notifier.timeout
+                        continue
+
+                    self.cancelled = True
+                    sent_ids = list(self.sent_ids)
+
+                    with _overdue_lock:
+                        _overdue_deliveries[self.notifier] = self
+
+                msg = f"Notifier '{self.notifier}' did not deliver a message within {self.notifier.timeout} seconds."
+                logger.error(msg)
+                delivered = set(sent_ids)
+                failed_ids = [message.id for message in self.messages if message.id not in delivered]
+                return DeliveryResult(
+                    self.notifier, sent_ids, failed_ids, NotifierError(msg), time.monotonic() - start_time
+                )
+
+            if error is not None:
+                logger.error(f"Error occurred delivering with '{self.notifier}': {error!r}")
+            else:
+                logger.debug(
+                    f"Notifier '{self.notifier}' delivered {len(sent_ids)} messages in {elapsed:.3f} seconds."
+                )
+
+            return DeliveryResult(self.notifier, sent_ids, failed_ids, error, elapsed)
+
+
+def deliver_messages(notifiers: List[BaseNotifier], messages: List[OutboxMessage]) -> List[DeliveryResult]:
+    """Deliver the given outbox messages, every notifier its own ones and all of them concurrently.
+
+    Every notifier sends its messages in order and stops on the first one that
+    fails, so the ones after it are left for the next attempt. Notifiers still
+    running a delivery which went over their timeout deliver nothing, their
+    messages are left for the next attempt.
+
+    Args:
+        notifiers (List[BaseNotifier]): Notifiers to deliver with.
+        messages (List[OutboxMessage]): Outbox messages to deliver.
+
+    Returns:
+        List[DeliveryResult]: Result of every notifier in the same order they were given.
+    """
+    start_time = time.monotonic()
+    deliveries = list()
+
+    for notifier in notifiers:
+        delivery = None
+
+        if not is_delivering(notifier):
+            delivery = Delivery(
+                notifier, [message for message in messages if message.notifier_type == notifier.notifier_type]
+            )
+            delivery.start()
+
+        deliveries.append((notifier, delivery))
+
+    results = list()
+
+    for notifier, delivery in deliveries:
+
+        if delivery is not None:
+            results.append(delivery.wait(start_time))
+            continue
+
+        msg = f"Notifier '{notifier}' is still running a delivery which went over its timeout."
+        logger.error(msg)
+        results.append(DeliveryResult(notifier, list(), list(), NotifierError(msg), 0.0))
+
+    return results
+
+
+def is_delivering(notifier: BaseNotifier) -> bool:
+    """Check whether the notifier is still running a delivery which went over its timeout.
+
+    Args:
+        notifier (BaseNotifier): Notifier to check.
+
+    Returns:
+        bool: Whether the notifier is still delivering.
+    """
+    with _overdue_lock:
+        return notifier in _overdue_deliveries
+
+
+def close_notifier(notifier: BaseNotifier) -> None:
+    """Close the notifier, once its delivery finishes when one went over its timeout.
+
+    Args:
+        notifier (BaseNotifier): Notifier to close.
+    """
+    with _overdue_lock:
+        delivery = _overdue_deliveries.get(notifier)
+
+        if delivery is not None:
+            logger.warning(f"Notifier '{notifier}' is still delivering, it will be closed once it finishes.")
+            delivery.close_requested = True
+            return
+
+    notifier.close()
+
+
+def _settle_buffered(notifier: BaseNotifier, buffered_ids: List[int]) -> List[int]:
+    """Take out the IDs of the messages the notifier no longer buffers, written or dropped by a flush.
+
+    Args:
+        notifier (BaseNotifier): Notifier buffering the messages.
+        buffered_ids (List[int]): IDs of the messages sent but buffered, oldest first, updated in place.
+
+    Returns:
+        List[int]: IDs of the messages no longer buffered.
+    """
+    settled = len(buffered_ids) - notifier.buffered_messages()
+    settled_ids = buffered_ids[:settled]
+    del buffered_ids[:settled]
+    return settled_ids
@@ -1,43 +1,176 @@
 """Email notifier module."""
 import logging
+import smtplib
 
-from datetime import datetime
-from typing import List
+from email.message import EmailMessage
+from email.utils import formatdate
+from email.utils import make_msgid
+from typing import Union
 
-from friends_keeper.database.notifications import NotificationEvent
+from friends_keeper.constants import DEFAULT_SMTP_HOST
+from friends_keeper.constants import NOTIFIER_TYPES
+from friends_keeper.exceptions import ConfigurationError
+from friends_keeper.exceptions import NotifierError
 from friends_keeper.notifiers.base import BaseNotifier
 
 
 logger = logging.getLogger(__name__)
 
+# Errors after which the SMTP connection is considered lost and opened again.
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
 
 class EmailNotifier(BaseNotifier):
     """Email notifications.
 
-    All notifications are sent via mail.
+    All notifications are sent via mail. A single SMTP connection is opened on
+    the first send and reused for all messages until the notifier is closed,
+    every message goes to all recipients within the same SMTP transaction.
 
     Args:
         BaseNotifier (friends_keeper.notifiers.base): Base abstract notifier class.
     """
 
+    notifier_type = NOTIFIER_TYPES.email
+
     def __init__(self, configuration: dict):
         """Initialization of the email notifier.
 
         Args:
             configuration (dict): YAML configuration loaded in JSON format.
+
+        Raises:
+            ConfigurationError: Raised when the email configuration is missing.
         """
+        if "email" not in configuration.get("notifiers", {}):
+            raise ConfigurationError("Email configuration not found.")
+
+        email_configuration = configuration["notifiers"]["email"]
+        self.host = email_configuration.get("host", DEFAULT_SMTP_HOST)
+        self.use_ssl = email_configuration.get("use_ssl", False)
+        self.port = email_configuration.get("port", smtplib.SMTP_SSL_PORT if self.use_ssl else smtplib.SMTP_PORT)
+        self.use_tls = email_configuration.get("use_tls", False)
+        self.from_address = email_configuration["from_address"]
+        self.to_address = email_configuration["to_address"]
+        self.username = email_configuration.get("username", self.from_address)
+        self._password = email_configuration["password"]
+        self._connection = None
+
         super().__init__(configuration)
 
-    def notify(self, notifications: List[NotificationEvent]) -> None:
-        """Notify user via email.
+    def send_message(self, message: str, idempotency_key: Union[str, None] = None) -> None:
+        """Send a single message to all recipients, connecting again once if the connection was lost.
+
+        The idempotency key is used as the `Message-ID` so mail clients tell repeated emails apart.
+
+        Args:
+            message (str): Message to be sent.
+            idempotency_key (Union[str, None], optional): Key identifying the message. Defaults to None.
+
+        Raises:
+            ConfigurationError: Raised when credentials are configured but the server does not offer AUTH.
+            NotifierError: Raised when the message could not be sent.
+        """
+        email_message = self._build_email_message(message, idempotency_key=idempotency_key)
+
+        try:
+            self._send(email_message)
+
+        except CONNECTION_ERRORS:
+            logger.info("SMTP connection lost, connecting again.")
+            self.close()
+
+            try:
+                self._send(email_message)
+            except (smtplib.SMTPException, OSError) as exec_error:
+                raise NotifierError(f"Error occurred sending the email: {exec_error!r}")
+
+        except (smtplib.SMTPException, OSError) as exec_error:
+            logger.error("Error occurred trying to send the email.")
+            raise NotifierError(f"Error occurred sending the email: {exec_error!r}")
+
+    def close(self) -> None:
+        """Close the SMTP connection if there is one opened."""
+        if self._connection is not None:
+
+            try:
+                self._connection.quit()
+            except CONNECTION_ERRORS + (smtplib.SMTPException,):
+                self._connection.close()
+
+            self._connection = None
+
+    def _send(self, email_message: EmailMessage) -> None:
+        """Send the email message to all recipients, connecting if needed.
 
         Args:
-            notifications (List[NotificationEvent]): List with notification event
-            objects.
+            email_message (EmailMessage): Email message to be sent.
         """
-        # TODO: Implement real logic
-        notification_message = self.build_notification_message(notifications=notifications)
-        print(f"{datetime.now().strftime('%d/%m/%y_%H%M%S')} - {notification_message}")
+        if self._connection is None:
+            self._connection = self._connect()
+
+        self._connection.send_message(email_message, from_addr=self.from_address, to_addrs=self.to_address)
+
+    def _connect(self) -> Union[smtplib.SMTP, smtplib.SMTP_SSL]:
+        """Open and authenticate the SMTP connection.
+
+        Raises:
+            ConfigurationError: Raised when a password is configured but the server does not offer AUTH,
+            so messages never go out unauthenticated.
+
+        Returns:
+            Union[smtplib.SMTP, smtplib.SMTP_SSL]: SMTP connection ready to send emails.
+        """
+        logger.debug(f"Connecting to SMTP server '{self.host}:{self.port}'.")
+
+        if self.use_ssl:
+            connection = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+
+        connection.ehlo()
+
+        if self.use_tls:
+            connection.starttls()
+            connection.ehlo()
+
+        if self._password:
+
+            if not connection.has_extn("auth"):
+                connection.close()
+                msg = f"SMTP server '{self.host}:{self.port}' does not offer AUTH but credentials are configured."
+                logger.error(msg)
+                raise ConfigurationError(msg)
+
+            connection.login(self.username, self._password)
+
+        return connection
+
+    def _build_email_message(self, message: str, idempotency_key: Union[str, None] = None) -> EmailMessage:
+        """Build the email message addressed to all recipients.
+
+        Args:
+            message (str): Notification message to be sent.
+            idempotency_key (Union[str, None], optional): Key used as `Message-ID`. Defaults to None,
+            which generates a new one.
+
+        Returns:
+            EmailMessage: Email message.
+        """
+        domain = self.from_address.split("@")[-1]
+        email_message = EmailMessage()
+        email_message["Subject"] = self.title
+        email_message["From"] = self.from_address
+        email_message["To"] = ", ".join(self.to_address)
+        email_message["Date"] = formatdate(localtime=True)
+
+        if idempotency_key is not None:
+            email_message["Message-ID"] = f"<{idempotency_key}@{domain}>"
+        else:
+            email_message["Message-ID"] = make_msgid(domain=domain)
+
+        email_message.set_content(message)
+        return email_message
 
     def __repr__(self) -> str:
         """String representation of EmailNotifier.
@@ -45,4 +178,4 @@ class EmailNotifier(BaseNotifier):
         Returns:
             str: String representation of the object.
         """
-        return "EmailNotifier"
+        return str({"EmailNotifier": {"host": self.host, "port": self.port}})
@@ -1,18 +1,42 @@
-"""File notifier module."""
+"""File notifier module.
+
+The notifier keeps the file open for its whole lifetime and buffers messages,
+writing them at once when `flush_size` bytes are pending, when `flush_interval`
+seconds went by since the last write or when the notifier is flushed, which
+happens after every batch of deliveries and on close. Messages which could not
+be written are dropped, the outbox attempts them again.
+
+The file can be rotated, setting the `rotation` section, once it grows over
+`max_bytes` or once `interval` seconds went by since its first message. Rotated
+files get a number suffix, `.1` being the newest one, up to `backup_count` of
+them, and are compressed with gzip when `compress` is set.
+"""
+import gzip
 import logging
 import os
+import shutil
+import threading
+import time
 
 from datetime import datetime
+from typing import IO
 from typing import List
+from typing import Union
 
+from friends_keeper.constants import DEFAULT_FILE_BACKUP_COUNT
+from friends_keeper.constants import DEFAULT_FILE_FLUSH_INTERVAL
+from friends_keeper.constants import DEFAULT_FILE_FLUSH_SIZE
 from friends_keeper.constants import NOTIFICATIONS_FILE_PATH
-from friends_keeper.database.notifications import NotificationEvent
+from friends_keeper.constants import NOTIFIER_TYPES
 from friends_keeper.exceptions import ConfigurationError
+from friends_keeper.exceptions import NotifierError
 from friends_keeper.notifiers.base import BaseNotifier
 
 
 logger = logging.getLogger(__name__)
 
+TIMESTAMP_FORMAT = "%d/%m/%y_%H%M%S"
+
 
 class FileNotifier(BaseNotifier):
     """File notifications.
@@ -24,66 +48,244 @@ class FileNotifier(BaseNotifier):
         BaseNotifier (friends_keeper.notifiers.base): Base abstract notifier class.
     """
 
+    notifier_type = NOTIFIER_TYPES.file
+
     def __init__(self, configuration: dict):
         """Initialization of the File notifier.
 
+        The file is not opened until the first message is written.
+
         Args:
             configuration (dict): YAML configuration loaded in JSON format.
         """
         super().__init__(configuration)
+        file_configuration = configuration["notifiers"]["file"]
+        rotation_configuration = file_configuration.get("rotation", {})
+        self.file_path = os.path.abspath(file_configuration["path"] or NOTIFICATIONS_FILE_PATH)
+        self.flush_size = file_configuration.get("flush_size", DEFAULT_FILE_FLUSH_SIZE)
+        self.flush_interval = file_configuration.get("flush_interval", DEFAULT_FILE_FLUSH_INTERVAL)
+        self.max_bytes = rotation_configuration.get("max_bytes")
+        self.rotation_interval = rotation_configuration.get("interval")
+        self.backup_count = rotation_configuration.get("backup_count", DEFAULT_FILE_BACKUP_COUNT)
+        self.compress = rotation_configuration.get("compress", False)
+
+        self._file_obj = None
+        self._size = 0
+        self._opened_at = None
+        self._buffer = list()
+        self._buffer_size = 0
+        self._flushed_at = time.monotonic()
+        self._lock = threading.RLock()
+
+    def send_message(self, message: str, idempotency_key: Union[str, None] = None) -> None:
+        """Buffer a single message, the idempotency key is not written.
+
+        Args:
+            message (str): Message to be written.
+            idempotency_key (Union[str, None], optional): Key identifying the message. Defaults to None.
+
+        Raises:
+            ConfigurationError: Raised when the path on configuration is not valid.
+            NotifierError: Raised when the buffered messages could not be written.
+        """
+        with self._lock:
+            self._append([message])
+
+            if self._buffer_size >= self.flush_size or time.monotonic() - self._flushed_at >= self.flush_interval:
+                self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered messages to the file, rotating it first when due.
+
+        The buffer is emptied either way, messages which could not be written
+        are dropped so they are not written twice when attempted again.
+
+        Raises:
+            ConfigurationError: Raised when the path on configuration is not valid.
+            NotifierError: Raised when the messages could not be written.
+        """
+        with self._lock:
+
+            if not self._buffer:
+                return
+
+            messages = len(self._buffer)
+            data = "".join(self._buffer)
+            data_size = self._buffer_size
+            self._buffer = list()
+            self._buffer_size = 0
+
+            try:
+                self._write(data, data_size)
+
+            except (ConfigurationError, NotifierError):
+                logger.error(f"Dropping {messages} buffered messages of '{self.file_path}'.")
+                raise
+
+            self._flushed_at = time.monotonic()
+            logger.debug(f"Flushed {len(data)} characters to '{self.file_path}'.")
+
+    def buffered_messages(self) -> int:
+        """Get the number of messages buffered, waiting for a flush.
+
+        Returns:
+            int: Messages buffered.
+        """
+        with self._lock:
+            return len(self._buffer)
+
+    def rotate(self) -> None:
+        """Move the current file to the first backup, shifting the older ones.
+
+        Raises:
+            NotifierError: Raised when the file could not be rotated.
+        """
+        with self._lock:
+            self._close_file()
+            suffix = ".gz" if self.compress else ""
+
+            try:
+                for index in range(self.backup_count - 1, 0, -1):
+                    source = f"{self.file_path}.{index}{suffix}"
 
-    def notify(self, notifications: List[NotificationEvent]) -> None:
-        """Notify the user using the file provided on the configuration.
+                    if os.path.exists(source):
+                        os.replace(source, f"{self.file_path}.{index + 1}{suffix}")
+
+                if self.compress:
+                    with open(self.file_path, "rb") as source_obj:
+                        with gzip.open(f"{self.file_path}.1.gz", "wb") as gzip_obj:
+                            shutil.copyfileobj(source_obj, gzip_obj)
+
+                    os.remove(self.file_path)
+
+                else:
+                    os.replace(self.file_path, f"{self.file_path}.1")
+
+            except OSError as exec_error:
+                logger.error(f"Error occurred trying to rotate the file '{self.file_path}'.")
+                raise NotifierError(f"File '{self.file_path}' could not be rotated: {exec_error!r}")
+
+            logger.info(f"File '{self.file_path}' rotated.")
+
+    def close(self) -> None:
+        """Write the buffered messages and close the file."""
+        with self._lock:
+
+            try:
+                self.flush()
+
+            except (ConfigurationError, NotifierError):
+                # Flushing already logged the messages it dropped.
+                pass
+
+            finally:
+                self._close_file()
+
+    def _write(self, data: str, data_size: int) -> None:
+        """Write the given data to the file, rotating it first when due.
 
         Args:
-            notifications (List[NotificationEvent]): List with notification event
-            objects.
+            data (str): Lines to be written.
+            data_size (int): Bytes of the data.
 
         Raises:
             ConfigurationError: Raised when the path on configuration is not valid.
+            NotifierError: Raised when the data could not be written.
         """
-        # TODO: Checking the config should be responsibility of the load_configuration function.
-        # Build the notification message
-        notification_message = self.build_notification_message(notifications=notifications)
-        # Add carriage return so it appends data onto the next line.
-        notification_message += "\n"
+        file_obj = self._get_file()
+
+        if self._should_rotate(data_size):
+            self.rotate()
+            file_obj = self._get_file()
 
-        # TODO: Move check to init and also create the file_path attribute
-        config_notifier_file_path = self.configuration["notifiers"]["file"]["path"]
+        try:
+            file_obj.write(data)
+            file_obj.flush()
 
-        if config_notifier_file_path:
+        except OSError as exec_error:
+            logger.error(f"Error occurred trying to write to the file '{self.file_path}'.")
+            raise NotifierError(f"Messages could not be written to '{self.file_path}': {exec_error!r}")
 
-            config_notifier_file_path = os.path.abspath(config_notifier_file_path)
+        self._size += data_size
 
-            if os.path.exists(config_notifier_file_path):
-                logger.debug(f"File '{config_notifier_file_path}' exists using it for notification events.")
-                create_file = False
-            else:
-                create_file = True
+    def _append(self, notification_messages: List[str]) -> None:
+        """Add the given messages to the buffer, one per line.
 
-            notification_file_path = config_notifier_file_path
+        Args:
+            notification_messages (List[str]): Messages to be written.
+        """
+        timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
 
-        else:
-            config_notifier_file_path = NOTIFICATIONS_FILE_PATH
+        # Add carriage return so every message goes onto its own line.
+        for notification_message in notification_messages:
+            line = f"{timestamp} - {notification_message}\n"
+            self._buffer.append(line)
+            self._buffer_size += len(line.encode())
 
-            if os.path.exists(config_notifier_file_path):
-                logger.debug(f"File '{config_notifier_file_path}' exists using it for notification events.")
-                create_file = False
-            else:
-                create_file = True
+    def _get_file(self) -> IO[str]:
+        """Get the file handle, opening the file the first time.
 
-        if create_file:
+        Raises:
+            ConfigurationError: Raised when the file could not be opened.
+
+        Returns:
+            IO[str]: File opened to append.
+        """
+        if self._file_obj is None:
 
             try:
-                with open(config_notifier_file_path, "w"):
-                    logger.debug(f"Creating the file '{config_notifier_file_path}' as it does not exists.")
+                self._file_obj = open(self.file_path, "a", encoding="utf-8")
+
             except OSError:
-                logger.error(f"Error occurred trying to create file '{notification_file_path}'.")
-                raise ConfigurationError(f"File path '{notification_file_path}' provided in configuration seem wrong.")
+                logger.error(f"Error occurred trying to open file '{self.file_path}'.")
+                raise ConfigurationError(f"File path '{self.file_path}' provided in configuration seem wrong.")
+
+            self._size = self._file_obj.tell()
+            self._opened_at = self._get_first_timestamp() if self._size else datetime.now()
+            logger.debug(f"File '{self.file_path}' opened for notification events.")
+
+        return self._file_obj
+
+    def _get_first_timestamp(self) -> datetime:
+        """Get the time of the first message of the file, which started the current segment.
+
+        Returns:
+            datetime: Time of the first message or now when it can not be read.
+        """
+        timestamp_length = len(datetime.now().strftime(TIMESTAMP_FORMAT))
+
+        try:
+            with open(self.file_path, encoding="utf-8") as file_obj:
+                return datetime.strptime(file_obj.read(timestamp_length), TIMESTAMP_FORMAT)
+
+        except (OSError, ValueError):
+            return datetime.now()
+
+    def _should_rotate(self, pending_size: int) -> bool:
+        """Whether the file must be rotated before writing the given bytes.
+
+        Args:
+            pending_size (int): Bytes about to be written.
+
+        Returns:
+            bool: True when rotation is set and the file is over its size or age.
+        """
+        if not self._size:
+            return False
+
+        if self.max_bytes is not None and self._size + pending_size > self.max_bytes:
+            return True
+
+        if self.rotation_interval is not None:
+            return (datetime.now() - self._opened_at).total_seconds() >= self.rotation_interval
+
+        return False
 
-        with open(config_notifier_file_path, "a") as file_obj:
-            file_obj.write(f"{datetime.now().strftime('%d/%m/%y_%H%M%S')} - {notification_message}")
-            logger.info("File notification written.")
+    def _close_file(self) -> None:
+        """Close the file handle when it is open."""
+        if self._file_obj is not None:
+            self._file_obj.close()
+            self._file_obj = None
 
     def __repr__(self) -> str:
         """Representation of the file notifier.
@@ -91,5 +293,4 @@ class FileNotifier(BaseNotifier):
         Returns:
             str: String representation of the FileNotifier Object
         """
-        # TODO: Add the path used for notifications
-        return str({"FileNotifier": {"path": ""}})
+        return str({"FileNotifier": {"path": self.file_path}})
@@ -1,12 +1,21 @@
 """Gotify notifier module."""
 import logging
 
-from typing import List
+from io import IOBase
+from typing import Optional
+from typing import Union
 
+import requests
+
+from gotify import GotifyConfigurationError
 from gotify import GotifyError
 from gotify import gotify
+from requests.adapters import HTTPAdapter
 
-from friends_keeper.database.notifications import NotificationEvent
+from friends_keeper.constants import DEFAULT_GOTIFY_CONNECT_TIMEOUT
+from friends_keeper.constants import DEFAULT_GOTIFY_POOL_SIZE
+from friends_keeper.constants import DEFAULT_GOTIFY_READ_TIMEOUT
+from friends_keeper.constants import NOTIFIER_TYPES
 from friends_keeper.exceptions import ConfigurationError
 from friends_keeper.notifiers.base import BaseNotifier
 
@@ -14,6 +23,103 @@ from friends_keeper.notifiers.base import BaseNotifier
 logger = logging.getLogger(__name__)
 
 
+class PooledGotify(gotify):
+    """Gotify client sending all requests through a pooled keep-alive HTTP session.
+
+    The `gotify` client uses `requests.request` which opens a new connection, and
+    so a new TCP+TLS handshake, on every request. This client keeps one session
+    with its own connection pool so connections get reused across requests.
+
+    The client has no public way to pass a session, so `_request` is overridden.
+    Being private it may change on any release, which is why the `gotify`
+    version is pinned on `pyproject.toml` to the releases checked against it.
+
+    Args:
+        gotify (gotify.gotify): Gotify API client.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        app_token: str,
+        pool_size: int = DEFAULT_GOTIFY_POOL_SIZE,
+        connect_timeout: float = DEFAULT_GOTIFY_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_GOTIFY_READ_TIMEOUT,
+    ):
+        """Initialization of the pooled gotify client.
+
+        Args:
+            base_url (str): Base URL of the Gotify server.
+            app_token (str): Token of the application sending messages.
+            pool_size (int, optional): Maximum connections kept alive. Defaults to DEFAULT_GOTIFY_POOL_SIZE.
+            connect_timeout (float, optional): Seconds to wait for the connection. Defaults to
+            DEFAULT_GOTIFY_CONNECT_TIMEOUT.
+            read_timeout (float, optional): Seconds to wait for the response. Defaults to DEFAULT_GOTIFY_READ_TIMEOUT.
+        """
+        super().__init__(base_url=base_url, app_token=app_token)
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self) -> None:
+        """Close the HTTP session and all its pooled connections."""
+        self.session.close()
+
+    def _request(
+        self,
+        url: str,
+        *args: Optional[Union[dict, IOBase]],
+        method: str = "get",
+        auth_mode: str = "client",
+    ) -> Union[dict, list, str]:
+        """Send a request to the Gotify API using the pooled session.
+
+        Args:
+            url (str): API endpoint relative to the base URL.
+            args (Optional[Union[dict, IOBase]]): Query parameters, JSON body or file to upload.
+            method (str, optional): HTTP method. Defaults to "get".
+            auth_mode (str, optional): Token to authenticate with, "app" or "client". Defaults to "client".
+
+        Raises:
+            GotifyConfigurationError: Raised when the base URL is not set.
+            GotifyError: Raised when the response is not successful.
+
+        Returns:
+            Union[dict, list, str]: Response content.
+        """
+        if not self.base_url:
+            raise GotifyConfigurationError("'base_url' is not defined.")
+
+        kwargs = dict()
+
+        for arg in args:
+            if isinstance(arg, dict):
+                if method == "get":
+                    kwargs["params"] = arg
+                else:
+                    kwargs["json"] = arg
+            elif isinstance(arg, IOBase):
+                kwargs["files"] = {"file": arg}
+
+        response = self.session.request(
+            method,
+            self._join_urls(self.base_url, url),
+            headers={"X-Gotify-Key": self._get_token(auth_mode)},
+            timeout=self.timeout,
+            **kwargs,
+        )
+
+        if response.status_code == requests.codes.OK:
+            try:
+                return response.json()
+            except ValueError:
+                return response.text
+        else:
+            raise GotifyError(response)
+
+
 class GotifyNotifier(BaseNotifier):
     """Gotify notifications.
 
@@ -24,6 +130,8 @@ class GotifyNotifier(BaseNotifier):
         BaseNotifier (friends_keeper.notifiers.base): Base abstract notifier class.
     """
 
+    notifier_type = NOTIFIER_TYPES.gotify
+
     def __init__(self, configuration: dict):
         """Initialization of the Gotify notifier.
 
@@ -45,10 +153,15 @@ class GotifyNotifier(BaseNotifier):
         else:
             raise ConfigurationError("Gotify configuration not found.")
 
+        gotify_configuration = configuration["notifiers"]["gotify"]
+
         try:
-            self.gotify_obj = gotify(
+            self.gotify_obj = PooledGotify(
                 base_url=self.base_url,
                 app_token=self._token,
+                pool_size=gotify_configuration.get("pool_size", DEFAULT_GOTIFY_POOL_SIZE),
+                connect_timeout=gotify_configuration.get("connect_timeout", DEFAULT_GOTIFY_CONNECT_TIMEOUT),
+                read_timeout=gotify_configuration.get("read_timeout", DEFAULT_GOTIFY_READ_TIMEOUT),
             )
 
         except GotifyError:
@@ -56,31 +169,34 @@ class GotifyNotifier(BaseNotifier):
 
         super().__init__(configuration)
 
-    def notify(self, notifications: List[NotificationEvent]) -> None:
-        """Notify the user using the gotify api.
+    def send_message(self, message: str, idempotency_key: Union[str, None] = None) -> None:
+        """Send a single message through the gotify api.
+
+        The idempotency key goes on the message extras so clients can tell repeated messages apart.
 
         Args:
-            notifications (List[NotificationEvent]): List with notification event
-            objects.
+            message (str): Message to be sent.
+            idempotency_key (Union[str, None], optional): Key identifying the message. Defaults to None.
+
+        Raises:
+            GotifyError: Raised when the message could not be sent.
         """
-        logger.debug("Building message")
+        extras = None
 
-        notification_message = self.build_notification_message(notifications=notifications)
+        if idempotency_key is not None:
+            extras = {"friends_keeper::delivery": {"idempotency_key": idempotency_key}}
 
         try:
             logger.debug("Sending gotify message")
-            self.gotify_obj.create_message(
-                message=notification_message,
-                title=self.title,
-                priority=0,
-            )
+            self.gotify_obj.create_message(message=message, title=self.title, priority=0, extras=extras)
 
         except GotifyError:
             logger.error("Error occurred trying to send the gotify message.")
             raise
 
-        else:
-            logger.info("Gotify message sent")
+    def close(self) -> None:
+        """Close the HTTP session shared across sends."""
+        self.gotify_obj.close()
 
     def __repr__(self) -> str:
         """String representation of GotifyNotifier.
@@ -0,0 +1,55 @@
+"""Notifiers rate limiting module.
+
+Deliveries of a notifier are limited with a token bucket: it holds up to
+`burst` tokens, refilled at `rate` tokens per second, and every delivery
+takes one. Short bursts go out right away while long ones are spread
+at the configured rate, which is what throttling services expect.
+"""
+import threading
+import time
+
+from typing import Callable
+
+
+class TokenBucket:
+    """Token bucket rate limiter, safe to share across threads."""
+
+    def __init__(self, rate: float, burst: int = 1, clock: Callable[[], float] = time.monotonic):
+        """Initialization of the token bucket, which starts full.
+
+        Args:
+            rate (float): Tokens added per second.
+            burst (int, optional): Maximum tokens held. Defaults to 1.
+            clock (Callable[[], float], optional): Monotonic clock in seconds. Defaults to time.monotonic.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated_at = clock()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """Take a token when there is one available.
+
+        Returns:
+            float: 0 when a token was taken, otherwise seconds until the next one is available.
+        """
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+
+            return (1 - self.tokens) / self.rate
+
+    def __repr__(self) -> str:
+        """String representation of the token bucket.
+
+        Returns:
+            str: String representation of the object.
+        """
+        return f"TokenBucket(rate={self.rate}, burst={self.burst})"
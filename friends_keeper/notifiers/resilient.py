@@ -0,0 +1,310 @@
+"""Resilient notifier module.
+
+Every configured notifier is wrapped so its deliveries are attempted again on
+failure and an endpoint which keeps failing is not called on every run:
+  - Retries: a failed delivery is attempted up to `retry.attempts` times,
+    waiting a random time, up to `retry.backoff` seconds doubled after every
+    attempt and capped by `retry.max_backoff`, so notifiers failing at once do
+    not retry in lockstep. Retries never go beyond the notifier timeout.
+  - Circuit breaker: after `circuit_breaker.failure_threshold` consecutive
+    failed deliveries the circuit opens and deliveries fail fast for
+    `circuit_breaker.reset_timeout` seconds. Afterwards the next delivery goes
+    through, closing the circuit on success and opening it again otherwise.
+    The state is kept on the database so it survives across runs, every
+    notifier keeps it in memory for `circuit_breaker.cache_ttl` seconds and
+    only writes it back when a delivery changes it.
+  - Rate limit: deliveries go through a token bucket refilled at
+    `rate_limit.rate` messages per second which holds up to `rate_limit.burst`
+    of them. A delivery waits for its token up to half the notifier timeout,
+    leaving the other half to send it, and is deferred otherwise.
+
+All sections are read from the notifier configuration under `notifiers`.
+
+Deliveries are timed on the `notifier.<type>` span and tallied on the
+`messages_sent.<type>`, `messages_failed.<type>`, `messages_deferred.<type>`
+and `retries.<type>` counters, see `friends_keeper.instrumentation`.
+"""
+import logging
+import random
+import time
+
+from datetime import datetime
+from datetime import timedelta
+from typing import List
+from typing import Tuple
+from typing import Union
+
+from friends_keeper.constants import DEFAULT_CIRCUIT_BREAKER_CACHE_TTL
+from friends_keeper.constants import DEFAULT_CIRCUIT_BREAKER_FAILURE_THRESHOLD
+from friends_keeper.constants import DEFAULT_CIRCUIT_BREAKER_RESET_TIMEOUT
+from friends_keeper.constants import DEFAULT_NOTIFIER_MAX_RETRY_BACKOFF
+from friends_keeper.constants import DEFAULT_NOTIFIER_RETRY_ATTEMPTS
+from friends_keeper.constants import DEFAULT_NOTIFIER_RETRY_BACKOFF
+from friends_keeper.exceptions import CircuitOpenError
+from friends_keeper.exceptions import DeliveryDeferredError
+from friends_keeper.exceptions import NotifierError
+from friends_keeper.exceptions import RateLimitedError
+from friends_keeper.instrumentation import count
+from friends_keeper.instrumentation import span
+from friends_keeper.notifiers.base import BaseNotifier
+from friends_keeper.notifiers.base import NotificationWithFriend
+from friends_keeper.notifiers.rate_limit import TokenBucket
+from friends_keeper.utils.orm.circuit_breakers import get_circuit_breaker
+from friends_keeper.utils.orm.circuit_breakers import record_circuit_breaker_failure
+from friends_keeper.utils.orm.circuit_breakers import reset_circuit_breaker
+
+
+logger = logging.getLogger(__name__)
+
+
+class ResilientNotifier(BaseNotifier):
+    """Delivery wrapper adding retries, a circuit breaker and a rate limit to a notifier.
+
+    Args:
+        BaseNotifier (friends_keeper.notifiers.base): Base abstract notifier class.
+    """
+
+    def __init__(self, notifier: BaseNotifier, rng: Union[random.Random, None] = None):
+        """Initialization of the resilient notifier.
+
+        Args:
+            notifier (BaseNotifier): Notifier to deliver with.
+            rng (Union[random.Random, None], optional): Random numbers generator used to jitter
+            the backoff. Defaults to None, which creates a new one.
+        """
+        self.notifier = notifier
+        self.notifier_type = notifier.notifier_type
+        super().__init__(notifier.configuration)
+        self.timeout = notifier.timeout
+        self.rng = rng or random.Random()
+
+        notifier_configuration = self.configuration.get("notifiers", {}).get(self.notifier_type, {})
+        retry_configuration = notifier_configuration.get("retry", {})
+        circuit_breaker_configuration = notifier_configuration.get("circuit_breaker", {})
+        self.attempts = retry_configuration.get("attempts", DEFAULT_NOTIFIER_RETRY_ATTEMPTS)
+        self.backoff = retry_configuration.get("backoff", DEFAULT_NOTIFIER_RETRY_BACKOFF)
+        self.max_backoff = retry_configuration.get("max_backoff", DEFAULT_NOTIFIER_MAX_RETRY_BACKOFF)
+        self.failure_threshold = circuit_breaker_configuration.get(
+            "failure_threshold", DEFAULT_CIRCUIT_BREAKER_FAILURE_THRESHOLD
+        )
+        self.reset_timeout = circuit_breaker_configuration.get("reset_timeout", DEFAULT_CIRCUIT_BREAKER_RESET_TIMEOUT)
+        self.cache_ttl = circuit_breaker_configuration.get("cache_ttl", DEFAULT_CIRCUIT_BREAKER_CACHE_TTL)
+        self.rate_limiter = None
+        # Consecutive failures and until when the circuit is open, along with the monotonic time they were loaded.
+        self._circuit_state = (0, None)
+        self._circuit_loaded_at = None
+        # Instrumentation names are built once, deliveries are on the hot path.
+        self._span_name = f"notifier.{self.notifier_type}"
+        self._counter_names = {
+            outcome: f"{outcome}.{self.notifier_type}"
+            for outcome in ("messages_sent", "messages_failed", "messages_deferred", "retries")
+        }
+
+        if "rate_limit" in notifier_configuration:
+            rate_limit_configuration = notifier_configuration["rate_limit"]
+            self.rate_limiter = TokenBucket(
+                rate=rate_limit_configuration["rate"], burst=rate_limit_configuration.get("burst", 1)
+            )
+
+    def send_message(self, message: str, idempotency_key: Union[str, None] = None) -> None:
+        """Send a single message, retrying on failure unless the circuit is open.
+
+        Args:
+            message (str): Message to be sent.
+            idempotency_key (Union[str, None], optional): Key identifying the message. Defaults to None.
+
+        Raises:
+            CircuitOpenError: Raised right away while the circuit is open.
+            RateLimitedError: Raised when the rate limit does not let the message through soon enough.
+            DatabaseError: Raised when the circuit breaker could not be loaded or updated.
+            NotifierError: Raised, or the error of the notifier, when every attempt failed.
+        """
+        with span(self._span_name):
+
+            try:
+                self._send_message(message=message, idempotency_key=idempotency_key)
+
+            except DeliveryDeferredError:
+                count(self._counter_names["messages_deferred"])
+                raise
+
+            except (Exception, NotifierError):
+                count(self._counter_names["messages_failed"])
+                raise
+
+        count(self._counter_names["messages_sent"])
+
+    def _send_message(self, message: str, idempotency_key: Union[str, None]) -> None:
+        """Send a single message unless the circuit is open, updating the circuit breaker.
+
+        Args:
+            message (str): Message to be sent.
+            idempotency_key (Union[str, None]): Key identifying the message.
+
+        Raises:
+            CircuitOpenError: Raised right away while the circuit is open.
+            RateLimitedError: Raised when the rate limit does not let the message through soon enough.
+            DatabaseError: Raised when the circuit breaker could not be loaded or updated.
+            NotifierError: Raised, or the error of the notifier, when every attempt failed.
+        """
+        failures, opened_until = self.get_circuit_state()
+
+        if opened_until is not None and opened_until > datetime.now():
+            raise CircuitOpenError(
+                f"Circuit of the notifier '{self.notifier_type}' is open until '{opened_until}'.",
+                retry_at=opened_until,
+            )
+
+        self.throttle()
+        error = self._send_with_retries(message=message, idempotency_key=idempotency_key)
+
+        if error is None:
+
+            if failures:
+                reset_circuit_breaker(notifier_type=self.notifier_type)
+                self._set_circuit_state(failures=0, opened_until=None)
+
+            return
+
+        opened_until = record_circuit_breaker_failure(
+            notifier_type=self.notifier_type,
+            error=repr(error),
+            failure_threshold=self.failure_threshold,
+            reset_timeout=self.reset_timeout,
+        )
+        self._set_circuit_state(failures=failures + 1, opened_until=opened_until)
+        raise error
+
+    def get_circuit_state(self) -> Tuple[int, Union[datetime, None]]:
+        """Get the state of the notifier circuit, loading it from the database once its cache expired.
+
+        Raises:
+            DatabaseError: Raised when the circuit breaker could not be loaded.
+
+        Returns:
+            Tuple[int, Union[datetime, None]]: Consecutive failures and until when the circuit is open.
+        """
+        if self._circuit_loaded_at is None or time.monotonic() - self._circuit_loaded_at >= self.cache_ttl:
+            circuit_breaker = get_circuit_breaker(notifier_type=self.notifier_type)
+
+            if circuit_breaker is None:
+                self._set_circuit_state(failures=0, opened_until=None)
+            else:
+                self._set_circuit_state(failures=circuit_breaker.failures, opened_until=circuit_breaker.opened_until)
+
+        return self._circuit_state
+
+    def _set_circuit_state(self, failures: int, opened_until: Union[datetime, None]) -> None:
+        """Keep the state of the notifier circuit in memory.
+
+        Args:
+            failures (int): Consecutive failures.
+            opened_until (Union[datetime, None]): Until when the circuit is open.
+        """
+        self._circuit_state = (failures, opened_until)
+        self._circuit_loaded_at = time.monotonic()
+
+    def throttle(self) -> None:
+        """Wait for the rate limit to let a delivery through.
+
+        Raises:
+            RateLimitedError: Raised when the wait would take over half the notifier timeout.
+        """
+        if self.rate_limiter is None:
+            return
+
+        wait = self.rate_limiter.try_acquire()
+
+        while wait:
+
+            if wait > self.timeout / 2:
+                raise RateLimitedError(
+                    f"Notifier '{self.notifier_type}' went over its rate limit.",
+                    retry_at=datetime.now() + timedelta(seconds=wait),
+                )
+
+            logger.debug(f"Notifier '{self.notifier_type}' throttled for {wait:.3f} seconds.")
+            time.sleep(wait)
+            wait = self.rate_limiter.try_acquire()
+
+    def _send_with_retries(
+        self, message: str, idempotency_key: Union[str, None]
+    ) -> Union[Exception, NotifierError, None]:
+        """Send the message with the wrapped notifier, attempting it again on failure.
+
+        Args:
+            message (str): Message to be sent.
+            idempotency_key (Union[str, None]): Key identifying the message.
+
+        Returns:
+            Union[Exception, NotifierError, None]: Error of the last attempt or None if it was delivered.
+        """
+        deadline = time.monotonic() + self.timeout
+
+        for attempt in range(1, self.attempts + 1):
+
+            try:
+                self.notifier.send_message(message, idempotency_key=idempotency_key)
+
+            except (Exception, NotifierError) as exec_error:
+                delay = self.get_retry_delay(attempt=attempt)
+
+                if attempt == self.attempts or time.monotonic() + delay >= deadline:
+                    logger.error(f"Notifier '{self.notifier_type}' failed after {attempt} attempt(s): {exec_error!r}")
+                    return exec_error
+
+                logger.warning(
+                    f"Notifier '{self.notifier_type}' failed, attempting again in {delay:.3f} seconds: {exec_error!r}"
+                )
+                count(self._counter_names["retries"])
+                time.sleep(delay)
+
+            else:
+                return None
+
+    def get_retry_delay(self, attempt: int) -> float:
+        """Get the seconds to wait after the given failed attempt, with full jitter.
+
+        Args:
+            attempt (int): Failed attempt, starting at one.
+
+        Returns:
+            float: Seconds to wait.
+        """
+        return self.rng.uniform(0, min(self.backoff * 2 ** (attempt - 1), self.max_backoff))
+
+    def build_notification_messages(self, notifications: List[NotificationWithFriend]) -> List[str]:
+        """Build the notification messages with the wrapped notifier.
+
+        Args:
+            notifications (List[NotificationWithFriend]): List with notification event
+            and friend pairs.
+
+        Returns:
+            List[str]: Messages to be sent.
+        """
+        return self.notifier.build_notification_messages(notifications=notifications)
+
+    def flush(self) -> None:
+        """Write any message the wrapped notifier buffered."""
+        self.notifier.flush()
+
+    def buffered_messages(self) -> int:
+        """Get the number of messages the wrapped notifier buffered.
+
+        Returns:
+            int: Messages buffered.
+        """
+        return self.notifier.buffered_messages()
+
+    def close(self) -> None:
+        """Release any resource held by the wrapped notifier."""
+        self.notifier.close()
+
+    def __repr__(self) -> str:
+        """String representation of the wrapped notifier.
+
+        Returns:
+            str: String representation of the object.
+        """
+        return repr(self.notifier)
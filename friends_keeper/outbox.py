@@ -0,0 +1,197 @@
+"""Transactional outbox for notification delivery.
+
+Notification events are not sent right away. Every notifier renders its messages,
+which are written to the outbox in the same transaction that reschedules the
+events, and the outbox is drained afterwards. A crash between sending and
+rescheduling can no longer send the same reminders twice, and a notifier failing
+does not lose nor hold back the rest of the run.
+
+The outbox is drained in batches of `outbox.batch_size` messages, every batch
+delivered by all notifiers concurrently and recorded with a single transaction,
+so delivery and database writes do not slow down each other. Messages that could
+not be delivered are attempted again on later drains, waiting `outbox.retry_backoff`
+seconds doubled after every failed attempt up to `outbox.max_retry_backoff`, and
+are given up on after `outbox.max_attempts` attempts. Messages of a notifier whose
+circuit is open, or which went over its rate limit, wait until it lets deliveries
+through again without using up an attempt.
+
+Every message has an idempotency key, built from the notification events it was
+rendered from, which notifiers hand over to the receiving end when it can tell
+repeated messages apart with it.
+"""
+import hashlib
+import logging
+import uuid
+
+from datetime import datetime
+from datetime import timedelta
+from typing import List
+from typing import Union
+
+from friends_keeper.constants import DEFAULT_OUTBOX_BATCH_SIZE
+from friends_keeper.constants import DEFAULT_OUTBOX_MAX_ATTEMPTS
+from friends_keeper.constants import DEFAULT_OUTBOX_MAX_RETRY_BACKOFF
+from friends_keeper.constants import DEFAULT_OUTBOX_RETRY_BACKOFF
+from friends_keeper.constants import OUTBOX_STATUSES
+from friends_keeper.database.outbox import OutboxMessage
+from friends_keeper.exceptions import DeliveryDeferredError
+from friends_keeper.instrumentation import count
+from friends_keeper.instrumentation import span
+from friends_keeper.notifiers.base import BaseNotifier
+from friends_keeper.notifiers.base import NotificationWithFriend
+from friends_keeper.notifiers.dispatcher import deliver_messages
+from friends_keeper.utils.orm.outbox import claim_outbox_messages
+from friends_keeper.utils.orm.outbox import complete_outbox_messages
+
+
+logger = logging.getLogger(__name__)
+
+
+def render_outbox_messages(notifiers: List[BaseNotifier], notifications: List[NotificationWithFriend]) -> List[dict]:
+    """Render the messages of every notifier for the given notifications.
+
+    Args:
+        notifiers (List[BaseNotifier]): Notifiers to render the messages of.
+        notifications (List[NotificationWithFriend]): List with notification event
+        and friend pairs.
+
+    Returns:
+        List[dict]: Outbox messages, each one with `notifier_type`, `idempotency_key` and `message` keys.
+    """
+    notification_ids = sorted(notification.id for notification, _ in notifications)
+    digest = hashlib.sha256(",".join(map(str, notification_ids)).encode()).hexdigest()[:32]
+    messages = list()
+
+    for notifier in notifiers:
+
+        for index, message in enumerate(notifier.build_notification_messages(notifications=notifications)):
+            messages.append(
+                {
+                    "notifier_type": notifier.notifier_type,
+                    "idempotency_key": f"{notifier.notifier_type}-{digest}-{index}",
+                    "message": message,
+                }
+            )
+
+    return messages
+
+
+def get_retry_delay(attempts: int, retry_backoff: float, max_retry_backoff: float) -> float:
+    """Get the seconds to wait before attempting again a message.
+
+    Args:
+        attempts (int): Failed attempts so far, at least one.
+        retry_backoff (float): Seconds to wait after the first failed attempt.
+        max_retry_backoff (float): Maximum seconds to wait.
+
+    Returns:
+        float: Seconds to wait.
+    """
+    return min(retry_backoff * 2 ** (attempts - 1), max_retry_backoff)
+
+
+def drain_outbox(notifiers: List[BaseNotifier], configuration: Union[dict, None] = None) -> int:
+    """Deliver the due outbox messages of the given notifiers in batches.
+
+    A notifier failing to deliver a message is left out of the following batches,
+    so an endpoint which is down is not tried again on every batch. Every batch is
+    claimed before delivering it, so concurrent drains never deliver the same messages.
+
+    Args:
+        notifiers (List[BaseNotifier]): Notifiers to deliver with.
+        configuration (Union[dict, None], optional): YAML configuration loaded as dict, the
+        `outbox` section sets the batch size and the retries. Defaults to None, which uses the defaults.
+
+    Raises:
+        DatabaseError: Raised if the outbox messages could not be loaded or updated.
+
+    Returns:
+        int: Number of messages delivered.
+    """
+    outbox_configuration = (configuration or dict()).get("outbox", dict())
+    batch_size = outbox_configuration.get("batch_size", DEFAULT_OUTBOX_BATCH_SIZE)
+    notifiers_by_type = {notifier.notifier_type: notifier for notifier in notifiers}
+    claim_token = uuid.uuid4().hex
+    delivered = 0
+
+    while notifiers_by_type:
+        with span("due_outbox_messages"):
+            messages = claim_outbox_messages(
+                claim_token=claim_token, notifier_types=list(notifiers_by_type), limit=batch_size
+            )
+
+        if not messages:
+            break
+
+        count("rows_read", len(messages))
+
+        messages_by_id = {message.id: message for message in messages}
+        sent_ids = list()
+        failures = list()
+
+        with span("deliver"):
+            results = deliver_messages(notifiers=list(notifiers_by_type.values()), messages=messages)
+
+        for result in results:
+            sent_ids.extend(result.sent_ids)
+
+            if result.error is not None:
+                notifiers_by_type.pop(result.notifier.notifier_type)
+
+                for failed_id in result.failed_ids:
+                    failures.append(get_failure(messages_by_id[failed_id], result.error, outbox_configuration))
+
+        with span("complete_outbox_messages"):
+            complete_outbox_messages(sent_ids=sent_ids, failures=failures, claim_token=claim_token)
+
+        count("rows_written", len(sent_ids) + len(failures))
+        delivered += len(sent_ids)
+
+    logger.info(f"Delivered {delivered} outbox messages.")
+    return delivered
+
+
+def get_failure(message: OutboxMessage, error: BaseException, outbox_configuration: dict) -> dict:
+    """Get the values recording a failed delivery attempt of the given message.
+
+    Args:
+        message (OutboxMessage): Outbox message that could not be delivered.
+        error (BaseException): Error raised delivering it.
+        outbox_configuration (dict): `outbox` section of the configuration.
+
+    Returns:
+        dict: `id`, `status`, `attempts`, `next_attempt_at` and `last_error` of the message. Deferred
+        messages keep their attempts and wait until the notifier lets deliveries through again.
+    """
+    if isinstance(error, DeliveryDeferredError) and error.retry_at is not None:
+        logger.info(f"Outbox message '{message.id}' deferred until '{error.retry_at}': {error!r}")
+        return {
+            "id": message.id,
+            "status": OUTBOX_STATUSES.pending,
+            "attempts": message.attempts,
+            "next_attempt_at": error.retry_at,
+            "last_error": repr(error),
+        }
+
+    attempts = message.attempts + 1
+    max_attempts = outbox_configuration.get("max_attempts", DEFAULT_OUTBOX_MAX_ATTEMPTS)
+    delay = get_retry_delay(
+        attempts=attempts,
+        retry_backoff=outbox_configuration.get("retry_backoff", DEFAULT_OUTBOX_RETRY_BACKOFF),
+        max_retry_backoff=outbox_configuration.get("max_retry_backoff", DEFAULT_OUTBOX_MAX_RETRY_BACKOFF),
+    )
+
+    if attempts >= max_attempts:
+        logger.error(f"Giving up on outbox message '{message.id}' after {attempts} attempts: {error!r}")
+        status = OUTBOX_STATUSES.failed
+    else:
+        logger.warning(f"Outbox message '{message.id}' will be attempted again in {delay} seconds: {error!r}")
+        status = OUTBOX_STATUSES.pending
+
+    return {
+        "id": message.id,
+        "status": status,
+        "attempts": attempts,
+        "next_attempt_at": datetime.now() + timedelta(seconds=delay),
+        "last_error": repr(error),
+    }
@@ -0,0 +1,277 @@
+"""Notification events scheduling strategies.
+
+Every friend gets its next notification event a number of days from today
+within its `[min_days, max_days)` window, the strategy picking the day is set
+with the `notifications.scheduling` configuration key:
+  - `random`: Any day of the window, picked uniformly at random.
+  - `balanced`: The day of the window with the fewest reminders expected, ties
+    broken at random, so the number of reminders per day stays flat instead of
+    bursting on some days.
+"""
+import logging
+import random
+
+from collections import Counter
+from datetime import date
+from datetime import timedelta
+from typing import Callable
+from typing import List
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+from friends_keeper.constants import DEFAULT_SCHEDULING_STRATEGY
+from friends_keeper.exceptions import ConfigurationError
+from friends_keeper.utils.orm.notifications import get_pending_notifications_per_window
+
+
+logger = logging.getLogger(__name__)
+
+# Expected loads are fractional, days within this margin of the lowest one are tied.
+LOAD_TOLERANCE = 1e-6
+
+
+class SchedulingStrategy:
+    """Base scheduling strategy.
+
+    Strategies get the `(min_days, max_days)` window of every friend to schedule
+    and return the next notification event date of each of them.
+    """
+
+    name = None
+
+    def __init__(self, rng: Union[random.Random, None] = None):
+        """Initialization of the scheduling strategy.
+
+        Args:
+            rng (Union[random.Random, None], optional): Random numbers generator, given to get
+            reproducible dates. Defaults to None, which creates a new one.
+        """
+        self.rng = rng or random.Random()
+
+    def next_dates(self, windows: List[Tuple[int, int]], today: Union[date, None] = None) -> List[date]:
+        """Get the next notification event date for every window.
+
+        Args:
+            windows (List[Tuple[int, int]]): Minimum and maximum days from today of every event.
+            today (Union[date, None], optional): Day the windows start from. Defaults to None, which is today.
+
+        Raises:
+            NotImplementedError: Raised when the strategy does not implement it.
+
+        Returns:
+            List[date]: Next notification event dates, in the same order as the windows.
+        """
+        raise NotImplementedError
+
+    def next_date(self, min_days: int, max_days: int, today: Union[date, None] = None) -> date:
+        """Get the next notification event date of a single friend.
+
+        Args:
+            min_days (int): Minimum days from today.
+            max_days (int): Maximum days from today, excluded.
+            today (Union[date, None], optional): Day the window starts from. Defaults to None, which is today.
+
+        Returns:
+            date: Next notification event date.
+        """
+        return self.next_dates([(min_days, max_days)], today=today)[0]
+
+    def __repr__(self) -> str:
+        """String representation of the scheduling strategy.
+
+        Returns:
+            str: String representation of the object.
+        """
+        return f"{self.__class__.__name__}()"
+
+
+class RandomScheduling(SchedulingStrategy):
+    """Pick any day of every window uniformly at random.
+
+    Args:
+        SchedulingStrategy (friends_keeper.scheduling.SchedulingStrategy): Base scheduling strategy.
+    """
+
+    name = "random"
+
+    def next_dates(self, windows: List[Tuple[int, int]], today: Union[date, None] = None) -> List[date]:
+        """Get a random date within every window.
+
+        Args:
+            windows (List[Tuple[int, int]]): Minimum and maximum days from today of every event.
+            today (Union[date, None], optional): Day the windows start from. Defaults to None, which is today.
+
+        Returns:
+            List[date]: Next notification event dates, in the same order as the windows.
+        """
+        today = today or date.today()
+        return [today + timedelta(days=self.rng.randrange(min_days, max_days)) for min_days, max_days in windows]
+
+    def sample_offsets(self, min_days: Sequence[int], max_days: Sequence[int]) -> List[int]:
+        """Get a random number of days within every window, all of them at once.
+
+        When NumPy is installed they are sampled with a single vectorized call on a
+        generator seeded from the strategy one, otherwise one by one, so the same
+        seed gives the same days as long as NumPy availability does not change.
+
+        Args:
+            min_days (Sequence[int]): Minimum days of every window.
+            max_days (Sequence[int]): Maximum days of every window, excluded.
+
+        Returns:
+            List[int]: Days from today of every window.
+        """
+        try:
+            import numpy
+        except ImportError:
+            return [self.rng.randrange(low, high) for low, high in zip(min_days, max_days)]
+
+        generator = numpy.random.default_rng(self.rng.getrandbits(64))
+        return generator.integers(numpy.asarray(min_days), numpy.asarray(max_days)).tolist()
+
+
+class BalancedScheduling(SchedulingStrategy):
+    """Pick the least loaded day of every window.
+
+    The load of every day is kept on a per day occupancy index, built every time
+    dates are requested from the pending notification events with a single
+    grouped query. Days far away look emptier only because the reminders before
+    them were not rescheduled yet, so every pending event also adds its expected
+    next reminder, spread evenly over its friend's window, to the index. Without
+    it reminders would drift to the end of their windows.
+
+    Days get added to the index as they are picked, so events scheduled together
+    spread out as well, narrower windows first since they have less days to
+    choose from.
+
+    Args:
+        SchedulingStrategy (friends_keeper.scheduling.SchedulingStrategy): Base scheduling strategy.
+    """
+
+    name = "balanced"
+
+    def __init__(
+        self,
+        rng: Union[random.Random, None] = None,
+        load_pending: Union[Callable[..., List[Tuple[date, int, int, int]]], None] = None,
+    ):
+        """Initialization of the balanced scheduling strategy.
+
+        Args:
+            rng (Union[random.Random, None], optional): Random numbers generator used to break
+            ties. Defaults to None, which creates a new one.
+            load_pending (Union[Callable, None], optional): Function getting the date, minimum days,
+            maximum days and number of pending events per day within `start` and `end`.
+            Defaults to None, which loads them from the database.
+        """
+        super().__init__(rng=rng)
+        self.load_pending = load_pending or get_pending_notifications_per_window
+
+    def next_dates(self, windows: List[Tuple[int, int]], today: Union[date, None] = None) -> List[date]:
+        """Get the least loaded date within every window.
+
+        Args:
+            windows (List[Tuple[int, int]]): Minimum and maximum days from today of every event.
+            today (Union[date, None], optional): Day the windows start from. Defaults to None, which is today.
+
+        Raises:
+            DatabaseError: Raised when the occupancy index could not be loaded.
+
+        Returns:
+            List[date]: Next notification event dates, in the same order as the windows.
+        """
+        if not windows:
+            return list()
+
+        today = today or date.today()
+        occupancy = self.get_occupancy(today=today, end=today + timedelta(days=max(window[1] for window in windows)))
+        next_dates = [None] * len(windows)
+
+        for index in sorted(range(len(windows)), key=lambda index: windows[index][1] - windows[index][0]):
+            min_days, max_days = windows[index]
+            days = [today + timedelta(days=offset) for offset in range(min_days, max_days)]
+            lowest_load = min(occupancy[day] for day in days)
+            next_date = self.rng.choice([day for day in days if occupancy[day] <= lowest_load + LOAD_TOLERANCE])
+            self.add_event(occupancy, next_date, min_days, max_days)
+            next_dates[index] = next_date
+
+        return next_dates
+
+    def get_occupancy(self, today: date, end: date) -> Counter:
+        """Build the occupancy index with the events pending after today.
+
+        Events due today or before are left out since they are the ones being rescheduled.
+
+        Args:
+            today (date): Day the windows start from.
+            end (date): Last day covered by the windows, excluded.
+
+        Raises:
+            DatabaseError: Raised when the pending events could not be loaded.
+
+        Returns:
+            Counter: Expected number of reminders per day.
+        """
+        occupancy = Counter()
+        # Expected reminders changes per day, added up below so every group costs the same no matter its window.
+        spread = Counter()
+        start = today + timedelta(days=1)
+
+        for event_date, min_days, max_days, count in self.load_pending(start=start, end=end):
+            occupancy[event_date] += count
+            share = count / (max_days - min_days)
+            spread[event_date + timedelta(days=min_days)] += share
+            spread[event_date + timedelta(days=max_days)] -= share
+
+        expected = 0.0
+
+        for offset in range((end - start).days):
+            day = start + timedelta(days=offset)
+            expected += spread[day]
+            occupancy[day] += expected
+
+        return occupancy
+
+    @staticmethod
+    def add_event(occupancy: Counter, event_date: date, min_days: int, max_days: int, count: int = 1) -> None:
+        """Add events and their expected next reminders to the occupancy index.
+
+        Args:
+            occupancy (Counter): Expected number of reminders per day.
+            event_date (date): Date of the events.
+            min_days (int): Minimum days between reminders of the events' friends.
+            max_days (int): Maximum days between reminders of the events' friends, excluded.
+            count (int, optional): Number of events. Defaults to 1.
+        """
+        occupancy[event_date] += count
+        share = count / (max_days - min_days)
+
+        for offset in range(min_days, max_days):
+            occupancy[event_date + timedelta(days=offset)] += share
+
+
+SCHEDULING_STRATEGIES = {strategy.name: strategy for strategy in (RandomScheduling, BalancedScheduling)}
+
+
+def get_scheduling_strategy(configuration: Union[dict, None] = None) -> SchedulingStrategy:
+    """Get the scheduling strategy set on the configuration.
+
+    Args:
+        configuration (Union[dict, None], optional): YAML configuration loaded as dict.
+        Defaults to None, which uses the default strategy.
+
+    Raises:
+        ConfigurationError: Raised when the strategy is not implemented.
+
+    Returns:
+        SchedulingStrategy: Scheduling strategy.
+    """
+    notifications_configuration = (configuration or dict()).get("notifications", dict())
+    name = notifications_configuration.get("scheduling", DEFAULT_SCHEDULING_STRATEGY)
+
+    if name not in SCHEDULING_STRATEGIES:
+        raise ConfigurationError(f"The scheduling strategy '{name}' is not implemented")
+
+    logger.debug(f"Using '{name}' scheduling strategy.")
+    return SCHEDULING_STRATEGIES[name]()
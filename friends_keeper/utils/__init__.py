@@ -1,17 +1,20 @@
 """Application utilities module."""
+import copy
+import functools
+import hashlib
+import json
 import logging
 import os
 import sys
 
 from datetime import datetime
 from datetime import timedelta
+from typing import TYPE_CHECKING
+from typing import Union
 
-import jsonschema
 import yaml
 
-from jsonschema.exceptions import SchemaError
-from jsonschema.exceptions import ValidationError
-
+from friends_keeper.constants import CONFIGURATION_CACHE_FILE_PATH
 from friends_keeper.constants import CONFIGURATION_FILE_PATH
 from friends_keeper.constants import NOTIFIER_TYPES
 from friends_keeper.constants import YAML_SCHEMA
@@ -19,16 +22,41 @@ from friends_keeper.exceptions import ConfigurationError
 from friends_keeper.exceptions import FriendsKeeperError
 
 
+if TYPE_CHECKING:
+    import jsonschema
+
+
 logger = logging.getLogger(__name__)
 
+# Already validated configurations keyed on the file path, along with the file stat they were read with.
+__configuration_cache = dict()
 
-def load_configuration_file() -> dict:
+
+def load_configuration_file(use_cache: bool = True) -> dict:
     """Load application configuration file.
 
+    Configurations already validated are cached keyed on the file path, its
+    modification time and size, so loading an unchanged file only costs a `stat()`.
+    When `CONFIGURATION_CACHE_FILE_PATH` is set the cache is also kept on disk
+    so it is shared between executions.
+
+    Args:
+        use_cache (bool, optional): Whether to use the cached configuration if the
+        file did not change. Defaults to True.
+
     Returns:
         dict: Configuration read from the file on the environment variable `CONFIGURATION_FILE_PATH`
     """
-    config_file_path = os.path.abspath(CONFIGURATION_FILE_PATH)
+    config_file_path = get_configuration_file_path()
+    file_stat = os.stat(config_file_path)
+    cache_key = [file_stat.st_mtime_ns, file_stat.st_size]
+
+    if use_cache:
+        configuration = get_cached_configuration(config_file_path=config_file_path, cache_key=cache_key)
+
+        if configuration is not None:
+            logger.debug(f"Using cached configuration for '{config_file_path}'")
+            return configuration
 
     with open(config_file_path) as config_file:
         try:
@@ -47,11 +75,134 @@ def load_configuration_file() -> dict:
             is_config_ok = check_config(configuration=configuration)
 
             if is_config_ok:
-                return configuration
+                cache_configuration(config_file_path=config_file_path, cache_key=cache_key, configuration=configuration)
+                return copy.deepcopy(configuration)
             else:
                 raise ConfigurationError("Error occurred while verifying the configuration.")
 
 
+def get_configuration_file_path() -> str:
+    """Get the absolute path of the configuration file.
+
+    Returns:
+        str: Absolute path of the configuration file.
+    """
+    return os.path.abspath(CONFIGURATION_FILE_PATH)
+
+
+def get_cached_configuration(config_file_path: str, cache_key: list) -> Union[dict, None]:
+    """Get the configuration cached for the given file if it did not change.
+
+    Args:
+        config_file_path (str): Absolute path of the configuration file.
+        cache_key (list): Modification time in nanoseconds and size of the configuration file.
+
+    Returns:
+        Union[dict, None]: Configuration cached or None if there is no valid cache.
+    """
+    cached_entry = __configuration_cache.get(config_file_path)
+
+    if cached_entry is None and CONFIGURATION_CACHE_FILE_PATH:
+        cached_entry = read_configuration_cache_file(config_file_path=config_file_path)
+
+        if cached_entry is not None:
+            __configuration_cache[config_file_path] = cached_entry
+
+    if cached_entry is not None and cached_entry["key"] == cache_key:
+        return copy.deepcopy(cached_entry["configuration"])
+
+    return None
+
+
+def cache_configuration(config_file_path: str, cache_key: list, configuration: dict) -> None:
+    """Cache an already validated configuration.
+
+    Args:
+        config_file_path (str): Absolute path of the configuration file.
+        cache_key (list): Modification time in nanoseconds and size of the configuration file.
+        configuration (dict): YAML configuration loaded into dict format.
+    """
+    cached_entry = {"key": cache_key, "configuration": copy.deepcopy(configuration)}
+    __configuration_cache[config_file_path] = cached_entry
+
+    if CONFIGURATION_CACHE_FILE_PATH:
+        cache_content = {
+            "path": config_file_path,
+            "schema": get_configuration_schema_hash(),
+            **cached_entry,
+        }
+        temporary_path = f"{CONFIGURATION_CACHE_FILE_PATH}.tmp"
+
+        try:
+            with open(temporary_path, "w") as cache_file:
+                json.dump(cache_content, cache_file)
+            os.replace(temporary_path, CONFIGURATION_CACHE_FILE_PATH)
+
+        except (OSError, TypeError, ValueError):
+            logger.error(f"Error occurred writing configuration cache file '{CONFIGURATION_CACHE_FILE_PATH}'")
+
+
+def read_configuration_cache_file(config_file_path: str) -> Union[dict, None]:
+    """Read the configuration cache entry from the cache file.
+
+    Args:
+        config_file_path (str): Absolute path of the configuration file.
+
+    Returns:
+        Union[dict, None]: Cache entry or None if missing, unreadable or from another schema or file.
+    """
+    try:
+        with open(CONFIGURATION_CACHE_FILE_PATH) as cache_file:
+            cache_content = json.load(cache_file)
+
+    except (OSError, ValueError):
+        logger.debug(f"No usable configuration cache file at '{CONFIGURATION_CACHE_FILE_PATH}'")
+        return None
+
+    is_same_file = cache_content.get("path") == config_file_path
+    is_same_schema = cache_content.get("schema") == get_configuration_schema_hash()
+
+    if is_same_file and is_same_schema:
+        return {"key": cache_content["key"], "configuration": cache_content["configuration"]}
+
+    return None
+
+
+def clear_configuration_cache() -> None:
+    """Clear the in memory configuration cache."""
+    __configuration_cache.clear()
+
+
+@functools.lru_cache(maxsize=None)
+def get_configuration_schema_hash() -> str:
+    """Get the hash of the configuration schema to invalidate caches built with another schema.
+
+    Returns:
+        str: SHA256 hex digest of the configuration schema.
+    """
+    return hashlib.sha256(json.dumps(YAML_SCHEMA, sort_keys=True).encode()).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def get_configuration_validator() -> "jsonschema.protocols.Validator":
+    """Get the configuration schema validator, built and checked only once.
+
+    `jsonschema` is imported here since it is only needed when the configuration
+    is not already cached.
+
+    Raises:
+        SchemaError: Raised when the configuration schema itself is not valid.
+
+    Returns:
+        jsonschema.protocols.Validator: Validator for the configuration schema.
+    """
+    import jsonschema
+
+    validator_class = jsonschema.validators.validator_for(YAML_SCHEMA)
+    validator_class.check_schema(YAML_SCHEMA)
+    return validator_class(YAML_SCHEMA)
+
+
 def is_valid_config_schema(configuration: dict) -> bool:
     """Check whether the configuration file schema is right or not.
 
@@ -64,11 +215,19 @@ def is_valid_config_schema(configuration: dict) -> bool:
     Returns:
         bool: Whether the configuration schema is valid or not.
     """
+    from jsonschema.exceptions import SchemaError
+    from jsonschema.exceptions import ValidationError
+    from jsonschema.exceptions import best_match
+
     result = False
 
     try:
         logger.debug("Validating configuration file content.")
-        jsonschema.validate(instance=configuration, schema=YAML_SCHEMA)
+        error = best_match(get_configuration_validator().iter_errors(configuration))
+
+        if error is not None:
+            raise error
+
         result = True
 
     except ValidationError as exec_error:
@@ -1,4 +1,9 @@
 """Command line utility functions."""
+import csv
+import io
+import json
+
+from datetime import date
 from typing import Any
 from typing import List
 from typing import Mapping
@@ -8,6 +13,9 @@ import click
 
 from click import Option
 from click import UsageError
+from prettytable import PrettyTable
+
+from friends_keeper.constants import DATE_FORMAT
 
 
 class MutuallyExclusiveOption(Option):
@@ -56,3 +64,193 @@ class MutuallyExclusiveOption(Option):
             )
 
         return super(MutuallyExclusiveOption, self).handle_parse_result(ctx, opts, args)
+
+
+class RowsWriter:
+    """Writer echoing rows as soon as they are given.
+
+    Rows are dictionaries keyed on the field keys, every writer only keeps the
+    rows given on the current call so memory does not depend on the number of rows.
+    """
+
+    def __init__(self, fields: List[Tuple[str, str]]):
+        """Initialization of the rows writer.
+
+        Args:
+            fields (List[Tuple[str, str]]): Field keys along with their header.
+        """
+        self.fields = fields
+        self.rows_written = 0
+
+    def write(self, rows: List[dict]) -> None:
+        """Echo the given rows.
+
+        Args:
+            rows (List[dict]): Rows to echo.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Echo anything pending once all rows are written."""
+        pass
+
+
+class TableRowsWriter(RowsWriter):
+    """Echo rows as a table.
+
+    Column widths are taken from the first rows written so all of them are
+    aligned, longer values are wrapped.
+
+    Args:
+        RowsWriter (friends_keeper.utils.cli.RowsWriter): Base rows writer.
+    """
+
+    def __init__(self, fields: List[Tuple[str, str]]):
+        """Initialization of the table rows writer.
+
+        Args:
+            fields (List[Tuple[str, str]]): Field keys along with their header.
+        """
+        super().__init__(fields)
+        self.widths = None
+        self.bottom_border = None
+
+    def write(self, rows: List[dict]) -> None:
+        """Echo the given rows as table rows.
+
+        Args:
+            rows (List[dict]): Rows to echo.
+        """
+        if not rows:
+            return
+
+        values = [[self.format_value(row[key]) for key, _ in self.fields] for row in rows]
+
+        if self.widths is None:
+            self.widths = {
+                header: max(len(header), *(len(row[index]) for row in values))
+                for index, (_, header) in enumerate(self.fields)
+            }
+
+        table_printer = PrettyTable()
+        table_printer.field_names = [header for _, header in self.fields]
+        table_printer.min_width = self.widths
+        table_printer.max_width = self.widths
+        table_printer.add_rows(values)
+        lines = table_printer.get_string(header=self.rows_written == 0).splitlines()
+
+        if self.rows_written:
+            # Top border is already there, closing the previous rows.
+            lines = lines[1:]
+
+        self.bottom_border = lines.pop()
+        self.rows_written += len(rows)
+        click.echo("\n".join(lines))
+
+    def close(self) -> None:
+        """Echo the table bottom border."""
+        if self.bottom_border is not None:
+            click.echo(self.bottom_border)
+
+    @staticmethod
+    def format_value(value: Any) -> str:
+        """Format a value to be shown on the table.
+
+        Args:
+            value (Any): Value to format.
+
+        Returns:
+            str: Formatted value.
+        """
+        if isinstance(value, date):
+            return value.strftime(DATE_FORMAT)
+
+        return str(value)
+
+
+class JSONLinesRowsWriter(RowsWriter):
+    """Echo rows as JSON lines, one JSON object per row.
+
+    Args:
+        RowsWriter (friends_keeper.utils.cli.RowsWriter): Base rows writer.
+    """
+
+    def write(self, rows: List[dict]) -> None:
+        """Echo the given rows as JSON lines.
+
+        Args:
+            rows (List[dict]): Rows to echo.
+        """
+        lines = [json.dumps({key: row[key] for key, _ in self.fields}, default=format_iso_value) for row in rows]
+
+        if lines:
+            self.rows_written += len(rows)
+            click.echo("\n".join(lines))
+
+
+class CSVRowsWriter(RowsWriter):
+    """Echo rows as CSV with a header row made of the field keys.
+
+    Args:
+        RowsWriter (friends_keeper.utils.cli.RowsWriter): Base rows writer.
+    """
+
+    def __init__(self, fields: List[Tuple[str, str]]):
+        """Initialization of the CSV rows writer, the header row is echoed right away.
+
+        Args:
+            fields (List[Tuple[str, str]]): Field keys along with their header.
+        """
+        super().__init__(fields)
+        self._echo_rows([[key for key, _ in fields]])
+
+    def write(self, rows: List[dict]) -> None:
+        """Echo the given rows as CSV.
+
+        Args:
+            rows (List[dict]): Rows to echo.
+        """
+        if rows:
+            self.rows_written += len(rows)
+            self._echo_rows([[format_iso_value(row[key]) for key, _ in self.fields] for row in rows])
+
+    def _echo_rows(self, rows: List[list]) -> None:
+        """Echo the given rows values as CSV lines.
+
+        Args:
+            rows (List[list]): Rows values.
+        """
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(rows)
+        click.echo(buffer.getvalue(), nl=False)
+
+
+ROWS_WRITERS = {"table": TableRowsWriter, "jsonl": JSONLinesRowsWriter, "csv": CSVRowsWriter}
+
+
+def get_rows_writer(output_format: str, fields: List[Tuple[str, str]]) -> RowsWriter:
+    """Get the rows writer for the given output format.
+
+    Args:
+        output_format (str): Output format, one of `OUTPUT_FORMATS`.
+        fields (List[Tuple[str, str]]): Field keys along with their header.
+
+    Returns:
+        RowsWriter: Rows writer.
+    """
+    return ROWS_WRITERS[output_format](fields)
+
+
+def format_iso_value(value: Any) -> Any:
+    """Format dates in ISO 8601, leaving other values as they are.
+
+    Args:
+        value (Any): Value to format.
+
+    Returns:
+        Any: Formatted value.
+    """
+    if isinstance(value, date):
+        return value.isoformat()
+
+    return value
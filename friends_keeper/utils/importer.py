@@ -0,0 +1,276 @@
+"""Friends import utilities.
+
+Friends are read from CSV or JSON lines files one row at a time, validated and
+inserted in chunks, every chunk along with the first notification event of its
+friends within a single transaction, so memory use does not depend on the file size.
+"""
+import csv
+import itertools
+import json
+import logging
+import os
+import time
+
+from collections import namedtuple
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Tuple
+from typing import Union
+
+from friends_keeper.constants import DEFAULT_IMPORT_CHUNK_SIZE
+from friends_keeper.constants import DEFAULT_MAX_DAYS
+from friends_keeper.constants import DEFAULT_MIN_DAYS
+from friends_keeper.constants import IMPORT_FORMATS
+from friends_keeper.scheduling import SchedulingStrategy
+from friends_keeper.utils.orm.friends import create_friends_in_bulk
+
+
+logger = logging.getLogger(__name__)
+
+ImportResult = namedtuple("ImportResult", ["read", "imported", "skipped", "invalid", "elapsed"])
+
+__TRUE_VALUES = ("1", "true", "yes", "y")
+__FALSE_VALUES = ("0", "false", "no", "n")
+
+
+def import_friends(
+    file_path: str,
+    file_format: Union[str, None] = None,
+    chunk_size: int = DEFAULT_IMPORT_CHUNK_SIZE,
+    strategy: Union[SchedulingStrategy, None] = None,
+) -> ImportResult:
+    """Import friends from the given file.
+
+    Invalid rows and nicknames repeated on the file or already on the database are skipped.
+
+    Args:
+        file_path (str): CSV or JSON lines file path.
+        file_format (Union[str, None], optional): File format, one of `IMPORT_FORMATS`.
+        Defaults to None, which gets it from the file extension.
+        chunk_size (int, optional): Friends inserted per transaction. Defaults to DEFAULT_IMPORT_CHUNK_SIZE.
+        strategy (Union[SchedulingStrategy, None], optional): Strategy picking the first
+        notification event dates. Defaults to None, which picks them at random.
+
+    Raises:
+        ValueError: Raised when the file format is not supported.
+        DatabaseError: Raised when a chunk could not be inserted.
+
+    Returns:
+        ImportResult: Rows read, friends imported, rows skipped, invalid rows and seconds elapsed.
+    """
+    file_format = file_format or get_file_format(file_path)
+    start_time = time.perf_counter()
+    read = imported = invalid = 0
+    seen_nicknames = set()
+
+    for chunk in chunked(iter_rows(file_path=file_path, file_format=file_format), chunk_size):
+        friends = list()
+
+        for line_number, row in chunk:
+            read += 1
+
+            try:
+                friend = validate_friend_row(row)
+
+            except ValueError as exec_error:
+                logger.warning(f"Skipping invalid row on line {line_number}: {exec_error}")
+                invalid += 1
+
+            else:
+
+                if friend["nickname"] not in seen_nicknames:
+                    seen_nicknames.add(friend["nickname"])
+                    friends.append(friend)
+
+        if friends:
+            imported += create_friends_in_bulk(friends, strategy=strategy)
+
+        logger.debug(f"{read} rows read, {imported} friends imported.")
+
+    elapsed = time.perf_counter() - start_time
+    return ImportResult(read, imported, read - imported - invalid, invalid, elapsed)
+
+
+def get_file_format(file_path: str) -> str:
+    """Get the import file format from its extension.
+
+    Args:
+        file_path (str): File path.
+
+    Raises:
+        ValueError: Raised when the extension is not a supported format.
+
+    Returns:
+        str: File format.
+    """
+    extension = os.path.splitext(file_path)[1].lower().lstrip(".")
+    file_format = {"ndjson": "jsonl"}.get(extension, extension)
+
+    if file_format not in IMPORT_FORMATS:
+        raise ValueError(f"Can not get the format of '{file_path}', it should be one of {', '.join(IMPORT_FORMATS)}.")
+
+    return file_format
+
+
+def iter_rows(file_path: str, file_format: str) -> Iterator[Tuple[int, dict]]:
+    """Read the rows of the given file one at a time.
+
+    Args:
+        file_path (str): CSV or JSON lines file path.
+        file_format (str): File format, one of `IMPORT_FORMATS`.
+
+    Raises:
+        ValueError: Raised when the file format is not supported.
+
+    Yields:
+        Iterator[Tuple[int, dict]]: Line number along with the row.
+    """
+    if file_format not in IMPORT_FORMATS:
+        raise ValueError(f"Format '{file_format}' not supported, it should be one of {', '.join(IMPORT_FORMATS)}.")
+
+    with open(file_path, newline="", encoding="utf-8-sig") as import_file:
+
+        if file_format == "csv":
+            reader = csv.DictReader(import_file)
+
+            for row in reader:
+                yield reader.line_num, row
+
+        else:
+
+            for line_number, line in enumerate(import_file, start=1):
+
+                if line.strip():
+
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError as exec_error:
+                        row = exec_error
+
+                    yield line_number, row
+
+
+def validate_friend_row(row: dict) -> dict:
+    """Validate an imported row and get the friend column values from it.
+
+    Args:
+        row (dict): Row read from the import file.
+
+    Raises:
+        ValueError: Raised when the row is not valid.
+
+    Returns:
+        dict: Friend column values.
+    """
+    if not isinstance(row, dict):
+        raise ValueError(f"Row is not an object: {row}")
+
+    nickname = str(row.get("nickname") or "").strip()
+
+    if not nickname:
+        raise ValueError("Missing nickname.")
+
+    min_days = get_days(row.get("min_days"), default=DEFAULT_MIN_DAYS, name="min_days")
+    max_days = get_days(row.get("max_days"), default=DEFAULT_MAX_DAYS, name="max_days")
+
+    if not min_days < max_days:
+        raise ValueError(f"Days between reminders must be 1 <= min_days < max_days, got {min_days} and {max_days}.")
+
+    return {
+        "nickname": nickname,
+        "name": get_optional_string(row.get("name")),
+        "last_name": get_optional_string(row.get("last_name")),
+        "relationship": get_optional_string(row.get("relationship")),
+        "min_days": min_days,
+        "max_days": max_days,
+        "active": get_boolean(row.get("active", True)),
+    }
+
+
+def get_days(value, default: int, name: str) -> int:
+    """Get the given days between reminders as integer, the default only applies to empty values.
+
+    Args:
+        value (Any): Value read from the import file.
+        default (int): Days used when the value is empty.
+        name (str): Column name, for the error message.
+
+    Raises:
+        ValueError: Raised when the value is not an integer of one day or more.
+
+    Returns:
+        int: Days between reminders.
+    """
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return default
+
+    try:
+        days = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Days between reminders must be integers, got '{value}' on {name}.")
+
+    if isinstance(value, bool) or days < 1:
+        raise ValueError(f"Days between reminders must be 1 or more, got '{value}' on {name}.")
+
+    return days
+
+
+def get_optional_string(value) -> Union[str, None]:
+    """Get the given value as string or None if it is empty.
+
+    Args:
+        value (Any): Value read from the import file.
+
+    Returns:
+        Union[str, None]: Value as string or None.
+    """
+    value = str(value).strip() if value is not None else ""
+    return value if value else None
+
+
+def get_boolean(value) -> bool:
+    """Get the given value as boolean, empty values are True.
+
+    Args:
+        value (Any): Value read from the import file.
+
+    Raises:
+        ValueError: Raised when the value is not a boolean.
+
+    Returns:
+        bool: Value as boolean.
+    """
+    if isinstance(value, bool):
+        return value
+
+    value = str(value if value is not None else "").strip().lower()
+
+    if not value or value in __TRUE_VALUES:
+        return True
+
+    if value in __FALSE_VALUES:
+        return False
+
+    raise ValueError(f"'{value}' is not a boolean.")
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[List]:
+    """Split the given iterable in lists of the given size.
+
+    Args:
+        iterable (Iterable): Iterable to split.
+        size (int): Items per chunk.
+
+    Yields:
+        Iterator[List]: Chunks of items, the last one can be smaller.
+    """
+    iterator = iter(iterable)
+
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+
+        if not chunk:
+            return
+
+        yield chunk
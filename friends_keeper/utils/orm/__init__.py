@@ -66,3 +66,34 @@ def get_object_from_query(query) -> list:
         else:
             logger.debug("Query executed!")
             return result
+
+
+def get_rows_from_query(query) -> list:
+    """Get rows from database based on given query.
+
+    Unlike `get_object_from_query` this keeps every selected entity on the row,
+    so it is meant for queries joining several tables together.
+
+    Args:
+        query (sqlalchemy.selectable): SQL query built with sqlalchemy.
+
+    Raises:
+        DatabaseError: Raised when executing query against database
+
+    Returns:
+        list: List of rows gotten from executing query.
+    """
+    with Session() as session:
+        try:
+            logger.debug(f"Executing query: '{str(query)}'")
+            result = session.execute(query).all()
+
+        except SQLAlchemyError:
+            msg = f"An error occurred getting row(s) from query: '{str(query)}'"
+            logger.error(msg)
+            session.rollback()
+            raise DatabaseError(msg)
+
+        else:
+            logger.debug("Query executed!")
+            return result
@@ -0,0 +1,152 @@
+"""Circuit breakers utility functions.
+
+Failures are counted with a single `UPDATE`, which opens the circuit in the
+same statement once they reach the threshold, so the state of a breaker is
+never read and written back by separate queries.
+"""
+import logging
+
+from datetime import datetime
+from datetime import timedelta
+from typing import Union
+
+from sqlalchemy import case
+from sqlalchemy import insert
+from sqlalchemy import select
+from sqlalchemy import update
+from sqlalchemy.exc import SQLAlchemyError
+
+from friends_keeper.database import Session
+from friends_keeper.database.circuit_breakers import CircuitBreaker
+from friends_keeper.exceptions import DatabaseError
+from friends_keeper.utils.orm import get_object_from_query
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_circuit_breaker(notifier_type: str) -> Union[CircuitBreaker, None]:
+    """Get the circuit breaker of the given notifier.
+
+    Args:
+        notifier_type (str): Type of the notifier.
+
+    Raises:
+        DatabaseError: Raised if error occurred while executing transaction.
+
+    Returns:
+        Union[CircuitBreaker, None]: Circuit breaker or None if the notifier never failed.
+    """
+    query = select(CircuitBreaker).where(CircuitBreaker.notifier_type == notifier_type)
+    logger.debug(f"Querying database for the circuit breaker of '{notifier_type}'")
+
+    try:
+        circuit_breakers = get_object_from_query(query=query)
+
+    except DatabaseError:
+        msg = f"An error occurred trying to get the circuit breaker, query: '{str(query)}'."
+        logger.error(msg)
+        raise DatabaseError(msg)
+
+    else:
+        return circuit_breakers[0] if circuit_breakers else None
+
+
+def record_circuit_breaker_failure(
+    notifier_type: str, error: str, failure_threshold: int, reset_timeout: float
+) -> Union[datetime, None]:
+    """Count a failed delivery of the given notifier, opening its circuit on the threshold.
+
+    A failure while the circuit is half open, after its reset timeout, opens it
+    again straight away since the failures were never reset.
+
+    Args:
+        notifier_type (str): Type of the notifier.
+        error (str): Error raised by the notifier.
+        failure_threshold (int): Consecutive failures opening the circuit.
+        reset_timeout (float): Seconds the circuit stays open.
+
+    Raises:
+        DatabaseError: Raised if error occurred while executing transaction.
+
+    Returns:
+        Union[datetime, None]: Until when the circuit is open or None if it is closed.
+    """
+    now = datetime.now()
+    opened_until = now + timedelta(seconds=reset_timeout)
+    table = CircuitBreaker.__table__
+
+    with Session() as session:
+        try:
+            result = session.execute(
+                update(table)
+                .where(table.c.notifier_type == notifier_type)
+                .values(
+                    failures=table.c.failures + 1,
+                    opened_until=case((table.c.failures + 1 >= failure_threshold, opened_until), else_=None),
+                    last_error=error,
+                    updated_at=now,
+                )
+            )
+
+            if result.rowcount == 0:
+                session.execute(
+                    insert(table).values(
+                        notifier_type=notifier_type,
+                        failures=1,
+                        opened_until=opened_until if failure_threshold <= 1 else None,
+                        last_error=error,
+                        updated_at=now,
+                    )
+                )
+
+            state = session.execute(select(table.c.opened_until).where(table.c.notifier_type == notifier_type))
+            opened_until = state.scalar()
+            session.commit()
+
+        except SQLAlchemyError:
+            session.rollback()
+            msg = f"An error occurred trying to record the failure of the notifier '{notifier_type}'."
+            logger.error(msg)
+            raise DatabaseError(msg)
+
+        else:
+
+            if opened_until is not None:
+                logger.warning(f"Circuit of the notifier '{notifier_type}' open until '{opened_until}'.")
+
+            return opened_until
+
+
+def reset_circuit_breaker(notifier_type: str) -> bool:
+    """Close the circuit of the given notifier and forget its failures.
+
+    Args:
+        notifier_type (str): Type of the notifier.
+
+    Raises:
+        DatabaseError: Raised if error occurred while executing transaction.
+
+    Returns:
+        bool: Whether operation was successful or not.
+    """
+    table = CircuitBreaker.__table__
+
+    with Session() as session:
+        try:
+            session.execute(
+                update(table)
+                .where(table.c.notifier_type == notifier_type)
+                .values(failures=0, opened_until=None, last_error=None, updated_at=datetime.now())
+            )
+            session.commit()
+
+        except SQLAlchemyError:
+            session.rollback()
+            msg = f"An error occurred trying to reset the circuit breaker of the notifier '{notifier_type}'."
+            logger.error(msg)
+            raise DatabaseError(msg)
+
+        else:
+            logger.info(f"Circuit of the notifier '{notifier_type}' closed.")
+            return True
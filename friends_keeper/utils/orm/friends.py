@@ -2,20 +2,31 @@
 import logging
 import random
 
+from datetime import date
+from datetime import timedelta
 from typing import List
+from typing import Tuple
 from typing import Union
 
+from sqlalchemy import bindparam
 from sqlalchemy import delete
+from sqlalchemy import func
+from sqlalchemy import insert
 from sqlalchemy import select
+from sqlalchemy import update
 from sqlalchemy.exc import SQLAlchemyError
 
+from friends_keeper.constants import DEFAULT_PAGE_SIZE
 from friends_keeper.database import Session
 from friends_keeper.database.friends import Friend
 from friends_keeper.database.notifications import NotificationEvent
 from friends_keeper.exceptions import DatabaseError
+from friends_keeper.scheduling import RandomScheduling
+from friends_keeper.scheduling import SchedulingStrategy
 from friends_keeper.utils import generate_next_reminder_date
 from friends_keeper.utils.orm import execute_query
 from friends_keeper.utils.orm import get_object_from_query
+from friends_keeper.utils.orm.notifications import BULK_CHUNK_SIZE
 from friends_keeper.utils.orm.notifications import create_notification
 from friends_keeper.utils.orm.notifications import delete_friend_notification
 
@@ -80,6 +91,49 @@ def create_friend(
     return friend
 
 
+def get_friends_page(
+    after: Union[int, None] = None, limit: int = DEFAULT_PAGE_SIZE, show_inactive: bool = False
+) -> List[Friend]:
+    """Get a page of friends sorted by ID.
+
+    Pages are keyset paginated on the friend ID, so getting any page costs the
+    same no matter how deep it is.
+
+    Args:
+        after (Union[int, None], optional): ID of the last friend of the previous page.
+        Defaults to None, which gets the first page.
+        limit (int, optional): Maximum number of friends. Defaults to DEFAULT_PAGE_SIZE.
+        show_inactive (bool, optional): Include inactive friends. Defaults to False.
+
+    Raises:
+        DatabaseError: Raised when executing query.
+
+    Returns:
+        List[Friend]: List of friends found on database.
+    """
+    query = select(Friend)
+
+    if not show_inactive:
+        query = query.where(Friend.active == True)  # noqa: E712
+
+    if after is not None:
+        query = query.where(Friend.id > after)
+
+    query = query.order_by(Friend.id).limit(limit)
+    logger.debug(f"Querying database for {limit} friends after '{after}'")
+
+    try:
+        friends = get_object_from_query(query=query)
+
+    except DatabaseError:
+        msg = f"An error occurred trying to get friends, query: '{str(query)}'."
+        logger.error(msg)
+        raise DatabaseError(msg)
+
+    else:
+        return friends
+
+
 def get_friend(friend_id: int) -> Union[Friend, None]:
     """Get specific friend from database with given friend ID.
 
@@ -111,6 +165,33 @@ def get_friend(friend_id: int) -> Union[Friend, None]:
             return None
 
 
+def get_friends_by_ids(friend_ids: List[int]) -> List[Friend]:
+    """Get friends from database with given friend IDs using a single query.
+
+    Args:
+        friend_ids (List[int]): Database friend IDs.
+
+    Raises:
+        DatabaseError: Raised when executing query.
+
+    Returns:
+        List[Friend]: Friends found on database.
+    """
+    query = select(Friend).where(Friend.id.in_(set(friend_ids)))
+    logger.info(f"Querying database for friends with IDs '{friend_ids}'.")
+
+    try:
+        friends = get_object_from_query(query=query)
+
+    except DatabaseError:
+        msg = f"An error occurred trying to get friends with IDs {friend_ids}."
+        logger.error(msg)
+        raise DatabaseError(msg)
+
+    else:
+        return friends
+
+
 def get_all_friends(show_inactive: bool = False) -> List[Friend]:
     """Get all friends from database.
 
@@ -273,3 +354,215 @@ def delete_friend(friend_id: int) -> bool:
 
     else:
         return False
+
+
+def create_friends_in_bulk(friends: List[dict], strategy: Union[SchedulingStrategy, None] = None) -> int:
+    """Create friends along with their first notification event in a single transaction.
+
+    Friends whose nickname is already on the database are skipped, all the given
+    friends must have the same keys.
+
+    Args:
+        friends (List[dict]): Friends column values, `nickname`, `min_days` and `max_days` are required.
+        strategy (Union[SchedulingStrategy, None], optional): Strategy picking the first
+        notification event dates. Defaults to None, which picks them at random.
+
+    Raises:
+        DatabaseError: Raised if error occurred when executing the transaction.
+
+    Returns:
+        int: Number of friends created.
+    """
+    with Session() as session:
+        try:
+            existing_nicknames = get_existing_nicknames(session, [friend["nickname"] for friend in friends])
+            new_friends = [friend for friend in friends if friend["nickname"] not in existing_nicknames]
+
+            if new_friends:
+                logger.debug(f"Inserting {len(new_friends)} friends.")
+                next_dates = (strategy or RandomScheduling()).next_dates(
+                    [(friend["min_days"], friend["max_days"]) for friend in new_friends]
+                )
+                session.execute(insert(Friend), new_friends)
+                friend_ids = get_friend_ids_by_nickname(session, [friend["nickname"] for friend in new_friends])
+                session.execute(
+                    insert(NotificationEvent),
+                    [
+                        {"friend_id": friend_ids[friend["nickname"]], "date": next_date}
+                        for friend, next_date in zip(new_friends, next_dates)
+                    ],
+                )
+
+            session.commit()
+
+        except SQLAlchemyError:
+            session.rollback()
+            msg = f"Error occurred trying to add {len(friends)} friends to the database."
+            logger.error(msg)
+            raise DatabaseError(msg)
+
+        else:
+            logger.info(f"{len(new_friends)} friends added, {len(friends) - len(new_friends)} already existed.")
+            return len(new_friends)
+
+
+def insert_friends_with_events(friends: List[dict], notification_events: List[dict]) -> None:
+    """Insert friends and notification events as they are in a single transaction.
+
+    Rows are not validated nor completed, so friends must carry their `id` for
+    the events to refer to them. Meant for generating synthetic databases.
+
+    Args:
+        friends (List[dict]): Friends column values, all with the same keys.
+        notification_events (List[dict]): Notification events column values, all with the same keys.
+
+    Raises:
+        DatabaseError: Raised if error occurred when executing the transaction.
+    """
+    with Session() as session:
+        try:
+            if friends:
+                session.execute(insert(Friend), friends)
+
+            if notification_events:
+                session.execute(insert(NotificationEvent), notification_events)
+
+            session.commit()
+
+        except SQLAlchemyError:
+            session.rollback()
+            msg = (
+                f"Error occurred trying to insert {len(friends)} friends and "
+                f"{len(notification_events)} notification events."
+            )
+            logger.error(msg)
+            raise DatabaseError(msg)
+
+        else:
+            logger.debug(f"Inserted {len(friends)} friends and {len(notification_events)} notification events.")
+
+
+def get_max_friend_id() -> int:
+    """Get the highest friend ID on the database.
+
+    Raises:
+        DatabaseError: Raised if error occurred when executing the query.
+
+    Returns:
+        int: Highest friend ID or 0 when there are no friends.
+    """
+    return get_object_from_query(select(func.max(Friend.id)))[0] or 0
+
+
+def get_existing_nicknames(session, nicknames: List[str]) -> set:
+    """Get which of the given nicknames are already on the database.
+
+    Args:
+        session (sqlalchemy.orm.Session): Session to query with.
+        nicknames (List[str]): Nicknames to look for.
+
+    Returns:
+        set: Nicknames found.
+    """
+    existing_nicknames = set()
+
+    for index in range(0, len(nicknames), BULK_CHUNK_SIZE):
+        chunk_end = index + BULK_CHUNK_SIZE
+        query = select(Friend.nickname).where(Friend.nickname.in_(nicknames[index:chunk_end]))
+        existing_nicknames.update(session.execute(query).scalars())
+
+    return existing_nicknames
+
+
+def get_friend_ids_by_nickname(session, nicknames: List[str]) -> dict:
+    """Get the IDs of the friends with the given nicknames.
+
+    Args:
+        session (sqlalchemy.orm.Session): Session to query with.
+        nicknames (List[str]): Friends nicknames.
+
+    Returns:
+        dict: Friend IDs keyed on their nickname.
+    """
+    friend_ids = dict()
+
+    for index in range(0, len(nicknames), BULK_CHUNK_SIZE):
+        chunk_end = index + BULK_CHUNK_SIZE
+        query = select(Friend.nickname, Friend.id).where(Friend.nickname.in_(nicknames[index:chunk_end]))
+        friend_ids.update(session.execute(query).all())
+
+    return friend_ids
+
+
+def reschedule_active_friends(
+    strategy: Union[RandomScheduling, None] = None, today: Union[date, None] = None
+) -> Tuple[int, int]:
+    """Give every active friend a new pending notification event date in a single transaction.
+
+    Days for the whole active friend set are sampled at once, then pending events
+    get their new date with one bulk `UPDATE` and friends without a pending event
+    get one with a single bulk `INSERT`. Inactive friends are left untouched.
+
+    Args:
+        strategy (Union[RandomScheduling, None], optional): Strategy sampling the days, seed its
+        generator to get reproducible dates. Defaults to None, which creates a new one.
+        today (Union[date, None], optional): Day the dates are counted from. Defaults to None, which is today.
+
+    Raises:
+        DatabaseError: Raised if error occurred when executing the transaction.
+
+    Returns:
+        Tuple[int, int]: Number of friends whose pending events were updated and of events created.
+    """
+    strategy = strategy or RandomScheduling()
+    today = today or date.today()
+    pending = (
+        select(NotificationEvent.id)
+        .where(NotificationEvent.friend_id == Friend.id, NotificationEvent.already_notified == False)  # noqa: E712
+        .exists()
+    )
+    query = select(Friend.id, Friend.min_days, Friend.max_days, pending).where(Friend.active == True)  # noqa: E712
+    update_query = (
+        update(NotificationEvent.__table__)
+        .where(
+            NotificationEvent.friend_id == bindparam("b_friend_id"),
+            NotificationEvent.already_notified == False,  # noqa: E712
+        )
+        .values(date=bindparam("b_date"))
+    )
+
+    with Session() as session:
+        try:
+            rows = session.execute(query).all()
+            friend_ids, min_days, max_days, has_pending = zip(*rows) if rows else ((), (), (), ())
+            offsets = strategy.sample_offsets(min_days, max_days)
+            dates = {offset: today + timedelta(days=offset) for offset in set(offsets)}
+            updates = list()
+            inserts = list()
+
+            for friend_id, offset, friend_has_pending in zip(friend_ids, offsets, has_pending):
+
+                if friend_has_pending:
+                    updates.append({"b_friend_id": friend_id, "b_date": dates[offset]})
+                else:
+                    inserts.append({"friend_id": friend_id, "date": dates[offset]})
+
+            logger.debug(f"Updating {len(updates)} pending notification events and creating {len(inserts)}.")
+
+            if updates:
+                session.execute(update_query, updates)
+
+            if inserts:
+                session.execute(insert(NotificationEvent.__table__), inserts)
+
+            session.commit()
+
+        except SQLAlchemyError:
+            session.rollback()
+            msg = "Error occurred trying to reschedule the active friends."
+            logger.error(msg)
+            raise DatabaseError(msg)
+
+        else:
+            logger.info(f"{len(friend_ids)} friends rescheduled, {len(inserts)} notification events created.")
+            return len(updates), len(inserts)
@@ -0,0 +1,225 @@
+"""Database locks utility functions.
+
+Locks are rows of the `locks` table with an expiry date. Taking one is a single
+transaction: the row is taken over when it expired or already belongs to the
+owner, otherwise it is inserted and the primary key makes sure only one of the
+processes racing for it succeeds.
+
+Locks are held for as long as the run needs them, `hold_lock` renews the lease in
+the background every third of its time to live, so runs taking longer than it
+do not let another run take the lock over.
+"""
+import logging
+import os
+import socket
+import threading
+import uuid
+
+from contextlib import contextmanager
+from datetime import datetime
+from datetime import timedelta
+from typing import Iterator
+
+from sqlalchemy import delete
+from sqlalchemy import insert
+from sqlalchemy import or_
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.exc import SQLAlchemyError
+
+from friends_keeper.constants import DEFAULT_RUN_LOCK_TTL
+from friends_keeper.database import Session
+from friends_keeper.database.locks import Lock
+from friends_keeper.exceptions import DatabaseError
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_lock_owner() -> str:
+    """Get a new lock owner identifier, unique to the caller.
+
+    Returns:
+        str: Host name and process ID, for troubleshooting, along with a random suffix.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+
+
+def acquire_lock(name: str, owner: str, ttl: float = DEFAULT_RUN_LOCK_TTL) -> bool:
+    """Take the given lock or extend it when the owner already holds it.
+
+    Args:
+        name (str): Lock name.
+        owner (str): Identifier of the owner, see `get_lock_owner`.
+        ttl (float, optional): Seconds until the lock expires. Defaults to DEFAULT_RUN_LOCK_TTL.
+
+    Raises:
+        DatabaseError: Raised if error occurred while executing transaction.
+
+    Returns:
+        bool: Whether the lock was taken.
+    """
+    now = datetime.now()
+    values = {"owner": owner, "expires_at": now + timedelta(seconds=ttl)}
+
+    with Session() as session:
+        try:
+            result = session.execute(
+                update(Lock.__table__)
+                .where(Lock.name == name, or_(Lock.expires_at < now, Lock.owner == owner))
+                .values(**values)
+            )
+
+            if result.rowcount == 0:
+                session.execute(insert(Lock.__table__).values(name=name, **values))
+
+            session.commit()
+
+        except IntegrityError:
+            session.rollback()
+            logger.info(f"Lock '{name}' is held by another owner.")
+            return False
+
+        except SQLAlchemyError:
+            session.rollback()
+            msg = f"An error occurred trying to acquire the lock '{name}'."
+            logger.error(msg)
+            raise DatabaseError(msg)
+
+        else:
+            logger.debug(f"Lock '{name}' acquired by '{owner}' until '{values['expires_at']}'.")
+            return True
+
+
+def release_lock(name: str, owner: str) -> bool:
+    """Release the given lock if the owner holds it.
+
+    Args:
+        name (str): Lock name.
+        owner (str): Identifier of the owner.
+
+    Raises:
+        DatabaseError: Raised if error occurred while executing transaction.
+
+    Returns:
+        bool: Whether the lock was held by the owner.
+    """
+    with Session() as session:
+        try:
+            result = session.execute(delete(Lock.__table__).where(Lock.name == name, Lock.owner == owner))
+            session.commit()
+
+        except SQLAlchemyError:
+            session.rollback()
+            msg = f"An error occurred trying to release the lock '{name}'."
+            logger.error(msg)
+            raise DatabaseError(msg)
+
+        else:
+            logger.debug(f"Lock '{name}' released by '{owner}'.")
+            return result.rowcount > 0
+
+
+def renew_lock(name: str, owner: str, ttl: float = DEFAULT_RUN_LOCK_TTL) -> bool:
+    """Extend the given lock if the owner still holds it.
+
+    Args:
+        name (str): Lock name.
+        owner (str): Identifier of the owner.
+        ttl (float, optional): Seconds from now until the lock expires. Defaults to DEFAULT_RUN_LOCK_TTL.
+
+    Raises:
+        DatabaseError: Raised if error occurred while executing transaction.
+
+    Returns:
+        bool: Whether the lock was still held by the owner.
+    """
+    expires_at = datetime.now() + timedelta(seconds=ttl)
+
+    with Session() as session:
+        try:
+            result = session.execute(
+                update(Lock.__table__).where(Lock.name == name, Lock.owner == owner).values(expires_at=expires_at)
+            )
+            session.commit()
+
+        except SQLAlchemyError:
+            session.rollback()
+            msg = f"An error occurred trying to renew the lock '{name}'."
+            logger.error(msg)
+            raise DatabaseError(msg)
+
+        else:
+            logger.debug(f"Lock '{name}' renewed by '{owner}' until '{expires_at}'.")
+            return result.rowcount > 0
+
+
+def keep_lock(name: str, owner: str, ttl: float, stopped: threading.Event) -> None:
+    """Renew the given lock every third of its time to live until stopped.
+
+    Args:
+        name (str): Lock name.
+        owner (str): Identifier of the owner.
+        ttl (float): Seconds until the lock expires if it is not renewed.
+        stopped (threading.Event): Event set once the lock is no longer needed.
+    """
+    while not stopped.wait(ttl / 3):
+        try:
+            if not renew_lock(name=name, owner=owner, ttl=ttl):
+                logger.error(f"Lock '{name}' expired and was taken over before it could be renewed.")
+                return
+
+        except DatabaseError:
+            # Renewing again before it expires may still work.
+            logger.error(f"Lock '{name}' could not be renewed, retrying.")
+
+
+@contextmanager
+def hold_lock(name: str, ttl: float = DEFAULT_RUN_LOCK_TTL) -> Iterator[bool]:
+    """Hold the given lock within the context, when it could be taken.
+
+    The lock is renewed in the background while the context runs, so it only
+    expires when the process holding it stops without releasing it. A lock which
+    could not be released is logged and left to expire, so it never hides the
+    error raised within the context.
+
+    Args:
+        name (str): Lock name.
+        ttl (float, optional): Seconds until the lock expires if it is not renewed nor released.
+        Defaults to DEFAULT_RUN_LOCK_TTL.
+
+    Raises:
+        DatabaseError: Raised if the lock could not be acquired.
+
+    Yields:
+        Iterator[bool]: Whether the lock was taken, callers must not go on otherwise.
+    """
+    owner = get_lock_owner()
+    acquired = acquire_lock(name=name, owner=owner, ttl=ttl)
+    stopped = threading.Event()
+    keeper = None
+
+    if acquired:
+        keeper = threading.Thread(
+            target=keep_lock,
+            kwargs={"name": name, "owner": owner, "ttl": ttl, "stopped": stopped},
+            name=f"lock-{name}",
+            daemon=True,
+        )
+        keeper.start()
+
+    try:
+        yield acquired
+
+    finally:
+
+        if keeper is not None:
+            stopped.set()
+            keeper.join()
+
+        if acquired:
+
+            try:
+                release_lock(name=name, owner=owner)
+            except DatabaseError:
+                logger.error(f"Lock '{name}' could not be released, it expires in {ttl} seconds.")
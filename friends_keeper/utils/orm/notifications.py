@@ -1,36 +1,54 @@
 """Common notifications event utility functions."""
 import logging
 
+from datetime import date
 from datetime import datetime
+from datetime import timedelta
 from typing import List
+from typing import Tuple
+from typing import Union
 
 from sqlalchemy import delete
+from sqlalchemy import func
+from sqlalchemy import insert
+from sqlalchemy import or_
 from sqlalchemy import select
+from sqlalchemy import tuple_
 from sqlalchemy import update
 from sqlalchemy.exc import SQLAlchemyError
 
+from friends_keeper.constants import DEFAULT_CLAIM_TTL
+from friends_keeper.constants import DEFAULT_PAGE_SIZE
 from friends_keeper.database import Session
+from friends_keeper.database.friends import Friend
 from friends_keeper.database.notifications import NotificationEvent
+from friends_keeper.database.outbox import OutboxMessage
 from friends_keeper.exceptions import DatabaseError
 from friends_keeper.utils.orm import execute_query
 from friends_keeper.utils.orm import get_object_from_query
+from friends_keeper.utils.orm import get_rows_from_query
 
 
 logger = logging.getLogger(__name__)
 
+# Keep `IN (...)` clauses under SQLite's bound parameters limit.
+BULK_CHUNK_SIZE = 500
 
-def get_today_notifications() -> List[NotificationEvent]:
+
+def get_today_notifications(claim_token: Union[str, None] = None) -> List[NotificationEvent]:
     """Get notification event of current day for all friends.
 
+    Args:
+        claim_token (Union[str, None], optional): Only get the events claimed with this token,
+        see `claim_notifications`. Defaults to None, which gets all of them.
+
     Raises:
         DatabaseError: Raised if error occurred while executing transaction.
 
     Returns:
         List[NotificationEvent]: List with obtained notification event objects.
     """
-    filter = (NotificationEvent.already_notified == False) & (  # noqa: E712
-        NotificationEvent.date <= datetime.today().date()
-    )
+    filter = get_today_filter(claim_token=claim_token)
     query = select(NotificationEvent).where(filter)
     logger.debug("Querying database for today's notification events")
 
@@ -47,6 +65,234 @@ def get_today_notifications() -> List[NotificationEvent]:
         return notifications
 
 
+def get_today_notifications_with_friends(
+    claim_token: Union[str, None] = None,
+) -> List[Tuple[NotificationEvent, Friend]]:
+    """Get notification event of current day for all friends along with their friend.
+
+    Events and friends are loaded with a single joined query so callers do not
+    need to look up each friend separately.
+
+    Args:
+        claim_token (Union[str, None], optional): Only get the events claimed with this token,
+        see `claim_notifications`. Defaults to None, which gets all of them.
+
+    Raises:
+        DatabaseError: Raised if error occurred while executing transaction.
+
+    Returns:
+        List[Tuple[NotificationEvent, Friend]]: List with notification event and friend pairs.
+    """
+    filter = get_today_filter(claim_token=claim_token)
+    query = (
+        select(NotificationEvent, Friend)
+        .join(Friend, Friend.id == NotificationEvent.friend_id)
+        .where(filter)
+        .order_by(NotificationEvent.id)
+    )
+    logger.debug("Querying database for today's notification events and their friends")
+
+    try:
+        rows = get_rows_from_query(query=query)
+        logger.debug(f"Found notification events'{[notification.id for notification, _ in rows]}'")
+
+    except DatabaseError:
+        msg = f"An error occurred trying to get todays notification events, query: '{str(query)}'."
+        logger.error(msg)
+        raise DatabaseError(msg)
+
+    else:
+        return [(notification, friend) for notification, friend in rows]
+
+
+def get_today_filter(claim_token: Union[str, None] = None):
+    """Get the filter matching the pending notification events due by today.
+
+    Args:
+        claim_token (Union[str, None], optional): Only match the events claimed with this token.
+        Defaults to None, which matches all of them.
+
+    Returns:
+        sqlalchemy.sql.elements.BooleanClauseList: Notification events filter.
+    """
+    filter = (NotificationEvent.already_notified == False) & (  # noqa: E712
+        NotificationEvent.date <= datetime.today().date()
+    )
+
+    if claim_token is not None:
+        filter = filter & (NotificationEvent.claim_token == claim_token)
+
+    return filter
+
+
+def claim_notifications(
+    claim_token: str, notification_ids: Union[List[int], None] = None, ttl: float = DEFAULT_CLAIM_TTL
+) -> List[int]:
+    """Claim the pending notification events due by today which nobody else claimed.
+
+    Events are marked with the claim token and then read back within the same
+    transaction, SQLite serializes writers so events claimed by a concurrent run
+    are never claimed again until their claim expires.
+
+    Args:
+        claim_token (str): Token identifying the run claiming the events.
+        notification_ids (Union[List[int], None], optional): IDs of the notification events
+        to claim. Defaults to None, which claims every due one.
+        ttl (float, optional): Seconds after which claims of other runs are considered
+        abandoned and can be taken over. Defaults to DEFAULT_CLAIM_TTL.
+
+    Raises:
+        DatabaseError: Raised if error occurred while executing transaction.
+
+    Returns:
+        List[int]: IDs of the notification events claimed with the token.
+    """
+    now = datetime.now()
+    filter = get_today_filter() & or_(
+        NotificationEvent.claim_token.is_(None), NotificationEvent.claimed_at < now - timedelta(seconds=ttl)
+    )
+
+    filters = [filter]
+
+    if notification_ids is not None:
+        filters = list()
+
+        for index in range(0, len(notification_ids), BULK_CHUNK_SIZE):
+            chunk_end = index + BULK_CHUNK_SIZE
+            filters.append(filter & NotificationEvent.id.in_(notification_ids[index:chunk_end]))
+
+    logger.debug(f"Claiming due notification events with token '{claim_token}'.")
+
+    with Session() as session:
+        try:
+            for chunk_filter in filters:
+                query = (
+                    update(NotificationEvent)
+                    .where(chunk_filter)
+                    .values(claim_token=claim_token, claimed_at=now)
+                    .execution_options(synchronize_session=False)
+                )
+                session.execute(query)
+
+            claimed_ids = (
+                session.execute(select(NotificationEvent.id).where(get_today_filter(claim_token=claim_token)))
+                .scalars()
+                .all()
+            )
+            session.commit()
+
+        except SQLAlchemyError:
+            session.rollback()
+            msg = "An error occurred trying to claim the notification events."
+            logger.error(msg)
+            raise DatabaseError(msg)
+
+        else:
+            logger.debug(f"Claimed notification events '{claimed_ids}'.")
+            return claimed_ids
+
+
+def release_notifications(notification_ids: List[int]) -> bool:
+    """Release the claim on the given notification events so the next run picks them up.
+
+    Args:
+        notification_ids (List[int]): IDs of the notification events to release.
+
+    Raises:
+        DatabaseError: Raised if error occurred while executing transaction.
+
+    Returns:
+        bool: Whether operation was successful or not.
+    """
+    logger.info(f"Releasing {len(notification_ids)} notification events.")
+
+    with Session() as session:
+        try:
+            for index in range(0, len(notification_ids), BULK_CHUNK_SIZE):
+                chunk_end = index + BULK_CHUNK_SIZE
+                query = (
+                    update(NotificationEvent)
+                    .where(NotificationEvent.id.in_(notification_ids[index:chunk_end]))
+                    .values(claim_token=None, claimed_at=None)
+                    .execution_options(synchronize_session=False)
+                )
+                session.execute(query)
+
+            session.commit()
+
+        except SQLAlchemyError:
+            session.rollback()
+            msg = "An error occurred trying to release the notification events."
+            logger.error(msg)
+            raise DatabaseError(msg)
+
+        else:
+            return True
+
+
+def get_due_notifications_by_friend(
+    after: Union[int, None] = None, limit: int = DEFAULT_PAGE_SIZE
+) -> List[Tuple[Friend, List[NotificationEvent]]]:
+    """Get the friends with pending notification events due by today along with all those events.
+
+    Friends are keyset paginated on their ID, so the backlog can be gone through
+    in chunks of the same size no matter how many events are overdue.
+
+    Args:
+        after (Union[int, None], optional): ID of the last friend of the previous chunk.
+        Defaults to None, which gets the first chunk.
+        limit (int, optional): Maximum number of friends. Defaults to DEFAULT_PAGE_SIZE.
+
+    Raises:
+        DatabaseError: Raised if error occurred while executing transaction.
+
+    Returns:
+        List[Tuple[Friend, List[NotificationEvent]]]: Friends sorted by ID along with their
+        due notification events sorted by date.
+    """
+    filter = (NotificationEvent.already_notified == False) & (  # noqa: E712
+        NotificationEvent.date <= datetime.today().date()
+    )
+
+    if after is not None:
+        filter = filter & (NotificationEvent.friend_id > after)
+
+    friend_ids = (
+        select(NotificationEvent.friend_id)
+        .where(filter)
+        .group_by(NotificationEvent.friend_id)
+        .order_by(NotificationEvent.friend_id)
+        .limit(limit)
+    )
+    query = (
+        select(NotificationEvent, Friend)
+        .join(Friend, Friend.id == NotificationEvent.friend_id)
+        .where(filter & NotificationEvent.friend_id.in_(friend_ids))
+        .order_by(NotificationEvent.friend_id, NotificationEvent.date, NotificationEvent.id)
+    )
+    logger.debug(f"Querying database for {limit} friends with due notification events after '{after}'")
+
+    try:
+        rows = get_rows_from_query(query=query)
+
+    except DatabaseError:
+        msg = f"An error occurred trying to get due notification events, query: '{str(query)}'."
+        logger.error(msg)
+        raise DatabaseError(msg)
+
+    else:
+        friends_with_events = list()
+
+        for notification, friend in rows:
+
+            if not friends_with_events or friends_with_events[-1][0].id != friend.id:
+                friends_with_events.append((friend, list()))
+
+            friends_with_events[-1][1].append(notification)
+
+        return friends_with_events
+
+
 def create_notification(friend_id: int, date: datetime.date) -> NotificationEvent:
     """Create friend notification event.
 
@@ -205,6 +451,73 @@ def mark_notification_as_done(notification_id: int) -> bool:
         return operation_result
 
 
+def get_next_notification_date() -> Union[date, None]:
+    """Get the date of the earliest pending notification event.
+
+    The lookup is answered from the pending notification events index.
+
+    Raises:
+        DatabaseError: Raised if error occurred while executing transaction.
+
+    Returns:
+        Union[date, None]: Earliest pending date or None if there are no pending events.
+    """
+    query = select(func.min(NotificationEvent.date)).where(NotificationEvent.already_notified == False)  # noqa: E712
+    logger.debug("Querying database for the next notification event date")
+
+    try:
+        next_date = get_object_from_query(query=query)[0]
+        logger.debug(f"Next notification event date: '{next_date}'")
+
+    except DatabaseError:
+        msg = f"An error occurred trying to get the next notification event date, query: '{str(query)}'."
+        logger.error(msg)
+        raise DatabaseError(msg)
+
+    else:
+        return next_date
+
+
+def get_pending_notifications_per_window(start: date, end: date) -> List[Tuple[date, int, int, int]]:
+    """Get the number of pending notification events per day and friend's days window.
+
+    Events are grouped on their date and the `min_days` and `max_days` of their
+    friend, the range lookup is answered from the pending notification events index.
+
+    Args:
+        start (date): First day of the range.
+        end (date): Day the range ends on, excluded.
+
+    Raises:
+        DatabaseError: Raised if error occurred while executing transaction.
+
+    Returns:
+        List[Tuple[date, int, int, int]]: Date, minimum days, maximum days and number of events of every group.
+    """
+    query = (
+        select(NotificationEvent.date, Friend.min_days, Friend.max_days, func.count())
+        .join(Friend, Friend.id == NotificationEvent.friend_id)
+        .where(
+            NotificationEvent.already_notified == False,  # noqa: E712
+            NotificationEvent.date >= start,
+            NotificationEvent.date < end,
+        )
+        .group_by(NotificationEvent.date, Friend.min_days, Friend.max_days)
+    )
+    logger.debug(f"Querying database for pending notification events per day from '{start}' to '{end}'")
+
+    try:
+        rows = get_rows_from_query(query=query)
+
+    except DatabaseError:
+        msg = f"An error occurred trying to count pending notification events, query: '{str(query)}'."
+        logger.error(msg)
+        raise DatabaseError(msg)
+
+    else:
+        return [tuple(row) for row in rows]
+
+
 def get_coming_notifications() -> List[NotificationEvent]:
     """Get the next notification from tomorrow on.
 
@@ -234,6 +547,59 @@ def get_coming_notifications() -> List[NotificationEvent]:
         return notifications
 
 
+def get_notifications_page(
+    after: Union[int, None] = None, limit: int = DEFAULT_PAGE_SIZE, friend_id: Union[int, None] = None
+) -> List[Tuple[NotificationEvent, Friend]]:
+    """Get a page of notification events along with their friend, sorted by date.
+
+    Pages are keyset paginated on the event date and ID, so getting any page costs
+    the same no matter how deep it is. Without a friend only pending events from
+    today on are returned, with a friend all of its events are.
+
+    Args:
+        after (Union[int, None], optional): ID of the last notification event of the previous page.
+        Defaults to None, which gets the first page.
+        limit (int, optional): Maximum number of notification events. Defaults to DEFAULT_PAGE_SIZE.
+        friend_id (Union[int, None], optional): Friend's ID to get the notification events from. Defaults to None.
+
+    Raises:
+        DatabaseError: Raised if error occurred while executing transaction.
+
+    Returns:
+        List[Tuple[NotificationEvent, Friend]]: List with notification event and friend pairs.
+    """
+    if friend_id is not None:
+        filter = NotificationEvent.friend_id == friend_id
+    else:
+        filter = (NotificationEvent.already_notified == False) & (  # noqa: E712
+            NotificationEvent.date >= datetime.today().date()
+        )
+
+    if after is not None:
+        after_date = select(NotificationEvent.date).where(NotificationEvent.id == after).scalar_subquery()
+        filter = filter & (tuple_(NotificationEvent.date, NotificationEvent.id) > tuple_(after_date, after))
+
+    query = (
+        select(NotificationEvent, Friend)
+        .join(Friend, Friend.id == NotificationEvent.friend_id)
+        .where(filter)
+        .order_by(NotificationEvent.date, NotificationEvent.id)
+        .limit(limit)
+    )
+    logger.debug(f"Querying database for {limit} notification events after '{after}'")
+
+    try:
+        rows = get_rows_from_query(query=query)
+
+    except DatabaseError:
+        msg = f"An error occurred trying to get notification events, query: '{str(query)}'."
+        logger.error(msg)
+        raise DatabaseError(msg)
+
+    else:
+        return [(notification, friend) for notification, friend in rows]
+
+
 def get_notification(notification_id: int) -> NotificationEvent:
     """Get notification event object from given ID.
 
@@ -260,3 +626,62 @@ def get_notification(notification_id: int) -> NotificationEvent:
 
     else:
         return notification
+
+
+def reschedule_notifications(
+    notification_ids: List[int], next_notifications: List[dict], outbox_messages: Union[List[dict], None] = None
+) -> bool:
+    """Mark notification events as done and create the following ones in one transaction.
+
+    Notification events are marked with bulk `UPDATE` statements and the new ones
+    are inserted with a single bulk `INSERT`, as are the messages rendered from
+    them into the outbox, everything gets committed once.
+
+    Args:
+        notification_ids (List[int]): IDs of the notification events already notified.
+        next_notifications (List[dict]): New notification events to create, each one
+        with `friend_id` and `date` keys.
+        outbox_messages (Union[List[dict], None], optional): Messages to write to the outbox,
+        each one with `notifier_type`, `idempotency_key` and `message` keys. Defaults to None.
+
+    Raises:
+        DatabaseError: Raised if error occurred while executing transaction.
+
+    Returns:
+        bool: Whether operation was successful or not.
+    """
+    logger.info(
+        f"Marking {len(notification_ids)} notification events as done and "
+        f"creating {len(next_notifications)} new ones."
+    )
+
+    with Session() as session:
+        try:
+            for index in range(0, len(notification_ids), BULK_CHUNK_SIZE):
+                chunk_end = index + BULK_CHUNK_SIZE
+                chunk_ids = notification_ids[index:chunk_end]
+                query = (
+                    update(NotificationEvent)
+                    .where(NotificationEvent.id.in_(chunk_ids))
+                    .values(already_notified=True)
+                    .execution_options(synchronize_session=False)
+                )
+                session.execute(query)
+
+            if next_notifications:
+                session.execute(insert(NotificationEvent), next_notifications)
+
+            if outbox_messages:
+                session.execute(insert(OutboxMessage), outbox_messages)
+
+            session.commit()
+
+        except SQLAlchemyError:
+            session.rollback()
+            msg = "An error occurred trying to reschedule the notification events."
+            logger.error(msg)
+            raise DatabaseError(msg)
+
+        else:
+            logger.info("Notification events rescheduled.")
+            return True
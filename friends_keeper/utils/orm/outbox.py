@@ -0,0 +1,229 @@
+"""Outbox messages utility functions."""
+import logging
+
+from datetime import datetime
+from datetime import timedelta
+from typing import List
+from typing import Union
+
+from sqlalchemy import and_
+from sqlalchemy import bindparam
+from sqlalchemy import func
+from sqlalchemy import insert
+from sqlalchemy import or_
+from sqlalchemy import select
+from sqlalchemy import update
+from sqlalchemy.exc import SQLAlchemyError
+
+from friends_keeper.constants import DEFAULT_CLAIM_TTL
+from friends_keeper.constants import DEFAULT_OUTBOX_BATCH_SIZE
+from friends_keeper.constants import OUTBOX_STATUSES
+from friends_keeper.database import Session
+from friends_keeper.database.outbox import OutboxMessage
+from friends_keeper.exceptions import DatabaseError
+from friends_keeper.utils.orm import get_object_from_query
+
+
+logger = logging.getLogger(__name__)
+
+# Keep `IN (...)` clauses under SQLite's bound parameters limit.
+BULK_CHUNK_SIZE = 500
+
+
+def enqueue_outbox_messages(messages: List[dict]) -> bool:
+    """Write the given messages to the outbox with a single bulk `INSERT`.
+
+    Args:
+        messages (List[dict]): Messages to deliver, each one with `notifier_type`,
+        `idempotency_key` and `message` keys.
+
+    Raises:
+        DatabaseError: Raised if error occurred while executing transaction.
+
+    Returns:
+        bool: Whether operation was successful or not.
+    """
+    logger.info(f"Writing {len(messages)} messages to the outbox.")
+
+    with Session() as session:
+        try:
+            if messages:
+                session.execute(insert(OutboxMessage), messages)
+
+            session.commit()
+
+        except SQLAlchemyError:
+            session.rollback()
+            msg = "An error occurred trying to write the messages to the outbox."
+            logger.error(msg)
+            raise DatabaseError(msg)
+
+        else:
+            return True
+
+
+def get_due_outbox_filter(notifier_types: List[str], now: datetime, ttl: float = DEFAULT_CLAIM_TTL):
+    """Get the filter of the pending outbox messages whose next attempt is due and nobody claimed.
+
+    Args:
+        notifier_types (List[str]): Types of the notifiers to get the messages of.
+        now (datetime): Current time.
+        ttl (float, optional): Seconds after which claims are considered abandoned. Defaults to DEFAULT_CLAIM_TTL.
+
+    Returns:
+        sqlalchemy.sql.elements.BooleanClauseList: Filter answered from the outbox messages status index.
+    """
+    return and_(
+        OutboxMessage.status == OUTBOX_STATUSES.pending,
+        OutboxMessage.next_attempt_at <= now,
+        OutboxMessage.notifier_type.in_(notifier_types),
+        or_(OutboxMessage.claim_token.is_(None), OutboxMessage.claimed_at < now - timedelta(seconds=ttl)),
+    )
+
+
+def claim_outbox_messages(
+    claim_token: str,
+    notifier_types: List[str],
+    limit: int = DEFAULT_OUTBOX_BATCH_SIZE,
+    ttl: float = DEFAULT_CLAIM_TTL,
+) -> List[OutboxMessage]:
+    """Claim the pending outbox messages of the given notifiers whose next attempt is due.
+
+    Messages are marked with the claim token and then read back within the same
+    transaction, so messages claimed by a concurrent run are never delivered again
+    until their claim expires. Claims are released by `complete_outbox_messages`.
+
+    Args:
+        claim_token (str): Token identifying the run claiming the messages.
+        notifier_types (List[str]): Types of the notifiers to get the messages of.
+        limit (int, optional): Maximum number of messages. Defaults to DEFAULT_OUTBOX_BATCH_SIZE.
+        ttl (float, optional): Seconds after which claims of other runs are considered
+        abandoned and can be taken over. Defaults to DEFAULT_CLAIM_TTL.
+
+    Raises:
+        DatabaseError: Raised if error occurred while executing transaction.
+
+    Returns:
+        List[OutboxMessage]: Outbox messages claimed, oldest first.
+    """
+    now = datetime.now()
+    filter = get_due_outbox_filter(notifier_types=notifier_types, now=now, ttl=ttl)
+    due_ids = select(OutboxMessage.id).where(filter).order_by(OutboxMessage.id).limit(limit)
+    logger.debug(f"Claiming {limit} due outbox messages of '{notifier_types}' with token '{claim_token}'.")
+
+    with Session() as session:
+        try:
+            session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id.in_(due_ids), filter)
+                .values(claim_token=claim_token, claimed_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            messages = (
+                session.execute(
+                    select(OutboxMessage)
+                    .where(OutboxMessage.claim_token == claim_token, OutboxMessage.status == OUTBOX_STATUSES.pending)
+                    .order_by(OutboxMessage.id)
+                )
+                .scalars()
+                .all()
+            )
+            session.commit()
+
+        except SQLAlchemyError:
+            session.rollback()
+            msg = "An error occurred trying to claim the due outbox messages."
+            logger.error(msg)
+            raise DatabaseError(msg)
+
+        else:
+            return messages
+
+
+def complete_outbox_messages(
+    sent_ids: List[int], failures: List[dict], claim_token: Union[str, None] = None
+) -> bool:
+    """Mark delivered outbox messages as sent and record the failed attempts in one transaction.
+
+    Args:
+        sent_ids (List[int]): IDs of the outbox messages delivered.
+        failures (List[dict]): Failed outbox messages, each one with the `id`, `status`,
+        `attempts`, `next_attempt_at` and `last_error` to set.
+        claim_token (Union[str, None], optional): Token the messages were claimed with, its
+        claims are released. Defaults to None, which releases none.
+
+    Raises:
+        DatabaseError: Raised if error occurred while executing transaction.
+
+    Returns:
+        bool: Whether operation was successful or not.
+    """
+    logger.info(f"Marking {len(sent_ids)} outbox messages as sent and {len(failures)} as failed attempts.")
+    table = OutboxMessage.__table__
+
+    with Session() as session:
+        try:
+            for index in range(0, len(sent_ids), BULK_CHUNK_SIZE):
+                chunk_end = index + BULK_CHUNK_SIZE
+                query = (
+                    update(table)
+                    .where(table.c.id.in_(sent_ids[index:chunk_end]))
+                    .values(status=OUTBOX_STATUSES.sent, sent_at=datetime.now())
+                )
+                session.execute(query)
+
+            if failures:
+                query = (
+                    update(table)
+                    .where(table.c.id == bindparam("b_id"))
+                    .values(
+                        status=bindparam("b_status"),
+                        attempts=bindparam("b_attempts"),
+                        next_attempt_at=bindparam("b_next_attempt_at"),
+                        last_error=bindparam("b_last_error"),
+                    )
+                )
+                session.execute(query, [{f"b_{key}": value for key, value in failure.items()} for failure in failures])
+
+            if claim_token is not None:
+                query = (
+                    update(table).where(table.c.claim_token == claim_token).values(claim_token=None, claimed_at=None)
+                )
+                session.execute(query)
+
+            session.commit()
+
+        except SQLAlchemyError:
+            session.rollback()
+            msg = "An error occurred trying to update the outbox messages."
+            logger.error(msg)
+            raise DatabaseError(msg)
+
+        else:
+            return True
+
+
+def get_next_outbox_attempt() -> Union[datetime, None]:
+    """Get the time of the earliest pending outbox message attempt.
+
+    The lookup is answered from the outbox messages status index.
+
+    Raises:
+        DatabaseError: Raised if error occurred while executing transaction.
+
+    Returns:
+        Union[datetime, None]: Earliest next attempt or None if there are no pending messages.
+    """
+    query = select(func.min(OutboxMessage.next_attempt_at)).where(OutboxMessage.status == OUTBOX_STATUSES.pending)
+    logger.debug("Querying database for the next outbox message attempt")
+
+    try:
+        next_attempt = get_object_from_query(query=query)[0]
+
+    except DatabaseError:
+        msg = f"An error occurred trying to get the next outbox message attempt, query: '{str(query)}'."
+        logger.error(msg)
+        raise DatabaseError(msg)
+
+    else:
+        return next_attempt
@@ -0,0 +1,145 @@
+"""Synthetic databases generation utilities.
+
+Friends are generated with their days between reminders drawn uniformly from
+the given `min_days` and `max_days` ranges, a share of them inactive, along with
+the already notified events they would have had over the given history, walking
+back from today one days window at a time. Active friends also get a pending
+notification event within their window.
+
+All values come from a random generator created from the given seed, so the same
+seed on an empty database always gives the same database. Rows are inserted in
+chunks with bulk inserts, every chunk within a single transaction.
+"""
+import logging
+import random
+import time
+
+from collections import namedtuple
+from datetime import date
+from datetime import timedelta
+from typing import Tuple
+from typing import Union
+
+from friends_keeper.constants import DEFAULT_SEED_CHUNK_SIZE
+from friends_keeper.constants import DEFAULT_SEED_HISTORY_YEARS
+from friends_keeper.constants import DEFAULT_SEED_INACTIVE_RATIO
+from friends_keeper.constants import DEFAULT_SEED_MAX_DAYS
+from friends_keeper.constants import DEFAULT_SEED_MIN_DAYS
+from friends_keeper.utils.orm.friends import get_max_friend_id
+from friends_keeper.utils.orm.friends import insert_friends_with_events
+
+
+logger = logging.getLogger(__name__)
+
+SeedResult = namedtuple("SeedResult", ["friends", "inactive", "pending", "history", "elapsed"])
+
+
+def seed_friends(
+    friends: int,
+    min_days: Tuple[int, int] = DEFAULT_SEED_MIN_DAYS,
+    max_days: Tuple[int, int] = DEFAULT_SEED_MAX_DAYS,
+    inactive_ratio: float = DEFAULT_SEED_INACTIVE_RATIO,
+    history_years: float = DEFAULT_SEED_HISTORY_YEARS,
+    seed: Union[int, None] = None,
+    chunk_size: int = DEFAULT_SEED_CHUNK_SIZE,
+    today: Union[date, None] = None,
+) -> SeedResult:
+    """Generate friends along with their notification events history.
+
+    Friend IDs follow the highest one on the database and nicknames are built
+    from them, so seeding a database which already has friends does not clash.
+
+    Args:
+        friends (int): Number of friends.
+        min_days (Tuple[int, int], optional): Lowest and highest `min_days`. Defaults to DEFAULT_SEED_MIN_DAYS.
+        max_days (Tuple[int, int], optional): Lowest and highest `max_days`, raised over `min_days`
+        when lower. Defaults to DEFAULT_SEED_MAX_DAYS.
+        inactive_ratio (float, optional): Share of inactive friends. Defaults to DEFAULT_SEED_INACTIVE_RATIO.
+        history_years (float, optional): Years of already notified events. Defaults to DEFAULT_SEED_HISTORY_YEARS.
+        seed (Union[int, None], optional): Random seed. Defaults to None, which gives a different database every time.
+        chunk_size (int, optional): Friends inserted per transaction. Defaults to DEFAULT_SEED_CHUNK_SIZE.
+        today (Union[date, None], optional): Day the history ends and pending events start.
+        Defaults to None, which is today.
+
+    Raises:
+        DatabaseError: Raised when a chunk could not be inserted.
+
+    Returns:
+        SeedResult: Friends, inactive friends, pending and already notified events inserted and seconds elapsed.
+    """
+    rng = random.Random(seed)
+    today = today or date.today()
+    history_start = today - timedelta(days=round(history_years * 365))
+    start_time = time.perf_counter()
+    first_id = get_max_friend_id() + 1
+    inactive = pending = history = 0
+
+    for chunk_start in range(first_id, first_id + friends, chunk_size):
+        friend_rows = list()
+        event_rows = list()
+
+        for friend_id in range(chunk_start, min(chunk_start + chunk_size, first_id + friends)):
+            friend_min_days = rng.randint(*min_days)
+            friend_max_days = max(rng.randint(*max_days), friend_min_days + 1)
+            active = rng.random() >= inactive_ratio
+            friend_rows.append(
+                {
+                    "id": friend_id,
+                    "nickname": f"seed_{friend_id}",
+                    "min_days": friend_min_days,
+                    "max_days": friend_max_days,
+                    "active": active,
+                }
+            )
+
+            if active:
+                event_rows.append(
+                    {
+                        "friend_id": friend_id,
+                        "date": today + timedelta(days=rng.randrange(friend_max_days)),
+                        "already_notified": False,
+                    }
+                )
+                pending += 1
+            else:
+                inactive += 1
+
+            event_date = today - timedelta(days=rng.randrange(friend_min_days, friend_max_days))
+
+            while event_date >= history_start:
+                event_rows.append({"friend_id": friend_id, "date": event_date, "already_notified": True})
+                history += 1
+                event_date -= timedelta(days=rng.randrange(friend_min_days, friend_max_days))
+
+        insert_friends_with_events(friends=friend_rows, notification_events=event_rows)
+        logger.debug(f"Seeded friends {chunk_start} to {friend_rows[-1]['id']}.")
+
+    elapsed = time.perf_counter() - start_time
+    logger.info(f"{friends} friends seeded with {pending + history} notification events in {elapsed:.2f} seconds.")
+    return SeedResult(friends=friends, inactive=inactive, pending=pending, history=history, elapsed=elapsed)
+
+
+def parse_days_range(value: str) -> Tuple[int, int]:
+    """Parse a range of days given as `LOW:HIGH`, or a single number for a fixed value.
+
+    Args:
+        value (str): Range of days.
+
+    Raises:
+        ValueError: Raised when the range is not valid.
+
+    Returns:
+        Tuple[int, int]: Lowest and highest days, both included.
+    """
+    low, _, high = value.partition(":")
+
+    try:
+        days_range = (int(low), int(high or low))
+
+    except ValueError:
+        raise ValueError(f"'{value}' is not a range of days like '7:20'.")
+
+    if days_range[0] < 1 or days_range[0] > days_range[1]:
+        raise ValueError(f"'{value}' must go from one day or more up to a higher or equal number of days.")
+
+    return days_range
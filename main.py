@@ -4,9 +4,9 @@ import traceback
 import click
 
 from friends_keeper.cli import main_cli
-from friends_keeper.database import base_database, engine
+from friends_keeper.database import get_engine
 
-base_database.metadata.create_all(engine)
+get_engine()
 
 
 if __name__ == "__main__":
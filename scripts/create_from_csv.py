@@ -1,35 +1,21 @@
 #!/usr/bin/env python3
-import json
+"""Load friends from a CSV file.
 
+Kept for backwards compatibility, it is the same as `friends_keeper import <csv_file>`.
+"""
 import click
 
-from friends_keeper.database import base_database
-from friends_keeper.database import engine
-from friends_keeper.utils.orm.friends import create_friend
-
-
-base_database.metadata.create_all(engine)
-
-try:
-    import pandas
-except ImportError:
-    click.echo("ERROR!!! Please install 'pandas'")
+from friends_keeper.cli.importer import import_cli
 
 
 __CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"])
 
 
 @click.command(context_settings=__CONTEXT_SETTINGS, no_args_is_help=True, help="Load friends from CSV file")
-@click.option("-f", "--csv-file", type=click.Path(exists=True))
-def load_csv(csv_file: str):
-    dataframe = pandas.read_csv(csv_file, header=0)
-    click.echo(f"Data loaded from csv file:\n{dataframe}")
-    click.confirm(text="\nAre you sure, you want to add the data above?", abort=True)
-
-    csv_friends = json.loads(dataframe.to_json(orient="records"))
-
-    for csv_friend in csv_friends:
-        create_friend(**csv_friend)
+@click.option("-f", "--csv-file", type=click.Path(exists=True), required=True)
+@click.pass_context
+def load_csv(ctx: click.Context, csv_file: str):
+    ctx.invoke(import_cli, file_path=csv_file, file_format="csv")
 
 
 if __name__ == "__main__":
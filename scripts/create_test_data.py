@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
-from friends_keeper.database import base_database
-from friends_keeper.database import engine
+from friends_keeper.database import get_engine
+from friends_keeper.database.migrations import upgrade_database
 from friends_keeper.utils.orm.friends import create_friend
 
 
-base_database.metadata.create_all(engine)
+upgrade_database(get_engine())
 
 START_ID = 1001
 END_ID = 1010
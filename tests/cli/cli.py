@@ -0,0 +1,141 @@
+"""Main command line interface tests."""
+import os
+import subprocess
+import sys
+
+import click
+import pytest
+
+from click.testing import CliRunner
+from sqlalchemy import create_engine
+from sqlalchemy import select
+from sqlalchemy import text
+
+from friends_keeper.cli import main_cli
+from friends_keeper.database import dispose_database
+from friends_keeper.database import get_engine
+from friends_keeper.database.friends import Friend
+from friends_keeper.database.notifications import NotificationEvent
+from friends_keeper.database.profiler import get_query_profiler
+from tests.database.migrations import LEGACY_SCHEMA
+
+
+# Modules that must not be imported just to print the command line help.
+HEAVY_MODULES = ("sqlalchemy", "gotify", "requests", "jsonschema", "yaml", "prettytable")
+
+
+def get_imported_modules(*args: str) -> set:
+    """Get the top level modules imported by running the CLI with the given arguments.
+
+    Returns:
+        set: Names of the top level packages imported.
+    """
+    command = [sys.executable, "-X", "importtime", "-c", "from friends_keeper.cli import main_cli; main_cli()", *args]
+    process = subprocess.run(
+        command,
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    )
+    assert process.returncode == 0, process.stderr
+    modules = set()
+
+    for line in process.stderr.splitlines():
+
+        if line.startswith("import time:") and "|" in line:
+            modules.add(line.rsplit("|", 1)[-1].strip().split(".")[0])
+
+    return modules
+
+
+@pytest.mark.parametrize("args", [("--help",), ("-h",)])
+def test_help_does_not_import_heavy_modules(args):
+    modules = get_imported_modules(*args)
+
+    assert "friends_keeper" in modules
+    assert "click" in modules
+    assert modules.isdisjoint(HEAVY_MODULES), modules & set(HEAVY_MODULES)
+
+
+def test_help_lists_lazy_commands():
+    runner = CliRunner()
+    result = runner.invoke(main_cli, ["--help"])
+
+    assert result.exit_code == 0
+
+    for cmd_name in ("add", "delete", "dev", "import", "reschedule", "run", "serve", "show", "update"):
+        assert cmd_name in result.output
+
+
+def test_lazy_commands_are_loaded_on_demand():
+    ctx = click.Context(main_cli)
+
+    for cmd_name in main_cli.list_commands(ctx):
+        command = main_cli.get_command(ctx, cmd_name)
+
+        assert isinstance(command, click.Command)
+        assert command.name == cmd_name
+        assert command.help == main_cli.lazy_commands[cmd_name][2]
+
+    assert main_cli.get_command(ctx, "not_a_command") is None
+
+
+def test_profile_queries(config_file, populated_database):
+    dispose_database()
+    result = CliRunner().invoke(
+        main_cli, ["--profile-queries", "--slow-query-threshold", "60", "show", "notifications"]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "nickname1" in result.output
+    assert "Query profile:" in result.output
+    assert "statements" in result.output
+    assert get_query_profiler() is None
+
+
+def test_profile_queries_configured_engine(config_file, populated_database):
+    # The engine is usually configured before the command line runs, as `main.py` upgrades the database first.
+    result = CliRunner().invoke(
+        main_cli, ["--profile-queries", "--slow-query-threshold", "60", "show", "notifications"]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "Query profile:" in result.output
+    assert "Query profile:\n0 statements" not in result.output
+    assert get_query_profiler() is None
+
+
+@pytest.mark.parametrize(
+    "args, expected_friends, expected_events",
+    [(["show", "notifications"], [1], []), (["add", "friend", "-n", "new_friend"], [1, 2], [2])],
+    ids=["show", "add"],
+)
+def test_commands_upgrade_legacy_database(config_file, args, expected_friends, expected_events):
+    # Database created by the first releases, before the columns and tables added since.
+    legacy_engine = create_engine(f"sqlite:///{config_file.parent / 'friends_keeper.db'}")
+
+    with legacy_engine.begin() as connection:
+
+        for statement in LEGACY_SCHEMA:
+            connection.execute(text(statement))
+
+        connection.execute(text("INSERT INTO friends (id, nickname, min_days, max_days) VALUES (1, 'nickname', 1, 2)"))
+
+    legacy_engine.dispose()
+    dispose_database()
+
+    try:
+        result = CliRunner().invoke(main_cli, args)
+
+        assert result.exit_code == 0, result.output
+
+        with get_engine().connect() as connection:
+            friends = connection.execute(select(Friend.id)).scalars().all()
+            events = connection.execute(select(NotificationEvent.friend_id)).scalars().all()
+
+    finally:
+        dispose_database()
+
+    # Friends added get their notification event along with them.
+    assert expected_friends == sorted(friends)
+    assert expected_events == events
@@ -0,0 +1,20 @@
+from click.testing import CliRunner
+
+from friends_keeper.cli.dev import dev_cli
+
+
+def test_dev_seed_cli(tmp_database):
+    result = CliRunner().invoke(
+        dev_cli, ["seed", "--friends", "20", "--inactive-ratio", "0", "--history-years", "0.5", "--seed", "3"]
+    )
+
+    assert 0 == result.exit_code
+    assert "20 friends seeded, 0 inactive, with 20 pending and" in result.output
+    assert "rows/s" in result.output
+
+
+def test_dev_seed_cli_invalid_range(tmp_database):
+    result = CliRunner().invoke(dev_cli, ["seed", "--friends", "20", "--min-days", "9:3"])
+
+    assert 2 == result.exit_code
+    assert "--min-days" in result.output
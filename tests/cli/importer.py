@@ -0,0 +1,24 @@
+from click.testing import CliRunner
+
+from friends_keeper.cli.importer import import_cli
+
+
+def test_import_cli(tmp_database, tmp_path):
+    csv_file = tmp_path / "friends.csv"
+    csv_file.write_text("nickname,min_days,max_days\nfirst,2,4\nsecond,2,4\n")
+
+    result = CliRunner().invoke(import_cli, [str(csv_file)])
+
+    assert 0 == result.exit_code
+    assert "2 friends imported, 0 skipped and 0 invalid out of 2 rows" in result.output
+    assert "rows/s" in result.output
+
+
+def test_import_cli_unknown_format(tmp_database, tmp_path):
+    data_file = tmp_path / "friends.txt"
+    data_file.write_text("nickname\nfirst\n")
+
+    result = CliRunner().invoke(import_cli, [str(data_file)])
+
+    assert 2 == result.exit_code
+    assert "--format" in result.output
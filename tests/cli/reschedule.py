@@ -0,0 +1,17 @@
+from click.testing import CliRunner
+
+from friends_keeper.cli.reschedule import reschedule_cli
+
+
+def test_reschedule_cli(populated_database):
+    result = CliRunner().invoke(reschedule_cli, ["--seed", "1", "--yes"])
+
+    assert 0 == result.exit_code
+    assert "4 notification events rescheduled and 0 created" in result.output
+
+
+def test_reschedule_cli_aborted(populated_database):
+    result = CliRunner().invoke(reschedule_cli, input="n\n")
+
+    assert 1 == result.exit_code
+    assert "Aborted" in result.output
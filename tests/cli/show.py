@@ -0,0 +1,69 @@
+import json
+
+from unittest import mock
+
+from click.testing import CliRunner
+
+from friends_keeper.cli.show import friends
+from friends_keeper.cli.show import iter_pages
+from friends_keeper.cli.show import notifications
+
+
+def test_show_friends(config_file, populated_database):
+    result = CliRunner().invoke(friends, ["--limit", "3"])
+
+    assert 0 == result.exit_code
+    assert "Friends in database" in result.output
+    assert "nickname3" in result.output
+    assert "nickname4" not in result.output
+    assert "--after 3" in result.output
+
+
+def test_show_friends_csv(config_file, populated_database):
+    result = CliRunner().invoke(friends, ["--after", "2", "--format", "csv", "--show-inactive", "true"])
+
+    assert 0 == result.exit_code
+    assert ["id,nickname,min_days,max_days,active", "3,nickname3,2,4,True"] == result.output.splitlines()[:2]
+    assert 4 == len(result.output.splitlines())
+
+
+def test_show_friends_empty(config_file, tmp_database):
+    result = CliRunner().invoke(friends, [])
+
+    assert 0 == result.exit_code
+    assert "No friends found." in result.output
+
+
+def test_show_notifications_jsonl(config_file, populated_database):
+    result = CliRunner().invoke(notifications, ["--format", "jsonl"])
+    rows = [json.loads(line) for line in result.output.splitlines()]
+
+    assert 0 == result.exit_code
+    assert [10, 8, 9, 6, 7] == [row["id"] for row in rows]
+    assert "nickname5" == rows[0]["nickname"]
+
+
+def test_show_friend_notifications(config_file, populated_database):
+    result = CliRunner().invoke(notifications, ["--friend-id", "1"])
+
+    assert 0 == result.exit_code
+    assert "Coming notifications events:" in result.output
+    assert 2 == result.output.count("nickname1")
+
+
+@mock.patch("friends_keeper.cli.show.DEFAULT_PAGE_SIZE", 2)
+def test_iter_pages():
+    get_page = mock.Mock(side_effect=[[mock.Mock(id=1), mock.Mock(id=2)], [mock.Mock(id=3)]])
+    pages = list(iter_pages(get_page, after=None, limit=None))
+
+    assert [2, 1] == [len(page) for page in pages]
+    assert [mock.call(after=None, limit=2), mock.call(after=2, limit=2)] == get_page.call_args_list
+
+
+@mock.patch("friends_keeper.cli.show.DEFAULT_PAGE_SIZE", 2)
+def test_iter_pages_limit():
+    get_page = mock.Mock(side_effect=[[mock.Mock(id=4), mock.Mock(id=5)], [mock.Mock(id=6)]])
+    pages = list(iter_pages(get_page, after=3, limit=3))
+
+    assert [2, 1] == [len(page) for page in pages]
+    assert [mock.call(after=3, limit=2), mock.call(after=5, limit=1)] == get_page.call_args_list
@@ -1,16 +1,118 @@
 from datetime import datetime
+from datetime import timedelta
+from unittest import mock
 
 import pytest
+import yaml
 
 from sqlalchemy import create_engine
+from sqlalchemy import insert
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 from sqlalchemy.orm import scoped_session
 from sqlalchemy.orm import sessionmaker
 
 from friends_keeper.constants import DEFAULT_CONFIGURATION
 from friends_keeper.database import base_database
+from friends_keeper.database import configure_database
+from friends_keeper.database import dispose_database
 from friends_keeper.database.friends import Friend
+from friends_keeper.database.migrations import upgrade_database
 from friends_keeper.database.notifications import NotificationEvent
+from friends_keeper.utils import clear_configuration_cache
+
+
+@pytest.fixture(autouse=True)
+def configuration_cache():
+    """Make sure every test starts without any cached configuration."""
+    clear_configuration_cache()
+    yield
+    clear_configuration_cache()
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    """Configuration file within a temporary directory used instead of the repository one."""
+    configuration = {
+        "logging": {"path": str(tmp_path / "friends_keeper.log"), "debug_level": "ERROR"},
+        "notifications": {"type": ["file"], "title": "Title"},
+        "notifiers": {"file": {"path": str(tmp_path / "notifications.txt")}},
+    }
+    config_file_path = tmp_path / "config.yaml"
+    config_file_path.write_text(yaml.safe_dump(configuration))
+
+    with mock.patch("friends_keeper.utils.CONFIGURATION_FILE_PATH", str(config_file_path)):
+        yield config_file_path
+
+
+@pytest.fixture
+def tmp_database(tmp_path):
+    """Application database within a temporary directory, disposed after the test."""
+    engine = configure_database({"database": {"url": f"sqlite:///{tmp_path / 'friends_keeper.db'}"}})
+    upgrade_database(engine)
+
+    yield engine
+
+    dispose_database()
+
+
+@pytest.fixture
+def populated_database(tmp_database):
+    """Temporary database with 5 friends, the last one inactive, and 2 notification events per friend.
+
+    Every friend has an already notified event from yesterday and a pending one
+    within the next days, friend 1 being the last one due.
+    """
+    today = datetime.today().date()
+
+    with tmp_database.begin() as connection:
+        connection.execute(
+            insert(Friend),
+            [
+                {"id": index, "nickname": f"nickname{index}", "min_days": 2, "max_days": 4, "active": index != 5}
+                for index in range(1, 6)
+            ],
+        )
+        connection.execute(
+            insert(NotificationEvent),
+            [
+                {"id": index, "friend_id": index, "date": today - timedelta(days=1), "already_notified": True}
+                for index in range(1, 6)
+            ]
+            + [
+                {
+                    "id": index + 5,
+                    "friend_id": index,
+                    "date": today + timedelta(days=(6 - index) // 2),
+                    "already_notified": False,
+                }
+                for index in range(1, 6)
+            ],
+        )
+
+    yield tmp_database
+
+
+@pytest.fixture
+def overdue_database(populated_database):
+    """Populated database where friend 1 missed 3 runs and friend 2 one.
+
+    Friend 1 overdue events are 11 to 13, the oldest first, and friend 2 one is 14.
+    """
+    today = datetime.today().date()
+
+    with populated_database.begin() as connection:
+        connection.execute(
+            insert(NotificationEvent),
+            [
+                {"id": 11, "friend_id": 1, "date": today - timedelta(days=7), "already_notified": False},
+                {"id": 12, "friend_id": 1, "date": today - timedelta(days=3), "already_notified": False},
+                {"id": 13, "friend_id": 1, "date": today - timedelta(days=1), "already_notified": False},
+                {"id": 14, "friend_id": 2, "date": today - timedelta(days=2), "already_notified": False},
+            ],
+        )
+
+    yield populated_database
 
 
 @pytest.fixture(scope="session")
@@ -38,6 +140,19 @@ def db_session_factory(db_engine):
     return scoped_session(sessionmaker(bind=db_engine))
 
 
+@pytest.fixture
+def query_plan(db_engine, tables):
+    """Returns a function giving the SQLite query plan of a query, one line per step."""
+
+    def get_query_plan(query) -> str:
+        sql = str(query.compile(db_engine, compile_kwargs={"literal_binds": True}))
+
+        with db_engine.connect() as connection:
+            return "\n".join(row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+    return get_query_plan
+
+
 @pytest.fixture
 def db_session(db_engine, tables):
     """Returns an sqlalchemy session, and after the test tears down everything properly."""
@@ -72,6 +187,23 @@ def two_notifications():
     return notifications
 
 
+@pytest.fixture
+def two_notifications_with_friends(two_notifications):
+    notifications_with_friends = list()
+
+    for notification in two_notifications:
+        friend = Friend(
+            id=notification.friend_id,
+            nickname=f"nickname{notification.friend_id}",
+            min_days=2,
+            max_days=4,
+            active=True,
+        )
+        notifications_with_friends.append((notification, friend))
+
+    return notifications_with_friends
+
+
 @pytest.fixture
 def friend_list():
     friends = []
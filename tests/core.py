@@ -1,32 +1,235 @@
+import copy
+
+from datetime import datetime
 from unittest import mock
 
 import pytest
 
+from sqlalchemy import select
+
+from friends_keeper.core import catch_up_notifications
+from friends_keeper.core import enqueue_notifications
+from friends_keeper.core import get_due_notifications
 from friends_keeper.core import main_core
+from friends_keeper.core import prepare_database
+from friends_keeper.core import process_notifications_in_batch
+from friends_keeper.database.notifications import NotificationEvent
+from friends_keeper.database.outbox import OutboxMessage
 from friends_keeper.exceptions import ConfigurationError
+from friends_keeper.exceptions import DatabaseError
+from friends_keeper.exceptions import NotifierError
+from friends_keeper.utils.orm.circuit_breakers import get_circuit_breaker
+from friends_keeper.utils.orm.locks import acquire_lock
+from friends_keeper.utils.orm.notifications import claim_notifications
+from friends_keeper.utils.orm.notifications import reschedule_notifications
 
 
-@mock.patch("friends_keeper.core.get_friend")
-@mock.patch("friends_keeper.notifiers.base.get_friend")
-@mock.patch("friends_keeper.core.get_today_notifications")
+@pytest.fixture(autouse=True)
+def prepare_database_mocked(tmp_database):
+    with mock.patch("friends_keeper.core.prepare_database") as prepare_database_mocked:
+        yield prepare_database_mocked
+
+
+@pytest.fixture
+def notifier_mock():
+    notifier = mock.Mock(notifier_type="file")
+    notifier.build_notification_messages.side_effect = lambda notifications: [
+        ", ".join(friend.nickname for _, friend in notifications)
+    ]
+    return notifier
+
+
+def get_outbox_messages(engine) -> list:
+    with engine.connect() as connection:
+        return connection.execute(select(OutboxMessage).order_by(OutboxMessage.id)).all()
+
+
+@mock.patch("friends_keeper.core.reschedule_notifications")
+@mock.patch("friends_keeper.core.get_today_notifications_with_friends")
 @mock.patch("friends_keeper.core.load_configuration_file")
 def test_main_core(
     load_configuration_mocked,
     get_today_notifications,
-    base_get_friend_mocked,
-    orm_get_friend_mocked,
+    reschedule_mocked,
     normal_dumb_config,
-    two_notifications,
-    friend_by_index,
+    two_notifications_with_friends,
 ):
-    base_get_friend_mocked.return_value = friend_by_index
-    orm_get_friend_mocked.return_value = friend_by_index
-    get_today_notifications.return_value = two_notifications
+    get_today_notifications.return_value = two_notifications_with_friends
     load_configuration_mocked.return_value = normal_dumb_config
     main_core(debug_level=0)
 
     assert True == load_configuration_mocked.called
     assert True == get_today_notifications.called
+    assert 1 == reschedule_mocked.call_count
+
+
+@mock.patch("friends_keeper.core.load_configuration_file")
+def test_main_core_timings(load_configuration_mocked, normal_dumb_config, overdue_database, tmp_path):
+    configuration = copy.deepcopy(normal_dumb_config)
+    configuration["notifiers"]["file"]["path"] = str(tmp_path / "notifications.txt")
+    load_configuration_mocked.return_value = configuration
+
+    summary = main_core(debug_level=0, catch_up=True, timings=True)
+
+    for stage in ("load_configuration", "prepare_database", "create_notifiers", "due_notifications", "deliver"):
+        assert stage in summary["spans"]
+
+    assert summary["counters"]["rows_read"] > 0
+    assert summary["counters"]["rows_written"] > 0
+    assert None == main_core(debug_level=0)
+
+
+@mock.patch("friends_keeper.notifiers.resilient.time.sleep")
+@mock.patch("friends_keeper.notifiers.file.FileNotifier.send_message")
+@mock.patch("friends_keeper.core.load_configuration_file")
+def test_main_core_delivery_failed(
+    load_configuration_mocked, send_message_mocked, sleep_mocked, normal_dumb_config, overdue_database
+):
+    load_configuration_mocked.return_value = normal_dumb_config
+    send_message_mocked.side_effect = NotifierError
+    main_core(debug_level=0)
+
+    # Events got rescheduled anyway, their message waits on the outbox for another attempt.
+    assert [] == get_due_notifications()
+    messages = get_outbox_messages(overdue_database)
+    assert ["pending"] == [message.status for message in messages]
+    assert 1 == messages[0].attempts
+    assert datetime.now() < messages[0].next_attempt_at
+    # Every delivery is attempted again right away before counting against the notifier circuit.
+    assert 3 == send_message_mocked.call_count
+    assert 1 == get_circuit_breaker(notifier_type="file").failures
+
+
+@mock.patch("friends_keeper.core.process_notifications_one_by_one")
+@mock.patch("friends_keeper.core.reschedule_notifications")
+@mock.patch("friends_keeper.core.get_today_notifications_with_friends")
+@mock.patch("friends_keeper.core.load_configuration_file")
+def test_main_core_batch_fallback(
+    load_configuration_mocked,
+    get_today_notifications,
+    reschedule_mocked,
+    one_by_one_mocked,
+    normal_dumb_config,
+    two_notifications_with_friends,
+):
+    get_today_notifications.return_value = two_notifications_with_friends
+    load_configuration_mocked.return_value = normal_dumb_config
+    reschedule_mocked.side_effect = DatabaseError
+    main_core(debug_level=0)
+
+    assert True == one_by_one_mocked.called
+    assert two_notifications_with_friends == one_by_one_mocked.call_args[0][0]
+
+
+@mock.patch("friends_keeper.core.get_today_notifications_with_friends")
+@mock.patch("friends_keeper.core.load_configuration_file")
+def test_main_core_run_locked(load_configuration_mocked, get_today_notifications, normal_dumb_config):
+    load_configuration_mocked.return_value = normal_dumb_config
+    acquire_lock(name="run", owner="another run")
+    main_core(debug_level=0)
+
+    assert False == get_today_notifications.called
+
+
+def test_get_due_notifications_claims(overdue_database):
+    assert [10, 11, 12, 13, 14] == [notification.id for notification, _ in get_due_notifications()]
+    # A concurrent run does not get the events already claimed.
+    assert [] == get_due_notifications()
+
+
+def test_enqueue_notifications(notifier_mock, overdue_database):
+    notifications = get_due_notifications()
+    enqueue_notifications(notifiers=[notifier_mock], notifications=notifications)
+
+    assert [] == get_due_notifications()
+    messages = get_outbox_messages(overdue_database)
+    assert ["nickname5, nickname1, nickname1, nickname1, nickname2"] == [message.message for message in messages]
+    assert messages[0].idempotency_key.startswith("file-")
+
+
+@mock.patch("friends_keeper.core.process_notifications")
+def test_enqueue_notifications_releases_claims(process_mocked, notifier_mock, overdue_database):
+    process_mocked.side_effect = DatabaseError
+    notifications = get_due_notifications()
+
+    with pytest.raises(DatabaseError):
+        enqueue_notifications(notifiers=[notifier_mock], notifications=notifications)
+
+    # The next run gets them right away instead of waiting for the claims to expire.
+    assert [10, 11, 12, 13, 14] == [notification.id for notification, _ in get_due_notifications()]
+
+
+@mock.patch("friends_keeper.core.process_notifications_in_batch")
+def test_enqueue_notifications_one_by_one_error(batch_mocked, notifier_mock, overdue_database):
+    batch_mocked.side_effect = DatabaseError
+    notifications = get_due_notifications()
+    # The fallback fails on the second event.
+    calls = iter([reschedule_notifications, mock.Mock(side_effect=DatabaseError)])
+
+    with mock.patch("friends_keeper.core.reschedule_notifications", side_effect=lambda **kwargs: next(calls)(**kwargs)):
+
+        with pytest.raises(DatabaseError):
+            enqueue_notifications(notifiers=[notifier_mock], notifications=notifications)
+
+    # Only the first event made it to the outbox, along with its rescheduling.
+    assert ["nickname5"] == [message.message for message in get_outbox_messages(overdue_database)]
+    notifications = get_due_notifications()
+    assert [11, 12, 13, 14] == [notification.id for notification, _ in notifications]
+
+    # The next run does not write the message of the first event again.
+    batch_mocked.side_effect = process_notifications_in_batch
+    enqueue_notifications(notifiers=[notifier_mock], notifications=notifications)
+    assert ["nickname5", "nickname1, nickname1, nickname1, nickname2"] == [
+        message.message for message in get_outbox_messages(overdue_database)
+    ]
+
+
+@mock.patch("friends_keeper.core.get_today_notifications")
+@mock.patch("friends_keeper.core.get_today_notifications_with_friends")
+def test_get_due_notifications_fallback_releases_claims(get_with_friends_mocked, get_today_mocked, overdue_database):
+    get_with_friends_mocked.side_effect = DatabaseError
+    get_today_mocked.side_effect = DatabaseError
+
+    with pytest.raises(DatabaseError):
+        get_due_notifications()
+
+    assert [10, 11, 12, 13, 14] == sorted(claim_notifications(claim_token="next run"))
+
+
+@mock.patch("friends_keeper.core.get_friends_by_ids")
+@mock.patch("friends_keeper.core.get_today_notifications")
+@mock.patch("friends_keeper.core.get_today_notifications_with_friends")
+def test_get_due_notifications_fallback(
+    get_with_friends_mocked, get_today_mocked, get_friends_mocked, two_notifications, friend_list
+):
+    get_with_friends_mocked.side_effect = DatabaseError
+    get_today_mocked.return_value = two_notifications
+    get_friends_mocked.return_value = friend_list
+    notifications = get_due_notifications()
+
+    assert 1 == get_friends_mocked.call_count
+    assert list(zip(two_notifications, friend_list)) == notifications
+
+
+@mock.patch("friends_keeper.core.reschedule_notifications")
+def test_process_notifications_in_batch(reschedule_mocked, two_notifications_with_friends):
+    process_notifications_in_batch(two_notifications_with_friends)
+
+    kwargs = reschedule_mocked.call_args.kwargs
+    assert [0, 1] == kwargs["notification_ids"]
+    assert [0, 1] == [notification["friend_id"] for notification in kwargs["next_notifications"]]
+
+
+@mock.patch("friends_keeper.core.reschedule_notifications")
+def test_process_notifications_in_batch_strategy(reschedule_mocked, two_notifications_with_friends):
+    strategy = mock.Mock()
+    strategy.next_dates.return_value = ["first", "second"]
+    process_notifications_in_batch(two_notifications_with_friends, strategy=strategy)
+
+    windows = [(friend.min_days, friend.max_days) for _, friend in two_notifications_with_friends]
+    strategy.next_dates.assert_called_once_with(windows)
+    next_notifications = reschedule_mocked.call_args.kwargs["next_notifications"]
+    assert ["first", "second"] == [notification["date"] for notification in next_notifications]
 
 
 @mock.patch("friends_keeper.core.get_today_notifications")
@@ -43,19 +246,23 @@ def test_main_core_abnormal1(load_configuration_mocked, get_today_notifications)
 
 
 @mock.patch("friends_keeper.core.NotifierFactory")
-@mock.patch("friends_keeper.core.get_today_notifications")
+@mock.patch("friends_keeper.core.get_today_notifications_with_friends")
 @mock.patch("friends_keeper.core.load_configuration_file")
 def test_main_core_abnormal2(
-    load_configuration_mocked, get_today_notifications, notifier_factory_mocked, normal_dumb_config, two_notifications
+    load_configuration_mocked,
+    get_today_notifications,
+    notifier_factory_mocked,
+    normal_dumb_config,
+    two_notifications_with_friends,
 ):
     notifier_factory_mocked.get_notifiers.side_effect = NotImplementedError
-    get_today_notifications.return_value = two_notifications
+    get_today_notifications.return_value = two_notifications_with_friends
     load_configuration_mocked.return_value = normal_dumb_config
     main_core(debug_level=0)
     pytest.raises(NotImplementedError)
 
 
-@mock.patch("friends_keeper.core.get_today_notifications")
+@mock.patch("friends_keeper.core.get_today_notifications_with_friends")
 @mock.patch("friends_keeper.core.load_configuration_file")
 def test_main_core_abnormal_no_notifications(load_configuration_mocked, get_today_notifications, normal_dumb_config):
     get_today_notifications.return_value = []
@@ -64,3 +271,71 @@ def test_main_core_abnormal_no_notifications(load_configuration_mocked, get_toda
 
     assert True == load_configuration_mocked.called
     assert True == get_today_notifications.called
+
+
+@mock.patch("friends_keeper.core.configure_database")
+def test_prepare_database(configure_database_mocked, normal_dumb_config):
+    prepare_database(configuration=normal_dumb_config)
+    configure_database_mocked.assert_called_once_with(configuration=normal_dumb_config)
+
+
+@mock.patch("friends_keeper.core.configure_database")
+def test_prepare_database_abnormal(configure_database_mocked, normal_dumb_config):
+    configure_database_mocked.side_effect = DatabaseError
+    with pytest.raises(DatabaseError):
+        prepare_database(configuration=normal_dumb_config)
+
+
+def test_catch_up_notifications(notifier_mock, overdue_database):
+    assert 3 == catch_up_notifications(notifiers=[notifier_mock], chunk_size=2)
+    assert 2 == notifier_mock.build_notification_messages.call_count
+    first_notifications = notifier_mock.build_notification_messages.call_args_list[0].kwargs["notifications"]
+    assert [(11, 1), (14, 2)] == [(event.id, friend.id) for event, friend in first_notifications]
+    assert ["nickname1, nickname2", "nickname5"] == [
+        message.message for message in get_outbox_messages(overdue_database)
+    ]
+
+    with overdue_database.connect() as connection:
+        pending = connection.execute(
+            select(NotificationEvent.friend_id, NotificationEvent.date).where(
+                NotificationEvent.already_notified == False  # noqa: E712
+            )
+        ).all()
+
+    # Every friend kept its upcoming event and the overdue ones got coalesced into a single next event.
+    assert all(date > datetime.today().date() for _, date in pending)
+    assert [1, 1, 2, 2, 3, 4, 5] == sorted(friend_id for friend_id, _ in pending)
+
+
+def test_catch_up_notifications_claimed_by_another_run(notifier_mock, overdue_database):
+    claim_notifications(claim_token="another run", notification_ids=[11, 12, 13])
+
+    assert 2 == catch_up_notifications(notifiers=[notifier_mock], chunk_size=1)
+    assert ["nickname2", "nickname5"] == [message.message for message in get_outbox_messages(overdue_database)]
+
+
+@mock.patch("friends_keeper.core.reschedule_notifications")
+def test_catch_up_notifications_releases_claims(reschedule_mocked, notifier_mock, overdue_database):
+    reschedule_mocked.side_effect = DatabaseError
+
+    with pytest.raises(DatabaseError):
+        catch_up_notifications(notifiers=[notifier_mock], chunk_size=2)
+
+    assert [10, 11, 12, 13, 14] == sorted(claim_notifications(claim_token="next run"))
+
+
+@mock.patch("friends_keeper.core.catch_up_notifications")
+@mock.patch("friends_keeper.core.get_next_notification_date")
+@mock.patch("friends_keeper.core.load_configuration_file")
+def test_main_core_catch_up(load_configuration_mocked, get_next_date_mocked, catch_up_mocked, normal_dumb_config):
+    load_configuration_mocked.return_value = normal_dumb_config
+    get_next_date_mocked.return_value = datetime.today().date()
+    main_core(debug_level=0, catch_up=True, chunk_size=5)
+
+    assert 5 == catch_up_mocked.call_args.kwargs["chunk_size"]
+
+    catch_up_mocked.reset_mock()
+    get_next_date_mocked.return_value = None
+    main_core(debug_level=0, catch_up=True)
+
+    assert False == catch_up_mocked.called
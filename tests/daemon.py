@@ -0,0 +1,225 @@
+import threading
+import time
+import urllib.request
+
+from datetime import datetime
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+
+from sqlalchemy import insert
+
+from friends_keeper.daemon import FriendsKeeperDaemon
+from friends_keeper.database import dispose_database
+from friends_keeper.database import get_engine
+from friends_keeper.database.friends import Friend
+from friends_keeper.database.notifications import NotificationEvent
+from friends_keeper.exceptions import ConfigurationError
+from friends_keeper.exceptions import DatabaseError
+from friends_keeper.utils.orm.locks import acquire_lock
+from friends_keeper.utils.orm.notifications import claim_notifications
+
+
+@pytest.fixture
+def daemon():
+    daemon_ = FriendsKeeperDaemon(poll_interval=0.01, retry_interval=60)
+    daemon_.running = True
+    yield daemon_
+    daemon_.close()
+
+
+def test_get_wake_time(daemon):
+    today = datetime.today().date()
+
+    daemon.next_date = None
+    assert daemon.get_wake_time() is None
+
+    daemon.next_date = today + timedelta(days=2)
+    assert datetime.combine(today + timedelta(days=2), datetime.min.time()) == daemon.get_wake_time()
+
+    daemon.next_date = today
+    assert datetime.now() + timedelta(seconds=50) < daemon.get_wake_time()
+
+
+def test_get_wake_time_outbox_retry(daemon):
+    today = datetime.today().date()
+    next_attempt = datetime.now() + timedelta(hours=2)
+
+    # Messages waiting for another attempt wake the daemon up before the next event.
+    daemon.next_date = today + timedelta(days=2)
+    daemon.next_attempt = next_attempt
+    assert next_attempt == daemon.get_wake_time()
+
+    daemon.next_date = None
+    assert next_attempt == daemon.get_wake_time()
+
+    # But not after it.
+    daemon.next_date = today + timedelta(days=2)
+    daemon.next_attempt = datetime.combine(today + timedelta(days=3), datetime.min.time())
+    assert datetime.combine(today + timedelta(days=2), datetime.min.time()) == daemon.get_wake_time()
+
+    # Messages left behind already due are not retried right away.
+    daemon.next_attempt = datetime.now() - timedelta(minutes=1)
+    assert datetime.now() + timedelta(seconds=50) < daemon.get_wake_time()
+
+
+@mock.patch("friends_keeper.daemon.get_next_notification_date")
+@mock.patch("friends_keeper.daemon.enqueue_notifications")
+@mock.patch("friends_keeper.daemon.get_due_notifications")
+def test_run_pending(
+    get_due_mocked, notify_mocked, get_next_date_mocked, daemon, two_notifications_with_friends, tmp_database
+):
+    next_date = datetime.today().date() + timedelta(days=3)
+    get_due_mocked.return_value = two_notifications_with_friends
+    get_next_date_mocked.return_value = next_date
+
+    assert 2 == daemon.run_pending()
+    notify_mocked.assert_called_once_with(
+        notifiers=daemon.notifiers, notifications=two_notifications_with_friends, strategy=daemon.strategy
+    )
+    assert next_date == daemon.next_date
+
+
+@mock.patch("friends_keeper.daemon.get_next_outbox_attempt")
+@mock.patch("friends_keeper.daemon.get_next_notification_date")
+@mock.patch("friends_keeper.daemon.drain_outbox")
+@mock.patch("friends_keeper.daemon.get_due_notifications")
+def test_run_pending_outbox_retry(get_due_mocked, drain_mocked, get_next_date_mocked, get_next_attempt_mocked, daemon):
+    get_due_mocked.return_value = []
+    next_date = datetime.today().date() + timedelta(days=3)
+    next_attempt = datetime.now() + timedelta(minutes=5)
+    get_next_date_mocked.return_value = next_date
+    get_next_attempt_mocked.return_value = next_attempt
+
+    with mock.patch("friends_keeper.daemon.hold_lock"):
+        assert 0 == daemon.run_pending()
+
+    assert 1 == drain_mocked.call_count
+    # The daemon sleeps until the messages are due for another attempt, not the retry interval.
+    assert (next_date, next_attempt) == (daemon.next_date, daemon.next_attempt)
+    assert next_attempt == daemon.get_wake_time()
+
+
+@mock.patch("friends_keeper.daemon.enqueue_notifications")
+@mock.patch("friends_keeper.daemon.get_due_notifications")
+def test_run_pending_abnormal(get_due_mocked, notify_mocked, daemon, tmp_database):
+    get_due_mocked.side_effect = DatabaseError
+
+    assert 0 == daemon.run_pending()
+    assert False == notify_mocked.called
+    assert datetime.today().date() == daemon.next_date
+
+
+@mock.patch("friends_keeper.core.process_notifications")
+def test_run_pending_releases_claims(process_mocked, daemon, overdue_database):
+    process_mocked.side_effect = DatabaseError
+
+    assert 0 == daemon.run_pending()
+    assert datetime.today().date() == daemon.next_date
+    # Claims were released, so the retry does not wait for them to expire.
+    assert [10, 11, 12, 13, 14] == sorted(claim_notifications(claim_token="next run"))
+
+
+@mock.patch("friends_keeper.daemon.get_due_notifications")
+def test_run_pending_locked(get_due_mocked, daemon, tmp_database):
+    acquire_lock(name="run", owner="another run")
+
+    assert 0 == daemon.run_pending()
+    assert False == get_due_mocked.called
+    assert datetime.today().date() == daemon.next_date
+
+
+def test_sleep_until_wake_time(daemon, tmp_database):
+    start = time.monotonic()
+    daemon.sleep(datetime.now() + timedelta(seconds=0.05))
+    assert 0.05 <= time.monotonic() - start < 1
+
+
+def test_sleep_woken_up_on_reload(daemon):
+    with mock.patch.object(daemon, "reload") as reload_mocked:
+        threading.Timer(0.05, daemon.request_reload).start()
+        daemon.sleep(None)
+
+    assert 1 == reload_mocked.call_count
+
+
+def test_sleep_woken_up_on_configuration_change(daemon):
+    with mock.patch.object(daemon, "configuration_changed", return_value=True), mock.patch.object(
+        daemon, "reload"
+    ) as reload_mocked:
+        daemon.sleep(datetime.now() + timedelta(days=1))
+
+    assert 1 == reload_mocked.call_count
+
+
+@mock.patch("friends_keeper.daemon.get_next_notification_date")
+def test_sleep_woken_up_on_earlier_notification(get_next_date_mocked, daemon):
+    today = datetime.today().date()
+    daemon.next_date = today + timedelta(days=5)
+    get_next_date_mocked.return_value = today
+
+    with mock.patch.object(daemon, "configuration_changed", return_value=False):
+        daemon.sleep(datetime.now() + timedelta(days=1))
+
+    assert 1 == get_next_date_mocked.call_count
+
+
+@mock.patch("friends_keeper.daemon.load_configuration_file")
+def test_reload_abnormal(load_configuration_mocked, daemon, config_file):
+    load_configuration_mocked.side_effect = ConfigurationError
+
+    with pytest.raises(ConfigurationError):
+        daemon.reload()
+
+    daemon.configuration = {"previous": True}
+    daemon.reload()
+    assert {"previous": True} == daemon.configuration
+
+
+def test_serve(config_file, tmp_path):
+    today = datetime.today().date()
+    daemon = FriendsKeeperDaemon(poll_interval=0.01, retry_interval=60)
+    daemon.reload()
+
+    with get_engine().begin() as connection:
+        connection.execute(insert(Friend), [{"id": 1, "nickname": "nickname", "min_days": 2, "max_days": 4}])
+        connection.execute(insert(NotificationEvent), [{"friend_id": 1, "date": today, "already_notified": False}])
+
+    with mock.patch.object(daemon, "install_signal_handlers"):
+        thread = threading.Thread(target=daemon.serve)
+        thread.start()
+
+        for _ in range(100):
+
+            if daemon.next_date is not None and daemon.next_date > today:
+                break
+
+            time.sleep(0.01)
+
+        daemon.stop()
+        thread.join(timeout=5)
+
+    dispose_database()
+
+    assert False == thread.is_alive()
+    assert today < daemon.next_date
+    assert "nickname" in (tmp_path / "notifications.txt").read_text()
+
+
+@mock.patch("friends_keeper.daemon.get_due_notifications")
+def test_run_pending_metrics(get_due_mocked, daemon, normal_dumb_config, tmp_database):
+    get_due_mocked.return_value = list()
+    daemon.configuration = {**normal_dumb_config, "metrics": {"port": 0}}
+    daemon.start_metrics()
+    daemon.run_pending()
+    daemon.run_pending()
+
+    with urllib.request.urlopen(f"http://127.0.0.1:{daemon.metrics_server.server_address[1]}/metrics") as response:
+        lines = response.read().decode().splitlines()
+
+    assert "friends_keeper_runs_total 2" in lines
+    assert any(line.startswith("friends_keeper_db_queries_total ") for line in lines)
+
+    daemon.close()
+    assert None == daemon.metrics_server
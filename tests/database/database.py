@@ -0,0 +1,92 @@
+import os
+
+from unittest import mock
+
+import pytest
+
+from sqlalchemy import text
+
+from friends_keeper.database import Session
+from friends_keeper.database import configure_database
+from friends_keeper.database import dispose_database
+from friends_keeper.database import get_database_url
+from friends_keeper.database import get_engine
+from friends_keeper.exceptions import ConfigurationError
+from friends_keeper.exceptions import DatabaseError
+
+
+@pytest.fixture(autouse=True)
+def database():
+    dispose_database()
+    yield
+    dispose_database()
+
+
+def get_pragma(engine, name: str):
+    with engine.connect() as connection:
+        return connection.execute(text(f"PRAGMA {name}")).scalar()
+
+
+@pytest.mark.parametrize(
+    "url,expected",
+    [
+        ("sqlite:///friends_keeper.db", f"sqlite:///{os.path.join('/srv/friends', 'friends_keeper.db')}"),
+        ("sqlite:////data/friends_keeper.db", "sqlite:////data/friends_keeper.db"),
+        ("sqlite://", "sqlite://"),
+        ("sqlite:///:memory:", "sqlite:///:memory:"),
+        ("postgresql://user@localhost/friends", "postgresql://user@localhost/friends"),
+    ],
+)
+def test_get_database_url(url, expected):
+    assert expected == get_database_url(url, base_dir="/srv/friends")
+
+
+def test_configure_database_relative_to_configuration(config_file):
+    engine = configure_database(configuration=dict())
+    assert str(config_file.parent / "friends_keeper.db") == engine.url.database
+
+
+def test_configure_database_pragmas(tmp_path):
+    url = f"sqlite:///{tmp_path / 'friends_keeper.db'}"
+    engine = configure_database(configuration={"database": {"url": url, "pragmas": {"cache_size": -2000}}})
+
+    assert "wal" == get_pragma(engine, "journal_mode")
+    assert 1 == get_pragma(engine, "synchronous")
+    assert 2 == get_pragma(engine, "temp_store")
+    assert -2000 == get_pragma(engine, "cache_size")
+    assert 5000 == get_pragma(engine, "busy_timeout")
+
+
+def test_configure_database_single_engine(tmp_path):
+    configuration = {"database": {"url": f"sqlite:///{tmp_path / 'friends_keeper.db'}"}}
+    engine = configure_database(configuration=configuration)
+
+    assert engine is configure_database(configuration=configuration)
+    assert engine is get_engine()
+    assert engine is Session.kw["bind"]
+
+    configuration["database"]["url"] = f"sqlite:///{tmp_path / 'other.db'}"
+    assert engine is not configure_database(configuration=configuration)
+
+
+def test_configure_database_abnormal():
+    with pytest.raises(DatabaseError):
+        configure_database(configuration={"database": {"url": "not a database url"}})
+
+
+@mock.patch("friends_keeper.utils.load_configuration_file")
+def test_session_configures_database(load_configuration_mocked, tmp_path):
+    load_configuration_mocked.return_value = {"database": {"url": f"sqlite:///{tmp_path / 'friends_keeper.db'}"}}
+
+    with Session() as session:
+        assert 1 == session.execute(text("SELECT 1")).scalar()
+
+    assert 1 == load_configuration_mocked.call_count
+    assert str(tmp_path / "friends_keeper.db") == get_engine().url.database
+
+
+@mock.patch("friends_keeper.utils.load_configuration_file")
+def test_get_engine_without_configuration(load_configuration_mocked, config_file):
+    load_configuration_mocked.side_effect = ConfigurationError
+    engine = get_engine()
+    assert str(config_file.parent / "friends_keeper.db") == engine.url.database
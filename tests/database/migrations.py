@@ -0,0 +1,88 @@
+from datetime import date
+from unittest import mock
+
+import pytest
+
+from sqlalchemy import create_engine
+from sqlalchemy import inspect
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from friends_keeper.database.migrations import upgrade_database
+from friends_keeper.database.notifications import NotificationEvent
+from friends_keeper.exceptions import DatabaseError
+
+
+LEGACY_SCHEMA = (
+    "CREATE TABLE friends (id INTEGER NOT NULL, name VARCHAR, last_name VARCHAR, nickname VARCHAR, "
+    "relationship VARCHAR, min_days INTEGER, max_days INTEGER, active BOOLEAN, PRIMARY KEY (id), UNIQUE (id), "
+    "UNIQUE (nickname))",
+    "CREATE TABLE notifications (id INTEGER NOT NULL, friend_id INTEGER, date DATE, already_notified BOOLEAN, "
+    "PRIMARY KEY (id), UNIQUE (id), FOREIGN KEY(friend_id) REFERENCES friends (id))",
+)
+
+
+@pytest.fixture
+def legacy_engine():
+    engine = create_engine("sqlite://")
+
+    with engine.begin() as connection:
+
+        for statement in LEGACY_SCHEMA:
+            connection.execute(text(statement))
+
+        connection.execute(text("INSERT INTO friends (id, nickname) VALUES (1, 'nickname')"))
+        connection.execute(
+            text("INSERT INTO notifications (friend_id, date, already_notified) VALUES (1, :date, 0)"),
+            {"date": date.today().isoformat()},
+        )
+
+    yield engine
+
+    engine.dispose()
+
+
+def get_column_names(engine) -> set:
+    return {column["name"] for column in inspect(engine).get_columns("notifications")}
+
+
+def get_index_names(engine) -> set:
+    return {index["name"] for index in inspect(engine).get_indexes("notifications")}
+
+
+def test_upgrade_database_creates_missing_indexes(legacy_engine):
+    assert get_index_names(legacy_engine) == set()
+    assert upgrade_database(legacy_engine) is True
+    assert get_index_names(legacy_engine) == {index.name for index in NotificationEvent.__table__.indexes}
+
+    with legacy_engine.connect() as connection:
+        assert connection.execute(text("SELECT count(*) FROM notifications")).scalar() == 1
+
+
+def test_upgrade_database_adds_missing_columns(legacy_engine):
+    assert "claim_token" not in get_column_names(legacy_engine)
+    assert upgrade_database(legacy_engine) is True
+    assert get_column_names(legacy_engine) == {column.name for column in NotificationEvent.__table__.columns}
+    assert inspect(legacy_engine).has_table("locks")
+
+    with legacy_engine.connect() as connection:
+        assert connection.execute(text("SELECT claim_token FROM notifications")).scalar() is None
+
+
+def test_upgrade_database_up_to_date(legacy_engine):
+    upgrade_database(legacy_engine)
+    assert upgrade_database(legacy_engine) is False
+
+
+def test_upgrade_database_new_database():
+    engine = create_engine("sqlite://")
+    assert upgrade_database(engine) is False
+    assert inspect(engine).has_table("friends")
+    assert get_index_names(engine) == {index.name for index in NotificationEvent.__table__.indexes}
+
+
+@mock.patch("friends_keeper.database.migrations.base_database")
+def test_upgrade_database_abnormal(base_database_mock, legacy_engine):
+    base_database_mock.metadata.create_all.side_effect = SQLAlchemyError
+    with pytest.raises(DatabaseError):
+        upgrade_database(legacy_engine)
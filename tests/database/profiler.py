@@ -0,0 +1,160 @@
+from unittest import mock
+
+import pytest
+
+from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from friends_keeper.database import configure_database
+from friends_keeper.database import dispose_database
+from friends_keeper.database.profiler import QueryProfiler
+from friends_keeper.database.profiler import disable_query_profiler
+from friends_keeper.database.profiler import enable_query_profiler
+from friends_keeper.database.profiler import get_query_plan
+from friends_keeper.database.profiler import get_query_profiler
+from friends_keeper.database.profiler import normalize_statement
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE friends (id INTEGER PRIMARY KEY, nickname TEXT)"))
+        connection.execute(text("INSERT INTO friends (id, nickname) VALUES (1, 'one'), (2, 'two')"))
+
+    yield engine
+
+    engine.dispose()
+
+
+@pytest.mark.parametrize(
+    "statement,expected",
+    [
+        ("SELECT id\n  FROM friends\n WHERE id = ?", "SELECT id FROM friends WHERE id = ?"),
+        ("SELECT id FROM friends WHERE id IN (?, ?, ?)", "SELECT id FROM friends WHERE id IN (?, ...)"),
+        ("INSERT INTO friends (id, nickname) VALUES (?, ?)", "INSERT INTO friends (id, nickname) VALUES (?, ...)"),
+    ],
+)
+def test_normalize_statement(statement, expected):
+    assert expected == normalize_statement(statement)
+
+
+def test_query_profiler_counts_statements(engine):
+    profiler = QueryProfiler(slow_query_threshold=60)
+    profiler.attach(engine)
+    profiler.attach(engine)
+
+    with engine.connect() as connection:
+        for friend_id in (1, 2, 1):
+            connection.execute(text("SELECT nickname FROM friends WHERE id = :id"), {"id": friend_id})
+
+        connection.execute(text("SELECT count(*) FROM friends"))
+
+    count, total, maximum = profiler.statements["SELECT nickname FROM friends WHERE id = ?"]
+
+    assert [engine] == profiler.engines
+    assert 3 == count
+    assert 0 < maximum <= total
+    assert 2 == len(profiler.statements)
+    assert 1 == len(profiler.get_top_statements(limit=1))
+    assert 0 == profiler.slow_queries
+    assert profiler.format_summary().startswith("4 statements (2 distinct) took ")
+
+    profiler.detach(engine)
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT count(*) FROM friends"))
+
+    assert [] == profiler.engines
+    assert 4 == sum(stats[0] for stats in profiler.statements.values())
+
+
+def test_query_profiler_logs_slow_query_plan(engine):
+    profiler = QueryProfiler(slow_query_threshold=0)
+    profiler.attach(engine)
+
+    with mock.patch("friends_keeper.database.profiler.logger") as logger:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT nickname FROM friends WHERE id = :id"), {"id": 1})
+
+    message = logger.warning.call_args[0][0]
+
+    assert 1 == profiler.slow_queries
+    assert message.startswith("Slow query took")
+    assert "SELECT nickname FROM friends WHERE id = ?" in message
+    assert "SEARCH friends USING INTEGER PRIMARY KEY" in message
+
+
+def test_query_profiler_failed_statement(engine):
+    profiler = QueryProfiler()
+    profiler.attach(engine)
+
+    with engine.connect() as connection:
+        with pytest.raises(OperationalError):
+            connection.execute(text("SELECT * FROM not_a_table"))
+
+        assert [] == connection.info["friends_keeper_query_start_times"]
+        connection.execute(text("SELECT count(*) FROM friends"))
+
+    assert 1 == len(profiler.statements)
+
+
+def test_get_query_plan(engine):
+    with engine.connect() as connection:
+        assert "SCAN friends" in get_query_plan(connection, "SELECT nickname FROM friends WHERE nickname = ?", ("a",))
+        assert get_query_plan(connection, "PRAGMA journal_mode", ()) is None
+        assert get_query_plan(connection, "SELECT * FROM not_a_table", ()) is None
+
+
+def test_configure_database_attaches_query_profiler(tmp_path):
+    profiler = enable_query_profiler(slow_query_threshold=60)
+
+    try:
+        engine = configure_database({"database": {"url": f"sqlite:///{tmp_path / 'friends_keeper.db'}"}})
+
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+        assert profiler is get_query_profiler()
+        assert [engine] == profiler.engines
+        assert 1 == profiler.statements["SELECT 1"][0]
+
+    finally:
+        disable_query_profiler()
+        dispose_database()
+
+    assert get_query_profiler() is None
+    assert [] == profiler.engines
+
+
+def test_enable_query_profiler_attaches_configured_engine(tmp_database):
+    # The engine already exists when the profiler is enabled.
+    profiler = enable_query_profiler(slow_query_threshold=60)
+
+    try:
+        with tmp_database.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+        assert [tmp_database] == profiler.engines
+        assert 1 == profiler.statements["SELECT 1"][0]
+
+    finally:
+        disable_query_profiler()
+
+    assert [] == profiler.engines
+    assert False == event.contains(tmp_database, "before_cursor_execute", profiler.before_cursor_execute)
+
+
+def test_configure_database_without_query_profiler(tmp_path):
+    with mock.patch("friends_keeper.database.get_query_profiler", return_value=None):
+        engine = configure_database({"database": {"url": f"sqlite:///{tmp_path / 'friends_keeper.db'}"}})
+
+    try:
+        with engine.connect() as connection:
+            assert "friends_keeper_query_start_times" not in connection.info
+
+    finally:
+        dispose_database()
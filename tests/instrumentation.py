@@ -0,0 +1,133 @@
+import json
+
+from unittest import mock
+
+from friends_keeper.instrumentation import Instrumentation
+from friends_keeper.instrumentation import NullInstrumentation
+from friends_keeper.instrumentation import count
+from friends_keeper.instrumentation import format_summary
+from friends_keeper.instrumentation import gauge
+from friends_keeper.instrumentation import get_instrumentation
+from friends_keeper.instrumentation import instrument_run
+from friends_keeper.instrumentation import report_summary
+from friends_keeper.instrumentation import span
+from friends_keeper.metrics import MetricsRegistry
+
+
+def test_instrumentation():
+    instrumentation = Instrumentation(clock=mock.Mock(side_effect=[0, 1, 2, 4, 7, 10]))
+
+    for _ in range(2):
+        with instrumentation.span("stage"):
+            pass
+
+    instrumentation.count("rows_read", 3)
+    instrumentation.count("rows_read")
+    instrumentation.stop()
+    summary = instrumentation.summary()
+
+    assert 10 == summary["duration"]
+    assert {"stage": {"count": 2, "total": 4, "max": 3}} == summary["spans"]
+    assert {"rows_read": 4} == summary["counters"]
+
+
+def test_instrumentation_span_error():
+    instrumentation = Instrumentation()
+
+    try:
+        with instrumentation.span("stage"):
+            raise ValueError()
+    except ValueError:
+        pass
+
+    assert 1 == instrumentation.summary()["spans"]["stage"]["count"]
+
+
+def test_null_instrumentation():
+    instrumentation = NullInstrumentation()
+
+    with instrumentation.span("stage"):
+        instrumentation.count("rows_read")
+
+    assert instrumentation.span("stage") is instrumentation.span("other")
+    assert {} == instrumentation.summary()["spans"]
+    assert {} == instrumentation.summary()["counters"]
+
+
+def test_instrument_run_disabled():
+    with instrument_run(configuration={"instrumentation": {"enabled": False}}) as instrumentation:
+        count("rows_read")
+
+    assert False == instrumentation.enabled
+    assert False == get_instrumentation().enabled
+
+
+def test_instrument_run(tmp_path):
+    summary_path = tmp_path / "summary.json"
+
+    with instrument_run(
+        configuration={"instrumentation": {"enabled": True, "path": str(summary_path)}}
+    ) as instrumentation:
+        assert instrumentation is get_instrumentation()
+
+        with span("stage"):
+            count("rows_read", 2)
+
+    summary = json.loads(summary_path.read_text())
+    assert 1 == summary["spans"]["stage"]["count"]
+    assert {"rows_read": 2} == summary["counters"]
+    assert instrumentation.summary() == summary
+    assert False == get_instrumentation().enabled
+
+
+def test_instrument_run_metrics_textfile(tmp_path):
+    textfile = tmp_path / "friends_keeper.prom"
+
+    with instrument_run(configuration={"metrics": {"textfile": str(textfile)}}) as instrumentation:
+        count("messages_sent.file")
+
+    assert True == instrumentation.enabled
+    lines = textfile.read_text().splitlines()
+    assert 'friends_keeper_messages_sent_total{notifier="file"} 1' in lines
+    assert "friends_keeper_runs_total 1" in lines
+
+
+def test_instrument_run_metrics_registry():
+    registry = MetricsRegistry()
+
+    for _ in range(2):
+        with instrument_run(configuration=None, registry=registry):
+            gauge("due_notifications", 2)
+
+    lines = registry.render().splitlines()
+    assert "friends_keeper_runs_total 2" in lines
+    assert "friends_keeper_due_notifications 2" in lines
+
+
+def test_instrument_run_enabled():
+    with instrument_run(configuration=None, enabled=True) as instrumentation:
+        count("rows_read")
+
+    assert {"rows_read": 1} == instrumentation.summary()["counters"]
+
+
+def test_report_summary_write_error(tmp_path):
+    summary = Instrumentation().summary()
+    report_summary(summary, path=str(tmp_path / "missing" / "summary.json"))
+
+    assert not (tmp_path / "missing").exists()
+
+
+def test_format_summary():
+    summary = {
+        "duration": 1.5,
+        "spans": {"deliver": {"count": 2, "total": 1.25, "max": 1}},
+        "counters": {"messages_sent.file": 3},
+        "gauges": {"due_notifications": 4},
+    }
+    lines = format_summary(summary).splitlines()
+
+    assert "Run finished in 1.500 seconds." == lines[0]
+    assert lines[1].split() == ["deliver", "2", "x", "1.250s", "(max", "1.000s)"]
+    assert lines[2].split() == ["messages_sent.file", "3"]
+    assert lines[3].split() == ["due_notifications", "4"]
@@ -0,0 +1,104 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+from friends_keeper.metrics import MetricsRegistry
+from friends_keeper.metrics import format_labels
+from friends_keeper.metrics import format_value
+from friends_keeper.metrics import get_metrics_registry
+from friends_keeper.metrics import start_metrics_server
+
+
+@pytest.fixture
+def registry():
+    registry_ = MetricsRegistry(buckets=(1, 0.1))
+    registry_.record("deliver", 0.05)
+    registry_.record("deliver", 0.5)
+    registry_.record("notifier.file", 2)
+    registry_.count("rows_read", 3)
+    registry_.count("messages_sent.file")
+    registry_.gauge("due_notifications", 3)
+    return registry_
+
+
+def test_metrics_registry_render(registry):
+    lines = registry.render().splitlines()
+
+    for line in (
+        "# TYPE friends_keeper_rows_read_total counter",
+        "friends_keeper_rows_read_total 3",
+        'friends_keeper_messages_sent_total{notifier="file"} 1',
+        "# TYPE friends_keeper_due_notifications gauge",
+        "friends_keeper_due_notifications 3",
+        "# HELP friends_keeper_stage_duration_seconds Time every run stage took.",
+        "# TYPE friends_keeper_stage_duration_seconds histogram",
+        'friends_keeper_stage_duration_seconds_bucket{stage="deliver",le="0.1"} 1',
+        'friends_keeper_stage_duration_seconds_bucket{stage="deliver",le="1"} 2',
+        'friends_keeper_stage_duration_seconds_bucket{stage="deliver",le="+Inf"} 2',
+        'friends_keeper_stage_duration_seconds_sum{stage="deliver"} 0.55',
+        'friends_keeper_stage_duration_seconds_count{stage="deliver"} 2',
+        'friends_keeper_notifier_duration_seconds_bucket{notifier="file",le="1"} 0',
+        'friends_keeper_notifier_duration_seconds_count{notifier="file"} 1',
+    ):
+        assert line in lines
+
+
+def test_metrics_registry_observe_run(registry):
+    registry.observe_run({"duration": 0.5})
+    registry.observe_run({"duration": 0.5})
+    lines = registry.render().splitlines()
+
+    assert "friends_keeper_runs_total 2" in lines
+    assert "friends_keeper_run_duration_seconds_count 2" in lines
+    assert any(line.startswith("friends_keeper_last_run_timestamp_seconds ") for line in lines)
+
+
+def test_write_textfile(registry, tmp_path):
+    textfile = tmp_path / "friends_keeper.prom"
+    registry.write_textfile(str(textfile))
+
+    assert registry.render() == textfile.read_text()
+    assert ["friends_keeper.prom"] == [path.name for path in tmp_path.iterdir()]
+
+
+def test_write_textfile_error(registry, tmp_path):
+    registry.write_textfile(str(tmp_path / "missing" / "friends_keeper.prom"))
+
+    assert not (tmp_path / "missing").exists()
+
+
+def test_get_metrics_registry():
+    assert None == get_metrics_registry(configuration=None)
+    assert None == get_metrics_registry(configuration={"metrics": {"buckets": [1]}})
+    assert (0.5, 1) == get_metrics_registry(configuration={"metrics": {"port": 0, "buckets": [1, 0.5]}}).buckets
+
+
+def test_start_metrics_server(registry):
+    server = start_metrics_server(registry=registry, port=0)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        with urllib.request.urlopen(f"{url}/metrics") as response:
+            assert 200 == response.status
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert registry.render() == response.read().decode()
+
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{url}/other")
+
+        assert 404 == error.value.code
+
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_format_labels():
+    assert "" == format_labels(())
+    assert '{notifier="fi\\"le\\\\\\n",le="1"}' == format_labels((("notifier", 'fi"le\\\n'), ("le", "1")))
+
+
+@pytest.mark.parametrize("value, expected", [(3, "3"), (1.0, "1"), (0.25, "0.25")])
+def test_format_value(value, expected):
+    assert expected == format_value(value)
@@ -1,13 +1,29 @@
-from unittest import mock
+import copy
+
+from datetime import date
 
 import pytest
 
 from pytest import fail
 
 from friends_keeper.constants import DEFAULT_CONFIGURATION
+from friends_keeper.database.friends import Friend
+from friends_keeper.database.notifications import NotificationEvent
 from friends_keeper.notifiers.base import BaseNotifier
 
 
+class DumbNotifier(BaseNotifier):
+    def send_message(self, message, idempotency_key=None):
+        pass
+
+
+def get_notifications_with_friends(nicknames):
+    return [
+        (NotificationEvent(id=index, friend_id=index, date=date.today()), Friend(id=index, nickname=nickname))
+        for index, nickname in enumerate(nicknames)
+    ]
+
+
 def test_base_notifier_instantiation():
     try:
         BaseNotifier({})
@@ -43,30 +59,70 @@ def test_base_notifier_title_empty():
     assert notifier.title == "Friends keeper notification"
 
 
-@mock.patch("friends_keeper.notifiers.base.get_friend")
-def test_build_notification_message(get_friend_mock, two_notifications, friend_by_index):
-    get_friend_mock.return_value = friend_by_index
+def test_build_notification_message(two_notifications_with_friends):
     notifier = BaseNotifier
     notifier.__init__(notifier, configuration=DEFAULT_CONFIGURATION)
-    result = notifier.build_notification_message(notifier, notifications=two_notifications)
-    assert True == get_friend_mock.called
-    assert friend_by_index.nickname in result
+    result = notifier.build_notification_message(notifier, notifications=two_notifications_with_friends)
+    for _, friend in two_notifications_with_friends:
+        assert friend.nickname in result
 
 
-@mock.patch("friends_keeper.notifiers.base.get_friend")
-def test_build_notification_message_from_configuration(get_friend_mock, two_notifications, friend_by_index):
+def test_build_notification_message_from_configuration(two_notifications_with_friends):
     configuration = DEFAULT_CONFIGURATION
     configuration["notifications"]["message"] = "Test {action} with a {friend_name}"
-    get_friend_mock.return_value = friend_by_index
     notifier = BaseNotifier
     notifier.__init__(notifier, configuration=configuration)
-    result = notifier.build_notification_message(notifier, notifications=two_notifications)
-    assert True == get_friend_mock.called
-    assert friend_by_index.nickname in result
+    result = notifier.build_notification_message(notifier, notifications=two_notifications_with_friends)
+    assert "nickname0, nickname1" in result
 
 
-def test_base_notifier_notify():
+def test_base_notifier_send_message():
     notifier = BaseNotifier
     notifier.__init__(notifier, configuration=DEFAULT_CONFIGURATION)
-    result = notifier.notify(notifier, message="")
+    result = notifier.send_message(notifier, message="")
     assert result == None
+
+
+def test_build_notification_messages_split():
+    configuration = copy.deepcopy(DEFAULT_CONFIGURATION)
+    configuration["notifications"]["message"] = "{action} {friend_name}"
+    configuration["notifications"]["max_message_length"] = 30
+    notifier = DumbNotifier(configuration=configuration)
+    nicknames = [f"nickname{index}" for index in range(10)]
+    messages = notifier.build_notification_messages(get_notifications_with_friends(nicknames))
+
+    assert 5 == len(messages)
+    assert all(len(message) <= 30 for message in messages)
+    assert nicknames == [nickname for message in messages for nickname in message.split(" ", 1)[1].split(", ")]
+
+
+def test_build_notification_messages_long_nickname():
+    configuration = copy.deepcopy(DEFAULT_CONFIGURATION)
+    configuration["notifications"]["max_message_length"] = 10
+    notifier = DumbNotifier(configuration=configuration)
+    messages = notifier.build_notification_messages(get_notifications_with_friends(["a" * 20, "b"]))
+
+    assert 2 == len(messages)
+    assert "a" * 20 in messages[0]
+
+
+def test_build_notification_messages_max_items():
+    class DumbFileNotifier(DumbNotifier):
+        notifier_type = "file"
+
+    configuration = copy.deepcopy(DEFAULT_CONFIGURATION)
+    configuration["notifiers"]["file"]["max_items_per_message"] = 2
+    notifier = DumbFileNotifier(configuration=configuration)
+    messages = notifier.build_notification_messages(get_notifications_with_friends(["a", "b", "c", "d", "e"]))
+
+    assert 3 == len(messages)
+    assert "a, b" in messages[0]
+    assert "e" in messages[2]
+
+
+def test_build_notification_messages_single(two_notifications_with_friends):
+    notifier = DumbNotifier(configuration=copy.deepcopy(DEFAULT_CONFIGURATION))
+    messages = notifier.build_notification_messages(two_notifications_with_friends)
+
+    assert 1 == len(messages)
+    assert "nickname0, nickname1" in messages[0]
@@ -0,0 +1,199 @@
+import copy
+import threading
+import time
+
+from friends_keeper.constants import DEFAULT_CONFIGURATION
+from friends_keeper.database.outbox import OutboxMessage
+from friends_keeper.exceptions import ConfigurationError
+from friends_keeper.exceptions import NotifierError
+from friends_keeper.notifiers.base import BaseNotifier
+from friends_keeper.notifiers.dispatcher import close_notifier
+from friends_keeper.notifiers.dispatcher import deliver_messages
+from friends_keeper.notifiers.dispatcher import is_delivering
+from friends_keeper.notifiers.file import FileNotifier
+
+
+class SleepyNotifier(BaseNotifier):
+    def __init__(self, configuration, sleep_time, timeout, error=None):
+        super().__init__(configuration)
+        self.sleep_time = sleep_time
+        self.timeout = timeout
+        self.error = error
+        self.sent = list()
+        self.flushed = False
+
+    def send_message(self, message, idempotency_key=None):
+        time.sleep(self.sleep_time * (5 if message == "slow" else 1))
+
+        if message == "fail":
+            raise self.error
+
+        self.sent.append((message, idempotency_key))
+
+    def flush(self):
+        self.flushed = True
+
+
+class HungNotifier(BaseNotifier):
+    def __init__(self, configuration):
+        super().__init__(configuration)
+        self.timeout = 0.2
+        self.release = threading.Event()
+        self.closed = threading.Event()
+
+    def send_message(self, message, idempotency_key=None):
+        # Blocks until the test is over, as a backend which never answers.
+        self.release.wait()
+
+    def close(self):
+        self.closed.set()
+
+
+def get_file_notifier(path, **file_configuration):
+    configuration = copy.deepcopy(DEFAULT_CONFIGURATION)
+    configuration["notifiers"]["file"].update(path=str(path), **file_configuration)
+    return FileNotifier(configuration=configuration)
+
+
+def get_outbox_messages(notifier_type, messages):
+    return [
+        OutboxMessage(id=index, notifier_type=notifier_type, idempotency_key=f"key{index}", message=message)
+        for index, message in enumerate(messages)
+    ]
+
+
+def test_deliver_messages_concurrently():
+    notifiers = [SleepyNotifier(DEFAULT_CONFIGURATION, sleep_time=0.2, timeout=5) for _ in range(3)]
+    messages = list()
+
+    for index, notifier in enumerate(notifiers):
+        notifier.notifier_type = f"notifier{index}"
+        messages.extend(get_outbox_messages(notifier.notifier_type, ["first"]))
+
+    start_time = time.monotonic()
+    results = deliver_messages(notifiers=notifiers, messages=messages)
+    elapsed = time.monotonic() - start_time
+
+    assert [None, None, None] == [result.error for result in results]
+    assert elapsed < 0.5
+
+
+def test_deliver_messages(two_notifications_with_friends):
+    notifier = SleepyNotifier(DEFAULT_CONFIGURATION, sleep_time=0, timeout=1)
+    other_notifier = SleepyNotifier(DEFAULT_CONFIGURATION, sleep_time=0, timeout=1)
+    other_notifier.notifier_type = "other"
+    results = deliver_messages(
+        notifiers=[notifier, other_notifier], messages=get_outbox_messages("", ["first", "second"])
+    )
+
+    assert [[0, 1], []] == [result.sent_ids for result in results]
+    assert [("first", "key0"), ("second", "key1")] == notifier.sent
+    assert [None, None] == [result.error for result in results]
+
+
+def test_deliver_messages_error():
+    notifier = SleepyNotifier(DEFAULT_CONFIGURATION, sleep_time=0, timeout=1, error=ValueError("boom"))
+    results = deliver_messages(notifiers=[notifier], messages=get_outbox_messages("", ["first", "fail", "third"]))
+
+    assert [0] == results[0].sent_ids
+    assert [1] == results[0].failed_ids
+    assert isinstance(results[0].error, ValueError)
+    assert True == notifier.flushed
+
+
+def test_deliver_messages_steady():
+    notifier = SleepyNotifier(DEFAULT_CONFIGURATION, sleep_time=0.15, timeout=0.3)
+    results = deliver_messages(notifiers=[notifier], messages=get_outbox_messages("", ["first", "second", "third"]))
+
+    # The timeout applies to every message, not to all of them.
+    assert [0, 1, 2] == results[0].sent_ids
+    assert None == results[0].error
+
+
+def test_deliver_messages_timeout():
+    notifier = SleepyNotifier(DEFAULT_CONFIGURATION, sleep_time=0.15, timeout=0.3)
+    start_time = time.monotonic()
+    results = deliver_messages(notifiers=[notifier], messages=get_outbox_messages("", ["first", "slow", "third"]))
+
+    assert time.monotonic() - start_time < 0.7
+    assert [0] == results[0].sent_ids
+    assert [1, 2] == results[0].failed_ids
+    assert isinstance(results[0].error, NotifierError)
+
+    # The delivery stops once the slow message returns, the messages after it are not sent.
+    time.sleep(0.8)
+    assert ["first", "slow"] == [message for message, _ in notifier.sent]
+    assert False == is_delivering(notifier)
+
+
+def test_deliver_messages_hung_notifier():
+    hung_notifier = HungNotifier(DEFAULT_CONFIGURATION)
+    notifier = SleepyNotifier(DEFAULT_CONFIGURATION, sleep_time=0, timeout=1)
+    notifier.notifier_type = "other"
+    messages = get_outbox_messages("", ["first", "second"]) + get_outbox_messages("other", ["first"])
+    messages[-1].id = 2
+
+    try:
+        start_time = time.monotonic()
+        results = deliver_messages(notifiers=[hung_notifier, notifier], messages=messages)
+
+        # The hung notifier does not hold back the others.
+        assert time.monotonic() - start_time < 1
+        assert ([], [0, 1]) == (results[0].sent_ids, results[0].failed_ids)
+        assert isinstance(results[0].error, NotifierError)
+        assert ([2], None) == (results[1].sent_ids, results[1].error)
+
+        # It is neither used again nor closed until its delivery finishes.
+        results = deliver_messages(notifiers=[hung_notifier], messages=messages[:1])
+        assert ([], []) == (results[0].sent_ids, results[0].failed_ids)
+        assert isinstance(results[0].error, NotifierError)
+        close_notifier(hung_notifier)
+        assert False == hung_notifier.closed.is_set()
+
+    finally:
+        hung_notifier.release.set()
+
+    assert True == hung_notifier.closed.wait(1)
+    assert False == is_delivering(hung_notifier)
+
+
+def test_deliver_messages_buffered(tmp_path):
+    notifier = get_file_notifier(tmp_path / "notifications.txt", flush_size=60, flush_interval=60)
+    results = deliver_messages(notifiers=[notifier], messages=get_outbox_messages("file", ["first", "second"]))
+
+    # Buffered messages count as delivered once the final flush wrote them.
+    assert [0, 1] == results[0].sent_ids
+    assert 2 == len((tmp_path / "notifications.txt").read_text().splitlines())
+
+
+def test_deliver_messages_flush_error(tmp_path):
+    notifier = get_file_notifier(tmp_path / "missing" / "notifications.txt", flush_interval=60)
+    results = deliver_messages(notifiers=[notifier], messages=get_outbox_messages("file", ["first", "second"]))
+
+    assert [] == results[0].sent_ids
+    assert [0, 1] == results[0].failed_ids
+    assert isinstance(results[0].error, ConfigurationError)
+    # Messages that could not be written are dropped, so they are not written twice when attempted again.
+    assert 0 == notifier.buffered_messages()
+
+
+def test_deliver_messages_flush_error_mid_batch(tmp_path):
+    notifier = get_file_notifier(tmp_path / "notifications.txt", flush_size=20, flush_interval=60)
+    messages = get_outbox_messages("file", ["first", "second", "third", "fourth"])
+    write_calls = list()
+
+    def write(data):
+        write_calls.append(data)
+
+        if len(write_calls) == 2:
+            raise OSError("disk full")
+
+    notifier._get_file().write = write
+    results = deliver_messages(notifiers=[notifier], messages=messages)
+
+    # Every message flushes the buffer, the second write fails and the rest are left for the next attempt.
+    assert [0] == results[0].sent_ids
+    assert [1] == results[0].failed_ids
+    assert isinstance(results[0].error, NotifierError)
+    assert 2 == len(write_calls)
+    assert 0 == notifier.buffered_messages()
@@ -1,18 +1,152 @@
+import copy
+import smtplib
+import socket
+
 from unittest import mock
 
+import pytest
+
 from friends_keeper.constants import DEFAULT_CONFIGURATION
+from friends_keeper.exceptions import ConfigurationError
+from friends_keeper.exceptions import NotifierError
 from friends_keeper.notifiers.email import EmailNotifier
 
 
+def get_email_configuration(port=25):
+    configuration = copy.deepcopy(DEFAULT_CONFIGURATION)
+    configuration["notifications"]["title"] = "Friends keeper notification"
+    configuration["notifiers"]["email"] = {
+        "host": "127.0.0.1",
+        "port": port,
+        "password": "super_secret_password",
+        "from_address": "friends_keeper@test.com",
+        "to_address": ["test@test.com", "other@test.com"],
+    }
+    return configuration
+
+
+def authenticate(server, session, envelope, mechanism, auth_data):
+    from aiosmtpd.smtp import AuthResult
+
+    return AuthResult(success=auth_data.password == b"super_secret_password")
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.sessions = list()
+        self.envelopes = list()
+
+    async def handle_DATA(self, server, session, envelope):
+        if not any(known_session is session for known_session in self.sessions):
+            self.sessions.append(session)
+        self.envelopes.append(envelope)
+        return "250 Message accepted for delivery"
+
+
+@pytest.fixture(params=[True], ids=["auth"])
+def smtp_server(request):
+    controller_module = pytest.importorskip("aiosmtpd.controller")
+
+    with socket.socket() as free_socket:
+        free_socket.bind(("127.0.0.1", 0))
+        port = free_socket.getsockname()[1]
+
+    handler = RecordingHandler()
+    auth_options = dict(authenticator=authenticate, auth_require_tls=False) if request.param else dict()
+    controller = controller_module.Controller(handler, hostname="127.0.0.1", port=port, **auth_options)
+    controller.start()
+
+    yield controller, handler
+
+    controller.stop()
+
+
 def test_email_notifier_initialization():
-    notifier = EmailNotifier(configuration=DEFAULT_CONFIGURATION)
+    notifier = EmailNotifier(configuration=get_email_configuration())
     assert notifier.title == "Friends keeper notification"
 
 
-@mock.patch("friends_keeper.notifiers.email.EmailNotifier.build_notification_message")
-def test_email_notify(build_msg_mock, two_notifications):
-    notifier = EmailNotifier(configuration=DEFAULT_CONFIGURATION)
-    build_msg_mock.return_value = "ANY MSG"
-    notifier.build_notification_message = build_msg_mock
-    notifier.notify(two_notifications)
-    assert build_msg_mock.called == True
+def test_email_notifier_default_port():
+    configuration = get_email_configuration()
+    configuration["notifiers"]["email"].pop("port")
+    assert smtplib.SMTP_PORT == EmailNotifier(configuration=configuration).port
+
+    configuration["notifiers"]["email"]["use_ssl"] = True
+    assert smtplib.SMTP_SSL_PORT == EmailNotifier(configuration=configuration).port
+
+
+def test_email_notifier_initialization_abnormal():
+    configuration = copy.deepcopy(DEFAULT_CONFIGURATION)
+    configuration["notifiers"].pop("email", None)
+
+    with pytest.raises(ConfigurationError):
+        EmailNotifier(configuration=configuration)
+
+
+def test_email_send_message_single_connection(smtp_server):
+    controller, handler = smtp_server
+    notifier = EmailNotifier(configuration=get_email_configuration(port=controller.port))
+
+    for message in ["first", "second", "third"]:
+        notifier.send_message(message)
+
+    notifier.close()
+
+    assert 3 == len(handler.envelopes)
+    assert 1 == len(handler.sessions)
+    assert ["test@test.com", "other@test.com"] == handler.envelopes[0].rcpt_tos
+    assert b"second" in handler.envelopes[1].content
+
+
+def test_email_send_message_reconnects(smtp_server):
+    controller, handler = smtp_server
+    notifier = EmailNotifier(configuration=get_email_configuration(port=controller.port))
+    notifier.send_message("first")
+    # Drop the connection under the notifier's feet.
+    notifier._connection.close()
+    notifier.send_message("second")
+    notifier.close()
+
+    assert 2 == len(handler.envelopes)
+    assert 2 == len(handler.sessions)
+
+
+@mock.patch("friends_keeper.notifiers.email.smtplib.SMTP")
+def test_email_send_message_idempotency_key(smtp_mock):
+    notifier = EmailNotifier(configuration=get_email_configuration())
+    notifier.send_message("ANY MSG", idempotency_key="email-key-0")
+
+    email_message = smtp_mock.return_value.send_message.call_args[0][0]
+    assert "<email-key-0@test.com>" == email_message["Message-ID"]
+
+
+@mock.patch("friends_keeper.notifiers.email.smtplib.SMTP")
+def test_email_send_message_abnormal(smtp_mock):
+    smtp_mock.return_value.send_message.side_effect = smtplib.SMTPRecipientsRefused({})
+    notifier = EmailNotifier(configuration=get_email_configuration())
+
+    with pytest.raises(NotifierError):
+        notifier.send_message("ANY MSG")
+
+
+@pytest.mark.parametrize("smtp_server", [False], ids=["no_auth"], indirect=True)
+def test_email_send_message_server_without_auth(smtp_server):
+    controller, handler = smtp_server
+    notifier = EmailNotifier(configuration=get_email_configuration(port=controller.port))
+
+    with pytest.raises(ConfigurationError):
+        notifier.send_message("ANY MSG")
+
+    assert notifier._connection is None
+    assert [] == handler.envelopes
+
+
+def test_email_send_message_without_password(smtp_server):
+    controller, handler = smtp_server
+    configuration = get_email_configuration(port=controller.port)
+    configuration["notifiers"]["email"]["password"] = ""
+    notifier = EmailNotifier(configuration=configuration)
+    notifier.send_message("ANY MSG")
+    notifier.close()
+
+    assert 1 == len(handler.envelopes)
@@ -1,14 +1,26 @@
+import copy
+import gzip
 import os
 
+from datetime import datetime
+from datetime import timedelta
 from unittest import mock
 
 import pytest
 
 from friends_keeper.constants import DEFAULT_CONFIGURATION
 from friends_keeper.exceptions import ConfigurationError
+from friends_keeper.exceptions import NotifierError
+from friends_keeper.notifiers.file import TIMESTAMP_FORMAT
 from friends_keeper.notifiers.file import FileNotifier
 
 
+def get_file_notifier(tmp_path, **file_configuration):
+    configuration = copy.deepcopy(DEFAULT_CONFIGURATION)
+    configuration["notifiers"]["file"].update(path=str(tmp_path / "notifications.txt"), **file_configuration)
+    return FileNotifier(configuration=configuration)
+
+
 def clean_notifications_file():
     if os.path.exists("./notifications.txt"):
         with open("./notifications.txt", "w") as notifications_file:
@@ -29,16 +41,13 @@ def test_file_notifier_initialization():
         ("./test_notification111.txt", "./test_notification111.txt", " - ANY MSG", True),
     ],
 )
-@mock.patch("friends_keeper.notifiers.file.FileNotifier.build_notification_message")
-def test_file_notify(build_msg_mock, two_notifications, file_path, read_file, expected, delete_file):
+def test_file_send_message_path(file_path, read_file, expected, delete_file):
     test_file_path = os.path.abspath(file_path)
     configuration = DEFAULT_CONFIGURATION
     configuration["notifiers"]["file"]["path"] = test_file_path
     notifier = FileNotifier(configuration=configuration)
-    msg = "ANY MSG"
-    build_msg_mock.return_value = msg
-    notifier.build_notification_message = build_msg_mock
-    notifier.notify(two_notifications)
+    notifier.send_message("ANY MSG")
+    notifier.flush()
 
     with open(read_file) as file_obj:
         file_content = file_obj.read()
@@ -49,16 +58,14 @@ def test_file_notify(build_msg_mock, two_notifications, file_path, read_file, ex
         os.remove(read_file)
 
 
-@mock.patch("friends_keeper.notifiers.file.FileNotifier.build_notification_message")
-def test_file_notify_no_file_path(build_msg_mock, two_notifications):
+def test_file_send_message_no_file_path():
     test_file_path = os.path.abspath("./notifications.txt")
     configuration = DEFAULT_CONFIGURATION
     configuration["notifiers"]["file"]["path"] = ""
     notifier = FileNotifier(configuration=configuration)
     msg = "ANY MSG"
-    build_msg_mock.return_value = msg
-    notifier.build_notification_message = build_msg_mock
-    notifier.notify(two_notifications)
+    notifier.send_message(msg)
+    notifier.flush()
 
     with open(test_file_path) as file_obj:
         file_content = file_obj.read()
@@ -69,18 +76,103 @@ def test_file_notify_no_file_path(build_msg_mock, two_notifications):
 
 
 @mock.patch("friends_keeper.notifiers.file.open")
-@mock.patch("friends_keeper.notifiers.file.FileNotifier.build_notification_message")
-def test_file_notify_abnormal(build_msg_mock, open_mock, two_notifications):
+def test_file_send_message_abnormal(open_mock):
     test_file_path = os.path.abspath("./notifications_TO_DELETE.txt")
     configuration = DEFAULT_CONFIGURATION
     configuration["notifiers"]["file"]["path"] = test_file_path
     notifier = FileNotifier(configuration=configuration)
-    msg = "ANY MSG"
     open_mock.side_effect = OSError
-    build_msg_mock.return_value = msg
-    notifier.build_notification_message = build_msg_mock
+    notifier.send_message("ANY MSG")
+
+    with pytest.raises(ConfigurationError):
+        notifier.flush()
+
+
+def test_file_send_message(tmp_path):
+    configuration = copy.deepcopy(DEFAULT_CONFIGURATION)
+    configuration["notifiers"]["file"]["path"] = str(tmp_path / "notifications.txt")
+    notifier = FileNotifier(configuration=configuration)
+    notifier.send_message("first", idempotency_key="file-key-0")
+    notifier.send_message("second")
+    notifier.flush()
+
+    lines = (tmp_path / "notifications.txt").read_text().splitlines()
+    assert [" - first", " - second"] == [line[line.index(" - ") :] for line in lines]
+
+
+def test_file_send_message_buffered(tmp_path):
+    notifier = get_file_notifier(tmp_path, flush_interval=60)
+
+    with mock.patch("friends_keeper.notifiers.file.open", wraps=open) as open_mock:
+        notifier.send_message("first")
+        assert False == (tmp_path / "notifications.txt").exists()
+
+        notifier.flush()
+        notifier.send_message("second")
+        notifier.close()
+
+    # The file is opened once for the lifetime of the notifier.
+    assert 1 == open_mock.call_count
+    assert 2 == len((tmp_path / "notifications.txt").read_text().splitlines())
+
+
+@pytest.mark.parametrize("file_configuration", [{"flush_size": 10, "flush_interval": 60}, {"flush_interval": 0}])
+def test_file_send_message_flush_threshold(tmp_path, file_configuration):
+    notifier = get_file_notifier(tmp_path, **file_configuration)
+    notifier.send_message("first")
+
+    assert 1 == len((tmp_path / "notifications.txt").read_text().splitlines())
+
+
+def test_file_flush_error(tmp_path):
+    notifier = get_file_notifier(tmp_path, flush_interval=60)
+    notifier.send_message("first")
+
+    with mock.patch.object(notifier._get_file(), "write", side_effect=OSError):
+        with pytest.raises(NotifierError):
+            notifier.flush()
+
+    # Messages are dropped, the outbox attempts them again.
+    assert 0 == notifier.buffered_messages()
+    notifier.send_message("second")
+    notifier.flush()
+    assert [" - second"] == [
+        line[line.index(" - ") :] for line in (tmp_path / "notifications.txt").read_text().splitlines()
+    ]
+
+
+def test_file_rotation_size(tmp_path):
+    notifier = get_file_notifier(tmp_path, flush_size=0, rotation={"max_bytes": 60, "backup_count": 2})
+
+    for index in range(4):
+        notifier.send_message(f"message {index} " + "x" * 20)
+
+    notifier.close()
+    assert ["message 3"] == [line[18:27] for line in (tmp_path / "notifications.txt").read_text().splitlines()]
+    assert "message 2" in (tmp_path / "notifications.txt.1").read_text()
+    assert "message 1" in (tmp_path / "notifications.txt.2").read_text()
+    assert False == (tmp_path / "notifications.txt.3").exists()
+
+
+def test_file_rotation_compress(tmp_path):
+    notifier = get_file_notifier(tmp_path, flush_size=0, rotation={"max_bytes": 10, "compress": True})
+    notifier.send_message("first")
+    notifier.send_message("second")
+    notifier.close()
+
+    with gzip.open(tmp_path / "notifications.txt.1.gz", "rt") as gzip_obj:
+        assert "first" in gzip_obj.read()
+
+    assert "second" in (tmp_path / "notifications.txt").read_text()
+
+
+def test_file_rotation_interval(tmp_path):
+    timestamp = (datetime.now() - timedelta(days=2)).strftime(TIMESTAMP_FORMAT)
+    (tmp_path / "notifications.txt").write_text(f"{timestamp} - old\n")
+    notifier = get_file_notifier(tmp_path, flush_size=0, rotation={"interval": 86400})
+    notifier.send_message("new")
+    notifier.send_message("newer")
+    notifier.close()
 
-    try:
-        notifier.notify(two_notifications)
-    except ConfigurationError:
-        pytest.raises(ConfigurationError)
+    assert f"{timestamp} - old\n" == (tmp_path / "notifications.txt.1").read_text()
+    assert 2 == len((tmp_path / "notifications.txt").read_text().splitlines())
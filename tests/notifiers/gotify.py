@@ -1,5 +1,10 @@
+import copy
+import inspect
 import json
+import threading
 
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
 from unittest import mock
 
 import pytest
@@ -10,6 +15,42 @@ from gotify import gotify
 from friends_keeper.constants import DEFAULT_CONFIGURATION
 from friends_keeper.exceptions import ConfigurationError
 from friends_keeper.notifiers.gotify import GotifyNotifier
+from friends_keeper.notifiers.gotify import PooledGotify
+
+
+class StubGotifyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def handle(self):
+        # Called once per TCP connection, requests on a kept-alive connection reuse it.
+        self.server.connections += 1
+        super().handle()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = json.dumps({"id": 1}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_gotify_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubGotifyHandler)
+    server.daemon_threads = True
+    server.connections = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
 
 
 def test_gotify_notifier_initialization_abnormal():
@@ -50,37 +91,89 @@ def test_gotify_notifier_initialization_missing_token():
         assert str(exec_error) == "Gotify app token missing in configuration."
 
 
-@mock.patch("friends_keeper.notifiers.gotify.gotify")
-@mock.patch("friends_keeper.notifiers.gotify.GotifyNotifier.build_notification_message")
-def test_gotify_notify(build_msg_mock, gotify_mock, two_notifications):
+@mock.patch("friends_keeper.notifiers.gotify.PooledGotify.create_message")
+def test_gotify_send_message(create_message_mock):
     configuration = DEFAULT_CONFIGURATION
     configuration["notifiers"]["gotify"] = dict()
     configuration["notifiers"]["gotify"]["app_token"] = "loco_token_that_does_not_work"
     configuration["notifiers"]["gotify"]["url"] = "https://loco_url_that_does_not_work.com"
-    build_msg_mock.return_value = "ANY MSG"
-    gotify_mock_object = mock.MagicMock()
-    gotify_mock_object.create_message.return_value = True
-    gotify_mock.gotify.return_value = gotify_mock_object
+    create_message_mock.return_value = True
+    notifier = GotifyNotifier(configuration=configuration)
+    notifier.send_message("ANY MSG")
+    assert True == create_message_mock.called
+
+
+@mock.patch("friends_keeper.notifiers.gotify.PooledGotify.create_message")
+def test_gotify_send_message_idempotency_key(create_message_mock):
+    configuration = copy.deepcopy(DEFAULT_CONFIGURATION)
+    configuration["notifiers"]["gotify"] = {"app_token": "token", "url": "https://loco_url_that_does_not_work.com"}
+    notifier = GotifyNotifier(configuration=configuration)
+    notifier.send_message("ANY MSG", idempotency_key="gotify-key-0")
+    notifier.close()
+
+    extras = create_message_mock.call_args.kwargs["extras"]
+    assert {"friends_keeper::delivery": {"idempotency_key": "gotify-key-0"}} == extras
+
+
+def test_gotify_notifier_pool_configuration():
+    configuration = copy.deepcopy(DEFAULT_CONFIGURATION)
+    configuration["notifiers"]["gotify"] = {
+        "app_token": "loco_token_that_does_not_work",
+        "url": "https://loco_url_that_does_not_work.com",
+        "pool_size": 2,
+        "connect_timeout": 1,
+        "read_timeout": 3,
+    }
+    notifier = GotifyNotifier(configuration=configuration)
+    adapter = notifier.gotify_obj.session.get_adapter("https://loco_url_that_does_not_work.com")
+    assert 2 == adapter._pool_maxsize
+    assert (1, 3) == notifier.gotify_obj.timeout
+    notifier.close()
+
+
+def test_pooled_gotify_overrides_request():
+    # `_request` is private to the gotify client, make sure the pinned releases still match it.
+    signature = inspect.signature(gotify._request)
+    pooled_signature = inspect.signature(PooledGotify._request)
+
+    assert [(name, parameter.kind) for name, parameter in signature.parameters.items()] == [
+        (name, parameter.kind) for name, parameter in pooled_signature.parameters.items()
+    ]
+    assert callable(getattr(gotify, "_join_urls", None))
+    assert callable(getattr(gotify, "_get_token", None))
+
+
+def test_gotify_notifier_reuses_connections(stub_gotify_server):
+    base_url = f"http://127.0.0.1:{stub_gotify_server.server_address[1]}"
+    messages = 5
+
+    plain_client = gotify(base_url=base_url, app_token="token")
+    for _ in range(messages):
+        plain_client.create_message(message="ANY MSG", title="title", priority=0)
+    plain_connections = stub_gotify_server.connections
+
+    stub_gotify_server.connections = 0
+    configuration = copy.deepcopy(DEFAULT_CONFIGURATION)
+    configuration["notifiers"]["gotify"] = {"app_token": "token", "url": base_url}
     notifier = GotifyNotifier(configuration=configuration)
-    notifier.build_notification_message = build_msg_mock
-    notifier.notify(two_notifications)
+    for _ in range(messages):
+        notifier.send_message("ANY MSG")
+    notifier.close()
+
+    assert messages == plain_connections
+    assert 1 == stub_gotify_server.connections
 
 
 @mock.patch("friends_keeper.notifiers.gotify.gotify")
-@mock.patch("friends_keeper.notifiers.gotify.GotifyNotifier.build_notification_message")
-def test_gotify_notify_abnormal(build_msg_mock, gotify_mock, two_notifications):
+def test_gotify_send_message_abnormal(gotify_mock):
     configuration = DEFAULT_CONFIGURATION
     configuration["notifiers"]["gotify"] = dict()
     configuration["notifiers"]["gotify"]["app_token"] = "loco_token_that_does_not_work"
     configuration["notifiers"]["gotify"]["url"] = "https://loco_url_that_does_not_work.com"
-    build_msg_mock.return_value = "ANY MSG"
     notifier = GotifyNotifier(configuration=configuration)
     notifier.gotify_obj.create_message = mock.Mock(spec=gotify)
     notifier.gotify_obj.create_message.side_effect = GotifyError(
         mock.MagicMock(status_code=200, headers={"content-type": "application/json"}, text=json.dumps({"status": True}))
     )
-    notifier.build_notification_message = build_msg_mock
-    try:
-        notifier.notify(two_notifications)
-    except GotifyError:
-        pytest.raises(GotifyError)
+    with pytest.raises(GotifyError):
+        notifier.send_message("ANY MSG")
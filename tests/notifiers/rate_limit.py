@@ -0,0 +1,51 @@
+import threading
+
+import pytest
+
+from friends_keeper.notifiers.rate_limit import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_burst():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=3, clock=clock)
+
+    assert [0, 0, 0] == [bucket.try_acquire() for _ in range(3)]
+    assert 0.5 == pytest.approx(bucket.try_acquire())
+
+
+def test_token_bucket_refill():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=2, clock=clock)
+    bucket.try_acquire()
+    bucket.try_acquire()
+
+    clock.now = 0.25
+    assert 0.25 == pytest.approx(bucket.try_acquire())
+    clock.now = 0.5
+    assert 0 == bucket.try_acquire()
+    # Idle time never fills the bucket over its burst.
+    clock.now = 100
+    assert [0, 0] == [bucket.try_acquire() for _ in range(2)]
+    assert 0 < bucket.try_acquire()
+
+
+def test_token_bucket_threads():
+    bucket = TokenBucket(rate=0.001, burst=10)
+    taken = list()
+
+    def take():
+        taken.append(bucket.try_acquire() == 0)
+
+    threads = [threading.Thread(target=take) for _ in range(20)]
+    [thread.start() for thread in threads]
+    [thread.join() for thread in threads]
+
+    assert 10 == sum(taken)
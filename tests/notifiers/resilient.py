@@ -0,0 +1,192 @@
+import copy
+import random
+
+from datetime import datetime
+from unittest import mock
+
+import pytest
+
+from friends_keeper.constants import DEFAULT_CONFIGURATION
+from friends_keeper.exceptions import CircuitOpenError
+from friends_keeper.exceptions import NotifierError
+from friends_keeper.exceptions import RateLimitedError
+from friends_keeper.instrumentation import instrument_run
+from friends_keeper.notifiers import NotifierFactory
+from friends_keeper.notifiers.file import FileNotifier
+from friends_keeper.notifiers.rate_limit import TokenBucket
+from friends_keeper.notifiers.resilient import ResilientNotifier
+from friends_keeper.utils.orm.circuit_breakers import get_circuit_breaker
+from friends_keeper.utils.orm.circuit_breakers import record_circuit_breaker_failure
+
+
+@pytest.fixture
+def file_notifier(tmp_path):
+    configuration = copy.deepcopy(DEFAULT_CONFIGURATION)
+    configuration["notifiers"]["file"].update(
+        path=str(tmp_path / "notifications.txt"),
+        retry={"attempts": 3, "backoff": 1, "max_backoff": 2},
+        circuit_breaker={"failure_threshold": 2, "reset_timeout": 60},
+    )
+    notifier = FileNotifier(configuration=configuration)
+    notifier.send_message = mock.Mock()
+    return notifier
+
+
+def test_notifier_factory_wraps_notifiers():
+    notifiers = NotifierFactory.get_notifiers(configuration=DEFAULT_CONFIGURATION)
+
+    assert 1 == len(notifiers)
+    assert isinstance(notifiers[0], ResilientNotifier)
+    assert isinstance(notifiers[0].notifier, FileNotifier)
+    assert "file" == notifiers[0].notifier_type
+
+
+def test_resilient_notifier_initialization(file_notifier):
+    notifier = ResilientNotifier(notifier=file_notifier)
+
+    assert (3, 1, 2) == (notifier.attempts, notifier.backoff, notifier.max_backoff)
+    assert (2, 60) == (notifier.failure_threshold, notifier.reset_timeout)
+    assert file_notifier.timeout == notifier.timeout
+    assert repr(file_notifier) == repr(notifier)
+    assert None == notifier.rate_limiter
+
+    file_notifier.configuration["notifiers"]["file"]["rate_limit"] = {"rate": 2}
+    notifier = ResilientNotifier(notifier=file_notifier)
+    assert (2, 1) == (notifier.rate_limiter.rate, notifier.rate_limiter.burst)
+
+
+def test_get_retry_delay(file_notifier):
+    notifier = ResilientNotifier(notifier=file_notifier, rng=random.Random(0))
+
+    for attempt, cap in ((1, 1), (2, 2), (3, 2), (10, 2)):
+        assert 0 <= notifier.get_retry_delay(attempt=attempt) <= cap
+
+
+@mock.patch("friends_keeper.notifiers.resilient.time.sleep")
+def test_send_message_retries(sleep_mocked, file_notifier, tmp_database):
+    file_notifier.send_message.side_effect = [NotifierError, NotifierError, None]
+    notifier = ResilientNotifier(notifier=file_notifier)
+    notifier.send_message("ANY MSG", idempotency_key="ANY KEY")
+
+    assert 3 == file_notifier.send_message.call_count
+    file_notifier.send_message.assert_called_with("ANY MSG", idempotency_key="ANY KEY")
+    assert 2 == sleep_mocked.call_count
+    assert None == get_circuit_breaker(notifier_type="file")
+
+
+@mock.patch("friends_keeper.notifiers.resilient.time.sleep")
+def test_send_message_opens_circuit(sleep_mocked, file_notifier, tmp_database):
+    file_notifier.send_message.side_effect = ValueError("ANY ERROR")
+    notifier = ResilientNotifier(notifier=file_notifier)
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            notifier.send_message("ANY MSG")
+
+    assert 6 == file_notifier.send_message.call_count
+    assert True == get_circuit_breaker(notifier_type="file").is_open(datetime.now())
+
+    # The endpoint is not called anymore while the circuit is open.
+    with pytest.raises(CircuitOpenError) as error:
+        notifier.send_message("ANY MSG")
+
+    assert 6 == file_notifier.send_message.call_count
+    assert get_circuit_breaker(notifier_type="file").opened_until == error.value.retry_at
+
+
+@mock.patch("friends_keeper.notifiers.resilient.time.sleep")
+def test_send_message_half_open(sleep_mocked, file_notifier, tmp_database):
+    record_circuit_breaker_failure(notifier_type="file", error="ANY ERROR", failure_threshold=1, reset_timeout=0.001)
+    notifier = ResilientNotifier(notifier=file_notifier)
+    notifier.send_message("ANY MSG")
+
+    circuit_breaker = get_circuit_breaker(notifier_type="file")
+    assert (0, None) == (circuit_breaker.failures, circuit_breaker.opened_until)
+
+
+@mock.patch("friends_keeper.notifiers.resilient.reset_circuit_breaker")
+@mock.patch("friends_keeper.notifiers.resilient.get_circuit_breaker", wraps=get_circuit_breaker)
+def test_send_message_caches_circuit(get_circuit_breaker_mocked, reset_mocked, file_notifier, tmp_database):
+    notifier = ResilientNotifier(notifier=file_notifier)
+
+    for _ in range(3):
+        notifier.send_message("ANY MSG")
+
+    # The state is loaded once and never written back while it does not change.
+    assert 1 == get_circuit_breaker_mocked.call_count
+    assert False == reset_mocked.called
+
+    notifier.cache_ttl = 0
+    notifier.send_message("ANY MSG")
+    assert 2 == get_circuit_breaker_mocked.call_count
+
+
+@mock.patch("friends_keeper.notifiers.resilient.time.sleep")
+def test_send_message_cached_circuit_failures(sleep_mocked, file_notifier, tmp_database):
+    file_notifier.send_message.side_effect = [ValueError, ValueError, ValueError, None]
+    notifier = ResilientNotifier(notifier=file_notifier)
+
+    with pytest.raises(ValueError):
+        notifier.send_message("ANY MSG")
+
+    # The failure recorded is kept in memory, so the next delivery closes the circuit.
+    notifier.send_message("ANY MSG")
+    circuit_breaker = get_circuit_breaker(notifier_type="file")
+    assert (0, None) == (circuit_breaker.failures, circuit_breaker.opened_until)
+
+
+@mock.patch("friends_keeper.notifiers.resilient.time.sleep")
+def test_send_message_within_timeout(sleep_mocked, file_notifier, tmp_database):
+    file_notifier.send_message.side_effect = NotifierError
+    file_notifier.timeout = 0.001
+    notifier = ResilientNotifier(notifier=file_notifier, rng=mock.Mock(uniform=mock.Mock(return_value=1)))
+
+    with pytest.raises(NotifierError):
+        notifier.send_message("ANY MSG")
+
+    # Waiting for another attempt would go beyond the notifier timeout.
+    assert 1 == file_notifier.send_message.call_count
+    assert False == sleep_mocked.called
+
+
+@mock.patch("friends_keeper.notifiers.resilient.time.sleep")
+def test_send_message_throttled(sleep_mocked, file_notifier, tmp_database):
+    notifier = ResilientNotifier(notifier=file_notifier)
+    notifier.rate_limiter = mock.Mock(spec=TokenBucket)
+    notifier.rate_limiter.try_acquire.side_effect = [0.5, 0]
+    notifier.send_message("ANY MSG")
+
+    sleep_mocked.assert_called_once_with(0.5)
+    assert 1 == file_notifier.send_message.call_count
+
+
+def test_send_message_rate_limited(file_notifier, tmp_database):
+    notifier = ResilientNotifier(notifier=file_notifier)
+    notifier.rate_limiter = TokenBucket(rate=1 / 3600)
+    notifier.send_message("ANY MSG")
+
+    # Waiting for the next token would take over half the notifier timeout, the message is deferred.
+    with pytest.raises(RateLimitedError) as error:
+        notifier.send_message("ANY MSG")
+
+    assert datetime.now() < error.value.retry_at
+    assert 1 == file_notifier.send_message.call_count
+    assert None == get_circuit_breaker(notifier_type="file")
+
+
+@mock.patch("friends_keeper.notifiers.resilient.time.sleep")
+def test_send_message_instrumented(sleep_mocked, file_notifier, tmp_database):
+    file_notifier.send_message.side_effect = [NotifierError, None, ValueError, ValueError, ValueError]
+    notifier = ResilientNotifier(notifier=file_notifier)
+
+    with instrument_run(enabled=True) as instrumentation:
+        notifier.send_message("ANY MSG")
+
+        with pytest.raises(ValueError):
+            notifier.send_message("ANY MSG")
+
+    summary = instrumentation.summary()
+    assert 2 == summary["spans"]["notifier.file"]["count"]
+    assert (1, 1, 3) == tuple(
+        summary["counters"][name] for name in ("messages_sent.file", "messages_failed.file", "retries.file")
+    )
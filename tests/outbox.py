@@ -0,0 +1,112 @@
+from datetime import datetime
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+
+from sqlalchemy import insert
+from sqlalchemy import select
+
+from friends_keeper.database.outbox import OutboxMessage
+from friends_keeper.exceptions import CircuitOpenError
+from friends_keeper.exceptions import NotifierError
+from friends_keeper.outbox import drain_outbox
+from friends_keeper.outbox import get_retry_delay
+from friends_keeper.outbox import render_outbox_messages
+
+
+def get_notifier_mock(notifier_type, failing_messages=()):
+    notifier = mock.Mock(notifier_type=notifier_type, timeout=1)
+    notifier.buffered_messages.return_value = 0
+    notifier.build_notification_messages.return_value = ["first", "second"]
+
+    def send_message(message, idempotency_key=None):
+        if message in failing_messages:
+            raise NotifierError(message)
+
+    notifier.send_message.side_effect = send_message
+    return notifier
+
+
+@pytest.fixture
+def outbox_database(tmp_database):
+    with tmp_database.begin() as connection:
+        connection.execute(
+            insert(OutboxMessage),
+            [
+                {"notifier_type": notifier_type, "idempotency_key": f"{notifier_type}-{message}", "message": message}
+                for notifier_type in ("file", "gotify")
+                for message in ("first", "second", "third")
+            ],
+        )
+
+    yield tmp_database
+
+
+def get_outbox(engine) -> list:
+    with engine.connect() as connection:
+        return connection.execute(select(OutboxMessage).order_by(OutboxMessage.id)).all()
+
+
+def test_render_outbox_messages(two_notifications_with_friends):
+    notifiers = [get_notifier_mock("file"), get_notifier_mock("gotify")]
+    messages = render_outbox_messages(notifiers=notifiers, notifications=two_notifications_with_friends)
+
+    assert ["file", "file", "gotify", "gotify"] == [message["notifier_type"] for message in messages]
+    assert ["first", "second", "first", "second"] == [message["message"] for message in messages]
+    # Keys only depend on the notification events, so rendering them again gives the same ones.
+    keys = [message["idempotency_key"] for message in messages]
+    assert len(set(keys)) == len(keys)
+    assert keys == [
+        message["idempotency_key"]
+        for message in render_outbox_messages(notifiers, list(reversed(two_notifications_with_friends)))
+    ]
+
+
+def test_get_retry_delay():
+    assert [60, 120, 240, 300] == [
+        get_retry_delay(attempts=attempts, retry_backoff=60, max_retry_backoff=300) for attempts in range(1, 5)
+    ]
+
+
+def test_drain_outbox(outbox_database):
+    notifiers = [get_notifier_mock("file"), get_notifier_mock("gotify")]
+
+    assert 6 == drain_outbox(notifiers=notifiers, configuration={"outbox": {"batch_size": 2}})
+    assert ["sent"] * 6 == [message.status for message in get_outbox(outbox_database)]
+    assert 0 == drain_outbox(notifiers=notifiers)
+
+
+def test_drain_outbox_failed_notifier(outbox_database):
+    notifiers = [get_notifier_mock("file", failing_messages=("second",)), get_notifier_mock("gotify")]
+
+    assert 4 == drain_outbox(notifiers=notifiers, configuration={"outbox": {"batch_size": 2, "retry_backoff": 30}})
+    outbox = get_outbox(outbox_database)
+    assert ["sent", "pending", "pending", "sent", "sent", "sent"] == [message.status for message in outbox]
+    # Only the message that failed counts the attempt, the failed notifier was not tried again afterwards.
+    assert [0, 1, 0] == [message.attempts for message in outbox[:3]]
+    assert "NotifierError('second')" == outbox[1].last_error
+    assert datetime.now() < outbox[1].next_attempt_at
+    assert 2 == notifiers[0].send_message.call_count
+
+    # The message that failed is not attempted again before its backoff, the ones left behind are.
+    assert 1 == drain_outbox(notifiers=notifiers)
+    assert "pending" == get_outbox(outbox_database)[1].status
+
+
+def test_drain_outbox_gives_up(outbox_database):
+    notifiers = [get_notifier_mock("file", failing_messages=("first",))]
+    drain_outbox(notifiers=notifiers, configuration={"outbox": {"max_attempts": 1}})
+
+    assert ["failed", "pending", "pending"] == [message.status for message in get_outbox(outbox_database)[:3]]
+
+
+def test_drain_outbox_circuit_open(outbox_database):
+    retry_at = datetime.now() + timedelta(minutes=5)
+    notifier = get_notifier_mock("file")
+    notifier.send_message.side_effect = CircuitOpenError("open", retry_at=retry_at)
+
+    assert 0 == drain_outbox(notifiers=[notifier])
+    message = get_outbox(outbox_database)[0]
+    # Failing fast does not use up an attempt, the message waits until the circuit closes.
+    assert ("pending", 0, retry_at) == (message.status, message.attempts, message.next_attempt_at)
@@ -0,0 +1,97 @@
+import copy
+import random
+
+from datetime import date
+from datetime import timedelta
+
+import pytest
+
+from friends_keeper.exceptions import ConfigurationError
+from friends_keeper.scheduling import BalancedScheduling
+from friends_keeper.scheduling import RandomScheduling
+from friends_keeper.scheduling import get_scheduling_strategy
+
+
+def test_random_scheduling():
+    today = date(2022, 2, 1)
+    strategy = RandomScheduling(rng=random.Random(0))
+    next_dates = strategy.next_dates([(2, 4)] * 50 + [(10, 11)], today=today)
+
+    assert {today + timedelta(days=2), today + timedelta(days=3)} == set(next_dates[:50])
+    assert today + timedelta(days=10) == next_dates[-1]
+    assert next_dates == RandomScheduling(rng=random.Random(0)).next_dates([(2, 4)] * 50 + [(10, 11)], today=today)
+
+
+def test_random_scheduling_sample_offsets():
+    offsets = RandomScheduling(rng=random.Random(0)).sample_offsets([2] * 100 + [10], [4] * 100 + [11])
+
+    assert {2, 3} == set(offsets[:100])
+    assert 10 == offsets[-1]
+    assert offsets == RandomScheduling(rng=random.Random(0)).sample_offsets([2] * 100 + [10], [4] * 100 + [11])
+
+
+def test_random_scheduling_sample_offsets_numpy():
+    numpy = pytest.importorskip("numpy")
+    min_days = numpy.full(1000, 5)
+    offsets = RandomScheduling(rng=random.Random(0)).sample_offsets(min_days, min_days + 10)
+
+    assert 1000 == len(offsets)
+    assert all(5 <= offset < 15 for offset in offsets)
+
+
+def test_balanced_scheduling_spreads_batch():
+    today = date(2022, 2, 1)
+    strategy = BalancedScheduling(rng=random.Random(0), load_pending=lambda start, end: [])
+    next_dates = strategy.next_dates([(10, 13)] * 30, today=today)
+
+    assert [10, 10, 10] == [next_dates.count(today + timedelta(days=offset)) for offset in range(10, 13)]
+
+
+def test_balanced_scheduling_avoids_loaded_days():
+    today = date(2022, 2, 1)
+    pending = [(today + timedelta(days=1), 10, 11, 3), (today + timedelta(days=3), 10, 11, 1)]
+    strategy = BalancedScheduling(rng=random.Random(0), load_pending=lambda start, end: pending)
+
+    assert [today + timedelta(days=2)] * 2 == strategy.next_dates([(1, 4)] * 2, today=today)
+    assert today + timedelta(days=2) == strategy.next_date(1, 4, today=today)
+
+
+def test_balanced_scheduling_counts_expected_reminders():
+    today = date(2022, 2, 1)
+    # A pending event tomorrow will get its next reminder 3 or 4 days later.
+    pending = [(today + timedelta(days=1), 3, 5, 2)]
+    strategy = BalancedScheduling(rng=random.Random(0), load_pending=lambda start, end: pending)
+
+    next_dates = strategy.next_dates([(2, 6)] * 2, today=today)
+
+    assert [today + timedelta(days=2), today + timedelta(days=3)] == sorted(next_dates)
+
+
+def test_balanced_scheduling_narrow_windows_first():
+    today = date(2022, 2, 1)
+    strategy = BalancedScheduling(rng=random.Random(0), load_pending=lambda start, end: [])
+    next_dates = strategy.next_dates([(5, 7), (5, 6)], today=today)
+
+    assert [today + timedelta(days=6), today + timedelta(days=5)] == next_dates
+
+
+def test_balanced_scheduling_database(populated_database):
+    today = date.today()
+    # Tomorrow and the day after have 2 pending events each, the third day just the expected reminders.
+    assert [today + timedelta(days=3)] == BalancedScheduling().next_dates([(1, 4)])
+
+
+def test_get_scheduling_strategy(normal_dumb_config):
+    configuration = copy.deepcopy(normal_dumb_config)
+    assert isinstance(get_scheduling_strategy(), RandomScheduling)
+    assert isinstance(get_scheduling_strategy(configuration), RandomScheduling)
+
+    configuration["notifications"]["scheduling"] = "balanced"
+    assert isinstance(get_scheduling_strategy(configuration), BalancedScheduling)
+
+
+def test_get_scheduling_strategy_abnormal(normal_dumb_config):
+    configuration = copy.deepcopy(normal_dumb_config)
+    configuration["notifications"]["scheduling"] = "fancy"
+    with pytest.raises(ConfigurationError):
+        get_scheduling_strategy(configuration)
@@ -0,0 +1,60 @@
+import json
+
+from datetime import date
+
+import pytest
+
+from friends_keeper.utils.cli import CSVRowsWriter
+from friends_keeper.utils.cli import JSONLinesRowsWriter
+from friends_keeper.utils.cli import TableRowsWriter
+from friends_keeper.utils.cli import get_rows_writer
+
+
+FIELDS = [("id", "ID"), ("nickname", "Nickname"), ("date", "Date")]
+ROWS = [
+    {"id": 1, "nickname": "first", "date": date(2022, 2, 1), "ignored": True},
+    {"id": 2, "nickname": "second", "date": date(2022, 2, 2), "ignored": True},
+]
+
+
+@pytest.mark.parametrize(
+    "output_format,writer_class", [("table", TableRowsWriter), ("jsonl", JSONLinesRowsWriter), ("csv", CSVRowsWriter)]
+)
+def test_get_rows_writer(output_format, writer_class):
+    assert isinstance(get_rows_writer(output_format, FIELDS), writer_class)
+
+
+def test_table_rows_writer(capsys):
+    writer = TableRowsWriter(FIELDS)
+    writer.write(ROWS[:1])
+    first_output = capsys.readouterr().out
+    writer.write(ROWS[1:])
+    writer.write([])
+    writer.close()
+    lines = (first_output + capsys.readouterr().out).splitlines()
+
+    assert 2 == writer.rows_written
+    assert "| ID | Nickname |   Date   |" == lines[1]
+    assert "01/02/22" in first_output
+    assert 6 == len(lines)
+    assert lines[0] == lines[2] == lines[-1]
+    assert 1 == len({len(line) for line in lines})
+
+
+def test_jsonl_rows_writer(capsys):
+    writer = JSONLinesRowsWriter(FIELDS)
+    writer.write(ROWS)
+    writer.close()
+    lines = capsys.readouterr().out.splitlines()
+
+    assert {"id": 1, "nickname": "first", "date": "2022-02-01"} == json.loads(lines[0])
+    assert 2 == len(lines)
+
+
+def test_csv_rows_writer(capsys):
+    writer = CSVRowsWriter(FIELDS)
+    writer.write(ROWS[:1])
+    writer.write(ROWS[1:])
+    writer.close()
+
+    assert "id,nickname,date\n1,first,2022-02-01\n2,second,2022-02-02\n" == capsys.readouterr().out
@@ -0,0 +1,128 @@
+import json
+
+from unittest import mock
+
+import pytest
+
+from sqlalchemy import func
+from sqlalchemy import select
+
+from friends_keeper.database.friends import Friend
+from friends_keeper.database.notifications import NotificationEvent
+from friends_keeper.utils.importer import chunked
+from friends_keeper.utils.importer import get_file_format
+from friends_keeper.utils.importer import import_friends
+from friends_keeper.utils.importer import validate_friend_row
+
+
+CSV_HEADER = "nickname,name,last_name,relationship,min_days,max_days,active\n"
+
+
+def count(engine, model) -> int:
+    with engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(model)).scalar()
+
+
+def test_import_friends_csv(tmp_database, tmp_path):
+    csv_file = tmp_path / "friends.csv"
+    rows = [f"nickname_{index},name_{index},,friend,5,10,\n" for index in range(1200)]
+    csv_file.write_text(CSV_HEADER + "".join(rows))
+
+    result = import_friends(file_path=str(csv_file), chunk_size=500)
+
+    assert (1200, 1200, 0, 0) == result[:4]
+    assert 1200 == count(tmp_database, Friend)
+    assert 1200 == count(tmp_database, NotificationEvent)
+
+    with tmp_database.connect() as connection:
+        friend = connection.execute(select(Friend).where(Friend.nickname == "nickname_7")).one()
+
+    assert ("name_7", None, "friend", 5, 10, True) == (
+        friend.name,
+        friend.last_name,
+        friend.relationship,
+        friend.min_days,
+        friend.max_days,
+        friend.active,
+    )
+
+
+def test_import_friends_jsonl_skips_invalid_and_repeated(tmp_database, tmp_path):
+    jsonl_file = tmp_path / "friends.jsonl"
+    lines = [
+        json.dumps({"nickname": "first", "min_days": 2, "max_days": 4}),
+        "",
+        json.dumps({"nickname": "first", "min_days": 2, "max_days": 4}),
+        json.dumps({"nickname": "", "min_days": 2, "max_days": 4}),
+        json.dumps({"nickname": "wrong_days", "min_days": 4, "max_days": 2}),
+        "{not json",
+        json.dumps({"nickname": "second", "active": "no"}),
+    ]
+    jsonl_file.write_text("\n".join(lines))
+
+    first_result = import_friends(file_path=str(jsonl_file), chunk_size=2)
+    second_result = import_friends(file_path=str(jsonl_file))
+
+    assert (6, 2, 1, 3) == first_result[:4]
+    assert (6, 0, 3, 3) == second_result[:4]
+    assert 2 == count(tmp_database, Friend)
+    assert 2 == count(tmp_database, NotificationEvent)
+
+
+def test_import_friends_rejects_zero_days(tmp_database, tmp_path):
+    csv_file = tmp_path / "friends.csv"
+    csv_file.write_text(CSV_HEADER + "first,,,,2,4,\nzero,,,,0,30,\n")
+
+    with mock.patch("friends_keeper.utils.importer.logger") as logger:
+        result = import_friends(file_path=str(csv_file))
+
+    assert (2, 1, 0, 1) == result[:4]
+    assert 1 == count(tmp_database, Friend)
+    assert "line 3" in logger.warning.call_args[0][0]
+    assert "min_days" in logger.warning.call_args[0][0]
+
+
+@pytest.mark.parametrize(
+    "row,expected",
+    [
+        ({"nickname": " nick "}, {"nickname": "nick", "min_days": 7, "max_days": 20, "active": True}),
+        ({"nickname": "nick", "min_days": "1", "max_days": "2", "active": "0"}, {"min_days": 1, "active": False}),
+        ({"nickname": "nick", "name": " ", "last_name": "Last"}, {"name": None, "last_name": "Last"}),
+        ({"nickname": "nick", "min_days": "", "max_days": None}, {"min_days": 7, "max_days": 20}),
+    ],
+)
+def test_validate_friend_row(row, expected):
+    friend = validate_friend_row(row)
+    assert expected == {key: friend[key] for key in expected}
+
+
+@pytest.mark.parametrize(
+    "row",
+    [
+        {"name": "no nickname"},
+        {"nickname": "nick", "min_days": "one"},
+        {"nickname": "nick", "min_days": 0, "max_days": 2},
+        {"nickname": "nick", "min_days": 0, "max_days": 30},
+        {"nickname": "nick", "min_days": "0"},
+        {"nickname": "nick", "max_days": 0},
+        {"nickname": "nick", "min_days": -1, "max_days": 30},
+        {"nickname": "nick", "min_days": 3, "max_days": 3},
+        {"nickname": "nick", "active": "maybe"},
+        ["not", "an", "object"],
+    ],
+)
+def test_validate_friend_row_abnormal(row):
+    with pytest.raises(ValueError):
+        validate_friend_row(row)
+
+
+def test_get_file_format():
+    assert "csv" == get_file_format("friends.CSV")
+    assert "jsonl" == get_file_format("friends.ndjson")
+
+    with pytest.raises(ValueError):
+        get_file_format("friends.xlsx")
+
+
+def test_chunked():
+    assert [[0, 1], [2, 3], [4]] == list(chunked(range(5), 2))
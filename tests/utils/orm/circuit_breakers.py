@@ -0,0 +1,71 @@
+from datetime import datetime
+from unittest import mock
+
+import pytest
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from friends_keeper.exceptions import DatabaseError
+from friends_keeper.utils.orm.circuit_breakers import get_circuit_breaker
+from friends_keeper.utils.orm.circuit_breakers import record_circuit_breaker_failure
+from friends_keeper.utils.orm.circuit_breakers import reset_circuit_breaker
+
+
+def test_get_circuit_breaker(tmp_database):
+    assert None == get_circuit_breaker(notifier_type="gotify")
+
+    record_circuit_breaker_failure(notifier_type="gotify", error="ANY ERROR", failure_threshold=3, reset_timeout=60)
+    circuit_breaker = get_circuit_breaker(notifier_type="gotify")
+    assert (1, None, "ANY ERROR") == (
+        circuit_breaker.failures,
+        circuit_breaker.opened_until,
+        circuit_breaker.last_error,
+    )
+    assert False == circuit_breaker.is_open(datetime.now())
+
+
+def test_record_circuit_breaker_failure(tmp_database):
+    opened_until = [
+        record_circuit_breaker_failure(notifier_type="gotify", error="ANY ERROR", failure_threshold=3, reset_timeout=60)
+        for _ in range(4)
+    ]
+
+    assert [None, None] == opened_until[:2]
+    assert datetime.now() < opened_until[2] < opened_until[3]
+    assert True == get_circuit_breaker(notifier_type="gotify").is_open(datetime.now())
+    assert None == get_circuit_breaker(notifier_type="file")
+
+
+def test_record_circuit_breaker_failure_first(tmp_database):
+    assert None != record_circuit_breaker_failure(
+        notifier_type="file", error="ANY ERROR", failure_threshold=1, reset_timeout=60
+    )
+
+
+def test_reset_circuit_breaker(tmp_database):
+    record_circuit_breaker_failure(notifier_type="gotify", error="ANY ERROR", failure_threshold=1, reset_timeout=60)
+
+    assert True == reset_circuit_breaker(notifier_type="gotify")
+    circuit_breaker = get_circuit_breaker(notifier_type="gotify")
+    assert (0, None, None) == (circuit_breaker.failures, circuit_breaker.opened_until, circuit_breaker.last_error)
+
+
+@mock.patch("friends_keeper.utils.orm.circuit_breakers.Session")
+def test_record_circuit_breaker_failure_abnormal(session_mock):
+    session_mock.return_value.__enter__.return_value.execute.side_effect = SQLAlchemyError
+    with pytest.raises(DatabaseError):
+        record_circuit_breaker_failure(notifier_type="gotify", error="ANY ERROR", failure_threshold=1, reset_timeout=60)
+
+
+@mock.patch("friends_keeper.utils.orm.circuit_breakers.Session")
+def test_reset_circuit_breaker_abnormal(session_mock):
+    session_mock.return_value.__enter__.return_value.execute.side_effect = SQLAlchemyError
+    with pytest.raises(DatabaseError):
+        reset_circuit_breaker(notifier_type="gotify")
+
+
+@mock.patch("friends_keeper.utils.orm.circuit_breakers.get_object_from_query")
+def test_get_circuit_breaker_abnormal(get_object_mock):
+    get_object_mock.side_effect = DatabaseError
+    with pytest.raises(DatabaseError):
+        get_circuit_breaker(notifier_type="gotify")
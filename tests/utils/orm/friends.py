@@ -1,17 +1,31 @@
+import random
+
+from datetime import date
+from datetime import timedelta
 from unittest import mock
 
 import pytest
 
+from sqlalchemy import insert
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 
+from friends_keeper.database.friends import Friend
+from friends_keeper.database.notifications import NotificationEvent
 from friends_keeper.exceptions import DatabaseError
+from friends_keeper.scheduling import RandomScheduling
 from friends_keeper.utils.orm.friends import create_friend
 from friends_keeper.utils.orm.friends import delete_friend
 from friends_keeper.utils.orm.friends import get_all_friend_notifications
 from friends_keeper.utils.orm.friends import get_all_friends
 from friends_keeper.utils.orm.friends import get_friend
 from friends_keeper.utils.orm.friends import get_friend_notifications_sent
+from friends_keeper.utils.orm.friends import get_friends_by_ids
+from friends_keeper.utils.orm.friends import get_friends_page
+from friends_keeper.utils.orm.friends import get_max_friend_id
 from friends_keeper.utils.orm.friends import get_next_friend_notification
+from friends_keeper.utils.orm.friends import insert_friends_with_events
+from friends_keeper.utils.orm.friends import reschedule_active_friends
 
 
 @mock.patch("friends_keeper.utils.orm.friends.Session")
@@ -57,6 +71,21 @@ def test_get_friend_none(get_object_mock):
     assert friend == None
 
 
+@mock.patch("friends_keeper.utils.orm.friends.get_object_from_query")
+def test_get_friends_by_ids(get_object_mock, friend_list):
+    get_object_mock.return_value = friend_list
+    friends = get_friends_by_ids(friend_ids=[0, 1, 1])
+    assert 1 == get_object_mock.call_count
+    assert len(friends) == 2
+
+
+@mock.patch("friends_keeper.utils.orm.friends.get_object_from_query")
+def test_get_friends_by_ids_abnormal(get_object_mock):
+    get_object_mock.side_effect = DatabaseError
+    with pytest.raises(DatabaseError):
+        get_friends_by_ids(friend_ids=[1])
+
+
 @mock.patch("friends_keeper.utils.orm.friends.get_object_from_query")
 def test_get_all_friends(get_object_mock, friend_list):
     get_object_mock.return_value = friend_list
@@ -90,6 +119,16 @@ def test_get_next_friend_notification(get_object_mock, two_notifications):
     assert notification.friend_id == (id - 1)
 
 
+@pytest.mark.parametrize("function", [get_next_friend_notification, get_all_friend_notifications])
+@mock.patch("friends_keeper.utils.orm.friends.get_object_from_query")
+def test_friend_notifications_use_index(get_object_mock, function, query_plan):
+    get_object_mock.return_value = []
+    function(friend_id=1)
+    plan = query_plan(get_object_mock.call_args.kwargs["query"])
+    assert "SCAN notifications" not in plan
+    assert "USING INDEX ix_notifications_friend_id" in plan
+
+
 @mock.patch("friends_keeper.utils.orm.friends.get_object_from_query")
 def test_get_next_friend_notification_abnormal(get_object_mock):
     get_object_mock.side_effect = DatabaseError
@@ -182,3 +221,83 @@ def test_delete_friend_notification_false(delete_friend_notification):
     delete_friend_notification.return_value = False
     result = delete_friend(friend_id=1)
     assert False == result
+
+
+def test_get_friends_page(populated_database):
+    assert [1, 2] == [friend.id for friend in get_friends_page(limit=2)]
+    assert [3, 4] == [friend.id for friend in get_friends_page(after=2, limit=2)]
+    assert [] == get_friends_page(after=4, limit=2)
+    assert [5] == [friend.id for friend in get_friends_page(after=4, limit=2, show_inactive=True)]
+
+
+@mock.patch("friends_keeper.utils.orm.friends.get_object_from_query")
+def test_get_friends_page_abnormal(get_object_mock):
+    get_object_mock.side_effect = DatabaseError
+    with pytest.raises(DatabaseError):
+        get_friends_page()
+
+
+def test_reschedule_active_friends(populated_database):
+    today = date.today()
+
+    with populated_database.begin() as connection:
+        connection.execute(insert(Friend), [{"id": 6, "nickname": "nickname6", "min_days": 10, "max_days": 11}])
+
+    assert (4, 1) == reschedule_active_friends(strategy=RandomScheduling(rng=random.Random(0)), today=today)
+
+    with populated_database.connect() as connection:
+        pending = dict(
+            connection.execute(
+                select(NotificationEvent.friend_id, NotificationEvent.date).where(
+                    NotificationEvent.already_notified == False  # noqa: E712
+                )
+            ).all()
+        )
+
+    assert all(today + timedelta(days=2) <= pending[friend_id] < today + timedelta(days=4) for friend_id in range(1, 5))
+    assert today == pending[5]
+    assert today + timedelta(days=10) == pending[6]
+
+
+def test_reschedule_active_friends_seed(populated_database):
+    def get_pending_dates():
+        with populated_database.connect() as connection:
+            return connection.execute(select(NotificationEvent.date).order_by(NotificationEvent.id)).scalars().all()
+
+    reschedule_active_friends(strategy=RandomScheduling(rng=random.Random(1)))
+    first_dates = get_pending_dates()
+    reschedule_active_friends(strategy=RandomScheduling(rng=random.Random(1)))
+
+    assert first_dates == get_pending_dates()
+
+
+def test_reschedule_active_friends_empty(tmp_database):
+    assert (0, 0) == reschedule_active_friends()
+
+
+@mock.patch("friends_keeper.utils.orm.friends.Session")
+def test_reschedule_active_friends_abnormal(session_mock):
+    session_mock.return_value.__enter__.return_value.execute.side_effect = SQLAlchemyError()
+    with pytest.raises(DatabaseError):
+        reschedule_active_friends()
+
+
+def test_insert_friends_with_events(tmp_database):
+    assert 0 == get_max_friend_id()
+
+    insert_friends_with_events(
+        friends=[{"id": 7, "nickname": "seeded", "min_days": 2, "max_days": 4, "active": True}],
+        notification_events=[{"friend_id": 7, "date": date.today(), "already_notified": False}],
+    )
+
+    assert 7 == get_max_friend_id()
+    assert 1 == len(get_all_friend_notifications(friend_id=7))
+
+
+@mock.patch("friends_keeper.utils.orm.friends.Session")
+def test_insert_friends_with_events_abnormal(session_mock):
+    session_mock.return_value.__enter__.return_value.execute.side_effect = SQLAlchemyError()
+    with pytest.raises(DatabaseError):
+        insert_friends_with_events(friends=[{"id": 1, "nickname": "seeded"}], notification_events=[])
+
+    session_mock.return_value.__enter__.return_value.rollback.assert_called_once()
@@ -0,0 +1,118 @@
+import time
+
+from datetime import datetime
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+
+from sqlalchemy import select
+from sqlalchemy import update
+from sqlalchemy.exc import SQLAlchemyError
+
+from friends_keeper.database.locks import Lock
+from friends_keeper.exceptions import DatabaseError
+from friends_keeper.utils.orm.locks import acquire_lock
+from friends_keeper.utils.orm.locks import get_lock_owner
+from friends_keeper.utils.orm.locks import hold_lock
+from friends_keeper.utils.orm.locks import release_lock
+from friends_keeper.utils.orm.locks import renew_lock
+
+
+def test_get_lock_owner():
+    assert get_lock_owner() != get_lock_owner()
+
+
+def test_acquire_lock(tmp_database):
+    assert True == acquire_lock(name="run", owner="first")
+    assert False == acquire_lock(name="run", owner="second")
+    # The owner extends the lock it already holds.
+    assert True == acquire_lock(name="run", owner="first")
+    assert True == acquire_lock(name="other", owner="second")
+
+
+def test_acquire_lock_expired(tmp_database):
+    acquire_lock(name="run", owner="first")
+
+    with tmp_database.begin() as connection:
+        connection.execute(update(Lock).values(expires_at=datetime.now() - timedelta(seconds=1)))
+
+    assert True == acquire_lock(name="run", owner="second")
+    assert False == release_lock(name="run", owner="first")
+
+    with tmp_database.connect() as connection:
+        assert "second" == connection.execute(select(Lock.owner)).scalar()
+
+
+@mock.patch("friends_keeper.utils.orm.locks.Session")
+def test_acquire_lock_abnormal(session_mock):
+    session_mock.return_value.__enter__.return_value.execute.side_effect = SQLAlchemyError
+    with pytest.raises(DatabaseError):
+        acquire_lock(name="run", owner="first")
+
+
+def test_release_lock(tmp_database):
+    acquire_lock(name="run", owner="first")
+
+    assert False == release_lock(name="run", owner="second")
+    assert True == release_lock(name="run", owner="first")
+    assert True == acquire_lock(name="run", owner="second")
+
+
+@mock.patch("friends_keeper.utils.orm.locks.Session")
+def test_release_lock_abnormal(session_mock):
+    session_mock.return_value.__enter__.return_value.execute.side_effect = SQLAlchemyError
+    with pytest.raises(DatabaseError):
+        release_lock(name="run", owner="first")
+
+
+def test_renew_lock(tmp_database):
+    acquire_lock(name="run", owner="first", ttl=1)
+
+    assert False == renew_lock(name="run", owner="second")
+    assert True == renew_lock(name="run", owner="first", ttl=60)
+
+    with tmp_database.connect() as connection:
+        assert connection.execute(select(Lock.expires_at)).scalar() > datetime.now() + timedelta(seconds=30)
+
+
+@mock.patch("friends_keeper.utils.orm.locks.Session")
+def test_renew_lock_abnormal(session_mock):
+    session_mock.return_value.__enter__.return_value.execute.side_effect = SQLAlchemyError
+    with pytest.raises(DatabaseError):
+        renew_lock(name="run", owner="first")
+
+
+def test_hold_lock(tmp_database):
+    with hold_lock("run") as acquired:
+        assert True == acquired
+
+        with hold_lock("run") as acquired_again:
+            assert False == acquired_again
+
+    with hold_lock("run") as acquired:
+        assert True == acquired
+
+
+def test_hold_lock_renews_lease(tmp_database):
+    with hold_lock("run", ttl=0.3) as acquired:
+        assert True == acquired
+        # Held longer than its time to live, the lock is renewed meanwhile.
+        time.sleep(0.6)
+        assert False == acquire_lock(name="run", owner="second")
+
+    assert True == acquire_lock(name="run", owner="second")
+
+
+@mock.patch("friends_keeper.utils.orm.locks.logger")
+@mock.patch("friends_keeper.utils.orm.locks.release_lock")
+def test_hold_lock_release_error(release_mocked, logger_mocked, tmp_database):
+    release_mocked.side_effect = DatabaseError
+
+    # The error raised within the context is not replaced by the release one.
+    with pytest.raises(ValueError):
+        with hold_lock("run"):
+            raise ValueError
+
+    assert 1 == release_mocked.call_count
+    assert 1 == logger_mocked.error.call_count
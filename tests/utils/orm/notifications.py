@@ -1,18 +1,29 @@
 from datetime import datetime
+from datetime import timedelta
 from unittest import mock
 
 import pytest
 
+from sqlalchemy import update
 from sqlalchemy.exc import SQLAlchemyError
 
+from friends_keeper.database.notifications import NotificationEvent
+from friends_keeper.database.outbox import OutboxMessage
 from friends_keeper.exceptions import DatabaseError
+from friends_keeper.utils.orm.notifications import claim_notifications
 from friends_keeper.utils.orm.notifications import create_notification
 from friends_keeper.utils.orm.notifications import delete_friend_notification
 from friends_keeper.utils.orm.notifications import delete_notification
 from friends_keeper.utils.orm.notifications import get_coming_notifications
+from friends_keeper.utils.orm.notifications import get_due_notifications_by_friend
 from friends_keeper.utils.orm.notifications import get_notification
+from friends_keeper.utils.orm.notifications import get_notifications_page
+from friends_keeper.utils.orm.notifications import get_pending_notifications_per_window
 from friends_keeper.utils.orm.notifications import get_today_notifications
+from friends_keeper.utils.orm.notifications import get_today_notifications_with_friends
 from friends_keeper.utils.orm.notifications import mark_notification_as_done
+from friends_keeper.utils.orm.notifications import release_notifications
+from friends_keeper.utils.orm.notifications import reschedule_notifications
 from friends_keeper.utils.orm.notifications import update_notification_event_date
 
 
@@ -23,6 +34,24 @@ def test_get_today_notifications(get_object_mock, two_notifications):
     assert len(notifications) == 2
 
 
+@mock.patch("friends_keeper.utils.orm.notifications.get_object_from_query")
+def test_get_today_notifications_uses_index(get_object_mock, query_plan):
+    get_object_mock.return_value = []
+    get_today_notifications()
+    plan = query_plan(get_object_mock.call_args.kwargs["query"])
+    assert "SCAN notifications" not in plan
+    assert "USING INDEX ix_notifications_" in plan
+
+
+@mock.patch("friends_keeper.utils.orm.notifications.get_rows_from_query")
+def test_get_today_notifications_with_friends_uses_index(get_rows_mock, query_plan):
+    get_rows_mock.return_value = []
+    get_today_notifications_with_friends()
+    plan = query_plan(get_rows_mock.call_args.kwargs["query"])
+    assert "SCAN notifications" not in plan
+    assert "USING INDEX ix_notifications_" in plan
+
+
 @mock.patch("friends_keeper.utils.orm.notifications.get_object_from_query")
 def test_get_today_notifications_abnormal(get_object_mock):
     get_object_mock.side_effect = DatabaseError
@@ -34,6 +63,58 @@ def test_get_today_notifications_abnormal(get_object_mock):
         pytest.raises(DatabaseError)
 
 
+@mock.patch("friends_keeper.utils.orm.notifications.get_rows_from_query")
+def test_get_today_notifications_with_friends(get_rows_mock, two_notifications_with_friends):
+    get_rows_mock.return_value = two_notifications_with_friends
+    notifications = get_today_notifications_with_friends()
+    assert notifications == two_notifications_with_friends
+
+
+@mock.patch("friends_keeper.utils.orm.notifications.get_rows_from_query")
+def test_get_today_notifications_with_friends_abnormal(get_rows_mock):
+    get_rows_mock.side_effect = DatabaseError
+    with pytest.raises(DatabaseError):
+        get_today_notifications_with_friends()
+
+
+@mock.patch("friends_keeper.utils.orm.notifications.Session")
+def test_reschedule_notifications(session_mock, db_session):
+    session_mock.return_value = db_session
+    today = datetime.today().date()
+    db_session.add_all(
+        [NotificationEvent(id=10, friend_id=1, date=today), NotificationEvent(id=11, friend_id=2, date=today)]
+    )
+    db_session.flush()
+    next_notifications = [{"friend_id": 1, "date": today}, {"friend_id": 2, "date": today}]
+    result = reschedule_notifications(notification_ids=[10, 11], next_notifications=next_notifications)
+    assert True == result
+    notifications = db_session.query(NotificationEvent).order_by(NotificationEvent.id).all()
+    assert [True, True, False, False] == [notification.already_notified for notification in notifications]
+
+
+@mock.patch("friends_keeper.utils.orm.notifications.Session")
+def test_reschedule_notifications_with_outbox(session_mock, db_session):
+    session_mock.return_value = db_session
+    today = datetime.today().date()
+    db_session.add(NotificationEvent(id=10, friend_id=1, date=today))
+    db_session.flush()
+    outbox_messages = [{"notifier_type": "file", "idempotency_key": "file-key-0", "message": "ANY MSG"}]
+    reschedule_notifications(
+        notification_ids=[10], next_notifications=[{"friend_id": 1, "date": today}], outbox_messages=outbox_messages
+    )
+    messages = db_session.query(OutboxMessage).all()
+    assert [("file-key-0", "pending", 0)] == [
+        (message.idempotency_key, message.status, message.attempts) for message in messages
+    ]
+
+
+@mock.patch("friends_keeper.utils.orm.notifications.Session")
+def test_reschedule_notifications_abnormal(session_mock):
+    session_mock.return_value.__enter__.return_value.execute.side_effect = SQLAlchemyError()
+    with pytest.raises(DatabaseError):
+        reschedule_notifications(notification_ids=[1], next_notifications=[])
+
+
 @mock.patch("friends_keeper.utils.orm.notifications.Session")
 def test_create_notification(session_mock, db_session):
     session_mock.return_value = db_session
@@ -155,3 +236,121 @@ def test_get_notification_abnormal(get_object_mock, two_notifications):
         get_notification(notification_id=1)
     except DatabaseError:
         pytest.raises(DatabaseError)
+
+
+def test_get_notifications_page(populated_database):
+    first_page = get_notifications_page(limit=2)
+    second_page = get_notifications_page(after=first_page[-1][0].id, limit=2)
+    last_page = get_notifications_page(after=second_page[-1][0].id, limit=2)
+
+    assert [10, 8] == [notification.id for notification, _ in first_page]
+    assert [9, 6] == [notification.id for notification, _ in second_page]
+    assert [7] == [notification.id for notification, _ in last_page]
+    assert "nickname5" == first_page[0][1].nickname
+
+
+def test_get_notifications_page_friend(populated_database):
+    notifications = get_notifications_page(friend_id=2)
+    assert [2, 7] == [notification.id for notification, _ in notifications]
+    assert [7] == [notification.id for notification, _ in get_notifications_page(after=2, friend_id=2)]
+
+
+def test_get_due_notifications_by_friend(overdue_database):
+    first_chunk = get_due_notifications_by_friend(limit=1)
+    second_chunk = get_due_notifications_by_friend(after=first_chunk[-1][0].id, limit=1)
+
+    assert [1] == [friend.id for friend, _ in first_chunk]
+    assert [11, 12, 13] == [event.id for event in first_chunk[0][1]]
+    assert [2] == [friend.id for friend, _ in second_chunk]
+    assert [14] == [event.id for event in second_chunk[0][1]]
+    # Friend 5 has its pending event due today.
+    assert [5] == [friend.id for friend, _ in get_due_notifications_by_friend(after=2)]
+
+
+@mock.patch("friends_keeper.utils.orm.notifications.get_rows_from_query")
+def test_get_due_notifications_by_friend_abnormal(get_rows_mock):
+    get_rows_mock.side_effect = DatabaseError
+    with pytest.raises(DatabaseError):
+        get_due_notifications_by_friend()
+
+
+def test_get_pending_notifications_per_window(populated_database):
+    today = datetime.today().date()
+    rows = get_pending_notifications_per_window(start=today + timedelta(days=1), end=today + timedelta(days=3))
+    assert [(today + timedelta(days=1), 2, 4, 2), (today + timedelta(days=2), 2, 4, 2)] == sorted(rows)
+
+
+@mock.patch("friends_keeper.utils.orm.notifications.get_rows_from_query")
+def test_get_pending_notifications_per_window_uses_index(get_rows_mock, query_plan):
+    get_rows_mock.return_value = []
+    today = datetime.today().date()
+    get_pending_notifications_per_window(start=today, end=today + timedelta(days=30))
+    plan = query_plan(get_rows_mock.call_args.kwargs["query"])
+    assert "SCAN notifications" not in plan
+    assert "USING INDEX ix_notifications_" in plan
+
+
+@mock.patch("friends_keeper.utils.orm.notifications.get_rows_from_query")
+def test_get_pending_notifications_per_window_abnormal(get_rows_mock):
+    get_rows_mock.side_effect = DatabaseError
+    with pytest.raises(DatabaseError):
+        get_pending_notifications_per_window(start=datetime.today().date(), end=datetime.today().date())
+
+
+@mock.patch("friends_keeper.utils.orm.notifications.get_rows_from_query")
+def test_get_notifications_page_uses_index(get_rows_mock, query_plan):
+    get_rows_mock.return_value = []
+    get_notifications_page(after=10, limit=2)
+    plan = query_plan(get_rows_mock.call_args.kwargs["query"])
+    assert "SCAN notifications" not in plan
+    assert "TEMP B-TREE" not in plan
+
+
+@mock.patch("friends_keeper.utils.orm.notifications.get_rows_from_query")
+def test_get_notifications_page_abnormal(get_rows_mock):
+    get_rows_mock.side_effect = DatabaseError
+    with pytest.raises(DatabaseError):
+        get_notifications_page()
+
+
+def test_claim_notifications(overdue_database):
+    assert [10, 11, 12, 13, 14] == sorted(claim_notifications(claim_token="first"))
+    # Events claimed by another run are left out until their claim expires.
+    assert [] == claim_notifications(claim_token="second")
+    assert [10, 11, 12, 13, 14] == sorted(event.id for event in get_today_notifications(claim_token="first"))
+    assert [] == get_today_notifications_with_friends(claim_token="second")
+
+    with overdue_database.begin() as connection:
+        connection.execute(
+            update(NotificationEvent)
+            .where(NotificationEvent.id == 14)
+            .values(claimed_at=datetime.now() - timedelta(hours=2))
+        )
+
+    assert [14] == claim_notifications(claim_token="second", ttl=3600)
+
+
+def test_claim_notifications_by_ids(overdue_database):
+    assert [11, 12] == sorted(claim_notifications(claim_token="first", notification_ids=[6, 11, 12]))
+    assert [13] == claim_notifications(claim_token="second", notification_ids=[11, 12, 13])
+
+
+@mock.patch("friends_keeper.utils.orm.notifications.Session")
+def test_claim_notifications_abnormal(session_mock):
+    session_mock.return_value.__enter__.return_value.execute.side_effect = SQLAlchemyError
+    with pytest.raises(DatabaseError):
+        claim_notifications(claim_token="token")
+
+
+def test_release_notifications(overdue_database):
+    claim_notifications(claim_token="first")
+
+    assert True == release_notifications([11, 14])
+    assert [11, 14] == sorted(claim_notifications(claim_token="second"))
+
+
+@mock.patch("friends_keeper.utils.orm.notifications.Session")
+def test_release_notifications_abnormal(session_mock):
+    session_mock.return_value.__enter__.return_value.execute.side_effect = SQLAlchemyError
+    with pytest.raises(DatabaseError):
+        release_notifications([1])
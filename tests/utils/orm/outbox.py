@@ -0,0 +1,95 @@
+from datetime import datetime
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from friends_keeper.database.outbox import OutboxMessage
+from friends_keeper.exceptions import DatabaseError
+from friends_keeper.utils.orm.outbox import claim_outbox_messages
+from friends_keeper.utils.orm.outbox import complete_outbox_messages
+from friends_keeper.utils.orm.outbox import enqueue_outbox_messages
+from friends_keeper.utils.orm.outbox import get_due_outbox_filter
+from friends_keeper.utils.orm.outbox import get_next_outbox_attempt
+
+
+MESSAGES = [
+    {"notifier_type": "file", "idempotency_key": "file-0", "message": "first"},
+    {"notifier_type": "gotify", "idempotency_key": "gotify-0", "message": "first"},
+    {"notifier_type": "file", "idempotency_key": "file-1", "message": "second"},
+]
+
+
+def test_enqueue_outbox_messages(tmp_database):
+    assert get_next_outbox_attempt() is None
+    assert True == enqueue_outbox_messages(MESSAGES)
+    assert get_next_outbox_attempt() <= datetime.now()
+    assert [1, 3] == [message.id for message in claim_outbox_messages("first", notifier_types=["file"])]
+    assert [2] == [message.id for message in claim_outbox_messages("second", notifier_types=["file", "gotify"])]
+
+
+@mock.patch("friends_keeper.utils.orm.outbox.Session")
+def test_enqueue_outbox_messages_abnormal(session_mock):
+    session_mock.return_value.__enter__.return_value.execute.side_effect = SQLAlchemyError
+    with pytest.raises(DatabaseError):
+        enqueue_outbox_messages(MESSAGES)
+
+
+def test_complete_outbox_messages(tmp_database):
+    enqueue_outbox_messages(MESSAGES)
+    next_attempt_at = datetime.now() + timedelta(minutes=5)
+    failure = {"id": 2, "status": "pending", "attempts": 1, "next_attempt_at": next_attempt_at, "last_error": "boom"}
+
+    assert True == complete_outbox_messages(sent_ids=[1, 3], failures=[failure])
+    assert [] == claim_outbox_messages("first", notifier_types=["file", "gotify"])
+    assert next_attempt_at == get_next_outbox_attempt()
+
+    with tmp_database.connect() as connection:
+        outbox = connection.execute(select(OutboxMessage).order_by(OutboxMessage.id)).all()
+
+    assert ["sent", "pending", "sent"] == [message.status for message in outbox]
+    assert all(message.sent_at is not None for message in outbox[::2])
+    assert ("boom", 1) == (outbox[1].last_error, outbox[1].attempts)
+
+
+@mock.patch("friends_keeper.utils.orm.outbox.Session")
+def test_complete_outbox_messages_abnormal(session_mock):
+    session_mock.return_value.__enter__.return_value.execute.side_effect = SQLAlchemyError
+    with pytest.raises(DatabaseError):
+        complete_outbox_messages(sent_ids=[1], failures=[])
+
+
+def test_claim_outbox_messages(tmp_database):
+    enqueue_outbox_messages(MESSAGES)
+
+    assert [1] == [message.id for message in claim_outbox_messages("first", notifier_types=["file"], limit=1)]
+    # Messages claimed by another run are left alone until released or expired.
+    assert [3] == [message.id for message in claim_outbox_messages("second", notifier_types=["file"])]
+    assert [] == claim_outbox_messages("third", notifier_types=["file"])
+    assert [1, 3] == [message.id for message in claim_outbox_messages("third", notifier_types=["file"], ttl=0)]
+
+    complete_outbox_messages(sent_ids=[], failures=[], claim_token="third")
+    assert [1, 3] == [message.id for message in claim_outbox_messages("fourth", notifier_types=["file"])]
+
+
+@mock.patch("friends_keeper.utils.orm.outbox.Session")
+def test_claim_outbox_messages_abnormal(session_mock):
+    session_mock.return_value.__enter__.return_value.execute.side_effect = SQLAlchemyError
+    with pytest.raises(DatabaseError):
+        claim_outbox_messages("first", notifier_types=["file"])
+
+
+@mock.patch("friends_keeper.utils.orm.outbox.get_object_from_query")
+def test_get_next_outbox_attempt_abnormal(get_object_mock):
+    get_object_mock.side_effect = DatabaseError
+    with pytest.raises(DatabaseError):
+        get_next_outbox_attempt()
+
+
+def test_get_due_outbox_filter_uses_index(query_plan):
+    query = select(OutboxMessage.id).where(get_due_outbox_filter(notifier_types=["file"], now=datetime.now()))
+    plan = query_plan(query)
+    assert "ix_outbox_status_next_attempt_at" in plan
@@ -0,0 +1,95 @@
+from datetime import date
+from datetime import timedelta
+
+import pytest
+
+from sqlalchemy import select
+
+from friends_keeper.database import configure_database
+from friends_keeper.database import dispose_database
+from friends_keeper.database.friends import Friend
+from friends_keeper.database.migrations import upgrade_database
+from friends_keeper.database.notifications import NotificationEvent
+from friends_keeper.utils.seed import parse_days_range
+from friends_keeper.utils.seed import seed_friends
+
+
+TODAY = date(2024, 6, 1)
+
+
+def dump(engine) -> tuple:
+    with engine.connect() as connection:
+        friends = connection.execute(select(Friend.__table__).order_by(Friend.id)).all()
+        events = connection.execute(
+            select(
+                NotificationEvent.friend_id, NotificationEvent.date, NotificationEvent.already_notified
+            ).order_by(NotificationEvent.id)
+        ).all()
+
+    return friends, events
+
+
+def test_seed_friends(tmp_database):
+    result = seed_friends(
+        friends=250,
+        min_days=(2, 5),
+        max_days=(6, 9),
+        inactive_ratio=0.2,
+        history_years=1,
+        seed=1,
+        chunk_size=100,
+        today=TODAY,
+    )
+    friends, events = dump(tmp_database)
+
+    assert 250 == result.friends == len(friends)
+    assert 0 < result.inactive < 250
+    assert result.inactive == sum(not friend.active for friend in friends)
+    assert result.pending == 250 - result.inactive
+    assert result.pending + result.history == len(events)
+    assert all(2 <= friend.min_days <= 5 and 6 <= friend.max_days <= 9 for friend in friends)
+
+    for friend_id, event_date, already_notified in events:
+
+        if already_notified:
+            assert TODAY - timedelta(days=365) <= event_date < TODAY
+        else:
+            assert TODAY <= event_date < TODAY + timedelta(days=9)
+
+
+def test_seed_friends_deterministic(tmp_path_factory):
+    dumps = list()
+
+    for _ in range(2):
+        engine = configure_database({"database": {"url": f"sqlite:///{tmp_path_factory.mktemp('seed') / 'seed.db'}"}})
+        upgrade_database(engine)
+        seed_friends(friends=50, seed=7, chunk_size=20, today=TODAY)
+        dumps.append(dump(engine))
+        dispose_database()
+
+    assert dumps[0] == dumps[1]
+
+
+def test_seed_friends_after_existing(populated_database):
+    seed_friends(friends=3, history_years=0, seed=1, today=TODAY)
+    friends, _ = dump(populated_database)
+
+    assert ["seed_6", "seed_7", "seed_8"] == [friend.nickname for friend in friends[5:]]
+
+
+def test_seed_friends_max_over_min(tmp_database):
+    seed_friends(friends=20, min_days=(10, 10), max_days=(1, 10), history_years=0, seed=1, today=TODAY)
+    friends, _ = dump(tmp_database)
+
+    assert all(friend.max_days == 11 for friend in friends)
+
+
+@pytest.mark.parametrize("value, expected", [("7:20", (7, 20)), ("5", (5, 5))])
+def test_parse_days_range(value, expected):
+    assert expected == parse_days_range(value)
+
+
+@pytest.mark.parametrize("value", ["a:b", "0:4", "9:3", ""])
+def test_parse_days_range_invalid(value):
+    with pytest.raises(ValueError):
+        parse_days_range(value)
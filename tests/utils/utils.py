@@ -1,8 +1,14 @@
+import json
+import os
+
 from unittest import mock
 
 import pytest
+import yaml
 
 from friends_keeper.exceptions import ConfigurationError
+from friends_keeper.utils import clear_configuration_cache
+from friends_keeper.utils import get_configuration_validator
 from friends_keeper.utils import load_configuration_file
 
 
@@ -23,3 +29,55 @@ def test_load_configuration_abnormal(check_config_mocked, safe_load_mocked):
     safe_load_mocked.safe_load.return_value = dump_config
     check_config_mocked.return_value = False
     pytest.raises(ConfigurationError)
+
+
+@mock.patch("friends_keeper.utils.check_config")
+def test_load_configuration_cached(check_config_mocked, config_file):
+    check_config_mocked.return_value = True
+    first_configuration = load_configuration_file()
+    first_configuration["notifications"]["title"] = "Changed by caller"
+    second_configuration = load_configuration_file()
+
+    assert 1 == check_config_mocked.call_count
+    assert "Title" == second_configuration["notifications"]["title"]
+
+
+@mock.patch("friends_keeper.utils.check_config")
+def test_load_configuration_cache_invalidated(check_config_mocked, config_file):
+    check_config_mocked.return_value = True
+    load_configuration_file()
+    config_file.write_text(config_file.read_text().replace("Title", "New title"))
+    stat = os.stat(config_file)
+    os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    configuration = load_configuration_file()
+
+    assert 2 == check_config_mocked.call_count
+    assert "New title" == configuration["notifications"]["title"]
+
+
+def test_load_configuration_cache_file(config_file, tmp_path):
+    cache_file_path = str(tmp_path / "config.cache.json")
+
+    with mock.patch("friends_keeper.utils.CONFIGURATION_CACHE_FILE_PATH", cache_file_path):
+        configuration = load_configuration_file()
+        clear_configuration_cache()
+
+        with mock.patch("friends_keeper.utils.yaml") as yaml_mocked:
+            cached_configuration = load_configuration_file()
+
+    with open(cache_file_path) as cache_file:
+        assert str(config_file) == json.load(cache_file)["path"]
+
+    assert False == yaml_mocked.safe_load.called
+    assert configuration == cached_configuration
+
+
+def test_configuration_validator_built_once():
+    assert get_configuration_validator() is get_configuration_validator()
+
+
+def test_load_configuration_invalid_schema(config_file):
+    config_file.write_text(yaml.safe_dump({"notifications": {"title": "Missing type"}}))
+
+    with pytest.raises(ConfigurationError):
+        load_configuration_file()